@@ -43,9 +43,7 @@ class ObservationEncoder:
     @staticmethod
     def encode(obs) -> torch.Tensor:
         """Returns (74, 34) float32 tensor from the Rust observation encoder."""
-        feat_bytes = obs.encode()
-        feat_numpy = np.frombuffer(feat_bytes, dtype=np.float32).reshape(74, 34).copy()
-        return torch.from_numpy(feat_numpy)
+        return torch.from_numpy(obs.encode())
 
 
 class BaseDataset(IterableDataset):
@@ -92,25 +90,23 @@ class MCDataset(BaseDataset):
                     # Encode Group Features for Reward Prediction
                     grp_features = GrpFeatureEncoder(kyoku).encode()
 
-                    for player_id in range(4):
-                        trajectory = []
+                    # Collect all four trajectories in one pass over the kyoku
+                    trajectories = [[] for _ in range(4)]
+                    for player_id, obs, action in kyoku.steps(skip_single_action=True):
+                        features = self.encoder.encode(obs)
+                        action_id = action.encode()
 
+                        mask = obs.mask()
+                        assert 0 <= action_id < mask.shape[0], f"action_id should be in [0, {mask.shape[0]})"
+                        assert mask[action_id] == 1, f"action_id {action_id} should be legal"
+                        trajectories[player_id].append((features, action_id, mask))
+
+                    for player_id, trajectory in enumerate(trajectories):
                         # Compute Final Reward for this Kyoku
                         assert self.reward_predictor is not None
                         _, final_reward = self.reward_predictor.calc_pts_rewards([grp_features], player_id)
                         final_reward = final_reward.detach().cpu().item()
 
-                        # Collect Trajectory
-                        for obs, action in kyoku.steps(player_id):
-                            features = self.encoder.encode(obs)
-                            action_id = action.encode()
-
-                            mask_bytes = obs.mask()
-                            mask = np.frombuffer(mask_bytes, dtype=np.uint8).copy()
-                            assert 0 <= action_id < mask.shape[0], f"action_id should be in [0, {mask.shape[0]})"
-                            assert mask[action_id] == 1, f"action_id {action_id} should be legal"
-                            trajectory.append((features, action_id, mask))
-
                         # Compute Returns
                         T = len(trajectory)
                         for t, (feat, act, mask) in enumerate(trajectory):
@@ -132,8 +128,8 @@ class DiscardHistoryEncoder:
 
     @staticmethod
     def encode(obs) -> torch.Tensor:
-        base = np.frombuffer(obs.encode(), dtype=np.float32).reshape(74, 34).copy()
-        decay = np.frombuffer(obs.encode_discard_history_decay(), dtype=np.float32).reshape(4, 34).copy()
+        base = obs.encode()
+        decay = obs.encode_discard_history_decay()
         combined = np.concatenate([base, decay], axis=0)
         return torch.from_numpy(combined)
 
@@ -143,9 +139,9 @@ class DiscardHistoryShantenEncoder:
 
     @staticmethod
     def encode(obs) -> torch.Tensor:
-        base = np.frombuffer(obs.encode(), dtype=np.float32).reshape(74, 34).copy()
-        decay = np.frombuffer(obs.encode_discard_history_decay(), dtype=np.float32).reshape(4, 34).copy()
-        shanten = np.frombuffer(obs.encode_shanten_efficiency(), dtype=np.float32).reshape(4, 4).copy()
+        base = obs.encode()
+        decay = obs.encode_discard_history_decay()
+        shanten = obs.encode_shanten_efficiency()
         shanten_broadcast = np.repeat(shanten.reshape(16, 1), 34, axis=1)
         combined = np.concatenate([base, decay, shanten_broadcast], axis=0)
         return torch.from_numpy(combined)
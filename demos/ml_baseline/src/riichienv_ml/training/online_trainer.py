@@ -37,7 +37,7 @@ def evaluate_vs_baseline(hero_model, baseline_model, device, encoder, num_episod
                 model = hero_model if pid == 0 else baseline_model
 
                 feat = encoder.encode(obs)
-                mask = np.frombuffer(obs.mask(), dtype=np.uint8).copy()
+                mask = obs.mask()
 
                 feat_t = feat.to(device).unsqueeze(0)
                 mask_t = torch.from_numpy(mask).to(device).unsqueeze(0)
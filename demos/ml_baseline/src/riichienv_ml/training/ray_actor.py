@@ -68,7 +68,7 @@ class MahjongWorker:
     def _encode_obs(self, obs):
         """Encodes Rust observation."""
         feat = self.encoder.encode(obs)
-        mask = np.frombuffer(obs.mask(), dtype=np.uint8).copy()
+        mask = obs.mask()
 
         feat_tensor = feat.to(self.device)
         mask_tensor = torch.from_numpy(mask).to(self.device)
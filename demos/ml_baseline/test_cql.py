@@ -1,4 +1,3 @@
-import numpy as np
 import torch
 from riichienv import RiichiEnv
 from riichienv.agents import RandomAgent
@@ -15,10 +14,10 @@ class CQLAgent:
 
     def act(self, obs):
         with torch.no_grad():
-            feat = np.frombuffer(obs.encode(), dtype=np.float32).reshape(46, 34).copy()
+            feat = obs.encode()
             q_values = self.model(torch.from_numpy(feat).unsqueeze(0).to(self.device))
 
-            mask = torch.from_numpy(np.frombuffer(obs.mask(), dtype=np.uint8).copy()).to(self.device)
+            mask = torch.from_numpy(obs.mask()).to(self.device)
             q_values = q_values.masked_fill(mask == 0, -1e9)
             action_selected = q_values.argmax(dim=1).item()
 
@@ -16,10 +16,10 @@ class CQLAgent:
 
     def act(self, obs):
         with torch.no_grad():
-            feat = np.frombuffer(obs.encode(), dtype=np.float32).reshape(46, 34).copy()
+            feat = obs.encode()
             q_values = self.model(torch.from_numpy(feat).unsqueeze(0).to(self.device))
 
-            mask = torch.from_numpy(np.frombuffer(obs.mask(), dtype=np.uint8).copy()).to(self.device)
+            mask = torch.from_numpy(obs.mask()).to(self.device)
             q_values = q_values.masked_fill(mask == 0, -1e9)
             action_selected = q_values.argmax(dim=1).item()
 
@@ -40,10 +40,10 @@ class PPOAgent:
 
     def act(self, obs):
         with torch.no_grad():
-            feat = np.frombuffer(obs.encode(), dtype=np.float32).reshape(46, 34).copy()
+            feat = obs.encode()
             logits, q_values = self.model(torch.from_numpy(feat).unsqueeze(0).to(self.device))
 
-            mask = torch.from_numpy(np.frombuffer(obs.mask(), dtype=np.uint8).copy()).to(self.device)
+            mask = torch.from_numpy(obs.mask()).to(self.device)
             logits = logits.masked_fill(mask == 0, -1e9)
             dist = Categorical(logits=logits)
             action = dist.sample()
@@ -104,7 +104,8 @@ impl Action {
             }
         }
 
-        if !self.consume_tiles.is_empty() {
+        // Riichi carries its candidate discards, which are not part of the MJAI event.
+        if !self.consume_tiles.is_empty() && self.action_type != ActionType::Riichi {
             let cons: Vec<String> = self.consume_tiles.iter().map(|&t| tid_to_mjai(t)).collect();
             data.insert("consumed".to_string(), serde_json::to_value(cons).unwrap());
         }
@@ -1,3 +1,19 @@
+//! Winning-hand detection and decomposition.
+//!
+//! Standard hands are checked against precomputed tables: each suit is packed into a
+//! base-5 key of its nine counts (seven for honours, which have no sequences), and the
+//! table tells whether that group splits into mentsu alone or into mentsu plus one pair.
+//! The decompositions of every valid group are stored too, so `find_divisions` only
+//! combines per-group lists instead of backtracking over the whole hand.
+//!
+//! Waits come from a second table derived from the first: for every group key, the
+//! tiles whose addition completes the group with or without a pair. A 13-tile hand
+//! then needs one lookup per group instead of one agari check per candidate tile.
+
+use std::collections::HashMap;
+use std::sync::OnceLock;
+
+use crate::state::compact::TileMask;
 use crate::types::{Hand, TILE_MAX};
 
 #[derive(Debug, Clone, Copy, PartialEq, Eq)]
@@ -12,52 +28,232 @@ pub struct Division {
     pub body: Vec<Mentsu>,
 }
 
-pub fn is_tenpai(hand: &mut Hand) -> bool {
-    // Try adding each tile 0..34
-    // If is_agari becomes true, then it is tenpai.
-    for i in 0..crate::types::TILE_MAX {
-        if hand.counts[i] < 4 {
-            hand.add(i as u8);
+/// The group splits into mentsu only (the empty group included).
+const MENTSU_ONLY: u8 = 1;
+/// The group splits into mentsu plus exactly one pair.
+const MENTSU_AND_PAIR: u8 = 2;
 
-            // Fast checks first
-            if is_kokushi(hand) {
-                hand.remove(i as u8);
-                return true;
+/// First tile and length of the four groups: manzu, pinzu, souzu, honours.
+const GROUPS: [(usize, usize); 4] = [(0, 9), (9, 9), (18, 9), (27, 7)];
+
+/// Mentsu decomposition of a single group, in group-local tile indices.
+///
+/// Codes below `SHUNTSU` are koutsu of that tile, the others shuntsu starting at
+/// `code - SHUNTSU`.
+#[derive(Debug, Clone, Copy)]
+struct GroupDivision {
+    len: u8,
+    mentsu: [u8; 4],
+}
+
+const SHUNTSU: u8 = 9;
+
+impl GroupDivision {
+    fn push_into(&self, base: u8, body: &mut Vec<Mentsu>) {
+        body.extend(self.mentsu[..self.len as usize].iter().map(|&code| {
+            if code < SHUNTSU {
+                Mentsu::Koutsu(base + code)
+            } else {
+                Mentsu::Shuntsu(base + code - SHUNTSU)
             }
-            if is_chiitoitsu(hand) {
-                hand.remove(i as u8);
-                return true;
+        }));
+    }
+}
+
+struct GroupTable {
+    /// `MENTSU_ONLY` / `MENTSU_AND_PAIR` flags indexed by packed counts.
+    flags: Vec<u8>,
+    /// Every mentsu-only decomposition of each `MENTSU_ONLY` key.
+    divisions: HashMap<u32, Vec<GroupDivision>>,
+}
+
+impl GroupTable {
+    /// Enumerate every multiset of at most four mentsu that fits in `len` tiles.
+    fn build(len: usize, sequences: bool) -> Self {
+        let mut table = GroupTable {
+            flags: vec![0; 5usize.pow(len as u32)],
+            divisions: HashMap::new(),
+        };
+        let num_kinds = if sequences { len + len - 2 } else { len };
+        let mut counts = [0u8; 9];
+        table.add_mentsu(&mut counts[..len], num_kinds, 0, 0);
+
+        let complete: Vec<u32> = table.divisions.keys().copied().collect();
+        for key in complete {
+            let mut unit = 1;
+            for _ in 0..len {
+                if (key / unit) % 5 <= 2 {
+                    table.flags[(key + 2 * unit) as usize] |= MENTSU_AND_PAIR;
+                }
+                unit *= 5;
             }
+        }
+        table
+    }
 
-            // Pruning for standard agari:
-            // Only relevant if the added tile 'i' forms a pair or mentsu.
-            // This usually requires neighbors or existing count >= 2.
-            let c = hand.counts[i];
-            let check_standard = if i >= 27 {
-                c >= 2
+    fn add_mentsu(&mut self, counts: &mut [u8], num_kinds: usize, first_kind: usize, depth: usize) {
+        let key = pack(counts);
+        if self.flags[key as usize] & MENTSU_ONLY == 0 {
+            self.flags[key as usize] |= MENTSU_ONLY;
+            let mut found = Vec::new();
+            decompose_group(&mut counts.to_vec(), 0, &mut Vec::new(), &mut found);
+            self.divisions.insert(key, found);
+        }
+        if depth == 4 {
+            return;
+        }
+        let len = counts.len();
+        for kind in first_kind..num_kinds {
+            let tiles = if kind < len {
+                [kind; 3]
             } else {
-                let has_p = if i % 9 > 0 {
-                    hand.counts[i - 1] > 0
-                } else {
-                    false
-                };
-                let has_n = if i % 9 < 8 {
-                    hand.counts[i + 1] > 0
-                } else {
-                    false
-                };
-                c >= 2 || has_p || has_n
+                let start = kind - len;
+                [start, start + 1, start + 2]
             };
+            for &t in &tiles {
+                counts[t] += 1;
+            }
+            if tiles.iter().all(|&t| counts[t] <= 4) {
+                self.add_mentsu(counts, num_kinds, kind, depth + 1);
+            }
+            for &t in &tiles {
+                counts[t] -= 1;
+            }
+        }
+    }
+}
+
+/// Base-5 key of a group's counts (first tile in the lowest digit).
+#[inline]
+fn pack(counts: &[u8]) -> u32 {
+    counts.iter().rev().fold(0, |key, &c| key * 5 + c as u32)
+}
 
-            if check_standard && is_standard_agari(hand) {
-                hand.remove(i as u8);
-                return true;
+/// All mentsu-only decompositions of one group, koutsu tried before shuntsu at the
+/// lowest remaining tile.
+fn decompose_group(
+    counts: &mut [u8],
+    start: usize,
+    current: &mut Vec<u8>,
+    results: &mut Vec<GroupDivision>,
+) {
+    let Some(i) = (start..counts.len()).find(|&i| counts[i] > 0) else {
+        let mut division = GroupDivision {
+            len: current.len() as u8,
+            mentsu: [0; 4],
+        };
+        division.mentsu[..current.len()].copy_from_slice(current);
+        results.push(division);
+        return;
+    };
+
+    if counts[i] >= 3 {
+        counts[i] -= 3;
+        current.push(i as u8);
+        decompose_group(counts, i, current, results);
+        current.pop();
+        counts[i] += 3;
+    }
+
+    // Honour tables have 7 slots, and sequences are only built for 9-slot suits.
+    if counts.len() == 9 && i + 2 < 9 && counts[i + 1] > 0 && counts[i + 2] > 0 {
+        for c in &mut counts[i..i + 3] {
+            *c -= 1;
+        }
+        current.push(SHUNTSU + i as u8);
+        decompose_group(counts, i, current, results);
+        current.pop();
+        for c in &mut counts[i..i + 3] {
+            *c += 1;
+        }
+    }
+}
+
+struct Tables {
+    suit: GroupTable,
+    honor: GroupTable,
+}
+
+impl Tables {
+    #[inline]
+    fn group(&self, g: usize) -> &GroupTable {
+        if g == 3 {
+            &self.honor
+        } else {
+            &self.suit
+        }
+    }
+}
+
+fn tables() -> &'static Tables {
+    static TABLES: OnceLock<Tables> = OnceLock::new();
+    TABLES.get_or_init(|| Tables {
+        suit: GroupTable::build(9, true),
+        honor: GroupTable::build(7, false),
+    })
+}
+
+/// Per-group waits: the low half of each entry holds the group-local tiles that make
+/// the key `MENTSU_ONLY`, the high half those that make it `MENTSU_AND_PAIR`.
+struct WaitTables {
+    suit: Vec<u32>,
+    honor: Vec<u32>,
+}
+
+impl WaitTables {
+    fn build(table: &GroupTable, len: usize) -> Vec<u32> {
+        let mut waits = vec![0u32; table.flags.len()];
+        for (key, entry) in waits.iter_mut().enumerate() {
+            let mut unit = 1;
+            for i in 0..len {
+                if (key / unit) % 5 < 4 {
+                    let flags = table.flags[key + unit];
+                    if flags & MENTSU_ONLY != 0 {
+                        *entry |= 1 << i;
+                    }
+                    if flags & MENTSU_AND_PAIR != 0 {
+                        *entry |= 1 << (16 + i);
+                    }
+                }
+                unit *= 5;
             }
+        }
+        waits
+    }
+
+    #[inline]
+    fn group(&self, g: usize) -> &[u32] {
+        if g == 3 {
+            &self.honor
+        } else {
+            &self.suit
+        }
+    }
+}
+
+fn wait_tables() -> &'static WaitTables {
+    static WAIT_TABLES: OnceLock<WaitTables> = OnceLock::new();
+    WAIT_TABLES.get_or_init(|| {
+        let tables = tables();
+        WaitTables {
+            suit: WaitTables::build(&tables.suit, 9),
+            honor: WaitTables::build(&tables.honor, 7),
+        }
+    })
+}
 
-            hand.remove(i as u8); // backtrack
+/// Packed key of every group, or `None` if some kind is held more than four times.
+#[inline]
+fn group_keys(counts: &[u8; TILE_MAX]) -> Option<[u32; 4]> {
+    let mut keys = [0; 4];
+    for (key, &(start, len)) in keys.iter_mut().zip(&GROUPS) {
+        let group = &counts[start..start + len];
+        if group.iter().any(|&c| c > 4) {
+            return None;
         }
+        *key = pack(group);
     }
-    false
+    Some(keys)
 }
 
 pub fn is_agari(hand: &mut Hand) -> bool {
@@ -70,79 +266,147 @@ pub fn is_agari(hand: &mut Hand) -> bool {
     is_standard_agari(hand)
 }
 
-pub fn find_divisions(hand: &Hand) -> Vec<Division> {
-    let mut divisions = Vec::new();
-    for i in 0..TILE_MAX {
-        if hand.counts[i] >= 2 {
-            let mut processing_hand = hand.clone();
-            processing_hand.counts[i] -= 2;
-            let mut bodies = Vec::new();
-            let mut current_body = Vec::new();
-            decompose_all(&mut processing_hand, 0, &mut current_body, &mut bodies);
-            for body in bodies {
-                divisions.push(Division {
-                    head: i as u8,
-                    body,
-                });
-            }
+/// Tile kinds that complete the concealed `counts` into a winning hand.
+///
+/// `counts` must hold `3n + 1` tiles (a 13-tile hand less its melds, kan tiles reduced
+/// to three); kinds already held four times never count as waits. Chiitoitsu and
+/// kokushi waits are only possible with 13 concealed tiles.
+pub fn waits(counts: &[u8; TILE_MAX]) -> TileMask {
+    let Some(keys) = group_keys(counts) else {
+        return TileMask::EMPTY;
+    };
+    let tables = tables();
+    let wait_tables = wait_tables();
+
+    // Complete groups as they stand, and groups short of the pair.
+    let mut mentsu_only = 0u8;
+    let mut with_pair = 0u8;
+    for (g, &(start, len)) in GROUPS.iter().enumerate() {
+        let tiles: u8 = counts[start..start + len].iter().sum();
+        let flags = tables.group(g).flags[keys[g] as usize];
+        match tiles % 3 {
+            0 if flags & MENTSU_ONLY != 0 => mentsu_only |= 1 << g,
+            2 if flags & MENTSU_AND_PAIR != 0 => with_pair |= 1 << g,
+            _ => {}
         }
     }
-    divisions
-}
 
-fn decompose_all(
-    hand: &mut Hand,
-    start_idx: usize,
-    current_body: &mut Vec<Mentsu>,
-    results: &mut Vec<Vec<Mentsu>>,
-) {
-    let mut i = start_idx;
-    while i < TILE_MAX && hand.counts[i] == 0 {
-        i += 1;
+    let mut bits = 0u64;
+    for (g, &(start, _)) in GROUPS.iter().enumerate() {
+        let others = 0b1111 & !(1 << g);
+        let entry = wait_tables.group(g)[keys[g] as usize];
+        // The drawn tile either completes this group with the pair while every other
+        // group is complete, or completes it without one while another holds the pair.
+        let rest_complete = mentsu_only & others == others;
+        let rest_paired =
+            (mentsu_only | with_pair) & others == others && (with_pair & others).count_ones() == 1;
+        let local = if rest_complete {
+            entry >> 16
+        } else if rest_paired {
+            entry & 0xffff
+        } else {
+            0
+        };
+        bits |= (local as u64) << start;
     }
 
-    if i == TILE_MAX {
-        results.push(current_body.clone());
-        return;
+    let mut waits = TileMask::from_bits(bits);
+    if counts.iter().map(|&c| c as u32).sum::<u32>() == 13 {
+        for t in special_waits(counts).iter() {
+            waits.insert(t);
+        }
     }
+    waits
+}
+
+/// Chiitoitsu and kokushi waits of a 13-tile concealed hand.
+fn special_waits(counts: &[u8; TILE_MAX]) -> TileMask {
+    let mut waits = TileMask::EMPTY;
 
-    // Try Koutsu
-    if hand.counts[i] >= 3 {
-        hand.counts[i] -= 3;
-        current_body.push(Mentsu::Koutsu(i as u8));
-        decompose_all(hand, i, current_body, results);
-        current_body.pop();
-        hand.counts[i] += 3;
+    // Six pairs and a single: the single completes chiitoitsu.
+    if counts.iter().filter(|&&c| c == 2).count() == 6 {
+        if let Some(t) = counts.iter().position(|&c| c == 1) {
+            waits.insert(t as u8);
+        }
     }
 
-    // Try Shuntsu
-    if i < 27 {
-        let is_valid_seq_start = match i {
-            0..=6 => true,   // 1m-7m
-            9..=15 => true,  // 1p-7p
-            18..=24 => true, // 1s-7s
-            _ => false,
-        };
+    // Every terminal and honour with at most one pair: the missing one (or any of the
+    // thirteen when none is paired) completes kokushi.
+    let orphans = KOKUSHI_TILES
+        .iter()
+        .map(|&t| counts[t] as usize)
+        .sum::<usize>();
+    if orphans == 13 && KOKUSHI_TILES.iter().all(|&t| counts[t] <= 2) {
+        let mut missing = KOKUSHI_TILES.iter().filter(|&&t| counts[t] == 0);
+        match (missing.next(), missing.next()) {
+            (None, _) => KOKUSHI_TILES.iter().for_each(|&t| waits.insert(t as u8)),
+            (Some(&t), None) => waits.insert(t as u8),
+            _ => {}
+        }
+    }
+    waits
+}
+
+pub fn find_divisions(hand: &Hand) -> Vec<Division> {
+    let mut divisions = Vec::new();
+    let Some(keys) = group_keys(&hand.counts) else {
+        return divisions;
+    };
+    let tables = tables();
+    let mut lists: [&[GroupDivision]; 4] = [&[]; 4];
+
+    for (g, &(start, len)) in GROUPS.iter().enumerate() {
+        let mut unit = 1;
+        for head in start..start + len {
+            if hand.counts[head] >= 2 {
+                // Every group keeps its mentsu-only decompositions except the one
+                // holding the head, which is looked up without the pair.
+                let mut complete = true;
+                for (h, list) in lists.iter_mut().enumerate() {
+                    let key = if h == g { keys[h] - 2 * unit } else { keys[h] };
+                    match tables.group(h).divisions.get(&key) {
+                        Some(found) => *list = found,
+                        None => {
+                            complete = false;
+                            break;
+                        }
+                    }
+                }
+                if complete {
+                    push_combinations(head as u8, &lists, &mut divisions);
+                }
+            }
+            unit *= 5;
+        }
+    }
+    divisions
+}
 
-        if is_valid_seq_start && hand.counts[i + 1] > 0 && hand.counts[i + 2] > 0 {
-            hand.counts[i] -= 1;
-            hand.counts[i + 1] -= 1;
-            hand.counts[i + 2] -= 1;
-            current_body.push(Mentsu::Shuntsu(i as u8));
-            decompose_all(hand, i, current_body, results);
-            current_body.pop();
-            hand.counts[i] += 1;
-            hand.counts[i + 1] += 1;
-            hand.counts[i + 2] += 1;
+/// Append one division per combination of group decompositions, manzu varying slowest.
+fn push_combinations(head: u8, lists: &[&[GroupDivision]; 4], divisions: &mut Vec<Division>) {
+    for m in lists[0] {
+        for p in lists[1] {
+            for s in lists[2] {
+                for z in lists[3] {
+                    let mut body = Vec::with_capacity((m.len + p.len + s.len + z.len) as usize);
+                    m.push_into(0, &mut body);
+                    p.push_into(9, &mut body);
+                    s.push_into(18, &mut body);
+                    z.push_into(27, &mut body);
+                    divisions.push(Division { head, body });
+                }
+            }
         }
     }
 }
 
+/// Terminals and honours.
+const KOKUSHI_TILES: [usize; 13] = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33];
+
 pub fn is_kokushi(hand: &Hand) -> bool {
-    let kokushi_indices = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33];
     let mut pair_found = false;
 
-    for &idx in &kokushi_indices {
+    for &idx in &KOKUSHI_TILES {
         let c = hand.counts[idx];
         if c == 0 {
             return false;
@@ -177,68 +441,25 @@ pub fn is_chiitoitsu(hand: &Hand) -> bool {
 }
 
 pub fn is_standard_agari(hand: &mut Hand) -> bool {
-    // Basic backtracking
-    // 1. Find a pair (head)
-    // 2. Decompose rest into 4 sequences/triplets
-
-    for i in 0..TILE_MAX {
-        if hand.counts[i] >= 2 {
-            hand.counts[i] -= 2;
-            if decompose(hand, 0) {
-                hand.counts[i] += 2; // backtrack
-                return true;
-            }
-            hand.counts[i] += 2; // backtrack
-        }
-    }
-    false
-}
-
-fn decompose(hand: &mut Hand, start_idx: usize) -> bool {
-    let mut i = start_idx;
-    // Find first non-zero tile
-    while i < TILE_MAX && hand.counts[i] == 0 {
-        i += 1;
-    }
-
-    if i == TILE_MAX {
-        return true; // All tiles used
-    }
-
-    // Try Koutsu (Triplet)
-    if hand.counts[i] >= 3 {
-        hand.counts[i] -= 3;
-        if decompose(hand, i) {
-            hand.counts[i] += 3; // backtrack even on success
-            return true;
-        }
-        hand.counts[i] += 3; // backtrack
-    }
-
-    // Try Shuntsu (Sequence) - Only for number tiles
-    if i < 27 {
-        if let Some(is_valid_seq_start) = match i {
-            0..=6 => Some(true),   // 1m-7m
-            9..=15 => Some(true),  // 1p-7p
-            18..=24 => Some(true), // 1s-7s
-            _ => None,
-        } {
-            if is_valid_seq_start && hand.counts[i + 1] > 0 && hand.counts[i + 2] > 0 {
-                hand.counts[i] -= 1;
-                hand.counts[i + 1] -= 1;
-                hand.counts[i + 2] -= 1;
-                if decompose(hand, i) {
-                    hand.counts[i] += 1;
-                    hand.counts[i + 1] += 1;
-                    hand.counts[i + 2] += 1;
-                    return true;
-                }
-                hand.counts[i] += 1;
-                hand.counts[i + 1] += 1;
-                hand.counts[i + 2] += 1;
+    let Some(keys) = group_keys(&hand.counts) else {
+        return false;
+    };
+    let tables = tables();
+    let mut pairs = 0;
+    for (g, &(start, len)) in GROUPS.iter().enumerate() {
+        let tiles: u8 = hand.counts[start..start + len].iter().sum();
+        let flags = tables.group(g).flags[keys[g] as usize];
+        let ok = match tiles % 3 {
+            0 => flags & MENTSU_ONLY != 0,
+            2 => {
+                pairs += 1;
+                flags & MENTSU_AND_PAIR != 0
             }
+            _ => false,
+        };
+        if !ok {
+            return false;
         }
     }
-
-    false
+    pairs == 1
 }
@@ -0,0 +1,269 @@
+//! Optional process-wide LRU cache of `AgariCalculator.calc` results.
+//!
+//! Legal-action generation, replays and scoring tools evaluate the same hands again and
+//! again. Everything `calc` depends on is folded into a small fixed-size `AgariKey`
+//! (dora indicators are reduced to dora counts, meld tiles to their first 34-type), so
+//! lookups never allocate. The cache is disabled until a capacity is set.
+
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Mutex;
+
+use crate::types::{Agari, Conditions, Hand, Meld};
+
+/// Melds beyond this count never form a valid hand and are not cached.
+const MAX_MELDS: usize = 4;
+
+/// Everything `AgariCalculator.calc` reads, packed into a hashable value.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash)]
+pub struct AgariKey {
+    /// Concealed counts including the winning tile, with kan tiles reduced to three.
+    hand: [u8; 34],
+    /// `(meld_type, first 34-type tile, opened)` per meld.
+    melds: [(u8, u8, bool); MAX_MELDS],
+    num_melds: u8,
+    win_tile: u8,
+    dora: u8,
+    ura_dora: u8,
+    aka_dora: u8,
+    /// Boolean `Conditions` fields, one bit each.
+    flags: u16,
+    /// `round_wind << 2 | player_wind`.
+    winds: u8,
+    tsumi: u32,
+}
+
+impl AgariKey {
+    /// `None` for hands with more melds than a valid hand can hold.
+    pub fn new(
+        hand: &Hand,
+        melds: &[Meld],
+        win_tile_34: u8,
+        dora: u8,
+        ura_dora: u8,
+        aka_dora: u8,
+        conditions: &Conditions,
+    ) -> Option<Self> {
+        if melds.len() > MAX_MELDS {
+            return None;
+        }
+        let mut packed = [(0, 0, false); MAX_MELDS];
+        for (slot, meld) in packed.iter_mut().zip(melds) {
+            let first = meld.tiles.first().copied().unwrap_or(u8::MAX);
+            *slot = (meld.meld_type as u8, first, meld.opened);
+        }
+        let flags = [
+            conditions.tsumo,
+            conditions.riichi,
+            conditions.double_riichi,
+            conditions.ippatsu,
+            conditions.haitei,
+            conditions.houtei,
+            conditions.rinshan,
+            conditions.chankan,
+            conditions.tsumo_first_turn,
+        ]
+        .iter()
+        .enumerate()
+        .fold(0u16, |acc, (i, &f)| acc | ((f as u16) << i));
+
+        Some(Self {
+            hand: hand.counts,
+            melds: packed,
+            num_melds: melds.len() as u8,
+            win_tile: win_tile_34,
+            dora,
+            ura_dora,
+            aka_dora,
+            flags,
+            winds: ((conditions.round_wind as u8) << 2) | conditions.player_wind as u8,
+            tsumi: conditions.tsumi,
+        })
+    }
+}
+
+/// Hit/miss counters and size of the cache.
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct CacheInfo {
+    pub hits: u64,
+    pub misses: u64,
+    pub maxsize: usize,
+    pub currsize: usize,
+}
+
+const NIL: usize = usize::MAX;
+
+#[derive(Debug)]
+struct Node {
+    key: AgariKey,
+    value: Agari,
+    prev: usize,
+    next: usize,
+}
+
+/// Bounded map with least-recently-used eviction.
+///
+/// Nodes live in a slab and form a doubly linked list from most (`head`) to least
+/// (`tail`) recently used; evicted slots are reused in place.
+#[derive(Debug)]
+struct Lru {
+    map: HashMap<AgariKey, usize>,
+    nodes: Vec<Node>,
+    head: usize,
+    tail: usize,
+    hits: u64,
+    misses: u64,
+}
+
+impl Lru {
+    fn new() -> Self {
+        Self {
+            map: HashMap::new(),
+            nodes: Vec::new(),
+            head: NIL,
+            tail: NIL,
+            hits: 0,
+            misses: 0,
+        }
+    }
+
+    fn unlink(&mut self, idx: usize) {
+        let (prev, next) = (self.nodes[idx].prev, self.nodes[idx].next);
+        match prev {
+            NIL => self.head = next,
+            p => self.nodes[p].next = next,
+        }
+        match next {
+            NIL => self.tail = prev,
+            n => self.nodes[n].prev = prev,
+        }
+    }
+
+    fn push_front(&mut self, idx: usize) {
+        self.nodes[idx].prev = NIL;
+        self.nodes[idx].next = self.head;
+        if self.head != NIL {
+            self.nodes[self.head].prev = idx;
+        }
+        self.head = idx;
+        if self.tail == NIL {
+            self.tail = idx;
+        }
+    }
+
+    fn get(&mut self, key: &AgariKey) -> Option<Agari> {
+        match self.map.get(key).copied() {
+            Some(idx) => {
+                self.hits += 1;
+                self.unlink(idx);
+                self.push_front(idx);
+                Some(self.nodes[idx].value.clone())
+            }
+            None => {
+                self.misses += 1;
+                None
+            }
+        }
+    }
+
+    fn put(&mut self, key: AgariKey, value: Agari, capacity: usize) {
+        if let Some(&idx) = self.map.get(&key) {
+            self.nodes[idx].value = value;
+            self.unlink(idx);
+            self.push_front(idx);
+            return;
+        }
+        let node = Node {
+            key,
+            value,
+            prev: NIL,
+            next: NIL,
+        };
+        let idx = if self.map.len() >= capacity && self.tail != NIL {
+            // Full: the least recently used slot is evicted and reused.
+            let idx = self.tail;
+            self.unlink(idx);
+            self.map.remove(&self.nodes[idx].key);
+            self.nodes[idx] = node;
+            idx
+        } else {
+            self.nodes.push(node);
+            self.nodes.len() - 1
+        };
+        self.map.insert(key, idx);
+        self.push_front(idx);
+    }
+
+    /// Keep the `capacity` most recently used entries, compacting the slab.
+    fn shrink(&mut self, capacity: usize) {
+        let mut live = Vec::with_capacity(self.map.len().min(capacity));
+        let mut idx = self.head;
+        while idx != NIL && live.len() < capacity {
+            live.push(idx);
+            idx = self.nodes[idx].next;
+        }
+        let mut nodes: Vec<Option<Node>> = std::mem::take(&mut self.nodes)
+            .into_iter()
+            .map(Some)
+            .collect();
+        let (hits, misses) = (self.hits, self.misses);
+        *self = Self::new();
+        self.hits = hits;
+        self.misses = misses;
+        // Re-insert from least to most recently used so the order is preserved.
+        for &old in live.iter().rev() {
+            if let Some(node) = nodes[old].take() {
+                self.map.insert(node.key, self.nodes.len());
+                self.nodes.push(node);
+                self.push_front(self.nodes.len() - 1);
+            }
+        }
+    }
+}
+
+static CAPACITY: AtomicUsize = AtomicUsize::new(0);
+static CACHE: Mutex<Option<Lru>> = Mutex::new(None);
+
+fn with_cache<R>(f: impl FnOnce(&mut Lru) -> R) -> R {
+    let mut guard = CACHE.lock().unwrap_or_else(|e| e.into_inner());
+    f(guard.get_or_insert_with(Lru::new))
+}
+
+/// Whether `calc` should consult the cache at all.
+#[inline]
+pub fn enabled() -> bool {
+    CAPACITY.load(Ordering::Relaxed) > 0
+}
+
+pub fn get(key: &AgariKey) -> Option<Agari> {
+    with_cache(|lru| lru.get(key))
+}
+
+pub fn put(key: AgariKey, value: Agari) {
+    let capacity = CAPACITY.load(Ordering::Relaxed);
+    if capacity > 0 {
+        with_cache(|lru| lru.put(key, value, capacity));
+    }
+}
+
+/// Set the maximum number of cached results; 0 disables the cache and drops it.
+pub fn set_capacity(capacity: usize) {
+    with_cache(|lru| {
+        CAPACITY.store(capacity, Ordering::Relaxed);
+        lru.shrink(capacity);
+    });
+}
+
+/// Drop every entry and reset the counters.
+pub fn clear() {
+    with_cache(|lru| *lru = Lru::new());
+}
+
+pub fn info() -> CacheInfo {
+    with_cache(|lru| CacheInfo {
+        hits: lru.hits,
+        misses: lru.misses,
+        maxsize: CAPACITY.load(Ordering::Relaxed),
+        currsize: lru.map.len(),
+    })
+}
@@ -1,6 +1,14 @@
 #![allow(clippy::useless_conversion)]
+use std::collections::HashMap;
+
+use ndarray::{s, ArrayView1, ArrayView2, ArrayView3};
+use numpy::{IntoPyArray, PyReadonlyArray1, PyReadonlyArray2, PyReadonlyArray3};
+use pyo3::types::PyDict;
+
 use crate::agari;
+use crate::agari_cache::{self, AgariKey};
 use crate::score;
+use crate::state::compact::TileMask;
 use crate::types::{Agari, Conditions, Hand, Meld, MeldType, Wind};
 use crate::yaku;
 use pyo3::prelude::*;
@@ -86,8 +94,182 @@ impl AgariCalculator {
         ura_indicators: Vec<u8>,
         conditions: Option<Conditions>,
     ) -> Agari {
-        let win_tile_136 = win_tile;
-        let conditions = conditions.unwrap_or_default();
+        self.calc_inner(
+            win_tile,
+            &dora_indicators,
+            &ura_indicators,
+            &conditions.unwrap_or_default(),
+            agari_cache::enabled(),
+        )
+    }
+
+    /// Set the size of the process-wide LRU cache of `calc` results.
+    ///
+    /// The cache is keyed by the hand, melds, winning tile, dora counts and
+    /// conditions, and is shared by every calculator including the ones used by
+    /// `RiichiEnv`. `0` (the default) disables it and drops all entries.
+    ///
+    /// Every lookup takes a single process-wide lock, so envs stepped from several
+    /// threads serialize on it while it is enabled. `calc_batch` and the discard EV
+    /// rollouts never use the cache.
+    #[staticmethod]
+    pub fn set_cache_size(maxsize: usize) {
+        agari_cache::set_capacity(maxsize);
+    }
+
+    /// Counters of the `calc` cache: `hits`, `misses`, `maxsize` and `currsize`.
+    #[staticmethod]
+    pub fn cache_info() -> HashMap<&'static str, u64> {
+        let info = agari_cache::info();
+        HashMap::from([
+            ("hits", info.hits),
+            ("misses", info.misses),
+            ("maxsize", info.maxsize as u64),
+            ("currsize", info.currsize as u64),
+        ])
+    }
+
+    /// Score many hands at once from struct-of-arrays NumPy inputs.
+    ///
+    /// - `tiles`: `(N, K)` uint8 concealed tiles (136-format), padded with 255
+    /// - `win_tile`: `(N,)` uint8 winning tile
+    /// - `melds`: `(N, M, 4)` uint8 meld tiles padded with 255, with `meld_types`
+    ///   `(N, M)` int8 `MeldType` values and -1 for unused slots
+    /// - `dora_indicators` / `ura_indicators`: `(N, D)` uint8 padded with 255
+    /// - `conditions`: `(N,)` uint32 values of `Conditions.pack()`
+    ///
+    /// Returns a dict of `(N,)` arrays named like the `Agari` fields: `agari`,
+    /// `yakuman` (bool), `han`, `fu`, `ron_agari`, `tsumo_agari_oya`, `tsumo_agari_ko`
+    /// (uint32) and `yaku` (uint64, bit `i` set for yaku id `i`). Rows are scored in
+    /// parallel on `num_threads` threads (default: all cores) with the GIL released.
+    #[staticmethod]
+    #[allow(clippy::too_many_arguments)]
+    #[pyo3(signature = (tiles, win_tile, melds=None, meld_types=None, dora_indicators=None, ura_indicators=None, conditions=None, num_threads=None))]
+    pub fn calc_batch<'py>(
+        py: Python<'py>,
+        tiles: PyReadonlyArray2<'py, u8>,
+        win_tile: PyReadonlyArray1<'py, u8>,
+        melds: Option<PyReadonlyArray3<'py, u8>>,
+        meld_types: Option<PyReadonlyArray2<'py, i8>>,
+        dora_indicators: Option<PyReadonlyArray2<'py, u8>>,
+        ura_indicators: Option<PyReadonlyArray2<'py, u8>>,
+        conditions: Option<PyReadonlyArray1<'py, u32>>,
+        num_threads: Option<usize>,
+    ) -> PyResult<Bound<'py, PyDict>> {
+        let batch = BatchInputs {
+            tiles: tiles.as_array(),
+            win_tile: win_tile.as_array(),
+            melds: melds.as_ref().map(|m| m.as_array()),
+            meld_types: meld_types.as_ref().map(|m| m.as_array()),
+            dora: dora_indicators.as_ref().map(|d| d.as_array()),
+            ura: ura_indicators.as_ref().map(|u| u.as_array()),
+            conditions: conditions.as_ref().map(|c| c.as_array()),
+        };
+        batch.validate()?;
+
+        let n = batch.tiles.nrows();
+        let threads = match num_threads {
+            Some(t) => t.clamp(1, n.max(1)),
+            None => std::thread::available_parallelism()
+                .map(|p| p.get())
+                .unwrap_or(1)
+                .min(n.div_ceil(CALC_BATCH_MIN_PER_THREAD))
+                .max(1),
+        };
+        let mut rows = vec![BatchRow::default(); n];
+        py.detach(|| {
+            let chunk = n.div_ceil(threads).max(1);
+            std::thread::scope(|scope| {
+                for (c, out) in rows.chunks_mut(chunk).enumerate() {
+                    let batch = &batch;
+                    scope.spawn(move || {
+                        for (j, row) in out.iter_mut().enumerate() {
+                            *row = batch.calc_row(c * chunk + j);
+                        }
+                    });
+                }
+            });
+        });
+
+        let dict = PyDict::new(py);
+        let column = |f: fn(&BatchRow) -> u32| -> Vec<u32> { rows.iter().map(f).collect() };
+        dict.set_item(
+            "agari",
+            rows.iter()
+                .map(|r| r.agari)
+                .collect::<Vec<_>>()
+                .into_pyarray(py),
+        )?;
+        dict.set_item(
+            "yakuman",
+            rows.iter()
+                .map(|r| r.yakuman)
+                .collect::<Vec<_>>()
+                .into_pyarray(py),
+        )?;
+        dict.set_item("han", column(|r| r.han).into_pyarray(py))?;
+        dict.set_item("fu", column(|r| r.fu).into_pyarray(py))?;
+        dict.set_item("ron_agari", column(|r| r.ron_agari).into_pyarray(py))?;
+        dict.set_item(
+            "tsumo_agari_oya",
+            column(|r| r.tsumo_agari_oya).into_pyarray(py),
+        )?;
+        dict.set_item(
+            "tsumo_agari_ko",
+            column(|r| r.tsumo_agari_ko).into_pyarray(py),
+        )?;
+        dict.set_item(
+            "yaku",
+            rows.iter()
+                .map(|r| r.yaku)
+                .collect::<Vec<_>>()
+                .into_pyarray(py),
+        )?;
+        Ok(dict)
+    }
+
+    /// Drop every cached `calc` result and reset the counters.
+    #[staticmethod]
+    pub fn cache_clear() {
+        agari_cache::clear();
+    }
+
+    pub fn is_tenpai(&self) -> bool {
+        !self.wait_mask().is_empty()
+    }
+
+    pub fn get_waits_u8(&self) -> Vec<u8> {
+        self.wait_mask().iter().collect()
+    }
+
+    pub fn get_waits(&self) -> Vec<u32> {
+        self.get_waits_u8().iter().map(|&x| x as u32).collect()
+    }
+}
+
+impl AgariCalculator {
+    /// `calc` without the process-wide cache.
+    ///
+    /// For callers that score many hands from several threads at once (`calc_batch`,
+    /// discard EV rollouts), where every lookup would serialize on the cache lock.
+    pub(crate) fn calc_uncached(
+        &self,
+        win_tile: u8,
+        dora_indicators: &[u8],
+        ura_indicators: &[u8],
+        conditions: &Conditions,
+    ) -> Agari {
+        self.calc_inner(win_tile, dora_indicators, ura_indicators, conditions, false)
+    }
+
+    fn calc_inner(
+        &self,
+        win_tile_136: u8,
+        dora_indicators: &[u8],
+        ura_indicators: &[u8],
+        conditions: &Conditions,
+        use_cache: bool,
+    ) -> Agari {
         let win_tile_34 = win_tile_136 / 4;
 
         // Clone and add win tile to create 14-tile hands for check
@@ -102,23 +284,16 @@ impl AgariCalculator {
             full_hand_14.add(win_tile_34);
         }
 
-        let is_agari = agari::is_agari(&mut hand_14);
-
-        if !is_agari {
-            // has_agari_shape is false here because the hand structure (e.g. 4 melds + 1 pair) is invalid.
-            // If the structure were valid but the hand lacked Yaku, has_agari_shape would be true.
-            return Agari::new(false, false, 0, 0, 0, vec![], 0, 0, None, false);
-        }
         // Count normal doras in 14-tile hand
         let mut dora_count = 0;
-        for &indicator_136 in &dora_indicators {
+        for &indicator_136 in dora_indicators {
             let next_tile_34 = get_next_tile(indicator_136 / 4);
             dora_count += full_hand_14.counts[next_tile_34 as usize];
         }
 
         // Count ura doras in 14-tile hand
         let mut ura_dora_count = 0;
-        for &indicator_136 in &ura_indicators {
+        for &indicator_136 in ura_indicators {
             let next_tile_34 = get_next_tile(indicator_136 / 4);
             ura_dora_count += full_hand_14.counts[next_tile_34 as usize];
         }
@@ -129,6 +304,63 @@ impl AgariCalculator {
             aka_dora += 1;
         }
 
+        let key = if use_cache {
+            AgariKey::new(
+                &hand_14,
+                &self.melds,
+                win_tile_34,
+                dora_count,
+                ura_dora_count,
+                aka_dora,
+                conditions,
+            )
+        } else {
+            None
+        };
+        if let Some(hit) = key.as_ref().and_then(agari_cache::get) {
+            return hit;
+        }
+
+        let result = self.evaluate(
+            hand_14,
+            win_tile_34,
+            dora_count,
+            ura_dora_count,
+            aka_dora,
+            conditions,
+        );
+        if let Some(key) = key {
+            agari_cache::put(key, result.clone());
+        }
+        result
+    }
+
+    /// Waits of the 13-tile hand as a 34-bit mask; empty for any other hand size.
+    fn wait_mask(&self) -> TileMask {
+        let total =
+            self.hand.counts.iter().map(|&c| c as usize).sum::<usize>() + self.melds.len() * 3;
+        if total != 13 {
+            return TileMask::EMPTY;
+        }
+        agari::waits(&self.hand.counts)
+    }
+
+    /// Yaku and score of the 14-tile `hand_14` (kan tiles reduced to three).
+    fn evaluate(
+        &self,
+        mut hand_14: Hand,
+        win_tile_34: u8,
+        dora_count: u8,
+        ura_dora_count: u8,
+        aka_dora: u8,
+        conditions: &Conditions,
+    ) -> Agari {
+        if !agari::is_agari(&mut hand_14) {
+            // has_agari_shape is false here because the hand structure (e.g. 4 melds + 1 pair) is invalid.
+            // If the structure were valid but the hand lacked Yaku, has_agari_shape would be true.
+            return Agari::new(false, false, 0, 0, 0, vec![], 0, 0, None, false);
+        }
+
         let ctx = yaku::YakuContext {
             is_tsumo: conditions.tsumo,
             is_reach: conditions.riichi,
@@ -147,7 +379,6 @@ impl AgariCalculator {
             is_menzen: self.melds.iter().all(|m| !m.opened),
         };
 
-        let _divisions = agari::find_divisions(&hand_14);
         let yaku_res = yaku::calculate_yaku(&hand_14, &self.melds, &ctx, win_tile_34);
 
         let is_oya = conditions.player_wind == Wind::East;
@@ -158,12 +389,8 @@ impl AgariCalculator {
             conditions.tsumo,
             conditions.tsumi,
         );
-        let has_yaku = yaku_res
-            .yaku_ids
-            .iter()
-            .any(|&id| id != yaku::ID_DORA && id != yaku::ID_AKADORA && id != yaku::ID_URADORA);
-
-        let official_yaku: Vec<u32> = yaku_res.yaku_ids.into_iter().collect();
+        let has_yaku = yaku_res.yaku & !yaku::DORA_YAKU != 0;
+        let official_yaku: Vec<u32> = yaku_res.ids().collect();
 
         Agari {
             agari: (has_yaku || yaku_res.yakuman_count > 0) && yaku_res.han >= 1,
@@ -178,46 +405,188 @@ impl AgariCalculator {
             has_agari_shape: true,
         }
     }
+}
 
-    pub fn is_tenpai(&self) -> bool {
-        let current_total: u8 = self.hand.counts.iter().sum::<u8>() + (self.melds.len() as u8 * 3);
-        if current_total != 13 {
-            return false;
+/// Padding value of the `calc_batch` tile arrays.
+const BATCH_PAD: u8 = 255;
+
+/// Rows below which `calc_batch` does not start another thread.
+const CALC_BATCH_MIN_PER_THREAD: usize = 256;
+
+/// Borrowed `calc_batch` inputs.
+struct BatchInputs<'a> {
+    tiles: ArrayView2<'a, u8>,
+    win_tile: ArrayView1<'a, u8>,
+    melds: Option<ArrayView3<'a, u8>>,
+    meld_types: Option<ArrayView2<'a, i8>>,
+    dora: Option<ArrayView2<'a, u8>>,
+    ura: Option<ArrayView2<'a, u8>>,
+    conditions: Option<ArrayView1<'a, u32>>,
+}
+
+/// One scored `calc_batch` row.
+#[derive(Debug, Clone, Copy, Default)]
+struct BatchRow {
+    agari: bool,
+    yakuman: bool,
+    han: u32,
+    fu: u32,
+    ron_agari: u32,
+    tsumo_agari_oya: u32,
+    tsumo_agari_ko: u32,
+    yaku: u64,
+}
+
+fn meld_type_from_i8(value: i8) -> Option<MeldType> {
+    match value {
+        0 => Some(MeldType::Chi),
+        1 => Some(MeldType::Peng),
+        2 => Some(MeldType::Gang),
+        3 => Some(MeldType::Angang),
+        4 => Some(MeldType::Addgang),
+        _ => None,
+    }
+}
+
+/// Reject ids outside the 136-tile range, allowing the padding value when `pad` is set.
+fn check_tiles<'a>(
+    name: &str,
+    values: impl IntoIterator<Item = &'a u8>,
+    pad: bool,
+) -> PyResult<()> {
+    match values
+        .into_iter()
+        .find(|&&t| t >= 136 && !(pad && t == BATCH_PAD))
+    {
+        Some(t) => Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "Invalid tile id {} in {}",
+            t, name
+        ))),
+        None => Ok(()),
+    }
+}
+
+impl BatchInputs<'_> {
+    /// Check shapes and values up front so the worker threads cannot fail.
+    fn validate(&self) -> PyResult<()> {
+        let n = self.tiles.nrows();
+        let err = |msg: String| Err(pyo3::exceptions::PyValueError::new_err(msg));
+        let check_rows = |name: &str, rows: usize| {
+            if rows == n {
+                Ok(())
+            } else {
+                err(format!("{} has {} rows, expected {}", name, rows, n))
+            }
+        };
+        if self.tiles.ncols() > 14 {
+            return err(format!(
+                "tiles has {} columns, at most 14 are allowed",
+                self.tiles.ncols()
+            ));
         }
-        let mut hand_14 = self.hand.clone();
-        for i in 0..crate::types::TILE_MAX {
-            if hand_14.counts[i] < 4 {
-                hand_14.add(i as u8);
-                if agari::is_agari(&mut hand_14) {
-                    return true;
+        check_tiles("tiles", self.tiles.iter(), true)?;
+        check_rows("win_tile", self.win_tile.len())?;
+        check_tiles("win_tile", self.win_tile.iter(), false)?;
+
+        match (&self.melds, &self.meld_types) {
+            (None, None) => {}
+            (Some(melds), Some(types)) => {
+                check_rows("melds", melds.shape()[0])?;
+                if types.shape() != &melds.shape()[..2] {
+                    return err(format!(
+                        "meld_types has shape {:?}, expected {:?}",
+                        types.shape(),
+                        &melds.shape()[..2]
+                    ));
+                }
+                check_tiles("melds", melds.iter(), true)?;
+                if let Some(t) = types
+                    .iter()
+                    .find(|&&t| t != -1 && meld_type_from_i8(t).is_none())
+                {
+                    return err(format!("Invalid meld type {}", t));
+                }
+                for ((i, m), &t) in types.indexed_iter() {
+                    let Some(meld_type) = meld_type_from_i8(t) else {
+                        continue;
+                    };
+                    let count = melds
+                        .slice(s![i, m, ..])
+                        .iter()
+                        .filter(|&&x| x != BATCH_PAD)
+                        .count();
+                    let allowed = match meld_type {
+                        MeldType::Chi | MeldType::Peng => 3..=3,
+                        MeldType::Gang | MeldType::Angang | MeldType::Addgang => 3..=4,
+                    };
+                    if !allowed.contains(&count) {
+                        return err(format!(
+                            "meld {} of row {} holds {} tiles, expected {:?} for {:?}",
+                            m, i, count, allowed, meld_type
+                        ));
+                    }
                 }
-                hand_14.remove(i as u8);
             }
+            _ => return err("melds and meld_types must be given together".to_string()),
         }
-        false
+        if let Some(dora) = &self.dora {
+            check_rows("dora_indicators", dora.nrows())?;
+            check_tiles("dora_indicators", dora.iter(), true)?;
+        }
+        if let Some(ura) = &self.ura {
+            check_rows("ura_indicators", ura.nrows())?;
+            check_tiles("ura_indicators", ura.iter(), true)?;
+        }
+        if let Some(conditions) = &self.conditions {
+            check_rows("conditions", conditions.len())?;
+        }
+        Ok(())
     }
 
-    pub fn get_waits_u8(&self) -> Vec<u8> {
-        let mut waits = Vec::new();
-        let current_total: u8 = self.hand.counts.iter().sum::<u8>() + (self.melds.len() as u8 * 3);
-        if current_total != 13 {
-            return waits;
-        }
-        let mut hand_14 = self.hand.clone();
-        for i in 0..crate::types::TILE_MAX {
-            if hand_14.counts[i] < 4 {
-                hand_14.add(i as u8);
-                if crate::agari::is_agari(&mut hand_14) {
-                    waits.push(i as u8);
+    fn calc_row(&self, i: usize) -> BatchRow {
+        let unpadded = |row: ArrayView1<'_, u8>| -> Vec<u8> {
+            row.iter().copied().filter(|&t| t != BATCH_PAD).collect()
+        };
+
+        let mut melds = Vec::new();
+        if let (Some(meld_tiles), Some(types)) = (&self.melds, &self.meld_types) {
+            for (m, &ty) in types.row(i).iter().enumerate() {
+                if let Some(meld_type) = meld_type_from_i8(ty) {
+                    let tiles = unpadded(meld_tiles.slice(s![i, m, ..]));
+                    let opened = meld_type != MeldType::Angang;
+                    melds.push(Meld::new(meld_type, tiles, opened, -1));
                 }
-                hand_14.remove(i as u8);
             }
         }
-        waits
-    }
+        let dora = self
+            .dora
+            .as_ref()
+            .map_or_else(Vec::new, |d| unpadded(d.row(i)));
+        let ura = self
+            .ura
+            .as_ref()
+            .map_or_else(Vec::new, |u| unpadded(u.row(i)));
+        let conditions = self
+            .conditions
+            .as_ref()
+            .map_or_else(Conditions::default, |c| Conditions::unpack(c[i]));
 
-    pub fn get_waits(&self) -> Vec<u32> {
-        self.get_waits_u8().iter().map(|&x| x as u32).collect()
+        let calculator = AgariCalculator::new(unpadded(self.tiles.row(i)), melds);
+        let res = calculator.calc_uncached(self.win_tile[i], &dora, &ura, &conditions);
+        BatchRow {
+            agari: res.agari,
+            yakuman: res.yakuman,
+            han: res.han,
+            fu: res.fu,
+            ron_agari: res.ron_agari,
+            tsumo_agari_oya: res.tsumo_agari_oya,
+            tsumo_agari_ko: res.tsumo_agari_ko,
+            yaku: res
+                .yaku
+                .iter()
+                .filter(|&&id| id < 64)
+                .fold(0, |mask, &id| mask | (1 << id)),
+        }
     }
 }
 
@@ -0,0 +1,377 @@
+use std::collections::HashMap;
+
+use ndarray::{Array1, Array2, Array3};
+use numpy::{IntoPyArray, PyArray1, PyArray2, PyArray3, PyReadonlyArray1};
+use pyo3::prelude::*;
+
+use crate::action::{Action, Phase};
+use crate::env::{parse_game_mode, RiichiEnv};
+use crate::observation::{ACTION_SPACE, ENCODE_CHANNELS};
+use crate::rule::GameRule;
+use crate::state::wall::splitmix64;
+use crate::state::GameState;
+
+/// `(features, masks, actors, rewards, dones)` as returned by `RiichiEnvBatch.reset/step`.
+type BatchOutput<'py> = (
+    Bound<'py, PyArray3<f32>>,
+    Bound<'py, PyArray2<u8>>,
+    Bound<'py, PyArray1<i8>>,
+    Bound<'py, PyArray2<i32>>,
+    Bound<'py, PyArray1<bool>>,
+);
+
+/// One table of a `RiichiEnvBatch`.
+#[derive(Debug, Clone)]
+struct BatchSlot {
+    state: GameState,
+    /// Number of games this table has started since the batch was last seeded.
+    episode: u64,
+    /// Seat whose decision is requested next (`None` once the game is over).
+    actor: Option<u8>,
+    /// Legal actions of `actor` at the last observation.
+    legal_actions: Vec<Action>,
+    /// Responses already collected in the current `WaitResponse` window.
+    pending: HashMap<u8, Action>,
+    /// Scores at the previous step, used to derive per-step rewards.
+    last_scores: [i32; 4],
+    reward: [i32; 4],
+    features: Array2<f32>,
+    mask: [u8; ACTION_SPACE],
+}
+
+impl BatchSlot {
+    fn new(state: GameState, episode: u64) -> Self {
+        let mut slot = Self {
+            last_scores: Self::scores_of(&state),
+            state,
+            episode,
+            actor: None,
+            legal_actions: Vec::new(),
+            pending: HashMap::new(),
+            reward: [0; 4],
+            features: Array2::<f32>::zeros((ENCODE_CHANNELS, 34)),
+            mask: [0; ACTION_SPACE],
+        };
+        slot.observe();
+        slot
+    }
+
+    fn scores_of(state: &GameState) -> [i32; 4] {
+        [
+            state.players[0].score,
+            state.players[1].score,
+            state.players[2].score,
+            state.players[3].score,
+        ]
+    }
+
+    /// Pick the next seat to act and encode its observation.
+    ///
+    /// During `WaitResponse` the claimants are asked one at a time; their answers are
+    /// buffered in `pending` until everyone has replied.
+    fn observe(&mut self) {
+        self.actor = if self.state.is_done {
+            None
+        } else if self.state.phase == Phase::WaitAct {
+            Some(self.state.current_player)
+        } else {
+            self.state
+                .active_players
+                .iter()
+                .copied()
+                .find(|pid| !self.pending.contains_key(pid))
+        };
+
+        match self.actor {
+            Some(pid) => {
+                let obs = self.state.get_observation(pid);
+                obs.encode_into(self.features.view_mut());
+                obs.mask_into(&mut self.mask);
+                self.legal_actions = obs._legal_actions;
+            }
+            None => {
+                self.features.fill(0.0);
+                self.mask.fill(0);
+                self.legal_actions.clear();
+            }
+        }
+    }
+
+    fn find_action(&self, action_id: i64) -> Option<Action> {
+        self.legal_actions
+            .iter()
+            .find(|a| a.encode().is_ok_and(|idx| idx as i64 == action_id))
+            .cloned()
+    }
+
+    /// Record `action` for the current actor and advance the game once every
+    /// player of the current phase has decided.
+    fn apply(&mut self, action: Action) {
+        let Some(pid) = self.actor else {
+            return;
+        };
+        self.pending.insert(pid, action);
+
+        let waiting = self.state.phase == Phase::WaitResponse
+            && self
+                .state
+                .active_players
+                .iter()
+                .any(|p| !self.pending.contains_key(p));
+        if !waiting {
+            let actions = std::mem::take(&mut self.pending);
+            self.state.step(&actions);
+        }
+
+        let scores = Self::scores_of(&self.state);
+        for (i, r) in self.reward.iter_mut().enumerate() {
+            *r = scores[i] - self.last_scores[i];
+        }
+        self.last_scores = scores;
+        self.observe();
+    }
+}
+
+fn extract_action_ids(actions: &Bound<'_, PyAny>) -> PyResult<Vec<i64>> {
+    if let Ok(arr) = actions.extract::<PyReadonlyArray1<'_, i64>>() {
+        return Ok(arr.as_array().to_vec());
+    }
+    if let Ok(arr) = actions.extract::<PyReadonlyArray1<'_, i32>>() {
+        return Ok(arr.as_array().iter().map(|&x| x as i64).collect());
+    }
+    actions.extract::<Vec<i64>>()
+}
+
+/// Vectorized environment that owns `num_envs` independent tables.
+///
+/// Actions are passed as one flat array of `Action.encode()` ids (0-81), one per table,
+/// and all tables are advanced inside a single call. Each table asks exactly one seat
+/// per step (see `actors`); simultaneous responses such as double ron are gathered over
+/// consecutive steps before the table advances. Finished tables keep `done=True`, report
+/// `actor=-1` and ignore their action until they are reset. With `auto_pass=True`, seats
+/// whose only legal action is forced (e.g. a pass-only response) are never asked.
+#[pyclass(module = "riichienv._riichienv")]
+pub struct RiichiEnvBatch {
+    slots: Vec<BatchSlot>,
+    game_mode: u8,
+    skip_mjai_logging: bool,
+    seed: Option<u64>,
+    rule: GameRule,
+    auto_pass: bool,
+}
+
+/// Seed of game `episode` of table `index`.
+///
+/// Walls are drawn from `splitmix64(game seed + hand index)`, so the game seeds are
+/// mixed rather than consecutive: with `seed + index`, hand `k + 1` of one table would
+/// replay hand `k` of the next.
+fn table_seed(seed: u64, index: usize, episode: u64) -> u64 {
+    splitmix64(splitmix64(seed ^ splitmix64(index as u64)) ^ episode)
+}
+
+impl RiichiEnvBatch {
+    fn new_state(&self, index: usize, episode: u64) -> GameState {
+        let mut state = GameState::new(
+            self.game_mode,
+            self.skip_mjai_logging,
+            self.seed.map(|s| table_seed(s, index, episode)),
+            0,
+            self.rule,
+        );
+        state.auto_pass = self.auto_pass;
+        if state.auto_pass {
+            state._resolve_forced_actions();
+        }
+        state
+    }
+
+    fn output<'py>(&self, py: Python<'py>) -> PyResult<BatchOutput<'py>> {
+        let n = self.slots.len();
+        let mut features = Vec::with_capacity(n * ENCODE_CHANNELS * 34);
+        let mut masks = Vec::with_capacity(n * ACTION_SPACE);
+        let mut actors = Vec::with_capacity(n);
+        let mut rewards = Vec::with_capacity(n * 4);
+        let mut dones = Vec::with_capacity(n);
+        for slot in &self.slots {
+            features.extend(slot.features.iter().copied());
+            masks.extend_from_slice(&slot.mask);
+            actors.push(slot.actor.map_or(-1, |pid| pid as i8));
+            rewards.extend_from_slice(&slot.reward);
+            dones.push(slot.state.is_done);
+        }
+
+        let to_err =
+            |e: ndarray::ShapeError| pyo3::exceptions::PyValueError::new_err(e.to_string());
+        Ok((
+            Array3::from_shape_vec((n, ENCODE_CHANNELS, 34), features)
+                .map_err(to_err)?
+                .into_pyarray(py),
+            Array2::from_shape_vec((n, ACTION_SPACE), masks)
+                .map_err(to_err)?
+                .into_pyarray(py),
+            Array1::from_vec(actors).into_pyarray(py),
+            Array2::from_shape_vec((n, 4), rewards)
+                .map_err(to_err)?
+                .into_pyarray(py),
+            Array1::from_vec(dones).into_pyarray(py),
+        ))
+    }
+}
+
+#[pymethods]
+impl RiichiEnvBatch {
+    #[new]
+    #[pyo3(signature = (num_envs, game_mode=None, skip_mjai_logging=true, seed=None, rule=None, auto_pass=false))]
+    pub fn new(
+        num_envs: usize,
+        game_mode: Option<Bound<'_, PyAny>>,
+        skip_mjai_logging: bool,
+        seed: Option<u64>,
+        rule: Option<GameRule>,
+        auto_pass: bool,
+    ) -> PyResult<Self> {
+        if num_envs == 0 {
+            return Err(pyo3::exceptions::PyValueError::new_err(
+                "num_envs must be positive",
+            ));
+        }
+        let mut batch = RiichiEnvBatch {
+            slots: Vec::with_capacity(num_envs),
+            game_mode: parse_game_mode(game_mode),
+            skip_mjai_logging,
+            seed,
+            rule: rule.unwrap_or_default(),
+            auto_pass,
+        };
+        for i in 0..num_envs {
+            let state = batch.new_state(i, 0);
+            batch.slots.push(BatchSlot::new(state, 0));
+        }
+        Ok(batch)
+    }
+
+    #[getter]
+    pub fn num_envs(&self) -> usize {
+        self.slots.len()
+    }
+
+    fn __len__(&self) -> usize {
+        self.slots.len()
+    }
+
+    /// Start new games and return `(features, masks, actors, rewards, dones)`.
+    ///
+    /// `indices` restricts the reset to the given tables; the others keep their
+    /// current state. With a seed, every table and every game gets its own wall
+    /// sequence; passing `seed` here restarts the reset tables from that seed.
+    #[pyo3(signature = (indices=None, seed=None))]
+    pub fn reset<'py>(
+        &mut self,
+        py: Python<'py>,
+        indices: Option<Vec<usize>>,
+        seed: Option<u64>,
+    ) -> PyResult<BatchOutput<'py>> {
+        if seed.is_some() {
+            self.seed = seed;
+        }
+        let targets = indices.unwrap_or_else(|| (0..self.slots.len()).collect());
+        if let Some(&bad) = targets.iter().find(|&&i| i >= self.slots.len()) {
+            return Err(pyo3::exceptions::PyIndexError::new_err(format!(
+                "Env index {} out of range for batch of {}",
+                bad,
+                self.slots.len()
+            )));
+        }
+        py.detach(|| {
+            for &i in &targets {
+                let episode = if seed.is_some() {
+                    0
+                } else {
+                    self.slots[i].episode + 1
+                };
+                let state = self.new_state(i, episode);
+                self.slots[i] = BatchSlot::new(state, episode);
+            }
+        });
+        self.output(py)
+    }
+
+    /// Apply one action id per table and return `(features, masks, actors, rewards, dones)`.
+    ///
+    /// - `features`: `(N, 74, 34)` float32, `Observation.encode()` of each actor
+    /// - `masks`: `(N, 82)` uint8 legal action masks
+    /// - `actors`: `(N,)` int8 seat to act next, `-1` for finished tables
+    /// - `rewards`: `(N, 4)` int32 score change of every seat during this step
+    /// - `dones`: `(N,)` bool
+    pub fn step<'py>(
+        &mut self,
+        py: Python<'py>,
+        actions: &Bound<'py, PyAny>,
+    ) -> PyResult<BatchOutput<'py>> {
+        let ids = extract_action_ids(actions)?;
+        if ids.len() != self.slots.len() {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "Expected {} actions, got {}",
+                self.slots.len(),
+                ids.len()
+            )));
+        }
+
+        // Validate every table before touching any of them.
+        let mut resolved = Vec::with_capacity(ids.len());
+        for (i, (slot, &id)) in self.slots.iter().zip(ids.iter()).enumerate() {
+            match slot.actor {
+                None => resolved.push(None),
+                Some(pid) => match slot.find_action(id) {
+                    Some(action) => resolved.push(Some(action)),
+                    None => {
+                        return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                            "Illegal action id {} for env {} (player {})",
+                            id, i, pid
+                        )))
+                    }
+                },
+            }
+        }
+
+        py.detach(|| {
+            for (slot, action) in self.slots.iter_mut().zip(resolved) {
+                match action {
+                    Some(action) => slot.apply(action),
+                    None => slot.reward = [0; 4],
+                }
+            }
+        });
+        self.output(py)
+    }
+
+    /// Return a copy of table `index` as a standalone `RiichiEnv`.
+    pub fn get_env(&self, index: usize) -> PyResult<RiichiEnv> {
+        self.slots
+            .get(index)
+            .map(|slot| RiichiEnv {
+                state: slot.state.clone(),
+            })
+            .ok_or_else(|| {
+                pyo3::exceptions::PyIndexError::new_err(format!(
+                    "Env index {} out of range for batch of {}",
+                    index,
+                    self.slots.len()
+                ))
+            })
+    }
+
+    /// Legal actions of the current actor of table `index`.
+    pub fn legal_actions(&self, index: usize) -> PyResult<Vec<Action>> {
+        self.slots
+            .get(index)
+            .map(|slot| slot.legal_actions.clone())
+            .ok_or_else(|| {
+                pyo3::exceptions::PyIndexError::new_err(format!(
+                    "Env index {} out of range for batch of {}",
+                    index,
+                    self.slots.len()
+                ))
+            })
+    }
+}
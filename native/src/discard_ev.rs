@@ -0,0 +1,208 @@
+//! Monte-Carlo expected value of each discard.
+//!
+//! Every sample draws a sequence of tiles from the unseen pool and plays each candidate
+//! discard against that same sequence, so discards are compared on common draws. The
+//! rollout policy is greedy on shanten: a draw is kept when some discard lowers the
+//! shanten, otherwise it is discarded straight away, and a completed hand with a yaku
+//! wins by tsumo. Opponents, ron and calls are not modelled.
+
+use rand::rngs::StdRng;
+use rand::{Rng, SeedableRng};
+
+use crate::agari_calculator::AgariCalculator;
+use crate::shanten;
+use crate::types::{Conditions, Meld};
+
+/// Samples below which another worker thread is not started.
+pub const MIN_SAMPLES_PER_THREAD: usize = 64;
+
+/// Red fives in 136-format.
+const RED_FIVES: [u8; 3] = [16, 52, 88];
+
+/// Win rate and mean points (0 for samples that do not win) of one discard.
+#[derive(Debug, Clone, Copy, Default, PartialEq)]
+pub struct DiscardEv {
+    pub win_rate: f64,
+    pub expected_points: f64,
+}
+
+/// Everything a rollout needs about the player's hand and the table.
+#[derive(Debug, Clone)]
+pub struct EvSetup {
+    /// Concealed 136-format tiles, before the discard.
+    pub hand: Vec<u8>,
+    pub melds: Vec<Meld>,
+    pub dora_indicators: Vec<u8>,
+    /// Tiles the player cannot see: the pool future draws are sampled from.
+    pub pool: Vec<u8>,
+    /// Seat wind, round wind and honba of a tsumo win; riichi is assumed for closed hands.
+    pub conditions: Conditions,
+    pub is_oya: bool,
+    /// Own draws left before the wall runs out.
+    pub num_draws: usize,
+}
+
+impl EvSetup {
+    /// Estimate every discard in `discards` (136-format tiles held in `hand`) over
+    /// `samples` rollouts on up to `threads` threads.
+    ///
+    /// Sample `k` is seeded from `seed` and `k` alone, so the result does not depend on
+    /// the number of threads.
+    pub fn evaluate(
+        &self,
+        discards: &[u8],
+        samples: usize,
+        seed: u64,
+        threads: usize,
+    ) -> Vec<DiscardEv> {
+        if samples == 0 || discards.is_empty() {
+            return vec![DiscardEv::default(); discards.len()];
+        }
+        let mut totals = vec![(0u64, 0u64); discards.len()];
+        let chunk = samples.div_ceil(threads.max(1));
+        std::thread::scope(|scope| {
+            let workers: Vec<_> = (0..samples)
+                .step_by(chunk)
+                .map(|start| {
+                    let end = (start + chunk).min(samples);
+                    scope.spawn(move || self.run_samples(discards, start..end, seed))
+                })
+                .collect();
+            for worker in workers {
+                let partial = worker.join().expect("discard EV worker panicked");
+                for (total, (wins, points)) in totals.iter_mut().zip(partial) {
+                    total.0 += wins;
+                    total.1 += points;
+                }
+            }
+        });
+
+        totals
+            .into_iter()
+            .map(|(wins, points)| DiscardEv {
+                win_rate: wins as f64 / samples as f64,
+                expected_points: points as f64 / samples as f64,
+            })
+            .collect()
+    }
+
+    /// `(wins, total points)` per discard over the samples in `range`.
+    fn run_samples(
+        &self,
+        discards: &[u8],
+        range: std::ops::Range<usize>,
+        seed: u64,
+    ) -> Vec<(u64, u64)> {
+        let mut totals = vec![(0u64, 0u64); discards.len()];
+        let num_draws = self.num_draws.min(self.pool.len());
+        let mut pool = self.pool.clone();
+        for k in range {
+            let mut rng =
+                StdRng::seed_from_u64(seed ^ (k as u64).wrapping_mul(0x9e37_79b9_7f4a_7c15));
+            // Partial Fisher-Yates: the first `num_draws` tiles become the draw order.
+            pool.copy_from_slice(&self.pool);
+            for i in 0..num_draws {
+                let j = rng.gen_range(i..pool.len());
+                pool.swap(i, j);
+            }
+            let draws = &pool[..num_draws];
+            for (total, &discard) in totals.iter_mut().zip(discards) {
+                if let Some(points) = self.rollout(discard, draws) {
+                    total.0 += 1;
+                    total.1 += points as u64;
+                }
+            }
+        }
+        totals
+    }
+
+    /// Points won by tsumo after discarding `discard` and drawing `draws`, if the hand
+    /// completes with a yaku.
+    fn rollout(&self, discard: u8, draws: &[u8]) -> Option<u32> {
+        let mut tiles = self.hand.clone();
+        let pos = tiles.iter().position(|&t| t == discard)?;
+        tiles.swap_remove(pos);
+
+        let num_melds = self.melds.len();
+        let mut counts = tiles_to_counts(&tiles);
+        let mut current = shanten::shanten(&counts, num_melds);
+        for &draw in draws {
+            let kind = draw as usize / 4;
+            counts[kind] += 1;
+            let after = shanten::shanten(&counts, num_melds);
+            if after == -1 {
+                if let Some(points) = self.tsumo_points(&tiles, draw) {
+                    return Some(points);
+                }
+            } else if after < current {
+                // Keep the draw and let go of a tile that preserves the improvement.
+                let out = (0..34).find(|&t| {
+                    if counts[t] == 0 {
+                        return false;
+                    }
+                    counts[t] -= 1;
+                    let kept = shanten::shanten(&counts, num_melds) == after;
+                    counts[t] += 1;
+                    kept
+                });
+                if let Some(out) = out {
+                    counts[out] -= 1;
+                    tiles.push(draw);
+                    remove_kind(&mut tiles, out as u8);
+                    current = after;
+                    continue;
+                }
+            }
+            counts[kind] -= 1;
+        }
+        None
+    }
+
+    fn tsumo_points(&self, tiles: &[u8], win_tile: u8) -> Option<u32> {
+        let calc = AgariCalculator::new(tiles.to_vec(), self.melds.clone());
+        let res = calc.calc_uncached(win_tile, &self.dora_indicators, &[], &self.conditions);
+        if !res.agari {
+            return None;
+        }
+        Some(if self.is_oya {
+            res.tsumo_agari_ko * 3
+        } else {
+            res.tsumo_agari_oya + res.tsumo_agari_ko * 2
+        })
+    }
+}
+
+fn tiles_to_counts(tiles: &[u8]) -> [u8; 34] {
+    let mut counts = [0u8; 34];
+    for &t in tiles {
+        counts[t as usize / 4] += 1;
+    }
+    counts
+}
+
+/// Remove one tile of `kind`, keeping red fives when a plain copy is available.
+fn remove_kind(tiles: &mut Vec<u8>, kind: u8) {
+    let pos = tiles
+        .iter()
+        .position(|&t| t / 4 == kind && !RED_FIVES.contains(&t))
+        .or_else(|| tiles.iter().position(|&t| t / 4 == kind));
+    if let Some(pos) = pos {
+        tiles.swap_remove(pos);
+    }
+}
+
+/// Discards worth evaluating separately: one tile per kind, plus a red five when the
+/// hand also holds a plain copy of it.
+pub fn distinct_discards(candidates: impl IntoIterator<Item = u8>) -> Vec<u8> {
+    let mut seen = [[false; 2]; 34];
+    let mut out = Vec::new();
+    for t in candidates {
+        let red = RED_FIVES.contains(&t) as usize;
+        let slot = &mut seen[t as usize / 4][red];
+        if !*slot {
+            *slot = true;
+            out.push(t);
+        }
+    }
+    out
+}
@@ -1,15 +1,58 @@
 use pyo3::prelude::*;
 use pyo3::IntoPyObject;
+use rand::rngs::StdRng;
+use rand::SeedableRng;
 use std::collections::HashMap;
 
 use crate::action::{Action, Phase};
 use crate::observation::Observation;
 use crate::replay::MjaiEvent;
 use crate::rule::GameRule;
+use crate::state::compact::{ClaimTable, MAX_DISCARDS, MAX_HAND_TILES, PAO_SLOTS};
 use crate::state::legal_actions::GameStateLegalActions; // Import trait
 use crate::state::GameState;
 use crate::types::{Agari, Meld};
 
+/// Map a game mode given as a preset name (e.g. "4p-red-half") or an int to its id.
+pub(crate) fn parse_game_mode(game_mode: Option<Bound<'_, PyAny>>) -> u8 {
+    if let Some(val) = game_mode {
+        if let Ok(s) = val.extract::<String>() {
+            match s.as_str() {
+                "4p-red-single" => 0,
+                "4p-red-east" => 1,
+                "4p-red-half" => 2,
+                _ => 0,
+            }
+        } else {
+            val.extract::<u8>().unwrap_or_default()
+        }
+    } else {
+        0
+    }
+}
+
+fn check_discard_flags(v: &[Vec<bool>]) -> PyResult<()> {
+    match v.iter().find(|d| d.len() > MAX_DISCARDS) {
+        Some(d) => Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "At most {} discards are tracked per player, got {}",
+            MAX_DISCARDS,
+            d.len()
+        ))),
+        None => Ok(()),
+    }
+}
+
+/// Saved copy of a `RiichiEnv` state, created by `RiichiEnv.snapshot()`.
+///
+/// It covers the full game state including the wall, RNG position, pending claims and
+/// kan. Keep `skip_mjai_logging=True` on envs used for search, since the MJAI log is
+/// part of the state and is copied too.
+#[pyclass(module = "riichienv._riichienv")]
+#[derive(Debug, Clone)]
+pub struct EnvSnapshot {
+    pub(crate) state: GameState,
+}
+
 #[pyclass(module = "riichienv._riichienv")]
 #[derive(Debug, Clone)]
 pub struct RiichiEnv {
@@ -20,42 +63,40 @@ pub struct RiichiEnv {
 #[pymethods]
 impl RiichiEnv {
     #[new]
-    #[pyo3(signature = (game_mode=None, skip_mjai_logging=false, seed=None, round_wind=None, rule=None))]
+    #[pyo3(signature = (game_mode=None, skip_mjai_logging=false, seed=None, round_wind=None, rule=None, auto_pass=false))]
     pub fn new(
         game_mode: Option<Bound<'_, PyAny>>,
         skip_mjai_logging: bool,
         seed: Option<u64>,
         round_wind: Option<u8>,
         rule: Option<GameRule>,
+        auto_pass: bool,
     ) -> PyResult<Self> {
-        let gt = if let Some(val) = game_mode {
-            if let Ok(s) = val.extract::<String>() {
-                match s.as_str() {
-                    "4p-red-single" => 0,
-                    "4p-red-east" => 1,
-                    "4p-red-half" => 2,
-                    _ => 0,
-                }
-            } else {
-                val.extract::<u8>().unwrap_or_default()
-            }
-        } else {
-            0
-        };
-
-        Ok(RiichiEnv {
-            state: GameState::new(
-                gt,
-                skip_mjai_logging,
-                seed,
-                round_wind.unwrap_or(0),
-                rule.unwrap_or_default(),
-            ),
-        })
+        let gt = parse_game_mode(game_mode);
+
+        let mut state = GameState::new(
+            gt,
+            skip_mjai_logging,
+            seed,
+            round_wind.unwrap_or(0),
+            rule.unwrap_or_default(),
+        );
+        state.auto_pass = auto_pass;
+        Ok(RiichiEnv { state })
     }
 
     // --- Delegation Getters/Setters ---
 
+    /// When set, decisions with a single legal action are resolved inside `step`.
+    #[getter]
+    pub fn get_auto_pass(&self) -> bool {
+        self.state.auto_pass
+    }
+    #[setter]
+    pub fn set_auto_pass(&mut self, v: bool) {
+        self.state.auto_pass = v;
+    }
+
     #[getter]
     pub fn get_wall(&self) -> Vec<u32> {
         self.state.wall.tiles.iter().map(|&x| x as u32).collect()
@@ -74,12 +115,26 @@ impl RiichiEnv {
             .collect()
     }
     #[setter]
-    pub fn set_hands(&mut self, v: Vec<Vec<u32>>) {
+    pub fn set_hands(&mut self, v: Vec<Vec<u32>>) -> PyResult<()> {
+        if let Some(h) = v.iter().find(|h| h.len() > MAX_HAND_TILES) {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "A hand holds at most {} tiles, got {}",
+                MAX_HAND_TILES,
+                h.len()
+            )));
+        }
+        if let Some(&t) = v.iter().flatten().find(|&&t| t >= 136) {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "Invalid tile id {}",
+                t
+            )));
+        }
         if v.len() == 4 {
             for (i, h) in v.into_iter().enumerate() {
                 self.state.players[i].hand = h.iter().map(|&x| x as u8).collect();
             }
         }
+        Ok(())
     }
 
     #[getter]
@@ -117,16 +172,18 @@ impl RiichiEnv {
         self.state
             .players
             .iter()
-            .map(|p| p.discard_from_hand.clone())
+            .map(|p| p.discard_from_hand.to_vec())
             .collect()
     }
     #[setter]
-    pub fn set_discard_from_hand(&mut self, v: Vec<Vec<bool>>) {
+    pub fn set_discard_from_hand(&mut self, v: Vec<Vec<bool>>) -> PyResult<()> {
+        check_discard_flags(&v)?;
         if v.len() == 4 {
             for (i, d) in v.into_iter().enumerate() {
-                self.state.players[i].discard_from_hand = d;
+                self.state.players[i].discard_from_hand = d.into_iter().collect();
             }
         }
+        Ok(())
     }
 
     #[getter]
@@ -134,16 +191,18 @@ impl RiichiEnv {
         self.state
             .players
             .iter()
-            .map(|p| p.discard_is_riichi.clone())
+            .map(|p| p.discard_is_riichi.to_vec())
             .collect()
     }
     #[setter]
-    pub fn set_discard_is_riichi(&mut self, v: Vec<Vec<bool>>) {
+    pub fn set_discard_is_riichi(&mut self, v: Vec<Vec<bool>>) -> PyResult<()> {
+        check_discard_flags(&v)?;
         if v.len() == 4 {
             for (i, d) in v.into_iter().enumerate() {
-                self.state.players[i].discard_is_riichi = d;
+                self.state.players[i].discard_is_riichi = d.into_iter().collect();
             }
         }
+        Ok(())
     }
 
     #[getter]
@@ -401,11 +460,11 @@ impl RiichiEnv {
 
     #[getter]
     pub fn current_claims(&self) -> HashMap<u8, Vec<Action>> {
-        self.state.current_claims.clone()
+        self.state.current_claims.to_map()
     }
     #[setter]
     pub fn set_current_claims(&mut self, v: HashMap<u8, Vec<Action>>) {
-        self.state.current_claims = v;
+        self.state.current_claims = ClaimTable::from(v);
     }
 
     #[getter]
@@ -423,15 +482,23 @@ impl RiichiEnv {
 
     #[getter]
     pub fn get_pao(&self) -> Vec<HashMap<u8, u8>> {
-        self.state.players.iter().map(|p| p.pao.clone()).collect()
+        self.state.players.iter().map(|p| p.pao.to_map()).collect()
     }
     #[setter]
-    pub fn set_pao(&mut self, v: Vec<HashMap<u8, u8>>) {
+    pub fn set_pao(&mut self, v: Vec<HashMap<u8, u8>>) -> PyResult<()> {
+        if let Some(p) = v.iter().find(|p| p.len() > PAO_SLOTS) {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "A player has at most {} pao entries, got {}",
+                PAO_SLOTS,
+                p.len()
+            )));
+        }
         if v.len() == 4 {
             for (i, p) in v.into_iter().enumerate() {
-                self.state.players[i].pao = p;
+                self.state.players[i].pao = p.into_iter().collect();
             }
         }
+        Ok(())
     }
 
     #[getter]
@@ -451,6 +518,23 @@ impl RiichiEnv {
         }
     }
 
+    #[getter]
+    pub fn get_missed_agari_riichi(&self) -> Vec<bool> {
+        self.state
+            .players
+            .iter()
+            .map(|p| p.missed_agari_riichi)
+            .collect()
+    }
+    #[setter]
+    pub fn set_missed_agari_riichi(&mut self, v: Vec<bool>) {
+        if v.len() == 4 {
+            for (i, &val) in v.iter().enumerate() {
+                self.state.players[i].missed_agari_riichi = val;
+            }
+        }
+    }
+
     #[getter]
     pub fn get_agari_results(&self) -> HashMap<u8, Agari> {
         self.state.agari_results.clone()
@@ -607,31 +691,98 @@ impl RiichiEnv {
         kyotaku: Option<u32>,
         seed: Option<u64>,
     ) -> PyResult<Py<PyAny>> {
-        if let Some(s) = seed {
-            self.state.seed = Some(s);
-        }
+        let obs_map = py.detach(|| {
+            if let Some(s) = seed {
+                self.state.seed = Some(s);
+            }
 
-        let initial_scores = if let Some(sc) = scores {
-            let mut s = [25000; 4];
-            for (i, &score) in sc.iter().enumerate().take(4) {
-                s[i] = score;
+            let initial_scores = if let Some(sc) = scores {
+                let mut s = [25000; 4];
+                for (i, &score) in sc.iter().enumerate().take(4) {
+                    s[i] = score;
+                }
+                Some(s)
+            } else {
+                None
+            };
+
+            self.state.reset();
+            self.state._initialize_round(
+                oya.unwrap_or(self.state.oya),
+                bakaze.unwrap_or(self.state.round_wind),
+                honba.unwrap_or(self.state.honba),
+                kyotaku.unwrap_or(self.state.riichi_sticks),
+                wall,
+                initial_scores,
+            );
+            if self.state.auto_pass {
+                self.state._resolve_forced_actions();
             }
-            Some(s)
-        } else {
-            None
-        };
 
-        self.state.reset();
-        self.state._initialize_round(
-            oya.unwrap_or(self.state.oya),
-            bakaze.unwrap_or(self.state.round_wind),
-            honba.unwrap_or(self.state.honba),
-            kyotaku.unwrap_or(self.state.riichi_sticks),
-            wall,
-            initial_scores,
-        );
+            self.get_observations(Some(self.state.active_players.clone()))
+        });
+        obs_map.into_pyobject(py).map(|o| o.unbind().into())
+    }
+
+    /// Capture the current state.
+    ///
+    /// Passing a previous snapshot as `out` overwrites it in place, reusing its buffers.
+    #[pyo3(signature = (out=None))]
+    pub fn snapshot(
+        &self,
+        py: Python<'_>,
+        out: Option<Py<EnvSnapshot>>,
+    ) -> PyResult<Py<EnvSnapshot>> {
+        match out {
+            Some(out) => {
+                out.try_borrow_mut(py)?.state.restore_from(&self.state);
+                Ok(out)
+            }
+            None => Py::new(
+                py,
+                EnvSnapshot {
+                    state: self.state.clone(),
+                },
+            ),
+        }
+    }
+
+    /// Return to a state captured by `snapshot()`, in place.
+    pub fn restore(&mut self, snapshot: PyRef<'_, EnvSnapshot>) {
+        self.state.restore_from(&snapshot.state);
+    }
 
-        self.get_obs_py(py, Some(self.state.active_players.clone()))
+    /// Sample `count` states consistent with what `player_id` can see.
+    ///
+    /// Opponents' concealed tiles and the unrevealed wall are redealt at random; with
+    /// `riichi_tenpai`, opponents in riichi are dealt tenpai hands. Returns snapshots to
+    /// pass to `restore()`. Sample `k` depends only on `seed` and `k`.
+    #[pyo3(signature = (player_id, count, seed=None, riichi_tenpai=true))]
+    pub fn determinize(
+        &self,
+        py: Python<'_>,
+        player_id: u8,
+        count: usize,
+        seed: Option<u64>,
+        riichi_tenpai: bool,
+    ) -> PyResult<Vec<Py<EnvSnapshot>>> {
+        let seed = seed.unwrap_or_else(rand::random);
+        let states = py
+            .detach(|| {
+                (0..count)
+                    .map(|k| {
+                        let mut rng = StdRng::seed_from_u64(
+                            seed ^ (k as u64).wrapping_mul(0x9e37_79b9_7f4a_7c15),
+                        );
+                        self.state.determinize(player_id, riichi_tenpai, &mut rng)
+                    })
+                    .collect::<Result<Vec<_>, _>>()
+            })
+            .map_err(pyo3::exceptions::PyValueError::new_err)?;
+        states
+            .into_iter()
+            .map(|state| Py::new(py, EnvSnapshot { state }))
+            .collect()
     }
 
     pub fn _get_legal_actions(&mut self, pid: u8) -> Vec<Action> {
@@ -644,12 +795,16 @@ impl RiichiEnv {
         py: Python<'py>,
         actions: HashMap<u8, Action>,
     ) -> PyResult<Py<PyAny>> {
-        self.state.step(&actions);
-        if self.state.last_error.is_some() {
-            let dict = pyo3::types::PyDict::new(py);
-            return Ok(dict.unbind().into());
-        }
-        self.get_obs_py(py, Some(self.state.active_players.clone()))
+        // Game logic and observation building are pure Rust; only the conversion of
+        // the result needs the GIL.
+        let obs_map = py.detach(|| {
+            self.state.step(&actions);
+            if self.state.last_error.is_some() {
+                return HashMap::new();
+            }
+            self.get_observations(Some(self.state.active_players.clone()))
+        });
+        obs_map.into_pyobject(py).map(|o| o.unbind().into())
     }
 
     pub fn apply_mjai_event(&mut self, py: Python, event: Py<PyAny>) -> PyResult<()> {
@@ -659,7 +814,8 @@ impl RiichiEnv {
         let ev: MjaiEvent = serde_json::from_str(&s).map_err(|e| {
             pyo3::exceptions::PyValueError::new_err(format!("JSON Parse Error: {}", e))
         })?;
-        self.state.apply_mjai_event(ev);
-        Ok(())
+        self.state
+            .apply_mjai_event(ev)
+            .map_err(pyo3::exceptions::PyValueError::new_err)
     }
 }
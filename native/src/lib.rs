@@ -1,6 +1,9 @@
+use std::collections::BTreeMap;
+
 use pyo3::prelude::*;
 
 mod agari;
+mod agari_cache;
 mod agari_calculator;
 mod score;
 mod tests;
@@ -8,6 +11,8 @@ mod types;
 mod yaku;
 
 mod action;
+mod batch_env;
+mod discard_ev;
 mod env;
 mod observation;
 mod parser;
@@ -17,40 +22,56 @@ mod shanten;
 mod state;
 mod yaku_checker;
 
-#[pyfunction]
-fn check_riichi_candidates(tiles_136: Vec<u8>) -> Vec<u32> {
-    let mut candidates = Vec::new();
-    // Convert to 34-tile hand
-    let mut tiles_34 = Vec::with_capacity(tiles_136.len());
-    for t in &tiles_136 {
-        tiles_34.push(t / 4);
+/// 34-type counts of `tiles_136` with kan tiles reduced as in `AgariCalculator`.
+fn counts_from_tiles(tiles_136: &[u8], melds: &[types::Meld]) -> PyResult<[u8; 34]> {
+    let mut counts = [0u8; 34];
+    for &t in tiles_136 {
+        if t >= 136 {
+            return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "Invalid tile id: {}",
+                t
+            )));
+        }
+        counts[t as usize / 4] += 1;
     }
+    if let Some(t) = counts.iter().position(|&c| c > 4) {
+        return Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "More than four copies of tile type {}",
+            t
+        )));
+    }
+    state::wait_cache::reduce_kan_counts(&mut counts, melds);
+    Ok(counts)
+}
 
-    // We iterate each tile in 136-tiles as a discard candidate.
-    // However, since we care about valid discards that lead to Tenpai,
-    // and multiple 136-tiles map to the same 34-tile, we can optimize or check simply.
-    // For exact 136 return, we should check each unique 136 tile in hand.
-
-    // Count uniqueness to avoid redundant checks?
-    // Actually, simple iteration is fine for 14 tiles.
-
-    for (i, &t_discard) in tiles_136.iter().enumerate() {
-        // Construct hand effectively by removing this tile
-        // Re-construct Hand from scratch is safer/easier than modifying mutable hand repeatedly?
-        // Or remove from `tiles_34`.
-
-        let mut hand = types::Hand::default();
-        for (j, &t) in tiles_34.iter().enumerate() {
-            if i != j {
-                hand.add(t);
-            }
-        }
+/// Tiles of a 14-tile closed hand whose discard keeps the hand tenpai.
+#[pyfunction]
+fn check_riichi_candidates(tiles_136: Vec<u8>) -> PyResult<Vec<u32>> {
+    let counts = counts_from_tiles(&tiles_136, &[])?;
+    let num_melds = 14usize.saturating_sub(tiles_136.len()) / 3;
+    let waits_after = state::wait_cache::tenpai_discards_by_type(&counts, num_melds);
+    Ok(tiles_136
+        .iter()
+        .filter(|&&t| !waits_after[t as usize / 4].is_empty())
+        .map(|&t| t as u32)
+        .collect())
+}
 
-        if agari::is_tenpai(&mut hand) {
-            candidates.push(t_discard as u32);
-        }
-    }
-    candidates
+/// Tenpai-keeping discards of a 14-tile hand, grouped by 34-tile type.
+///
+/// Maps each discard type to the 34-type waits left after discarding it; types whose
+/// discard leaves the hand noten are omitted.
+#[pyfunction]
+#[pyo3(signature = (tiles_136, melds=vec![]))]
+fn tenpai_discards(tiles_136: Vec<u8>, melds: Vec<types::Meld>) -> PyResult<BTreeMap<u8, Vec<u8>>> {
+    let counts = counts_from_tiles(&tiles_136, &melds)?;
+    let waits_after = state::wait_cache::tenpai_discards_by_type(&counts, melds.len());
+    Ok(waits_after
+        .iter()
+        .enumerate()
+        .filter(|(_, waits)| !waits.is_empty())
+        .map(|(t, waits)| (t as u8, waits.iter().collect()))
+        .collect())
 }
 
 #[pymodule]
@@ -64,6 +85,8 @@ fn _riichienv(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<agari_calculator::AgariCalculator>()?;
     m.add_class::<replay::MjSoulReplay>()?;
     m.add_class::<replay::MjaiReplay>()?;
+    m.add_class::<replay::mjai_replay::MjaiKyokuStream>()?;
+    m.add_class::<replay::ReplayLoader>()?;
     m.add_class::<replay::LogKyoku>()?;
     m.add_class::<replay::mjsoul_replay::KyokuIterator>()?;
     m.add_class::<replay::AgariContext>()?;
@@ -78,10 +101,16 @@ fn _riichienv(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<action::Action>()?;
     m.add_class::<observation::Observation>()?;
     m.add_class::<env::RiichiEnv>()?;
+    m.add_class::<env::EnvSnapshot>()?;
+    m.add_class::<batch_env::RiichiEnvBatch>()?;
 
     m.add_function(wrap_pyfunction!(score::calculate_score, m)?)?;
+    m.add_function(wrap_pyfunction!(score::calculate_score_batch, m)?)?;
     m.add_function(wrap_pyfunction!(parser::parse_hand, m)?)?;
     m.add_function(wrap_pyfunction!(parser::parse_tile, m)?)?;
     m.add_function(wrap_pyfunction!(check_riichi_candidates, m)?)?;
+    m.add_function(wrap_pyfunction!(tenpai_discards, m)?)?;
+    m.add_function(wrap_pyfunction!(observation::encode_batch, m)?)?;
+    m.add_function(wrap_pyfunction!(replay::shard::write_shard, m)?)?;
     Ok(())
 }
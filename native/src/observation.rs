@@ -1,12 +1,23 @@
+use std::collections::HashMap;
+use std::sync::{Arc, OnceLock};
+
 use pyo3::prelude::*;
 use pyo3::types::{PyDict, PyDictMethods};
 use serde::{Deserialize, Serialize};
 
 use crate::action::{Action, ActionType};
+use crate::discard_ev;
 use crate::shanten;
-use crate::types::{Meld, MeldType};
+use crate::types::{Conditions, Meld, MeldType, Wind};
 use crate::yaku_checker;
 use ndarray::prelude::*;
+use numpy::{IntoPyArray, PyArray, PyArray1, PyArray2, PyArray3, PyArray4, PyArrayMethods};
+
+/// Number of feature planes produced by `Observation::encode`.
+pub const ENCODE_CHANNELS: usize = 74;
+
+/// Size of the flat action id space produced by `Action::encode` (0-81).
+pub const ACTION_SPACE: usize = 82;
 
 /// Get the next tile in sequence for dora calculation
 /// Tile type: 0-33 (m1-m9: 0-8, p1-p9: 9-17, s1-s9: 18-26, winds: 27-30, dragons: 31-33)
@@ -37,6 +48,151 @@ fn get_next_tile(tile: u32) -> u8 {
     }
 }
 
+fn check_out_shape(got: &[usize], expected: &[usize]) -> PyResult<()> {
+    if got != expected {
+        return Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "out has shape {:?}, expected {:?}",
+            got, expected
+        )));
+    }
+    Ok(())
+}
+
+/// Hand an encoded array to Python.
+///
+/// `fill` writes the values into a view of shape `dim`. Without `out`, that is a fresh
+/// array that the returned NumPy array takes ownership of (no copy); with `out`, it is
+/// `out` itself, which is filled in place and returned.
+fn to_pyarray<'py, D: Dimension>(
+    py: Python<'py>,
+    dim: D,
+    out: Option<Bound<'py, PyArray<f32, D>>>,
+    fill: impl FnOnce(ArrayViewMut<f32, D>),
+) -> PyResult<Bound<'py, PyArray<f32, D>>> {
+    match out {
+        Some(out) => {
+            {
+                let mut rw = out
+                    .try_readwrite()
+                    .map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+                let view = rw.as_array_mut();
+                check_out_shape(view.shape(), dim.slice())?;
+                fill(view);
+            }
+            Ok(out)
+        }
+        None => {
+            let mut arr = Array::<f32, D>::zeros(dim);
+            fill(arr.view_mut());
+            Ok(arr.into_pyarray(py))
+        }
+    }
+}
+
+/// Discards, melds and dora indicators of the table when an observation was taken.
+///
+/// All tiles share one buffer, so taking an observation allocates twice however many
+/// melds and discards there are; the per-seat lists of `Observation` are unpacked from
+/// it on first access.
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub(crate) struct TableTiles {
+    /// Discards of seats 0-3, then the tiles of every meld, then the dora indicators.
+    tiles: Vec<u8>,
+    /// End of each seat's discards in `tiles`.
+    discard_ends: [u16; 4],
+    /// Melds in seat order, each ending at `end` in `tiles`.
+    melds: Vec<MeldEntry>,
+    /// Start of the dora indicators in `tiles`.
+    dora_start: u16,
+}
+
+#[derive(Debug, Clone, Copy, Serialize, Deserialize)]
+struct MeldEntry {
+    seat: u8,
+    meld_type: MeldType,
+    opened: bool,
+    from_who: i8,
+    end: u16,
+}
+
+impl TableTiles {
+    pub(crate) fn new<'a>(
+        discards: impl IntoIterator<Item = &'a [u8]>,
+        melds: impl IntoIterator<Item = &'a [Meld]>,
+        dora_indicators: &[u8],
+    ) -> Self {
+        let mut tiles = Vec::with_capacity(128);
+        let mut discards = discards.into_iter();
+        let mut discard_ends = [0; 4];
+        for end in &mut discard_ends {
+            if let Some(d) = discards.next() {
+                tiles.extend_from_slice(d);
+            }
+            *end = tiles.len() as u16;
+        }
+
+        let mut entries = Vec::new();
+        for (seat, seat_melds) in melds.into_iter().take(4).enumerate() {
+            for m in seat_melds {
+                tiles.extend_from_slice(&m.tiles);
+                entries.push(MeldEntry {
+                    seat: seat as u8,
+                    meld_type: m.meld_type,
+                    opened: m.opened,
+                    from_who: m.from_who,
+                    end: tiles.len() as u16,
+                });
+            }
+        }
+
+        let dora_start = tiles.len() as u16;
+        tiles.extend_from_slice(dora_indicators);
+        Self {
+            tiles,
+            discard_ends,
+            melds: entries,
+            dora_start,
+        }
+    }
+
+    fn discards(&self) -> Vec<Vec<u32>> {
+        let mut start = 0;
+        self.discard_ends
+            .iter()
+            .map(|&end| {
+                let seat = self.tiles[start..end as usize]
+                    .iter()
+                    .map(|&t| t as u32)
+                    .collect();
+                start = end as usize;
+                seat
+            })
+            .collect()
+    }
+
+    fn melds(&self) -> Vec<Vec<Meld>> {
+        let mut out = vec![Vec::new(); 4];
+        let mut start = self.discard_ends[3] as usize;
+        for m in &self.melds {
+            out[m.seat as usize].push(Meld {
+                meld_type: m.meld_type,
+                tiles: self.tiles[start..m.end as usize].to_vec(),
+                opened: m.opened,
+                from_who: m.from_who,
+            });
+            start = m.end as usize;
+        }
+        out
+    }
+
+    fn dora_indicators(&self) -> Vec<u32> {
+        self.tiles[self.dora_start as usize..]
+            .iter()
+            .map(|&t| t as u32)
+            .collect()
+    }
+}
+
 #[pyclass(module = "riichienv._riichienv")]
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct Observation {
@@ -44,12 +200,14 @@ pub struct Observation {
     pub player_id: u8,
     #[pyo3(get)]
     pub hands: Vec<Vec<u32>>,
-    #[pyo3(get)]
-    pub melds: Vec<Vec<Meld>>,
-    #[pyo3(get)]
-    pub discards: Vec<Vec<u32>>,
-    #[pyo3(get)]
-    pub dora_indicators: Vec<u32>,
+    /// Melds, discards and dora indicators, unpacked into the fields below on first use.
+    pub(crate) table: TableTiles,
+    #[serde(skip)]
+    pub(crate) melds: OnceLock<Vec<Vec<Meld>>>,
+    #[serde(skip)]
+    pub(crate) discards: OnceLock<Vec<Vec<u32>>>,
+    #[serde(skip)]
+    pub(crate) dora_indicators: OnceLock<Vec<u32>>,
     #[pyo3(get)]
     pub scores: Vec<i32>,
     #[pyo3(get)]
@@ -58,7 +216,8 @@ pub struct Observation {
     #[serde(skip)]
     pub _legal_actions: Vec<Action>,
 
-    pub events: Vec<String>,
+    /// New MJAI events for `player_id`, sharing their strings with the game's log.
+    pub events: Vec<Arc<str>>,
 
     #[pyo3(get)]
     pub honba: u8,
@@ -70,10 +229,9 @@ pub struct Observation {
     pub oya: u8,
     #[pyo3(get)]
     pub kyoku_index: u8,
-    #[pyo3(get)]
-    pub waits: Vec<u8>,
-    #[pyo3(get)]
-    pub is_tenpai: bool,
+    /// `(waits, is_tenpai)` of `player_id`, computed on first access (see `wait_info`).
+    #[serde(skip)]
+    pub(crate) wait_info: OnceLock<(Vec<u8>, bool)>,
     #[pyo3(get)]
     pub tsumogiri_flags: Vec<Vec<bool>>,
     #[pyo3(get)]
@@ -113,29 +271,29 @@ impl Observation {
             .iter()
             .map(|h| h.iter().map(|&x| x as u32).collect())
             .collect();
-        let discards_u32 = discards
-            .iter()
-            .map(|d| d.iter().map(|&x| x as u32).collect())
-            .collect();
-        let dora_u32 = dora_indicators.iter().map(|&x| x as u32).collect();
+        let table = TableTiles::new(
+            discards.iter().map(Vec::as_slice),
+            melds.iter().map(Vec::as_slice),
+            &dora_indicators,
+        );
 
         Self {
             player_id,
             hands: hands_u32,
-            melds,
-            discards: discards_u32,
-            dora_indicators: dora_u32,
+            table,
+            melds: OnceLock::new(),
+            discards: OnceLock::new(),
+            dora_indicators: OnceLock::new(),
             scores,
             riichi_declared,
             _legal_actions: legal_actions,
-            events,
+            events: events.into_iter().map(Arc::from).collect(),
             honba,
             riichi_sticks,
             round_wind,
             oya,
             kyoku_index,
-            waits,
-            is_tenpai,
+            wait_info: OnceLock::from((waits, is_tenpai)),
             tsumogiri_flags: vec![vec![]; 4], // Initialize with empty vectors
             riichi_sutehais,
             last_tedashis,
@@ -152,13 +310,39 @@ impl Observation {
         }
     }
 
+    #[getter]
+    pub fn get_melds(&self) -> Vec<Vec<Meld>> {
+        self.melds().to_vec()
+    }
+
+    #[getter]
+    pub fn get_discards(&self) -> Vec<Vec<u32>> {
+        self.discards().to_vec()
+    }
+
+    #[getter]
+    pub fn get_dora_indicators(&self) -> Vec<u32> {
+        self.dora_indicators().to_vec()
+    }
+
+    /// Tile types (0-33) that complete the player's hand.
+    #[getter]
+    pub fn waits(&self) -> Vec<u8> {
+        self.wait_info().0.clone()
+    }
+
+    #[getter]
+    pub fn is_tenpai(&self) -> bool {
+        self.wait_info().1
+    }
+
     #[getter]
     pub fn events<'py>(&self, py: Python<'py>) -> PyResult<Vec<Py<PyAny>>> {
         let json = py.import("json")?;
         let loads = json.getattr("loads")?;
         let mut res = Vec::new();
         for s in &self.events {
-            let obj = loads.call1((s,))?;
+            let obj = loads.call1((&**s,))?;
             res.push(obj.unbind());
         }
         Ok(res)
@@ -169,17 +353,29 @@ impl Observation {
         self._legal_actions.clone()
     }
 
-    #[pyo3(name = "mask")]
-    pub fn mask_method<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut mask = [0u8; 82];
-        for action in &self._legal_actions {
-            if let Ok(idx) = action.encode() {
-                if (idx as usize) < mask.len() {
-                    mask[idx as usize] = 1;
+    /// Legal action mask as an `(82,)` uint8 array indexed by `Action.encode()` ids.
+    #[pyo3(name = "mask", signature = (out=None))]
+    pub fn mask_method<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray1<u8>>>,
+    ) -> PyResult<Bound<'py, PyArray1<u8>>> {
+        let mut mask = [0u8; ACTION_SPACE];
+        self.mask_into(&mut mask);
+        match out {
+            Some(out) => {
+                {
+                    let mut rw = out
+                        .try_readwrite()
+                        .map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+                    let mut view = rw.as_array_mut();
+                    check_out_shape(view.shape(), &[ACTION_SPACE])?;
+                    view.assign(&ArrayView1::from(&mask[..]));
                 }
+                Ok(out)
             }
+            None => Ok(mask.to_vec().into_pyarray(py)),
         }
-        Ok(pyo3::types::PyBytes::new(py, &mask))
     }
 
     #[pyo3(signature = (action_id))]
@@ -306,7 +502,7 @@ impl Observation {
     }
 
     pub fn new_events(&self) -> Vec<String> {
-        self.events.clone()
+        self.events.iter().map(|s| s.to_string()).collect()
     }
 
     pub fn to_dict<'py>(&self, py: Python<'py>) -> PyResult<Py<PyAny>> {
@@ -315,7 +511,7 @@ impl Observation {
         dict.set_item("hands", self.hands.clone())?;
 
         let melds_py = pyo3::types::PyList::empty(py);
-        for p_melds in &self.melds {
+        for p_melds in self.melds() {
             let p_list = pyo3::types::PyList::new(
                 py,
                 p_melds.iter().map(|m| m.clone().into_pyobject(py).unwrap()),
@@ -324,8 +520,8 @@ impl Observation {
         }
         dict.set_item("melds", melds_py)?;
 
-        dict.set_item("discards", self.discards.clone())?;
-        dict.set_item("dora_indicators", self.dora_indicators.clone())?;
+        dict.set_item("discards", self.discards().to_vec())?;
+        dict.set_item("dora_indicators", self.dora_indicators().to_vec())?;
         dict.set_item("scores", self.scores.clone())?;
         dict.set_item("riichi_declared", self.riichi_declared.clone())?;
 
@@ -335,7 +531,7 @@ impl Observation {
         }
         dict.set_item("legal_actions", actions_py)?;
 
-        dict.set_item("events", self.events.clone())?;
+        dict.set_item("events", self.new_events())?;
         dict.set_item("honba", self.honba)?;
         dict.set_item("riichi_sticks", self.riichi_sticks)?;
         dict.set_item("round_wind", self.round_wind)?;
@@ -356,51 +552,17 @@ impl Observation {
     ///
     /// Parameters:
     /// - decay_rate: Rate of exponential decay (default 0.2, as used in Mortal)
-    #[pyo3(name = "encode_discard_history_decay", signature = (decay_rate=None))]
+    #[pyo3(name = "encode_discard_history_decay", signature = (decay_rate=None, out=None))]
     pub fn encode_discard_history_decay<'py>(
         &self,
         py: Python<'py>,
         decay_rate: Option<f32>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
         let decay_rate = decay_rate.unwrap_or(0.2);
-        let mut arr = Array2::<f32>::zeros((4, 34));
-
-        // Encode discard history for all 4 players
-        for player_idx in 0..4 {
-            if player_idx >= self.discards.len() {
-                continue;
-            }
-
-            let discs = &self.discards[player_idx];
-            let max_len = discs.len();
-
-            if max_len == 0 {
-                continue;
-            }
-
-            // Iterate through all discards, applying exponential decay
-            for (turn, &tile) in discs.iter().enumerate() {
-                let tile_idx = (tile as usize) / 4;
-                if tile_idx < 34 {
-                    // Age = how many turns ago this discard happened
-                    // Most recent discard has age 0
-                    let age = (max_len - 1 - turn) as f32;
-                    let weight = (-decay_rate * age).exp();
-
-                    // Add weighted value (accumulates if same tile discarded multiple times)
-                    arr[[player_idx, tile_idx]] += weight;
-                }
-            }
-        }
-
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
+        to_pyarray(py, Ix2(4, 34), out, |arr| {
+            self.discard_history_decay_into(decay_rate, arr)
+        })
     }
 
     /// Encode furiten-aware ron possibility based on tsumogiri patterns.
@@ -415,53 +577,15 @@ impl Observation {
     ///
     /// Logic: If a player has been consistently doing tsumogiri (auto-discard), their hand
     /// hasn't changed, so they likely cannot ron on tiles in their own river (furiten rule).
-    #[pyo3(name = "encode_furiten_ron_possibility")]
+    #[pyo3(name = "encode_furiten_ron_possibility", signature = (out=None))]
     pub fn encode_furiten_ron_possibility<'py>(
         &self,
         py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        const NUM_YAKU: usize = 21;
-        let mut arr = Array2::<f32>::ones((4, NUM_YAKU));
-
-        // For each player, check if they've been doing tsumogiri consecutively
-        for player_idx in 0..4 {
-            if player_idx >= self.tsumogiri_flags.len() {
-                continue;
-            }
-
-            let flags = &self.tsumogiri_flags[player_idx];
-            if flags.is_empty() {
-                continue;
-            }
-
-            // Count consecutive tsumogiri from the end
-            let mut consecutive_tsumogiri = 0;
-            for &flag in flags.iter().rev() {
-                if flag {
-                    consecutive_tsumogiri += 1;
-                } else {
-                    break;
-                }
-            }
-
-            // If 3+ consecutive tsumogiri, assume hand hasn't changed
-            // This means ron on their own discards is likely furiten
-            if consecutive_tsumogiri >= 3 {
-                // Mark all yaku as having reduced ron possibility
-                for yaku_idx in 0..NUM_YAKU {
-                    arr[[player_idx, yaku_idx]] = 0.0;
-                }
-            }
-        }
-
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(4, 21), out, |arr| {
+            self.furiten_ron_possibility_into(arr)
+        })
     }
 
     /// Encode yaku (winning hand patterns) possibility for each player.
@@ -495,149 +619,257 @@ impl Observation {
     /// 20: Ittsu (straight)
     ///
     /// Total: 21 yaku types
-    #[pyo3(name = "encode_yaku_possibility")]
+    #[pyo3(name = "encode_yaku_possibility", signature = (out=None))]
     pub fn encode_yaku_possibility<'py>(
         &self,
         py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        const NUM_YAKU: usize = 21;
-        let mut arr = Array3::<f32>::ones((4, NUM_YAKU, 2));
+        out: Option<Bound<'py, PyArray3<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray3<f32>>> {
+        to_pyarray(py, Ix3(4, 21, 2), out, |arr| {
+            self.yaku_possibility_into(arr)
+        })
+    }
 
-        // Combine all visible tiles for each player
-        let mut all_discards: Vec<Vec<u32>> = Vec::with_capacity(4);
-        for player_idx in 0..4 {
-            if player_idx < self.discards.len() {
-                all_discards.push(self.discards[player_idx].clone());
-            } else {
-                all_discards.push(Vec::new());
-            }
-        }
+    /// Encode the observation into `(74, 34)` float32 feature planes.
+    ///
+    /// When `out` is given, the features are written straight into it (e.g. a slot of a
+    /// preallocated batch tensor) and `out` is returned.
+    #[pyo3(signature = (out=None))]
+    pub fn encode<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(ENCODE_CHANNELS, 34), out, |arr| {
+            self.encode_into(arr)
+        })
+    }
 
-        // Encode for each player
-        for player_idx in 0..4 {
-            if player_idx >= self.melds.len() {
-                continue;
-            }
+    /// Encode shanten number and tile efficiency features.
+    ///
+    /// Returns a (4, 4) array where:
+    /// - Dimension 0 (4): Player index (0=self, 1-3=opponents)
+    /// - Dimension 1 (4): [shanten, effective_tiles, best_ukeire, normalized_turn]
+    ///
+    /// Features:
+    /// - shanten: Normalized shanten number (/ 8.0, where 8 is max typical shanten)
+    /// - effective_tiles: Number of tile types that reduce shanten (/ 34.0)
+    /// - best_ukeire: Best ukeire count after optimal discard (/ 80.0)
+    /// - normalized_turn: Current turn / max_turns (approx / 18.0)
+    #[pyo3(name = "encode_shanten_efficiency", signature = (out=None))]
+    pub fn encode_shanten_efficiency<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(4, 4), out, |arr| self.shanten_efficiency_into(arr))
+    }
 
-            let melds = &self.melds[player_idx];
-            let discards = &all_discards[player_idx];
+    /// Encode the tile efficiency of every discard of the current hand.
+    ///
+    /// Returns a (34, 34) array indexed by [discarded tile type, drawn tile type]: the
+    /// number of unseen copies (0-4) of a draw that lowers the shanten left by that
+    /// discard, and 0 otherwise. Rows of tile types not in hand are all zero, and each
+    /// row sums to the ukeire of its discard. Unseen copies exclude the hand, discards,
+    /// called tiles and dora indicators.
+    #[pyo3(name = "encode_ukeire_table", signature = (out=None))]
+    pub fn encode_ukeire_table<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(34, 34), out, |arr| self.ukeire_table_into(arr))
+    }
 
-            // Yaku 0: Tanyao
-            let tanyao = yaku_checker::check_tanyao(melds);
-            arr[[player_idx, 0, 0]] = tanyao.to_f32();
-            arr[[player_idx, 0, 1]] = tanyao.to_f32();
+    /// Monte-Carlo win rate and expected points of each legal discard.
+    ///
+    /// For every distinct legal discard (red fives separately from plain fives), each of
+    /// `samples` rollouts draws `num_draws` tiles from those this player cannot see and
+    /// plays the hand greedily on shanten, winning by tsumo once it completes with a yaku
+    /// (riichi is assumed for closed hands). `num_draws` defaults to this player's share
+    /// of the estimated live wall. Samples are spread over `num_threads` threads (default:
+    /// all cores) with the GIL released; a fixed `seed` gives the same table on any
+    /// thread count.
+    ///
+    /// Returns `{tile: (win_rate, expected_points)}` keyed by 136-format tile; empty when
+    /// the player has no discard to make.
+    #[pyo3(signature = (samples=1000, num_draws=None, seed=0, num_threads=None))]
+    pub fn discard_ev(
+        &self,
+        py: Python<'_>,
+        samples: usize,
+        num_draws: Option<usize>,
+        seed: u64,
+        num_threads: Option<usize>,
+    ) -> HashMap<u8, (f64, f64)> {
+        let discards = discard_ev::distinct_discards(
+            self._legal_actions
+                .iter()
+                .filter(|a| a.action_type == ActionType::Discard)
+                .filter_map(|a| a.tile),
+        );
+        let Some(setup) = self.discard_ev_setup(num_draws) else {
+            return HashMap::new();
+        };
+        let threads = match num_threads {
+            Some(t) => t.max(1),
+            None => std::thread::available_parallelism()
+                .map(|p| p.get())
+                .unwrap_or(1)
+                .min(samples.div_ceil(discard_ev::MIN_SAMPLES_PER_THREAD))
+                .max(1),
+        };
+        let table = py.detach(|| setup.evaluate(&discards, samples, seed, threads));
+        discards
+            .into_iter()
+            .zip(table)
+            .map(|(tile, ev)| (tile, (ev.win_rate, ev.expected_points)))
+            .collect()
+    }
 
-            // Yaku 1-3: Yakuhai (dragons: White=31, Green=32, Red=33)
-            for (yaku_idx, &tile_type) in [31, 32, 33].iter().enumerate() {
-                let yakuhai =
-                    yaku_checker::check_yakuhai(tile_type, melds, discards, &self.dora_indicators);
-                arr[[player_idx, 1 + yaku_idx, 0]] = yakuhai.to_f32();
-                arr[[player_idx, 1 + yaku_idx, 1]] = yakuhai.to_f32();
-            }
+    /// Encode kawa (discard pile) overview for all players
+    /// Returns a (4, 7, 34) array: 4 players × 7 channels × 34 tile types
+    /// Channels: [count1, count2, count3, count4, aka5m, aka5p, aka5s]
+    #[pyo3(name = "encode_kawa_overview", signature = (out=None))]
+    pub fn encode_kawa_overview<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray3<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray3<f32>>> {
+        to_pyarray(py, Ix3(4, 7, 34), out, |arr| self.kawa_overview_into(arr))
+    }
 
-            // Yaku 4: Yakuhai (round wind)
-            let round_wind_type = 27 + self.round_wind as usize;
-            let yakuhai_round = yaku_checker::check_yakuhai(
-                round_wind_type,
-                melds,
-                discards,
-                &self.dora_indicators,
-            );
-            arr[[player_idx, 4, 0]] = yakuhai_round.to_f32();
-            arr[[player_idx, 4, 1]] = yakuhai_round.to_f32();
+    /// Encode fuuro (meld) overview for all players
+    /// Returns a (4, 4, 5, 34) array: 4 players × 4 melds × 5 channels × 34 tile types
+    /// Channels: [tile1, tile2, tile3, tile4, aka]
+    #[pyo3(name = "encode_fuuro_overview", signature = (out=None))]
+    pub fn encode_fuuro_overview<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray4<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray4<f32>>> {
+        to_pyarray(py, Ix4(4, 4, 5, 34), out, |arr| {
+            self.fuuro_overview_into(arr)
+        })
+    }
 
-            // Yaku 5: Yakuhai (seat wind)
-            let seat = (player_idx as u8 + 4 - self.oya) % 4;
-            let seat_wind_type = 27 + seat as usize;
-            let yakuhai_seat =
-                yaku_checker::check_yakuhai(seat_wind_type, melds, discards, &self.dora_indicators);
-            arr[[player_idx, 5, 0]] = yakuhai_seat.to_f32();
-            arr[[player_idx, 5, 1]] = yakuhai_seat.to_f32();
+    /// Encode ankan (concealed kan) overview for all players
+    /// Returns a (4, 34) array: 4 players × 34 tile types
+    #[pyo3(name = "encode_ankan_overview", signature = (out=None))]
+    pub fn encode_ankan_overview<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(4, 34), out, |arr| self.ankan_overview_into(arr))
+    }
 
-            // Yaku 6-7: Honitsu, Chinitsu
-            let (honitsu, chinitsu) = yaku_checker::check_flush(melds);
-            arr[[player_idx, 6, 0]] = honitsu.to_f32();
-            arr[[player_idx, 6, 1]] = honitsu.to_f32();
-            arr[[player_idx, 7, 0]] = chinitsu.to_f32();
-            arr[[player_idx, 7, 1]] = chinitsu.to_f32();
+    /// Encode action availability flags
+    /// Returns a (11,) array: [can_riichi, can_chi_low, can_chi_mid, can_chi_high,
+    ///                          can_pon, can_daiminkan, can_ankan, can_kakan,
+    ///                          can_agari, can_ryukyoku, can_pass]
+    #[pyo3(name = "encode_action_availability", signature = (out=None))]
+    pub fn encode_action_availability<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray1<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray1<f32>>> {
+        to_pyarray(py, Ix1(11), out, |arr| self.action_availability_into(arr))
+    }
 
-            // Yaku 8: Toitoi
-            let toitoi = yaku_checker::check_toitoi(melds);
-            arr[[player_idx, 8, 0]] = toitoi.to_f32();
-            arr[[player_idx, 8, 1]] = toitoi.to_f32();
+    /// Encodes riichi sutehais (tiles discarded when declaring riichi) for opponents
+    /// Returns: (3, 3) array
+    /// - 3 opponents (excluding self)
+    /// - 3 channels per opponent: [tile_type, is_aka, is_dora]
+    #[pyo3(name = "encode_riichi_sutehais", signature = (out=None))]
+    pub fn encode_riichi_sutehais<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(3, 3), out, |arr| self.riichi_sutehais_into(arr))
+    }
 
-            // Yaku 9: Chiitoitsu
-            let chiitoitsu = yaku_checker::check_chiitoitsu(melds);
-            arr[[player_idx, 9, 0]] = chiitoitsu.to_f32();
-            arr[[player_idx, 9, 1]] = chiitoitsu.to_f32();
+    /// Encodes last tedashis (last hand discards, not tsumogiri) for opponents
+    /// Returns: (3, 3) array
+    /// - 3 opponents (excluding self)
+    /// - 3 channels per opponent: [tile_type, is_aka, is_dora]
+    #[pyo3(name = "encode_last_tedashis", signature = (out=None))]
+    pub fn encode_last_tedashis<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray2<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray2<f32>>> {
+        to_pyarray(py, Ix2(3, 3), out, |arr| self.last_tedashis_into(arr))
+    }
 
-            // Yaku 10: Shousangen
-            let shousangen = yaku_checker::check_shousangen(melds, discards, &self.dora_indicators);
-            arr[[player_idx, 10, 0]] = shousangen.to_f32();
-            arr[[player_idx, 10, 1]] = shousangen.to_f32();
-
-            // Yaku 11: Daisangen
-            let daisangen = yaku_checker::check_daisangen(melds, discards, &self.dora_indicators);
-            arr[[player_idx, 11, 0]] = daisangen.to_f32();
-            arr[[player_idx, 11, 1]] = daisangen.to_f32();
-
-            // Yaku 12: Tsuuiisou
-            let tsuuiisou = yaku_checker::check_tsuuiisou(melds);
-            arr[[player_idx, 12, 0]] = tsuuiisou.to_f32();
-            arr[[player_idx, 12, 1]] = tsuuiisou.to_f32();
-
-            // Yaku 13: Chinroutou
-            let chinroutou = yaku_checker::check_chinroutou(melds);
-            arr[[player_idx, 13, 0]] = chinroutou.to_f32();
-            arr[[player_idx, 13, 1]] = chinroutou.to_f32();
-
-            // Yaku 14: Honroutou
-            let honroutou = yaku_checker::check_honroutou(melds);
-            arr[[player_idx, 14, 0]] = honroutou.to_f32();
-            arr[[player_idx, 14, 1]] = honroutou.to_f32();
-
-            // Yaku 15: Kokushi (thirteen orphans)
-            let kokushi = yaku_checker::check_kokushi(melds, discards, &self.dora_indicators);
-            arr[[player_idx, 15, 0]] = kokushi.to_f32();
-            arr[[player_idx, 15, 1]] = kokushi.to_f32();
-
-            // Yaku 16: Chanta (outside hand)
-            let chanta = yaku_checker::check_chanta(melds);
-            arr[[player_idx, 16, 0]] = chanta.to_f32();
-            arr[[player_idx, 16, 1]] = chanta.to_f32();
+    /// Encodes pass context (current offer tile for chi/pon/kan/ron)
+    /// Returns: (3,) array: [tile_type, is_aka, is_dora]
+    #[pyo3(name = "encode_pass_context", signature = (out=None))]
+    pub fn encode_pass_context<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray1<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray1<f32>>> {
+        to_pyarray(py, Ix1(3), out, |arr| self.pass_context_into(arr))
+    }
 
-            // Yaku 17: Junchan (pure outside hand)
-            let junchan = yaku_checker::check_junchan(melds);
-            arr[[player_idx, 17, 0]] = junchan.to_f32();
-            arr[[player_idx, 17, 1]] = junchan.to_f32();
+    /// Encodes discard candidates detail
+    /// Returns: (5,) array
+    /// - Channel 0: number of tiles that can be discarded
+    /// - Channel 1: number of discards that keep current shanten
+    /// - Channel 2: number of discards that increase shanten
+    /// - Channel 3: whether already in tenpai (unconditional tenpai check)
+    /// - Channel 4: whether riichi is declared
+    #[pyo3(name = "encode_discard_candidates", signature = (out=None))]
+    pub fn encode_discard_candidates<'py>(
+        &self,
+        py: Python<'py>,
+        out: Option<Bound<'py, PyArray1<f32>>>,
+    ) -> PyResult<Bound<'py, PyArray1<f32>>> {
+        to_pyarray(py, Ix1(5), out, |arr| self.discard_candidates_into(arr))
+    }
+}
 
-            // Yaku 18: Sanshoku doujun (three colored straight)
-            let sanshoku = yaku_checker::check_sanshoku_doujun(melds);
-            arr[[player_idx, 18, 0]] = sanshoku.to_f32();
-            arr[[player_idx, 18, 1]] = sanshoku.to_f32();
+impl Observation {
+    /// Melds of every seat.
+    pub fn melds(&self) -> &[Vec<Meld>] {
+        self.melds.get_or_init(|| self.table.melds())
+    }
 
-            // Yaku 19: Iipeikou (pure double sequence)
-            let iipeikou = yaku_checker::check_iipeikou(melds);
-            arr[[player_idx, 19, 0]] = iipeikou.to_f32();
-            arr[[player_idx, 19, 1]] = iipeikou.to_f32();
+    /// Discards (136-format) of every seat, in order.
+    pub fn discards(&self) -> &[Vec<u32>] {
+        self.discards.get_or_init(|| self.table.discards())
+    }
 
-            // Yaku 20: Ittsu (straight)
-            let ittsu = yaku_checker::check_ittsu(melds);
-            arr[[player_idx, 20, 0]] = ittsu.to_f32();
-            arr[[player_idx, 20, 1]] = ittsu.to_f32();
-        }
+    /// Revealed dora indicators (136-format).
+    pub fn dora_indicators(&self) -> &[u32] {
+        self.dora_indicators
+            .get_or_init(|| self.table.dora_indicators())
+    }
 
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
+    /// Waits and tenpai flag of `player_id`, computed from the visible hand and melds on
+    /// first use and cached afterwards.
+    pub fn wait_info(&self) -> &(Vec<u8>, bool) {
+        self.wait_info.get_or_init(|| {
+            let pid = self.player_id as usize;
+            let (Some(hand), Some(melds)) = (self.hands.get(pid), self.melds().get(pid)) else {
+                return (Vec::new(), false);
+            };
+            let calc = crate::agari_calculator::AgariCalculator::new(
+                hand.iter().map(|&t| t as u8).collect(),
+                melds.clone(),
+            );
+            let waits = calc.get_waits_u8();
+            let is_tenpai = !waits.is_empty();
+            (waits, is_tenpai)
+        })
     }
 
-    pub fn encode<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
+    /// Write the `(74, 34)` feature planes of `encode()` into `arr`.
+    ///
+    /// `arr` is cleared first, so it can be a reused slot of a larger batch buffer.
+    pub fn encode_into(&self, mut arr: ArrayViewMut2<f32>) {
         // Total Channels (Expanded with Mortal features):
         // 0-3: Hand (1,2,3,4)
         // 4: Red (Hand)
@@ -668,8 +900,7 @@ impl Observation {
         // 70-73: Tsumogiri flags (All players, last discard)
         // Total: 74 channels
 
-        let num_channels = 74;
-        let mut arr = Array2::<f32>::zeros((num_channels, 34));
+        arr.fill(0.0);
 
         // 1. Hand (0-3), 2. Red (4)
         if (self.player_id as usize) < self.hands.len() {
@@ -701,8 +932,8 @@ impl Observation {
         }
 
         // 3. Melds (Self) (5-8)
-        if (self.player_id as usize) < self.melds.len() {
-            for (m_idx, meld) in self.melds[self.player_id as usize].iter().enumerate() {
+        if (self.player_id as usize) < self.melds().len() {
+            for (m_idx, meld) in self.melds()[self.player_id as usize].iter().enumerate() {
                 if m_idx >= 4 {
                     break;
                 }
@@ -716,7 +947,7 @@ impl Observation {
         }
 
         // 4. Dora Indicators (9)
-        for &t in &self.dora_indicators {
+        for &t in self.dora_indicators() {
             let idx = (t as usize) / 4;
             if idx < 34 {
                 arr[[9, idx]] = 1.0;
@@ -724,8 +955,8 @@ impl Observation {
         }
 
         // 5. Discards (Self) (10-13)
-        if (self.player_id as usize) < self.discards.len() {
-            let discs = &self.discards[self.player_id as usize];
+        if (self.player_id as usize) < self.discards().len() {
+            let discs = &self.discards()[self.player_id as usize];
             for (i, &t) in discs.iter().rev().take(4).enumerate() {
                 let idx = (t as usize) / 4;
                 if idx < 34 {
@@ -737,8 +968,8 @@ impl Observation {
         // 6. Discards (Opponents) (14-25)
         for i in 1..4 {
             let opp_id = (self.player_id + i) % 4;
-            if (opp_id as usize) < self.discards.len() {
-                let discs = &self.discards[opp_id as usize];
+            if (opp_id as usize) < self.discards().len() {
+                let discs = &self.discards()[opp_id as usize];
                 for (j, &t) in discs.iter().rev().take(4).enumerate() {
                     let idx = (t as usize) / 4;
                     if idx < 34 {
@@ -750,7 +981,7 @@ impl Observation {
         }
 
         // 7. Discard Counts (All players, normalized) (26-29)
-        for (player_idx, discs) in self.discards.iter().enumerate() {
+        for (player_idx, discs) in self.discards().iter().enumerate() {
             let count_norm = (discs.len() as f32) / 24.0; // Max ~24 discards
             for k in 0..34 {
                 arr[[26 + player_idx, k]] = count_norm;
@@ -760,10 +991,10 @@ impl Observation {
         // 8. Tiles Left in Wall (30)
         // Estimate tiles left: 136 total - discards - melds - hands visible
         let mut tiles_used = 0;
-        for discs in &self.discards {
+        for discs in self.discards() {
             tiles_used += discs.len();
         }
-        for melds_list in &self.melds {
+        for melds_list in self.melds() {
             for meld in melds_list {
                 tiles_used += meld.tiles.len();
             }
@@ -772,7 +1003,7 @@ impl Observation {
         if (self.player_id as usize) < self.hands.len() {
             tiles_used += self.hands[self.player_id as usize].len();
         }
-        tiles_used += self.dora_indicators.len();
+        tiles_used += self.dora_indicators().len();
         let tiles_left = (136_i32 - tiles_used as i32).max(0) as f32;
         let tiles_left_norm = tiles_left / 70.0; // Max ~70 tiles left in wall
         for k in 0..34 {
@@ -837,14 +1068,15 @@ impl Observation {
         }
 
         // 14. Waits (47)
-        for &t in &self.waits {
+        let (waits, is_tenpai) = self.wait_info();
+        for &t in waits {
             if (t as usize) < 34 {
                 arr[[47, t as usize]] = 1.0;
             }
         }
 
         // 15. Is Tenpai (48)
-        let tenpai_val = if self.is_tenpai { 1.0 } else { 0.0 };
+        let tenpai_val = if *is_tenpai { 1.0 } else { 0.0 };
         for i in 0..34 {
             arr[[48, i]] = tenpai_val;
         }
@@ -891,11 +1123,11 @@ impl Observation {
         // Count dora in each player's visible tiles (melds + discards)
         for (player_idx, dora_count) in dora_counts.iter_mut().enumerate() {
             // Melds
-            if player_idx < self.melds.len() {
-                for meld in &self.melds[player_idx] {
+            if player_idx < self.melds().len() {
+                for meld in &self.melds()[player_idx] {
                     for &tile in &meld.tiles {
                         // Check if tile is dora
-                        for &dora_ind in &self.dora_indicators {
+                        for &dora_ind in self.dora_indicators() {
                             let dora_tile = get_next_tile(dora_ind);
                             if (tile / 4) == (dora_tile / 4) {
                                 *dora_count += 1;
@@ -905,10 +1137,10 @@ impl Observation {
                 }
             }
             // Discards
-            if player_idx < self.discards.len() {
-                for &tile in &self.discards[player_idx] {
+            if player_idx < self.discards().len() {
+                for &tile in &self.discards()[player_idx] {
                     // tile is u32 from Vec<u32>
-                    for &dora_ind in &self.dora_indicators {
+                    for &dora_ind in self.dora_indicators() {
                         let dora_tile = get_next_tile(dora_ind);
                         if ((tile / 4) as u8) == (dora_tile / 4) {
                             *dora_count += 1;
@@ -921,7 +1153,7 @@ impl Observation {
         if (self.player_id as usize) < self.hands.len() {
             for &tile in &self.hands[self.player_id as usize] {
                 // tile is u32 from Vec<u32>
-                for &dora_ind in &self.dora_indicators {
+                for &dora_ind in self.dora_indicators() {
                     let dora_tile = get_next_tile(dora_ind);
                     if ((tile / 4) as u8) == (dora_tile / 4) {
                         dora_counts[self.player_id as usize] += 1;
@@ -937,7 +1169,7 @@ impl Observation {
         }
 
         // 20. Melds Count (59-62) - per player, normalized
-        for (player_idx, melds_list) in self.melds.iter().enumerate() {
+        for (player_idx, melds_list) in self.melds().iter().enumerate() {
             let meld_count_norm = (melds_list.len() as f32) / 4.0; // Max 4 melds
             for k in 0..34 {
                 arr[[59 + player_idx, k]] = meld_count_norm;
@@ -953,7 +1185,7 @@ impl Observation {
             }
         }
         // Melds (All)
-        for mlist in &self.melds {
+        for mlist in self.melds() {
             for m in mlist {
                 for &t in &m.tiles {
                     seen[(t as usize) / 4] += 1;
@@ -961,13 +1193,13 @@ impl Observation {
             }
         }
         // Discards (All)
-        for dlist in &self.discards {
+        for dlist in self.discards() {
             for &t in dlist {
                 seen[(t as usize) / 4] += 1;
             }
         }
         // Dora Indicators
-        for &t in &self.dora_indicators {
+        for &t in self.dora_indicators() {
             seen[(t as usize) / 4] += 1;
         }
 
@@ -979,8 +1211,8 @@ impl Observation {
 
         // 22-24. Extended Discard History (64-69)
         // Self: Last 18 discards (64-67, 4 channels)
-        if (self.player_id as usize) < self.discards.len() {
-            let discs = &self.discards[self.player_id as usize];
+        if (self.player_id as usize) < self.discards().len() {
+            let discs = &self.discards()[self.player_id as usize];
             for (i, &t) in discs.iter().rev().skip(4).take(4).enumerate() {
                 let idx = (t as usize) / 4;
                 if idx < 34 {
@@ -991,9 +1223,9 @@ impl Observation {
 
         // Opponents: Last 4-7 discards (68-69, 2 channels)
         // Simplified: only track 2 more channels for first opponent
-        if self.discards.len() > ((self.player_id + 1) % 4) as usize {
+        if self.discards().len() > ((self.player_id + 1) % 4) as usize {
             let opp_id = (self.player_id + 1) % 4;
-            let discs = &self.discards[opp_id as usize];
+            let discs = &self.discards()[opp_id as usize];
             for (i, &t) in discs.iter().rev().skip(4).take(2).enumerate() {
                 let idx = (t as usize) / 4;
                 if idx < 34 {
@@ -1015,245 +1247,182 @@ impl Observation {
                 }
             }
         }
-
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
     }
 
-    /// Encode shanten number and tile efficiency features.
-    ///
-    /// Returns a (4, 4) array where:
-    /// - Dimension 0 (4): Player index (0=self, 1-3=opponents)
-    /// - Dimension 1 (4): [shanten, effective_tiles, best_ukeire, normalized_turn]
-    ///
-    /// Features:
-    /// - shanten: Normalized shanten number (/ 8.0, where 8 is max typical shanten)
-    /// - effective_tiles: Number of tile types that reduce shanten (/ 34.0)
-    /// - best_ukeire: Best ukeire count after optimal discard (/ 80.0)
-    /// - normalized_turn: Current turn / max_turns (approx / 18.0)
-    #[pyo3(name = "encode_shanten_efficiency")]
-    pub fn encode_shanten_efficiency<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array2::<f32>::zeros((4, 4));
-
-        // Collect all visible tiles for ukire calculation
-        let mut all_visible: Vec<u32> = Vec::new();
-        for discs in &self.discards {
-            all_visible.extend(discs.iter().copied());
-        }
-        for melds_list in &self.melds {
-            for meld in melds_list {
-                all_visible.extend(meld.tiles.iter().map(|&x| x as u32));
-            }
-        }
-        all_visible.extend(self.dora_indicators.iter().copied());
+    /// Write the `(4, 21)` array of `encode_furiten_ron_possibility()` into `arr`.
+    pub(crate) fn furiten_ron_possibility_into(&self, mut arr: ArrayViewMut2<f32>) {
+        const NUM_YAKU: usize = 21;
+        arr.fill(1.0);
 
-        // Calculate features for each player
+        // For each player, check if they've been doing tsumogiri consecutively
         for player_idx in 0..4 {
-            if player_idx >= self.hands.len() {
+            if player_idx >= self.tsumogiri_flags.len() {
                 continue;
             }
 
-            let hand = &self.hands[player_idx];
-
-            // For self, we have full information
-            // For opponents, we can only estimate based on visible info
-            if player_idx == self.player_id as usize {
-                // Self: full calculation
-                let shanten = crate::shanten::calculate_shanten(hand);
-                let effective = crate::shanten::calculate_effective_tiles(hand);
-                let best_ukeire = crate::shanten::calculate_best_ukeire(hand, &all_visible);
-
-                // Normalize features
-                arr[[player_idx, 0]] = (shanten as f32).max(0.0) / 8.0;
-                arr[[player_idx, 1]] = (effective as f32) / 34.0;
-                arr[[player_idx, 2]] = (best_ukeire as f32) / 80.0;
-            } else {
-                // Opponents: estimate or use conservative values
-                // We don't know their hand, so set to unknown (0.5)
-                arr[[player_idx, 0]] = 0.5; // Unknown shanten
-                arr[[player_idx, 1]] = 0.5; // Unknown effective tiles
-                arr[[player_idx, 2]] = 0.5; // Unknown ukeire
-            }
-
-            // Turn count (same for all players)
-            let turn_count = if player_idx < self.discards.len() {
-                self.discards[player_idx].len() as f32
-            } else {
-                0.0
-            };
-            arr[[player_idx, 3]] = turn_count / 18.0; // Normalize by typical max turns
-        }
-
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
-    }
-
-    /// Encode kawa (discard pile) overview for all players
-    /// Returns a (4, 7, 34) array: 4 players × 7 channels × 34 tile types
-    /// Channels: [count1, count2, count3, count4, aka5m, aka5p, aka5s]
-    #[pyo3(name = "encode_kawa_overview")]
-    pub fn encode_kawa_overview<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array3::<f32>::zeros((4, 7, 34));
-
-        for (player_idx, discards) in self.discards.iter().enumerate() {
-            if player_idx >= 4 {
-                break;
+            let flags = &self.tsumogiri_flags[player_idx];
+            if flags.is_empty() {
+                continue;
             }
 
-            // Count each tile type (up to 4 copies)
-            let mut tile_counts = [0u8; 34];
-            let mut aka_flags = [false; 3]; // aka 5m/5p/5s
-
-            for &tile in discards {
-                let tile_type = (tile / 4) as usize;
-                if tile_type < 34 {
-                    let count_idx = tile_counts[tile_type].min(3) as usize;
-                    arr[[player_idx, count_idx, tile_type]] = 1.0;
-                    tile_counts[tile_type] = tile_counts[tile_type].saturating_add(1);
-                }
-
-                // Check for aka tiles (20, 24, 28 are aka 5m/5p/5s in 136-tile encoding)
-                match tile {
-                    20 => aka_flags[0] = true, // aka 5m
-                    24 => aka_flags[1] = true, // aka 5p
-                    28 => aka_flags[2] = true, // aka 5s
-                    _ => {}
+            // Count consecutive tsumogiri from the end
+            let mut consecutive_tsumogiri = 0;
+            for &flag in flags.iter().rev() {
+                if flag {
+                    consecutive_tsumogiri += 1;
+                } else {
+                    break;
                 }
             }
 
-            // Set aka flags
-            for (i, &has_aka) in aka_flags.iter().enumerate() {
-                if has_aka {
-                    arr[[player_idx, 4 + i, 5 + i * 9]] = 1.0; // 5m=5, 5p=14, 5s=23
+            // If 3+ consecutive tsumogiri, assume hand hasn't changed
+            // This means ron on their own discards is likely furiten
+            if consecutive_tsumogiri >= 3 {
+                // Mark all yaku as having reduced ron possibility
+                for yaku_idx in 0..NUM_YAKU {
+                    arr[[player_idx, yaku_idx]] = 0.0;
                 }
             }
         }
-
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
     }
 
-    /// Encode fuuro (meld) overview for all players
-    /// Returns a (4, 4, 5, 34) array: 4 players × 4 melds × 5 channels × 34 tile types
-    /// Channels: [tile1, tile2, tile3, tile4, aka]
-    #[pyo3(name = "encode_fuuro_overview")]
-    pub fn encode_fuuro_overview<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array4::<f32>::zeros((4, 4, 5, 34));
+    /// Write the `(4, 21, 2)` array of `encode_yaku_possibility()` into `arr`.
+    pub(crate) fn yaku_possibility_into(&self, mut arr: ArrayViewMut3<f32>) {
+        arr.fill(1.0);
 
-        for (player_idx, melds) in self.melds.iter().enumerate() {
-            if player_idx >= 4 {
-                break;
+        // Combine all visible tiles for each player
+        let mut all_discards: Vec<Vec<u32>> = Vec::with_capacity(4);
+        for player_idx in 0..4 {
+            if player_idx < self.discards().len() {
+                all_discards.push(self.discards()[player_idx].clone());
+            } else {
+                all_discards.push(Vec::new());
             }
+        }
 
-            for (meld_idx, meld) in melds.iter().enumerate() {
-                if meld_idx >= 4 {
-                    break;
-                }
+        // Encode for each player
+        for player_idx in 0..4 {
+            if player_idx >= self.melds().len() {
+                continue;
+            }
 
-                // Encode each tile in the meld
-                for (tile_slot_idx, &tile) in meld.tiles.iter().enumerate() {
-                    if tile_slot_idx >= 4 {
-                        break;
-                    }
+            let melds = &self.melds()[player_idx];
+            let discards = &all_discards[player_idx];
 
-                    let tile_type = (tile / 4) as usize;
-                    if tile_type < 34 {
-                        arr[[player_idx, meld_idx, tile_slot_idx, tile_type]] = 1.0;
-                    }
+            // Yaku 0: Tanyao
+            let tanyao = yaku_checker::check_tanyao(melds);
+            arr[[player_idx, 0, 0]] = tanyao.to_f32();
+            arr[[player_idx, 0, 1]] = tanyao.to_f32();
 
-                    // Check for aka
-                    let is_aka = matches!(tile, 20 | 24 | 28);
-                    if is_aka {
-                        arr[[player_idx, meld_idx, 4, tile_type]] = 1.0;
-                    }
-                }
+            // Yaku 1-3: Yakuhai (dragons: White=31, Green=32, Red=33)
+            for (yaku_idx, &tile_type) in [31, 32, 33].iter().enumerate() {
+                let yakuhai =
+                    yaku_checker::check_yakuhai(tile_type, melds, discards, self.dora_indicators());
+                arr[[player_idx, 1 + yaku_idx, 0]] = yakuhai.to_f32();
+                arr[[player_idx, 1 + yaku_idx, 1]] = yakuhai.to_f32();
             }
-        }
 
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
-    }
+            // Yaku 4: Yakuhai (round wind)
+            let round_wind_type = 27 + self.round_wind as usize;
+            let yakuhai_round = yaku_checker::check_yakuhai(
+                round_wind_type,
+                melds,
+                discards,
+                self.dora_indicators(),
+            );
+            arr[[player_idx, 4, 0]] = yakuhai_round.to_f32();
+            arr[[player_idx, 4, 1]] = yakuhai_round.to_f32();
 
-    /// Encode ankan (concealed kan) overview for all players
-    /// Returns a (4, 34) array: 4 players × 34 tile types
-    #[pyo3(name = "encode_ankan_overview")]
-    pub fn encode_ankan_overview<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array2::<f32>::zeros((4, 34));
+            // Yaku 5: Yakuhai (seat wind)
+            let seat = (player_idx as u8 + 4 - self.oya) % 4;
+            let seat_wind_type = 27 + seat as usize;
+            let yakuhai_seat = yaku_checker::check_yakuhai(
+                seat_wind_type,
+                melds,
+                discards,
+                self.dora_indicators(),
+            );
+            arr[[player_idx, 5, 0]] = yakuhai_seat.to_f32();
+            arr[[player_idx, 5, 1]] = yakuhai_seat.to_f32();
 
-        for (player_idx, melds) in self.melds.iter().enumerate() {
-            if player_idx >= 4 {
-                break;
-            }
+            // Yaku 6-7: Honitsu, Chinitsu
+            let (honitsu, chinitsu) = yaku_checker::check_flush(melds);
+            arr[[player_idx, 6, 0]] = honitsu.to_f32();
+            arr[[player_idx, 6, 1]] = honitsu.to_f32();
+            arr[[player_idx, 7, 0]] = chinitsu.to_f32();
+            arr[[player_idx, 7, 1]] = chinitsu.to_f32();
 
-            for meld in melds {
-                // Check if this is an ankan (concealed kan)
-                if matches!(meld.meld_type, MeldType::Angang) {
-                    // Use the first tile to determine type
-                    if let Some(&tile) = meld.tiles.first() {
-                        let tile_type = (tile / 4) as usize;
-                        if tile_type < 34 {
-                            arr[[player_idx, tile_type]] = 1.0;
-                        }
-                    }
-                }
-            }
-        }
+            // Yaku 8: Toitoi
+            let toitoi = yaku_checker::check_toitoi(melds);
+            arr[[player_idx, 8, 0]] = toitoi.to_f32();
+            arr[[player_idx, 8, 1]] = toitoi.to_f32();
+
+            // Yaku 9: Chiitoitsu
+            let chiitoitsu = yaku_checker::check_chiitoitsu(melds);
+            arr[[player_idx, 9, 0]] = chiitoitsu.to_f32();
+            arr[[player_idx, 9, 1]] = chiitoitsu.to_f32();
+
+            // Yaku 10: Shousangen
+            let shousangen =
+                yaku_checker::check_shousangen(melds, discards, self.dora_indicators());
+            arr[[player_idx, 10, 0]] = shousangen.to_f32();
+            arr[[player_idx, 10, 1]] = shousangen.to_f32();
+
+            // Yaku 11: Daisangen
+            let daisangen = yaku_checker::check_daisangen(melds, discards, self.dora_indicators());
+            arr[[player_idx, 11, 0]] = daisangen.to_f32();
+            arr[[player_idx, 11, 1]] = daisangen.to_f32();
+
+            // Yaku 12: Tsuuiisou
+            let tsuuiisou = yaku_checker::check_tsuuiisou(melds);
+            arr[[player_idx, 12, 0]] = tsuuiisou.to_f32();
+            arr[[player_idx, 12, 1]] = tsuuiisou.to_f32();
+
+            // Yaku 13: Chinroutou
+            let chinroutou = yaku_checker::check_chinroutou(melds);
+            arr[[player_idx, 13, 0]] = chinroutou.to_f32();
+            arr[[player_idx, 13, 1]] = chinroutou.to_f32();
+
+            // Yaku 14: Honroutou
+            let honroutou = yaku_checker::check_honroutou(melds);
+            arr[[player_idx, 14, 0]] = honroutou.to_f32();
+            arr[[player_idx, 14, 1]] = honroutou.to_f32();
+
+            // Yaku 15: Kokushi (thirteen orphans)
+            let kokushi = yaku_checker::check_kokushi(melds, discards, self.dora_indicators());
+            arr[[player_idx, 15, 0]] = kokushi.to_f32();
+            arr[[player_idx, 15, 1]] = kokushi.to_f32();
+
+            // Yaku 16: Chanta (outside hand)
+            let chanta = yaku_checker::check_chanta(melds);
+            arr[[player_idx, 16, 0]] = chanta.to_f32();
+            arr[[player_idx, 16, 1]] = chanta.to_f32();
+
+            // Yaku 17: Junchan (pure outside hand)
+            let junchan = yaku_checker::check_junchan(melds);
+            arr[[player_idx, 17, 0]] = junchan.to_f32();
+            arr[[player_idx, 17, 1]] = junchan.to_f32();
+
+            // Yaku 18: Sanshoku doujun (three colored straight)
+            let sanshoku = yaku_checker::check_sanshoku_doujun(melds);
+            arr[[player_idx, 18, 0]] = sanshoku.to_f32();
+            arr[[player_idx, 18, 1]] = sanshoku.to_f32();
+
+            // Yaku 19: Iipeikou (pure double sequence)
+            let iipeikou = yaku_checker::check_iipeikou(melds);
+            arr[[player_idx, 19, 0]] = iipeikou.to_f32();
+            arr[[player_idx, 19, 1]] = iipeikou.to_f32();
 
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
+            // Yaku 20: Ittsu (straight)
+            let ittsu = yaku_checker::check_ittsu(melds);
+            arr[[player_idx, 20, 0]] = ittsu.to_f32();
+            arr[[player_idx, 20, 1]] = ittsu.to_f32();
+        }
     }
 
-    /// Encode action availability flags
-    /// Returns a (11,) array: [can_riichi, can_chi_low, can_chi_mid, can_chi_high,
-    ///                          can_pon, can_daiminkan, can_ankan, can_kakan,
-    ///                          can_agari, can_ryukyoku, can_pass]
-    #[pyo3(name = "encode_action_availability")]
-    pub fn encode_action_availability<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array1::<f32>::zeros(11);
+    /// Write the `(11,)` array of `encode_action_availability()` into `arr`.
+    pub(crate) fn action_availability_into(&self, mut arr: ArrayViewMut1<f32>) {
+        arr.fill(0.0);
 
         for action in &self._legal_actions {
             match action.action_type {
@@ -1288,30 +1457,14 @@ impl Observation {
                 _ => {}
             }
         }
-
-        // Convert to bytes
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
     }
 
-    /// Encodes riichi sutehais (tiles discarded when declaring riichi) for opponents
-    /// Returns: (3, 3) array
-    /// - 3 opponents (excluding self)
-    /// - 3 channels per opponent: [tile_type, is_aka, is_dora]
-    #[pyo3(name = "encode_riichi_sutehais")]
-    pub fn encode_riichi_sutehais<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array2::<f32>::zeros((3, 3));
+    /// Write the `(3, 3)` array of `encode_riichi_sutehais()` into `arr`.
+    pub(crate) fn riichi_sutehais_into(&self, mut arr: ArrayViewMut2<f32>) {
+        arr.fill(0.0);
 
         let dora_tiles: Vec<u8> = self
-            .dora_indicators
+            .dora_indicators()
             .iter()
             .map(|&indicator| get_next_tile(indicator))
             .collect();
@@ -1340,29 +1493,14 @@ impl Observation {
 
             opponent_idx += 1;
         }
-
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
     }
 
-    /// Encodes last tedashis (last hand discards, not tsumogiri) for opponents
-    /// Returns: (3, 3) array
-    /// - 3 opponents (excluding self)
-    /// - 3 channels per opponent: [tile_type, is_aka, is_dora]
-    #[pyo3(name = "encode_last_tedashis")]
-    pub fn encode_last_tedashis<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array2::<f32>::zeros((3, 3));
+    /// Write the `(3, 3)` array of `encode_last_tedashis()` into `arr`.
+    pub(crate) fn last_tedashis_into(&self, mut arr: ArrayViewMut2<f32>) {
+        arr.fill(0.0);
 
         let dora_tiles: Vec<u8> = self
-            .dora_indicators
+            .dora_indicators()
             .iter()
             .map(|&indicator| get_next_tile(indicator))
             .collect();
@@ -1391,24 +1529,11 @@ impl Observation {
 
             opponent_idx += 1;
         }
-
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
     }
 
-    /// Encodes pass context (current offer tile for chi/pon/kan/ron)
-    /// Returns: (3,) array: [tile_type, is_aka, is_dora]
-    #[pyo3(name = "encode_pass_context")]
-    pub fn encode_pass_context<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array1::<f32>::zeros(3);
+    /// Write the `(3,)` array of `encode_pass_context()` into `arr`.
+    pub(crate) fn pass_context_into(&self, mut arr: ArrayViewMut1<f32>) {
+        arr.fill(0.0);
 
         if let Some(tile) = self.last_discard {
             let tile_type = (tile / 4) as usize;
@@ -1422,72 +1547,49 @@ impl Observation {
 
             // Channel 2: is dora
             let dora_tiles: Vec<u8> = self
-                .dora_indicators
+                .dora_indicators()
                 .iter()
                 .map(|&indicator| get_next_tile(indicator))
                 .collect();
             let is_dora = dora_tiles.contains(&(tile as u8));
             arr[2] = if is_dora { 1.0 } else { 0.0 };
         }
-
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
     }
 
-    /// Encodes discard candidates detail
-    /// Returns: (5,) array
-    /// - Channel 0: number of tiles that can be discarded
-    /// - Channel 1: number of discards that keep current shanten
-    /// - Channel 2: number of discards that increase shanten
-    /// - Channel 3: whether already in tenpai (unconditional tenpai check)
-    /// - Channel 4: whether riichi is declared
-    #[pyo3(name = "encode_discard_candidates")]
-    pub fn encode_discard_candidates<'py>(
-        &self,
-        py: Python<'py>,
-    ) -> PyResult<Bound<'py, pyo3::types::PyBytes>> {
-        let mut arr = Array1::<f32>::zeros(5);
+    /// Write the `(5,)` array of `encode_discard_candidates()` into `arr`.
+    pub(crate) fn discard_candidates_into(&self, mut arr: ArrayViewMut1<f32>) {
+        arr.fill(0.0);
 
         let player_idx = self.player_id as usize;
         if player_idx >= self.hands.len() {
-            let slice = arr.as_slice().ok_or_else(|| {
-                PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-            })?;
-            let byte_len = std::mem::size_of_val(slice);
-            let byte_slice =
-                unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-            return Ok(pyo3::types::PyBytes::new(py, byte_slice));
+            return;
         }
 
         let hand = &self.hands[player_idx];
-        let current_shanten = shanten::calculate_shanten(hand);
+        let num_melds = self.melds().get(player_idx).map_or(0, |m| m.len());
+        let mut counts = shanten::tile_counts(hand);
+        let current_shanten = shanten::shanten(&counts, num_melds);
 
         // Channel 0: number of tiles that can be discarded (normalized by 34)
         arr[0] = hand.len() as f32 / 34.0;
 
-        // Analyze each possible discard
+        // Analyze each possible discard, once per tile kind
         let mut keep_shanten_count = 0;
         let mut increase_shanten_count = 0;
 
-        for (idx, _tile) in hand.iter().enumerate() {
-            let new_hand: Vec<u32> = hand
-                .iter()
-                .enumerate()
-                .filter(|(i, _)| *i != idx)
-                .map(|(_, &t)| t)
-                .collect();
-
-            let new_shanten = shanten::calculate_shanten(&new_hand);
+        for t in 0..34 {
+            let copies = counts[t] as usize;
+            if copies == 0 {
+                continue;
+            }
+            counts[t] -= 1;
+            let new_shanten = shanten::shanten(&counts, num_melds);
+            counts[t] += 1;
 
             if new_shanten == current_shanten {
-                keep_shanten_count += 1;
+                keep_shanten_count += copies;
             } else if new_shanten > current_shanten {
-                increase_shanten_count += 1;
+                increase_shanten_count += copies;
             }
         }
 
@@ -1510,13 +1612,503 @@ impl Observation {
         } else {
             0.0
         };
+    }
+
+    /// Write the 82-wide legal action mask of `mask()` into `out`.
+    pub fn mask_into(&self, out: &mut [u8]) {
+        out.fill(0);
+        for action in &self._legal_actions {
+            if let Ok(idx) = action.encode() {
+                if (idx as usize) < out.len() {
+                    out[idx as usize] = 1;
+                }
+            }
+        }
+    }
+
+    /// Write the `(4, 34)` array of `encode_discard_history_decay()` into `arr`.
+    pub(crate) fn discard_history_decay_into(&self, decay_rate: f32, mut arr: ArrayViewMut2<f32>) {
+        arr.fill(0.0);
+
+        // Encode discard history for all 4 players
+        for player_idx in 0..4 {
+            if player_idx >= self.discards().len() {
+                continue;
+            }
+
+            let discs = &self.discards()[player_idx];
+            let max_len = discs.len();
+
+            if max_len == 0 {
+                continue;
+            }
+
+            // Iterate through all discards, applying exponential decay
+            for (turn, &tile) in discs.iter().enumerate() {
+                let tile_idx = (tile as usize) / 4;
+                if tile_idx < 34 {
+                    // Age = how many turns ago this discard happened
+                    // Most recent discard has age 0
+                    let age = (max_len - 1 - turn) as f32;
+                    let weight = (-decay_rate * age).exp();
+
+                    // Add weighted value (accumulates if same tile discarded multiple times)
+                    arr[[player_idx, tile_idx]] += weight;
+                }
+            }
+        }
+    }
+
+    /// 136-format tiles visible to all players: discards, called tiles and dora
+    /// indicators. A called discard appears in both a river and a meld but is marked once.
+    fn visible_tiles(&self) -> [bool; 136] {
+        let mut visible = [false; 136];
+        let discarded = self.discards().iter().flatten().copied();
+        let called = self
+            .melds()
+            .iter()
+            .flatten()
+            .flat_map(|meld| meld.tiles.iter().map(|&x| x as u32));
+        for tile in discarded
+            .chain(called)
+            .chain(self.dora_indicators().iter().copied())
+        {
+            if let Some(seen) = visible.get_mut(tile as usize) {
+                *seen = true;
+            }
+        }
+        visible
+    }
+
+    /// 34-type counts of `visible_tiles`.
+    fn visible_counts(&self) -> [u8; 34] {
+        let mut visible = [0u8; 34];
+        for (tile, _) in self.visible_tiles().iter().enumerate().filter(|(_, &v)| v) {
+            visible[tile / 4] += 1;
+        }
+        visible
+    }
+
+    /// Own draws left, estimated from the 70-tile live wall and the draws made so far.
+    ///
+    /// Every discard follows a draw, except after a chi or pon; an ankan adds a
+    /// replacement draw, and a kakan's replacement draw offsets its pon. A 3n+2-tile hand
+    /// holds a draw that has not been discarded yet.
+    fn estimated_own_draws(&self) -> usize {
+        let mut draws = self.discards().iter().map(Vec::len).sum::<usize>() as i64;
+        for meld in self.melds().iter().flatten() {
+            match meld.meld_type {
+                MeldType::Chi | MeldType::Peng => draws -= 1,
+                MeldType::Angang => draws += 1,
+                MeldType::Gang | MeldType::Addgang => {}
+            }
+        }
+        if self.hand().len() % 3 == 2 {
+            draws += 1;
+        }
+        ((70 - draws).max(0) / 4) as usize
+    }
+
+    /// Hand, pool of unseen tiles and win conditions for `discard_ev`.
+    fn discard_ev_setup(&self, num_draws: Option<usize>) -> Option<discard_ev::EvSetup> {
+        let pid = self.player_id as usize;
+        let hand: Vec<u8> = self.hands.get(pid)?.iter().map(|&t| t as u8).collect();
+        let melds = self.melds().get(pid).cloned().unwrap_or_default();
+
+        let mut unseen = self.visible_tiles().map(|v| !v);
+        for &t in &hand {
+            unseen[t as usize] = false;
+        }
+        let pool = (0..136u8).filter(|&t| unseen[t as usize]).collect();
+
+        let closed = melds.iter().all(|m| !m.opened);
+        let riichi = closed || self.riichi_declared.get(pid).copied().unwrap_or(false);
+        let conditions = Conditions {
+            tsumo: true,
+            riichi,
+            player_wind: Wind::from((self.player_id + 4 - self.oya % 4) % 4),
+            round_wind: Wind::from(self.round_wind),
+            tsumi: self.honba as u32,
+            ..Conditions::default()
+        };
+        Some(discard_ev::EvSetup {
+            hand,
+            melds,
+            dora_indicators: self.dora_indicators().iter().map(|&t| t as u8).collect(),
+            pool,
+            conditions,
+            is_oya: self.player_id == self.oya,
+            num_draws: num_draws.unwrap_or_else(|| self.estimated_own_draws()),
+        })
+    }
+
+    /// Write the `(34, 34)` array of `encode_ukeire_table()` into `arr`.
+    pub(crate) fn ukeire_table_into(&self, mut arr: ArrayViewMut2<f32>) {
+        arr.fill(0.0);
+        let player_idx = self.player_id as usize;
+        let Some(hand) = self.hands.get(player_idx) else {
+            return;
+        };
+        let num_melds = self.melds().get(player_idx).map_or(0, |m| m.len());
+        let counts = shanten::tile_counts(hand);
+        let visible = self.visible_counts();
+
+        let table = shanten::discard_ukeire(&counts, num_melds, &visible);
+        for (discard, entry) in table.iter().enumerate() {
+            let Some(ukeire) = entry else {
+                continue;
+            };
+            for draw in ukeire.tiles.iter() {
+                let draw = draw as usize;
+                arr[[discard, draw]] = shanten::unseen(&counts, &visible, draw) as f32;
+            }
+        }
+    }
+
+    /// Write the `(4, 4)` array of `encode_shanten_efficiency()` into `arr`.
+    pub(crate) fn shanten_efficiency_into(&self, mut arr: ArrayViewMut2<f32>) {
+        arr.fill(0.0);
+
+        let visible = self.visible_counts();
+
+        // Calculate features for each player
+        for player_idx in 0..4 {
+            if player_idx >= self.hands.len() {
+                continue;
+            }
+
+            let hand = &self.hands[player_idx];
+
+            // For self, we have full information
+            // For opponents, we can only estimate based on visible info
+            if player_idx == self.player_id as usize {
+                // Self: full calculation
+                let num_melds = self.melds().get(player_idx).map_or(0, |m| m.len());
+                let counts = crate::shanten::tile_counts(hand);
+                let shanten = crate::shanten::shanten(&counts, num_melds);
+                let effective = crate::shanten::effective_tiles(&counts, num_melds);
+                let best_ukeire = crate::shanten::best_ukeire(&counts, num_melds, &visible);
+
+                // Normalize features
+                arr[[player_idx, 0]] = (shanten as f32).max(0.0) / 8.0;
+                arr[[player_idx, 1]] = (effective as f32) / 34.0;
+                arr[[player_idx, 2]] = (best_ukeire as f32) / 80.0;
+            } else {
+                // Opponents: estimate or use conservative values
+                // We don't know their hand, so set to unknown (0.5)
+                arr[[player_idx, 0]] = 0.5; // Unknown shanten
+                arr[[player_idx, 1]] = 0.5; // Unknown effective tiles
+                arr[[player_idx, 2]] = 0.5; // Unknown ukeire
+            }
+
+            // Turn count (same for all players)
+            let turn_count = if player_idx < self.discards().len() {
+                self.discards()[player_idx].len() as f32
+            } else {
+                0.0
+            };
+            arr[[player_idx, 3]] = turn_count / 18.0; // Normalize by typical max turns
+        }
+    }
+
+    /// Write the `(4, 7, 34)` array of `encode_kawa_overview()` into `arr`.
+    pub(crate) fn kawa_overview_into(&self, mut arr: ArrayViewMut3<f32>) {
+        arr.fill(0.0);
+
+        for (player_idx, discards) in self.discards().iter().enumerate() {
+            if player_idx >= 4 {
+                break;
+            }
+
+            // Count each tile type (up to 4 copies)
+            let mut tile_counts = [0u8; 34];
+            let mut aka_flags = [false; 3]; // aka 5m/5p/5s
+
+            for &tile in discards {
+                let tile_type = (tile / 4) as usize;
+                if tile_type < 34 {
+                    let count_idx = tile_counts[tile_type].min(3) as usize;
+                    arr[[player_idx, count_idx, tile_type]] = 1.0;
+                    tile_counts[tile_type] = tile_counts[tile_type].saturating_add(1);
+                }
 
-        let slice = arr.as_slice().ok_or_else(|| {
-            PyErr::new::<pyo3::exceptions::PyValueError, _>("Array not contiguous")
-        })?;
-        let byte_len = std::mem::size_of_val(slice);
-        let byte_slice =
-            unsafe { std::slice::from_raw_parts(slice.as_ptr() as *const u8, byte_len) };
-        Ok(pyo3::types::PyBytes::new(py, byte_slice))
+                // Check for aka tiles (20, 24, 28 are aka 5m/5p/5s in 136-tile encoding)
+                match tile {
+                    20 => aka_flags[0] = true, // aka 5m
+                    24 => aka_flags[1] = true, // aka 5p
+                    28 => aka_flags[2] = true, // aka 5s
+                    _ => {}
+                }
+            }
+
+            // Set aka flags
+            for (i, &has_aka) in aka_flags.iter().enumerate() {
+                if has_aka {
+                    arr[[player_idx, 4 + i, 5 + i * 9]] = 1.0; // 5m=5, 5p=14, 5s=23
+                }
+            }
+        }
     }
+
+    /// Write the `(4, 4, 5, 34)` array of `encode_fuuro_overview()` into `arr`.
+    pub(crate) fn fuuro_overview_into(&self, mut arr: ArrayViewMut4<f32>) {
+        arr.fill(0.0);
+
+        for (player_idx, melds) in self.melds().iter().enumerate() {
+            if player_idx >= 4 {
+                break;
+            }
+
+            for (meld_idx, meld) in melds.iter().enumerate() {
+                if meld_idx >= 4 {
+                    break;
+                }
+
+                // Encode each tile in the meld
+                for (tile_slot_idx, &tile) in meld.tiles.iter().enumerate() {
+                    if tile_slot_idx >= 4 {
+                        break;
+                    }
+
+                    let tile_type = (tile / 4) as usize;
+                    if tile_type < 34 {
+                        arr[[player_idx, meld_idx, tile_slot_idx, tile_type]] = 1.0;
+                    }
+
+                    // Check for aka
+                    let is_aka = matches!(tile, 20 | 24 | 28);
+                    if is_aka {
+                        arr[[player_idx, meld_idx, 4, tile_type]] = 1.0;
+                    }
+                }
+            }
+        }
+    }
+
+    /// Write the `(4, 34)` array of `encode_ankan_overview()` into `arr`.
+    pub(crate) fn ankan_overview_into(&self, mut arr: ArrayViewMut2<f32>) {
+        arr.fill(0.0);
+
+        for (player_idx, melds) in self.melds().iter().enumerate() {
+            if player_idx >= 4 {
+                break;
+            }
+
+            for meld in melds {
+                // Check if this is an ankan (concealed kan)
+                if matches!(meld.meld_type, MeldType::Angang) {
+                    // Use the first tile to determine type
+                    if let Some(&tile) = meld.tiles.first() {
+                        let tile_type = (tile / 4) as usize;
+                        if tile_type < 34 {
+                            arr[[player_idx, tile_type]] = 1.0;
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+/// Feature groups that `encode_batch` can stack along the channel axis.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub(crate) enum FeatureGroup {
+    /// `encode()`: 74 planes.
+    Base,
+    /// `encode_discard_history_decay()` with the default rate: 4 planes.
+    DiscardHistoryDecay,
+    /// `encode_shanten_efficiency()` broadcast over tiles: 16 planes.
+    ShantenEfficiency,
+    /// `encode_kawa_overview()`: 28 planes.
+    KawaOverview,
+    /// `encode_fuuro_overview()`: 80 planes.
+    FuuroOverview,
+    /// `encode_ankan_overview()`: 4 planes.
+    AnkanOverview,
+}
+
+impl FeatureGroup {
+    pub(crate) fn from_name(name: &str) -> PyResult<Self> {
+        match name {
+            "base" => Ok(Self::Base),
+            "discard_history_decay" => Ok(Self::DiscardHistoryDecay),
+            "shanten_efficiency" => Ok(Self::ShantenEfficiency),
+            "kawa_overview" => Ok(Self::KawaOverview),
+            "fuuro_overview" => Ok(Self::FuuroOverview),
+            "ankan_overview" => Ok(Self::AnkanOverview),
+            _ => Err(pyo3::exceptions::PyValueError::new_err(format!(
+                "Unknown feature group: {}",
+                name
+            ))),
+        }
+    }
+
+    pub(crate) fn channels(self) -> usize {
+        match self {
+            Self::Base => ENCODE_CHANNELS,
+            Self::DiscardHistoryDecay | Self::AnkanOverview => 4,
+            Self::ShantenEfficiency => 16,
+            Self::KawaOverview => 28,
+            Self::FuuroOverview => 80,
+        }
+    }
+
+    /// Write this group of `obs` into `dst`, a `(self.channels(), 34)` view.
+    fn write(self, obs: &Observation, mut dst: ArrayViewMut2<f32>) {
+        match self {
+            Self::Base => obs.encode_into(dst),
+            Self::DiscardHistoryDecay => obs.discard_history_decay_into(0.2, dst),
+            Self::ShantenEfficiency => {
+                let mut values = [0.0f32; 16];
+                obs.shanten_efficiency_into(
+                    ArrayViewMut2::from_shape((4, 4), &mut values).expect("4x4 buffer"),
+                );
+                for (mut row, &v) in dst.rows_mut().into_iter().zip(values.iter()) {
+                    row.fill(v);
+                }
+            }
+            // Both views are contiguous unless `encode_batch` got a strided `out`.
+            Self::KawaOverview => match dst.view_mut().into_shape_with_order((4, 7, 34)) {
+                Ok(view) => obs.kawa_overview_into(view),
+                Err(_) => {
+                    let mut arr = Array3::<f32>::zeros((4, 7, 34));
+                    obs.kawa_overview_into(arr.view_mut());
+                    dst.iter_mut().zip(arr.iter()).for_each(|(d, &v)| *d = v);
+                }
+            },
+            Self::FuuroOverview => match dst.view_mut().into_shape_with_order((4, 4, 5, 34)) {
+                Ok(view) => obs.fuuro_overview_into(view),
+                Err(_) => {
+                    let mut arr = Array4::<f32>::zeros((4, 4, 5, 34));
+                    obs.fuuro_overview_into(arr.view_mut());
+                    dst.iter_mut().zip(arr.iter()).for_each(|(d, &v)| *d = v);
+                }
+            },
+            Self::AnkanOverview => obs.ankan_overview_into(dst),
+        }
+    }
+}
+
+/// Smallest number of observations worth handing to a worker thread in `encode_batch`.
+const ENCODE_BATCH_MIN_PER_THREAD: usize = 32;
+
+/// Encode one observation into a `(C, 34)` feature view and an `(82,)` mask view.
+pub(crate) fn encode_one(
+    obs: &Observation,
+    groups: &[FeatureGroup],
+    mut features: ArrayViewMut2<f32>,
+    mut mask: ArrayViewMut1<u8>,
+) {
+    let mut start = 0;
+    for &group in groups {
+        let end = start + group.channels();
+        group.write(obs, features.slice_mut(s![start..end, ..]));
+        start = end;
+    }
+
+    let mut buf = [0u8; ACTION_SPACE];
+    obs.mask_into(&mut buf);
+    mask.assign(&ArrayView1::from(&buf[..]));
+}
+
+/// Encode many observations at once.
+///
+/// Returns `(features, masks)` where `features` is an `(N, C, 34)` float32 array holding
+/// the requested `channels` groups stacked in order, and `masks` is the `(N, 82)` uint8
+/// legal action mask. Available groups: `"base"` (74, `encode()`),
+/// `"discard_history_decay"` (4), `"shanten_efficiency"` (16, broadcast over tiles),
+/// `"kawa_overview"` (28), `"fuuro_overview"` (80) and `"ankan_overview"` (4).
+/// `channels` defaults to `["base"]`.
+///
+/// `out` / `mask_out` may be preallocated arrays of the right shape that are filled in
+/// place. The work is split across `num_threads` threads (default: all cores) with the
+/// GIL released.
+#[pyfunction]
+#[pyo3(signature = (observations, channels=None, out=None, mask_out=None, num_threads=None))]
+pub fn encode_batch<'py>(
+    py: Python<'py>,
+    observations: Vec<PyRef<'py, Observation>>,
+    channels: Option<Vec<String>>,
+    out: Option<Bound<'py, PyArray3<f32>>>,
+    mask_out: Option<Bound<'py, PyArray2<u8>>>,
+    num_threads: Option<usize>,
+) -> PyResult<(Bound<'py, PyArray3<f32>>, Bound<'py, PyArray2<u8>>)> {
+    let groups = match channels {
+        Some(names) => names
+            .iter()
+            .map(|name| FeatureGroup::from_name(name))
+            .collect::<PyResult<Vec<_>>>()?,
+        None => vec![FeatureGroup::Base],
+    };
+    let n = observations.len();
+    let c = groups.iter().map(|g| g.channels()).sum::<usize>();
+
+    let features = match out {
+        Some(out) => out,
+        None => Array3::<f32>::zeros((n, c, 34)).into_pyarray(py),
+    };
+    let masks = match mask_out {
+        Some(mask_out) => mask_out,
+        None => Array2::<u8>::zeros((n, ACTION_SPACE)).into_pyarray(py),
+    };
+
+    {
+        let mut features_rw = features
+            .try_readwrite()
+            .map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+        let mut masks_rw = masks
+            .try_readwrite()
+            .map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+        let mut features_view = features_rw.as_array_mut();
+        let mut masks_view = masks_rw.as_array_mut();
+        check_out_shape(features_view.shape(), &[n, c, 34])?;
+        check_out_shape(masks_view.shape(), &[n, ACTION_SPACE])?;
+
+        let obs_refs: Vec<&Observation> = observations.iter().map(|o| &**o).collect();
+        let threads = match num_threads {
+            Some(t) => t.clamp(1, n.max(1)),
+            None => std::thread::available_parallelism()
+                .map(|p| p.get())
+                .unwrap_or(1)
+                .min(n.div_ceil(ENCODE_BATCH_MIN_PER_THREAD))
+                .max(1),
+        };
+
+        py.detach(|| {
+            if threads == 1 {
+                for (i, obs) in obs_refs.iter().enumerate() {
+                    encode_one(
+                        obs,
+                        &groups,
+                        features_view.index_axis_mut(Axis(0), i),
+                        masks_view.row_mut(i),
+                    );
+                }
+                return;
+            }
+
+            let chunk = n.div_ceil(threads);
+            std::thread::scope(|scope| {
+                for ((obs_chunk, mut feat_chunk), mut mask_chunk) in obs_refs
+                    .chunks(chunk)
+                    .zip(features_view.axis_chunks_iter_mut(Axis(0), chunk))
+                    .zip(masks_view.axis_chunks_iter_mut(Axis(0), chunk))
+                {
+                    let groups = &groups;
+                    scope.spawn(move || {
+                        for (i, obs) in obs_chunk.iter().enumerate() {
+                            encode_one(
+                                obs,
+                                groups,
+                                feat_chunk.index_axis_mut(Axis(0), i),
+                                mask_chunk.row_mut(i),
+                            );
+                        }
+                    });
+                }
+            });
+        });
+    }
+
+    Ok((features, masks))
 }
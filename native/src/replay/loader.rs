@@ -0,0 +1,201 @@
+//! Multi-threaded loading of replay corpora.
+//!
+//! Files are decompressed and parsed on worker threads that never hold the GIL. File
+//! `i` of the list goes to worker `i % n`. Every worker streams the kyokus of its files
+//! over its own bounded channel, closing each file with an end-of-file marker, so kyokus
+//! come out in list order while at most `prefetch` parsed kyokus per worker wait in
+//! memory. MJAI logs are read line by line; an MJSoul log is a single JSON document and
+//! is parsed whole before its kyokus are sent.
+
+use std::sync::mpsc::{sync_channel, Receiver, SyncSender};
+use std::sync::{Arc, Mutex};
+
+use pyo3::exceptions::{PyRuntimeError, PyValueError};
+use pyo3::prelude::*;
+use rand::rngs::StdRng;
+use rand::seq::SliceRandom;
+use rand::SeedableRng;
+
+use super::mjai_replay::JsonlKyokus;
+use super::{LogKyoku, MjSoulReplay};
+
+#[derive(Debug, Clone, Copy)]
+enum ReplayFormat {
+    /// MJAI JSONL, plain or gzipped.
+    Mjai,
+    /// Gzipped MJSoul game log, as read by `MjSoulReplay.from_json`.
+    MjSoul,
+}
+
+/// What a worker sends for each of its files: the kyokus in order, then `EndOfFile`.
+/// A file that fails sends `Error` instead and stops the worker.
+enum Message {
+    Kyoku(LogKyoku),
+    EndOfFile,
+    Error(PyErr),
+}
+
+fn open_file(
+    path: &str,
+    format: ReplayFormat,
+) -> PyResult<Box<dyn Iterator<Item = PyResult<LogKyoku>>>> {
+    Ok(match format {
+        ReplayFormat::Mjai => Box::new(JsonlKyokus::open(path)?),
+        ReplayFormat::MjSoul => Box::new(MjSoulReplay::load_json(path)?.rounds.into_iter().map(Ok)),
+    })
+}
+
+/// Stream the kyokus of `path` into `tx`. Returns `false` once the worker should stop,
+/// either because the file failed or because the loader was dropped.
+fn send_file(tx: &SyncSender<Message>, path: &str, format: ReplayFormat) -> bool {
+    let kyokus = match open_file(path, format) {
+        Ok(kyokus) => kyokus,
+        Err(e) => {
+            let _ = tx.send(Message::Error(e));
+            return false;
+        }
+    };
+    for kyoku in kyokus {
+        match kyoku {
+            Ok(kyoku) => {
+                if tx.send(Message::Kyoku(kyoku)).is_err() {
+                    return false;
+                }
+            }
+            Err(e) => {
+                let _ = tx.send(Message::Error(e));
+                return false;
+            }
+        }
+    }
+    tx.send(Message::EndOfFile).is_ok()
+}
+
+/// Iterator over the kyokus of many replay files, parsed on a pool of threads.
+///
+/// `paths` is a glob pattern (matches are sorted) or a list of paths. With a `seed`, the
+/// files are shuffled by it; the output order only depends on the file order, never on
+/// thread timing. `prefetch` is the number of parsed kyokus each worker may hold ahead
+/// of the consumer.
+#[pyclass]
+pub struct ReplayLoader {
+    #[pyo3(get)]
+    num_files: usize,
+    inner: Mutex<LoaderState>,
+}
+
+struct LoaderState {
+    receivers: Vec<Receiver<Message>>,
+    next_file: usize,
+    num_files: usize,
+    failed: bool,
+}
+
+#[pymethods]
+impl ReplayLoader {
+    #[new]
+    #[pyo3(signature = (paths, log_format="mjai", num_threads=None, seed=None, prefetch=64))]
+    fn new(
+        py: Python<'_>,
+        paths: Bound<'_, PyAny>,
+        log_format: &str,
+        num_threads: Option<usize>,
+        seed: Option<u64>,
+        prefetch: usize,
+    ) -> PyResult<Self> {
+        let format = match log_format {
+            "mjai" => ReplayFormat::Mjai,
+            "mjsoul" => ReplayFormat::MjSoul,
+            other => {
+                return Err(PyValueError::new_err(format!(
+                    "log_format must be 'mjai' or 'mjsoul', got '{}'",
+                    other
+                )))
+            }
+        };
+        let mut files: Vec<String> = match paths.extract::<String>() {
+            Ok(pattern) => {
+                let mut matched: Vec<String> = py
+                    .import("glob")?
+                    .call_method1("glob", (pattern,))?
+                    .extract()?;
+                matched.sort();
+                matched
+            }
+            Err(_) => paths.extract()?,
+        };
+        if let Some(seed) = seed {
+            files.shuffle(&mut StdRng::seed_from_u64(seed));
+        }
+
+        let num_files = files.len();
+        let threads = num_threads
+            .unwrap_or_else(|| {
+                std::thread::available_parallelism()
+                    .map(|p| p.get())
+                    .unwrap_or(1)
+            })
+            .clamp(1, num_files.max(1));
+        let files = Arc::new(files);
+        let receivers = (0..threads)
+            .map(|worker| {
+                let (tx, rx) = sync_channel(prefetch.max(1));
+                let files = Arc::clone(&files);
+                // A worker stops once the loader, and with it the receiver, is dropped.
+                std::thread::spawn(move || {
+                    for path in files.iter().skip(worker).step_by(threads) {
+                        if !send_file(&tx, path, format) {
+                            break;
+                        }
+                    }
+                });
+                rx
+            })
+            .collect();
+
+        Ok(Self {
+            num_files,
+            inner: Mutex::new(LoaderState {
+                receivers,
+                next_file: 0,
+                num_files,
+                failed: false,
+            }),
+        })
+    }
+
+    fn __iter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+        slf
+    }
+
+    fn __next__(mut slf: PyRefMut<'_, Self>, py: Python<'_>) -> PyResult<Option<LogKyoku>> {
+        let state = slf.inner.get_mut().unwrap_or_else(|e| e.into_inner());
+        py.detach(|| state.next()).transpose()
+    }
+}
+
+impl Iterator for LoaderState {
+    type Item = PyResult<LogKyoku>;
+
+    /// Stops for good after the first file that fails to load.
+    fn next(&mut self) -> Option<Self::Item> {
+        while !self.failed && self.next_file < self.num_files {
+            let rx = &self.receivers[self.next_file % self.receivers.len()];
+            match rx.recv() {
+                Ok(Message::Kyoku(kyoku)) => return Some(Ok(kyoku)),
+                Ok(Message::EndOfFile) => self.next_file += 1,
+                Ok(Message::Error(e)) => {
+                    self.failed = true;
+                    return Some(Err(e));
+                }
+                Err(_) => {
+                    self.failed = true;
+                    return Some(Err(PyRuntimeError::new_err(
+                        "replay loader worker stopped unexpectedly",
+                    )));
+                }
+            }
+        }
+        None
+    }
+}
@@ -1,10 +1,11 @@
-use flate2::read::GzDecoder;
+use flate2::read::MultiGzDecoder;
 use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
 use serde::{Deserialize, Serialize};
 use std::fs::File;
 use std::io::{BufRead, BufReader};
-use std::sync::Arc;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
 
 use crate::parser::mjai_to_tid;
 use crate::replay::{Action, HuleData, LogKyoku};
@@ -48,6 +49,170 @@ impl KyokuIterator {
     }
 }
 
+/// Kyokus of MJAI JSONL files, parsed as they are read. Returned by
+/// `MjaiReplay.iter_jsonl`.
+#[pyclass]
+pub struct MjaiKyokuStream {
+    inner: Mutex<JsonlKyokus>,
+}
+
+#[pymethods]
+impl MjaiKyokuStream {
+    fn __iter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+        slf
+    }
+
+    fn __next__(mut slf: PyRefMut<'_, Self>, py: Python<'_>) -> PyResult<Option<LogKyoku>> {
+        let inner = slf.inner.get_mut().unwrap_or_else(|e| e.into_inner());
+        py.detach(|| inner.next()).transpose()
+    }
+}
+
+/// Streaming JSONL reader that yields each kyoku once its `end_kyoku` is read.
+///
+/// Only the current line and the kyoku being built are held in memory. Files may hold
+/// several games back to back, and `.gz` files may be concatenated gzip members. A
+/// directory is read file by file in name order, taking its `.jsonl` and `.jsonl.gz`
+/// files; a kyoku left open at the end of a file is emitted as it stands.
+pub struct JsonlKyokus {
+    files: std::vec::IntoIter<PathBuf>,
+    path: PathBuf,
+    reader: Option<Box<dyn BufRead + Send>>,
+    line: String,
+    line_no: usize,
+    builder: Option<KyokuBuilder>,
+    failed: bool,
+}
+
+impl JsonlKyokus {
+    pub fn open(path: &str) -> PyResult<Self> {
+        let path = Path::new(path);
+        let files = if path.is_dir() {
+            let mut files: Vec<PathBuf> = std::fs::read_dir(path)
+                .and_then(|entries| entries.map(|e| e.map(|e| e.path())).collect())
+                .map_err(|e| PyValueError::new_err(format!("Failed to read directory: {}", e)))?;
+            files.retain(|p| {
+                let name = p.to_string_lossy();
+                name.ends_with(".jsonl") || name.ends_with(".jsonl.gz")
+            });
+            files.sort();
+            files
+        } else {
+            vec![path.to_path_buf()]
+        };
+        Ok(Self {
+            files: files.into_iter(),
+            path: PathBuf::new(),
+            reader: None,
+            line: String::new(),
+            line_no: 0,
+            builder: None,
+            failed: false,
+        })
+    }
+
+    fn open_next(&mut self) -> PyResult<bool> {
+        let Some(path) = self.files.next() else {
+            return Ok(false);
+        };
+        let file = File::open(&path)
+            .map_err(|e| PyValueError::new_err(format!("Failed to open file: {}", e)))?;
+        self.reader = Some(if path.to_string_lossy().ends_with(".gz") {
+            Box::new(BufReader::new(MultiGzDecoder::new(file)))
+        } else {
+            Box::new(BufReader::new(file))
+        });
+        self.path = path;
+        self.line_no = 0;
+        Ok(true)
+    }
+
+    fn next_kyoku(&mut self) -> PyResult<Option<LogKyoku>> {
+        loop {
+            let Some(reader) = self.reader.as_mut() else {
+                if let Some(b) = self.builder.take() {
+                    return Ok(Some(b.build()));
+                }
+                if !self.open_next()? {
+                    return Ok(None);
+                }
+                continue;
+            };
+
+            self.line.clear();
+            let read = reader
+                .read_line(&mut self.line)
+                .map_err(|e| PyValueError::new_err(format!("Read error: {}", e)))?;
+            if read == 0 {
+                self.reader = None;
+                continue;
+            }
+            self.line_no += 1;
+            if self.line.trim().is_empty() {
+                continue;
+            }
+            let event: MjaiEvent = serde_json::from_str(&self.line).map_err(|e| {
+                PyValueError::new_err(format!(
+                    "Parse error at {}:{}: {}",
+                    self.path.display(),
+                    self.line_no,
+                    e
+                ))
+            })?;
+
+            match event {
+                MjaiEvent::StartKyoku {
+                    bakaze,
+                    kyoku,
+                    honba,
+                    kyoutaku,
+                    scores,
+                    dora_marker,
+                    tehais,
+                    ..
+                } => {
+                    let next = KyokuBuilder::new(
+                        bakaze,
+                        kyoku,
+                        honba,
+                        kyoutaku,
+                        scores,
+                        dora_marker,
+                        tehais,
+                    );
+                    if let Some(b) = self.builder.replace(next) {
+                        return Ok(Some(b.build()));
+                    }
+                }
+                MjaiEvent::EndKyoku | MjaiEvent::EndGame => {
+                    if let Some(b) = self.builder.take() {
+                        return Ok(Some(b.build()));
+                    }
+                }
+                _ => {
+                    if let Some(ref mut b) = self.builder {
+                        MjaiReplay::process_event(b, event);
+                    }
+                }
+            }
+        }
+    }
+}
+
+impl Iterator for JsonlKyokus {
+    type Item = PyResult<LogKyoku>;
+
+    /// Stops for good after the first error.
+    fn next(&mut self) -> Option<Self::Item> {
+        if self.failed {
+            return None;
+        }
+        let next = self.next_kyoku();
+        self.failed = next.is_err();
+        next.transpose()
+    }
+}
+
 // MJAI Event Definitions
 #[derive(Deserialize, Serialize, Clone, Debug)]
 #[serde(tag = "type")]
@@ -233,74 +398,18 @@ impl KyokuBuilder {
 #[pymethods]
 impl MjaiReplay {
     #[staticmethod]
-    pub fn from_jsonl(path: String) -> PyResult<Self> {
-        let is_gzip = path.ends_with(".gz");
-        let file = File::open(&path)
-            .map_err(|e| PyValueError::new_err(format!("Failed to open file: {}", e)))?;
-
-        // Setup reader
-        let reader: Box<dyn BufRead> = if is_gzip {
-            let decoder = GzDecoder::new(file);
-            Box::new(BufReader::new(decoder))
-        } else {
-            Box::new(BufReader::new(file))
-        };
-
-        let mut rounds = Vec::new();
-        let mut builder: Option<KyokuBuilder> = None;
-
-        for line in reader.lines() {
-            let line = line.map_err(|e| PyValueError::new_err(format!("Read error: {}", e)))?;
-            if line.trim().is_empty() {
-                continue;
-            }
-            let event: MjaiEvent = serde_json::from_str(&line)
-                .map_err(|e| PyValueError::new_err(format!("Parse error: {}", e)))?;
-
-            match event {
-                MjaiEvent::StartKyoku {
-                    bakaze,
-                    kyoku,
-                    honba,
-                    kyoutaku,
-                    scores,
-                    dora_marker,
-                    tehais,
-                    ..
-                } => {
-                    // Start new LogKyoku
-                    if let Some(b) = builder.take() {
-                        rounds.push(b.build());
-                    }
-                    builder = Some(KyokuBuilder::new(
-                        bakaze,
-                        kyoku,
-                        honba,
-                        kyoutaku,
-                        scores,
-                        dora_marker,
-                        tehais,
-                    ));
-                }
-                MjaiEvent::EndKyoku | MjaiEvent::EndGame => {
-                    if let Some(b) = builder.take() {
-                        rounds.push(b.build());
-                    }
-                }
-                _ => {
-                    if let Some(ref mut b) = builder {
-                        Self::process_event(b, event);
-                    }
-                }
-            }
-        }
-
-        // Final flush if unexpected end
-        if let Some(b) = builder.take() {
-            rounds.push(b.build());
-        }
+    pub fn from_jsonl(py: Python<'_>, path: String) -> PyResult<Self> {
+        // Decompression and parsing do not touch Python objects.
+        py.detach(|| Self::load_jsonl(&path))
+    }
 
-        Ok(MjaiReplay { rounds })
+    /// Stream the kyokus of a JSONL file, or of every `.jsonl` / `.jsonl.gz` file in a
+    /// directory, without loading them all first.
+    #[staticmethod]
+    pub fn iter_jsonl(path: String) -> PyResult<MjaiKyokuStream> {
+        Ok(MjaiKyokuStream {
+            inner: Mutex::new(JsonlKyokus::open(&path)?),
+        })
     }
 
     fn num_rounds(&self) -> usize {
@@ -318,6 +427,11 @@ impl MjaiReplay {
 }
 
 impl MjaiReplay {
+    fn load_jsonl(path: &str) -> PyResult<Self> {
+        let rounds = JsonlKyokus::open(path)?.collect::<PyResult<Vec<_>>>()?;
+        Ok(MjaiReplay { rounds })
+    }
+
     fn process_event(builder: &mut KyokuBuilder, event: MjaiEvent) {
         match event {
             MjaiEvent::Tsumo { actor, pai } => {
@@ -562,7 +676,7 @@ mod tests {
 
         let path_str = path.to_str().unwrap().to_string();
 
-        let replay = MjaiReplay::from_jsonl(path_str.clone()).expect("Failed to parse MJAI");
+        let replay = MjaiReplay::load_jsonl(&path_str).expect("Failed to parse MJAI");
         assert_eq!(replay.rounds.len(), 1);
         let kyoku = &replay.rounds[0];
         assert_eq!(kyoku.actions.len(), 3);
@@ -151,31 +151,9 @@ pub struct GameLog {
 #[pymethods]
 impl MjSoulReplay {
     #[staticmethod]
-    fn from_json(path: String) -> PyResult<Self> {
-        let file = File::open(&path)
-            .map_err(|e| PyValueError::new_err(format!("Failed to open file: {}", e)))?;
-        let reader = BufReader::with_capacity(65536, file);
-        let mut decoder = GzDecoder::new(reader);
-        let mut buffer = Vec::with_capacity(128 * 1024);
-
-        decoder
-            .read_to_end(&mut buffer)
-            .map_err(|e| PyValueError::new_err(format!("Failed to decompress: {}", e)))?;
-
-        let log: GameLog = serde_json::from_slice(&buffer)
-            .map_err(|e| PyValueError::new_err(format!("Failed to parse JSON: {}", e)))?;
-
-        let mut rounds = Vec::with_capacity(log.rounds.len());
-        for r_raw in log.rounds {
-            rounds.push(Self::kyoku_from_raw_actions(r_raw));
-        }
-
-        // Populate end_scores based on next round's start scores
-        for i in 0..rounds.len().saturating_sub(1) {
-            rounds[i].end_scores = rounds[i + 1].scores.clone();
-        }
-
-        Ok(MjSoulReplay { rounds })
+    fn from_json(py: Python<'_>, path: String) -> PyResult<Self> {
+        // Decompression and parsing do not touch Python objects.
+        py.detach(|| Self::load_json(&path))
     }
 
     #[staticmethod]
@@ -243,9 +221,17 @@ impl MjSoulReplay {
                 Some(initial_scores),
             );
 
+            // Deal the starting hands so that draws and discards keep them in range
+            for (i, h) in last.hands.iter().enumerate().take(4) {
+                state.players[i].hand = crate::state::compact::HandTiles::try_from_tiles(h)
+                    .map_err(PyValueError::new_err)?;
+            }
+
             // Apply all actions
             for action in last.actions.iter() {
-                state.apply_log_action(action);
+                state
+                    .apply_log_action(action)
+                    .map_err(PyValueError::new_err)?;
             }
 
             // Update last round's end scores
@@ -361,6 +347,33 @@ impl MjSoulReplay {
 }
 
 impl MjSoulReplay {
+    pub(crate) fn load_json(path: &str) -> PyResult<Self> {
+        let file = File::open(path)
+            .map_err(|e| PyValueError::new_err(format!("Failed to open file: {}", e)))?;
+        let reader = BufReader::with_capacity(65536, file);
+        let mut decoder = GzDecoder::new(reader);
+        let mut buffer = Vec::with_capacity(128 * 1024);
+
+        decoder
+            .read_to_end(&mut buffer)
+            .map_err(|e| PyValueError::new_err(format!("Failed to decompress: {}", e)))?;
+
+        let log: GameLog = serde_json::from_slice(&buffer)
+            .map_err(|e| PyValueError::new_err(format!("Failed to parse JSON: {}", e)))?;
+
+        let mut rounds = Vec::with_capacity(log.rounds.len());
+        for r_raw in log.rounds {
+            rounds.push(Self::kyoku_from_raw_actions(r_raw));
+        }
+
+        // Populate end_scores based on next round's start scores
+        for i in 0..rounds.len().saturating_sub(1) {
+            rounds[i].end_scores = rounds[i + 1].scores.clone();
+        }
+
+        Ok(MjSoulReplay { rounds })
+    }
+
     fn kyoku_from_raw_actions(raw_actions: Vec<RawAction>) -> LogKyoku {
         let mut scores = Vec::new();
         let mut doras = Vec::new();
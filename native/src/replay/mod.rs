@@ -9,11 +9,15 @@ use std::sync::Arc;
 
 use crate::action::Action as EnvAction;
 use crate::agari_calculator::AgariCalculator;
+use crate::observation::Observation;
 use crate::types::{Agari, Conditions, Meld, MeldType};
 
+pub mod loader;
 pub mod mjai_replay;
 pub mod mjsoul_replay;
+pub mod shard;
 
+pub use loader::ReplayLoader;
 pub use mjai_replay::MjaiEvent;
 pub use mjai_replay::MjaiReplay;
 pub use mjsoul_replay::MjSoulReplay;
@@ -81,8 +85,12 @@ pub struct KyokuStepIterator {
     state: crate::state::GameState,
     actions: Arc<[Action]>,
     idx: usize,
-    pending_action: Option<(u8, EnvAction)>,
-    filter_seat: Option<u8>,
+    /// Discard of a riichi declaration, with the legal actions it was declared from.
+    pending_action: Option<(u8, EnvAction, Vec<EnvAction>)>,
+    /// Seats whose decisions are reported.
+    seats: [bool; 4],
+    /// Yield `(obs, action)` rather than `(seat, obs, action)`, as for `steps(seat)`.
+    single_seat: bool,
     skip_single_action: bool,
 }
 
@@ -93,50 +101,71 @@ impl KyokuStepIterator {
     }
 
     fn __next__(mut slf: PyRefMut<'_, Self>) -> PyResult<Option<Py<PyAny>>> {
-        let actions = slf.actions.clone();
+        let py = slf.py();
+        let iter = &mut *slf;
+        let Some((pid, obs, action)) = py.detach(|| iter.next_step())? else {
+            return Ok(None);
+        };
+        if iter.single_seat {
+            Ok(Some((obs, action).into_pyobject(py)?.unbind().into()))
+        } else {
+            Ok(Some((pid, obs, action).into_pyobject(py)?.unbind().into()))
+        }
+    }
+}
 
-        loop {
-            if let Some((pid, action)) = slf.pending_action.take() {
-                let obs =
-                    slf.state
-                        .get_observation_for_replay(pid, &action, &format!("{:?}", action))?;
-
-                let current_log_action = &actions[slf.idx];
-                slf.state.apply_log_action(current_log_action);
-                slf.idx += 1;
-
-                if let Some(target) = slf.filter_seat {
-                    if pid == target {
-                        // Filter forced actions if requested
-                        if slf.skip_single_action && obs._legal_actions.len() <= 1 {
-                            continue;
-                        }
+impl KyokuStepIterator {
+    /// Whether a decision of `pid` is reported: it must match the seat filter, and forced
+    /// decisions (a single legal action) are dropped when `skip_single_action` is set.
+    fn should_yield(&self, pid: u8, obs: &Observation) -> bool {
+        if !self.seats[pid as usize] {
+            return false;
+        }
+        !(self.skip_single_action && obs._legal_actions.len() <= 1)
+    }
 
-                        let py = slf.py();
-                        return Ok(Some((obs, action).into_pyobject(py)?.unbind().into()));
-                    }
-                    continue;
-                } else {
-                    let py = slf.py();
-                    return Ok(Some((pid, obs, action).into_pyobject(py)?.unbind().into()));
+    /// Advance to the next logged decision and return `(seat, observation, action)`.
+    fn next_step(&mut self) -> PyResult<Option<(u8, Observation, EnvAction)>> {
+        let actions = self.actions.clone();
+
+        loop {
+            if let Some((pid, action, legal)) = self.pending_action.take() {
+                let current_log_action = &actions[self.idx];
+                let obs = self.state.get_observation_for_replay(
+                    pid,
+                    &action,
+                    current_log_action,
+                    Some(legal),
+                )?;
+
+                self.state
+                    .apply_log_action(current_log_action)
+                    .map_err(pyo3::exceptions::PyValueError::new_err)?;
+                self.idx += 1;
+
+                if self.should_yield(pid, &obs) {
+                    return Ok(Some((pid, obs, action)));
                 }
+                continue;
             }
 
-            if slf.idx >= actions.len() {
+            if self.idx >= actions.len() {
                 return Ok(None);
             }
 
-            let action = &actions[slf.idx];
+            let action = &actions[self.idx];
             match action {
                 Action::DealTile { .. }
                 | Action::Dora { .. }
                 | Action::NoTile
                 | Action::LiuJu { .. } => {
-                    slf.state.apply_log_action(action);
-                    slf.idx += 1;
+                    self.state
+                        .apply_log_action(action)
+                        .map_err(pyo3::exceptions::PyValueError::new_err)?;
+                    self.idx += 1;
                 }
                 Action::Other(_) => {
-                    slf.idx += 1;
+                    self.idx += 1;
                 }
                 Action::DiscardTile {
                     seat,
@@ -152,53 +181,35 @@ impl KyokuStepIterator {
                         let riichi_action =
                             EnvAction::new(crate::action::ActionType::Riichi, None, Vec::new());
 
-                        let obs = slf.state.get_observation_for_replay(
+                        let obs = self.state.get_observation_for_replay(
                             pid,
                             &riichi_action,
-                            &format!("{:?}", action),
+                            action,
+                            None,
                         )?;
 
-                        slf.pending_action = Some((pid, env_action));
+                        // Nothing is applied before the discard, so its legal actions
+                        // are the ones riichi was declared from.
+                        self.pending_action = Some((pid, env_action, obs._legal_actions.clone()));
 
-                        if let Some(target) = slf.filter_seat {
-                            if pid == target {
-                                let py = slf.py();
-                                return Ok(Some(
-                                    (obs, riichi_action).into_pyobject(py)?.unbind().into(),
-                                ));
-                            }
-                        } else {
-                            let py = slf.py();
-                            return Ok(Some(
-                                (pid, obs, riichi_action).into_pyobject(py)?.unbind().into(),
-                            ));
+                        if self.seats[pid as usize] {
+                            return Ok(Some((pid, obs, riichi_action)));
                         }
                     } else {
-                        let obs = slf.state.get_observation_for_replay(
+                        let obs = self.state.get_observation_for_replay(
                             pid,
                             &env_action,
-                            &format!("{:?}", action),
+                            action,
+                            None,
                         )?;
 
-                        slf.state.apply_log_action(action);
-                        slf.idx += 1;
+                        self.state
+                            .apply_log_action(action)
+                            .map_err(pyo3::exceptions::PyValueError::new_err)?;
+                        self.idx += 1;
 
-                        if let Some(target) = slf.filter_seat {
-                            if pid == target {
-                                if slf.skip_single_action && obs._legal_actions.len() <= 1 {
-                                    continue;
-                                }
-
-                                let py = slf.py();
-                                return Ok(Some(
-                                    (obs, env_action).into_pyobject(py)?.unbind().into(),
-                                ));
-                            }
-                        } else {
-                            let py = slf.py();
-                            return Ok(Some(
-                                (pid, obs, env_action).into_pyobject(py)?.unbind().into(),
-                            ));
+                        if self.should_yield(pid, &obs) {
+                            return Ok(Some((pid, obs, env_action)));
                         }
                     }
                 }
@@ -220,28 +231,17 @@ impl KyokuStepIterator {
                     let t = tiles.first().copied();
                     let env_action = EnvAction::new(env_action_type, t, tiles.to_vec());
 
-                    let obs = slf.state.get_observation_for_replay(
-                        pid,
-                        &env_action,
-                        &format!("{:?}", action),
-                    )?;
+                    let obs =
+                        self.state
+                            .get_observation_for_replay(pid, &env_action, action, None)?;
 
-                    slf.state.apply_log_action(action);
-                    slf.idx += 1;
+                    self.state
+                        .apply_log_action(action)
+                        .map_err(pyo3::exceptions::PyValueError::new_err)?;
+                    self.idx += 1;
 
-                    if let Some(target) = slf.filter_seat {
-                        if pid == target {
-                            if slf.skip_single_action && obs._legal_actions.len() <= 1 {
-                                continue;
-                            }
-                            let py = slf.py();
-                            return Ok(Some((obs, env_action).into_pyobject(py)?.unbind().into()));
-                        }
-                    } else {
-                        let py = slf.py();
-                        return Ok(Some(
-                            (pid, obs, env_action).into_pyobject(py)?.unbind().into(),
-                        ));
+                    if self.should_yield(pid, &obs) {
+                        return Ok(Some((pid, obs, env_action)));
                     }
                 }
                 Action::AnGangAddGang {
@@ -272,7 +272,7 @@ impl KyokuStepIterator {
                             let tile = tiles[0];
                             // Find the existing Peng meld to get its tiles
                             let mut consume = Vec::new();
-                            for m in &slf.state.players[pid as usize].melds {
+                            for m in &self.state.players[pid as usize].melds {
                                 if m.meld_type == MeldType::Peng && m.tiles[0] / 4 == t34 {
                                     consume = m.tiles.clone();
                                     break;
@@ -286,28 +286,17 @@ impl KyokuStepIterator {
                         }
                     };
 
-                    let obs = slf.state.get_observation_for_replay(
-                        pid,
-                        &env_action,
-                        &format!("{:?}", action),
-                    )?;
+                    let obs =
+                        self.state
+                            .get_observation_for_replay(pid, &env_action, action, None)?;
 
-                    slf.state.apply_log_action(action);
-                    slf.idx += 1;
+                    self.state
+                        .apply_log_action(action)
+                        .map_err(pyo3::exceptions::PyValueError::new_err)?;
+                    self.idx += 1;
 
-                    if let Some(target) = slf.filter_seat {
-                        if pid == target {
-                            if slf.skip_single_action && obs._legal_actions.len() <= 1 {
-                                continue;
-                            }
-                            let py = slf.py();
-                            return Ok(Some((obs, env_action).into_pyobject(py)?.unbind().into()));
-                        }
-                    } else {
-                        let py = slf.py();
-                        return Ok(Some(
-                            (pid, obs, env_action).into_pyobject(py)?.unbind().into(),
-                        ));
+                    if self.should_yield(pid, &obs) {
+                        return Ok(Some((pid, obs, env_action)));
                     }
                 }
                 Action::Hule { hules } => {
@@ -320,34 +309,23 @@ impl KyokuStepIterator {
                         crate::action::ActionType::Ron
                     };
                     let tile = if first.zimo {
-                        slf.state.drawn_tile
+                        self.state.drawn_tile
                     } else {
-                        slf.state.last_discard.map(|(_, t)| t)
+                        self.state.last_discard.map(|(_, t)| t)
                     };
                     let env_action = EnvAction::new(atype, tile, Vec::new());
 
-                    let obs = slf.state.get_observation_for_replay(
-                        pid,
-                        &env_action,
-                        &format!("{:?}", action),
-                    )?;
+                    let obs =
+                        self.state
+                            .get_observation_for_replay(pid, &env_action, action, None)?;
 
-                    slf.state.apply_log_action(action);
-                    slf.idx += 1;
+                    self.state
+                        .apply_log_action(action)
+                        .map_err(pyo3::exceptions::PyValueError::new_err)?;
+                    self.idx += 1;
 
-                    if let Some(target) = slf.filter_seat {
-                        if pid == target {
-                            if slf.skip_single_action && obs._legal_actions.len() <= 1 {
-                                continue;
-                            }
-                            let py = slf.py();
-                            return Ok(Some((obs, env_action).into_pyobject(py)?.unbind().into()));
-                        }
-                    } else {
-                        let py = slf.py();
-                        return Ok(Some(
-                            (pid, obs, env_action).into_pyobject(py)?.unbind().into(),
-                        ));
+                    if self.should_yield(pid, &obs) {
+                        return Ok(Some((pid, obs, env_action)));
                     }
                 }
             }
@@ -395,15 +373,37 @@ impl LogKyoku {
         Ok(AgariContextIterator::new(self.clone()))
     }
 
-    #[pyo3(signature = (seat=None, rule=None, skip_single_action=None))]
+    /// Replay the kyoku and yield the logged decisions in order.
+    ///
+    /// `seat` yields `(obs, action)` for one seat. Otherwise every seat, or only those in
+    /// `seats`, is reported as `(seat, obs, action)` from a single pass over the log.
+    #[pyo3(signature = (seat=None, rule=None, skip_single_action=None, seats=None))]
     fn steps(
         &self,
         seat: Option<u8>,
         rule: Option<crate::rule::GameRule>,
         skip_single_action: Option<bool>,
+        seats: Option<Vec<u8>>,
     ) -> PyResult<KyokuStepIterator> {
+        if seat.is_some() && seats.is_some() {
+            return Err(pyo3::exceptions::PyValueError::new_err(
+                "steps() takes either seat or seats, not both",
+            ));
+        }
+        let mut selected = [seats.is_none() && seat.is_none(); 4];
+        for s in seat.into_iter().chain(seats.into_iter().flatten()) {
+            if s >= 4 {
+                return Err(pyo3::exceptions::PyValueError::new_err(format!(
+                    "Invalid seat: {}",
+                    s
+                )));
+            }
+            selected[s as usize] = true;
+        }
         let rule = rule.unwrap_or(self.rule);
-        let skip_single_action = skip_single_action.unwrap_or(true);
+        // Forced decisions are skipped by default for single-seat iteration; iterating all
+        // seats keeps every decision unless asked otherwise.
+        let skip_single_action = skip_single_action.unwrap_or(seat.is_some());
         let mut state = crate::state::GameState::new(0, false, None, 0, rule);
 
         // Initialize state from LogKyoku data
@@ -444,7 +444,8 @@ impl LogKyoku {
         );
 
         for (i, h) in self.hands.iter().enumerate() {
-            state.players[i].hand = h.clone();
+            state.players[i].hand = crate::state::compact::HandTiles::try_from_tiles(h)
+                .map_err(pyo3::exceptions::PyValueError::new_err)?;
         }
 
         // If dealer starts with 14 tiles, set drawn_tile to allow immediate Tsumo/Discard
@@ -509,7 +510,8 @@ impl LogKyoku {
             actions: self.actions.clone(),
             idx: 0,
             pending_action: None,
-            filter_seat: seat,
+            seats: selected,
+            single_seat: seat.is_some(),
             skip_single_action,
         })
     }
@@ -0,0 +1,321 @@
+//! Columnar training shards written straight from replays.
+//!
+//! Every logged decision becomes one row: the encoded features, the 82-wide legal action
+//! mask, the action id, the seat and the kyoku index. Per-kyoku metadata and results are
+//! stored in columns of their own, and `kyoku_offsets` holds the row range of each kyoku.
+//!
+//! Layout, little-endian: a 64-byte preamble (`MAGIC`, `u32` version, 4 padding bytes,
+//! `u64` header offset, `u64` header length), then the columns, each aligned to 64 bytes,
+//! then a JSON header describing every column as `{dtype, shape, offset}` in NumPy terms.
+//! The header goes last so the column offsets are known when it is written.
+//! `riichienv.shard.ShardReader` maps the file and exposes the columns as NumPy views.
+
+use std::fs::File;
+use std::io::{self, BufWriter, Seek, SeekFrom, Write};
+
+use ndarray::{ArrayViewMut1, ArrayViewMut2};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use serde_json::{json, Map, Value};
+
+use super::LogKyoku;
+use crate::observation::{encode_one, FeatureGroup, ACTION_SPACE};
+
+pub const MAGIC: &[u8; 8] = b"RIICHISH";
+pub const VERSION: u32 = 1;
+
+/// Alignment of the preamble and of every column.
+const ALIGN: u64 = 64;
+
+/// Rows and per-kyoku columns of one shard, gathered in memory before writing.
+#[derive(Default)]
+struct ShardColumns {
+    features: Vec<f32>,
+    mask: Vec<u8>,
+    action: Vec<u8>,
+    seat: Vec<u8>,
+    kyoku: Vec<u32>,
+    kyoku_offsets: Vec<u64>,
+    chang: Vec<u8>,
+    ju: Vec<u8>,
+    ben: Vec<u8>,
+    liqibang: Vec<u8>,
+    scores: Vec<i32>,
+    end_scores: Vec<i32>,
+    game_end_scores: Vec<i32>,
+    has_game_end_scores: Vec<u8>,
+}
+
+impl ShardColumns {
+    /// Replay `kyoku` once, appending a row per decision of any seat.
+    fn push_kyoku(
+        &mut self,
+        kyoku: &LogKyoku,
+        groups: &[FeatureGroup],
+        skip_single_action: bool,
+    ) -> PyResult<()> {
+        let row_len = groups.iter().map(|g| g.channels()).sum::<usize>() * 34;
+        let index = self.chang.len() as u32;
+        self.kyoku_offsets.push(self.action.len() as u64);
+
+        let mut steps = kyoku.steps(None, None, Some(skip_single_action), None)?;
+        while let Some((pid, obs, action)) = steps.next_step()? {
+            let row = self.action.len();
+            self.features.resize((row + 1) * row_len, 0.0);
+            self.mask.resize((row + 1) * ACTION_SPACE, 0);
+            let features =
+                ArrayViewMut2::from_shape((row_len / 34, 34), &mut self.features[row * row_len..])
+                    .expect("row slice matches the feature shape");
+            let mask = ArrayViewMut1::from(&mut self.mask[row * ACTION_SPACE..]);
+            encode_one(&obs, groups, features, mask);
+
+            self.action.push(action.encode()? as u8);
+            self.seat.push(pid);
+            self.kyoku.push(index);
+        }
+
+        self.chang.push(kyoku.chang);
+        self.ju.push(kyoku.ju);
+        self.ben.push(kyoku.ben);
+        self.liqibang.push(kyoku.liqibang);
+        self.scores.extend(four(&kyoku.scores));
+        self.end_scores.extend(four(&kyoku.end_scores));
+        match &kyoku.game_end_scores {
+            Some(scores) => {
+                self.game_end_scores.extend(four(scores));
+                self.has_game_end_scores.push(1);
+            }
+            None => {
+                self.game_end_scores.extend([0; 4]);
+                self.has_game_end_scores.push(0);
+            }
+        }
+        Ok(())
+    }
+
+    fn write(
+        &self,
+        path: &str,
+        channels: &[String],
+        num_channels: usize,
+        quantize: bool,
+    ) -> io::Result<()> {
+        let rows = self.action.len();
+        let kyokus = self.chang.len();
+        let feature_shape = [rows, num_channels, 34];
+
+        let mut file = ShardFile::create(path)?;
+        if quantize {
+            let (values, offset, scale) = quantize_features(&self.features, num_channels);
+            file.column("features", "|u1", &feature_shape, &values, u8::to_le_bytes)?;
+            file.column(
+                "feature_offset",
+                "<f4",
+                &[num_channels],
+                &offset,
+                f32::to_le_bytes,
+            )?;
+            file.column(
+                "feature_scale",
+                "<f4",
+                &[num_channels],
+                &scale,
+                f32::to_le_bytes,
+            )?;
+        } else {
+            file.column(
+                "features",
+                "<f4",
+                &feature_shape,
+                &self.features,
+                f32::to_le_bytes,
+            )?;
+        }
+        file.column(
+            "mask",
+            "|u1",
+            &[rows, ACTION_SPACE],
+            &self.mask,
+            u8::to_le_bytes,
+        )?;
+        file.column("action", "|u1", &[rows], &self.action, u8::to_le_bytes)?;
+        file.column("seat", "|u1", &[rows], &self.seat, u8::to_le_bytes)?;
+        file.column("kyoku", "<u4", &[rows], &self.kyoku, u32::to_le_bytes)?;
+        let mut offsets = self.kyoku_offsets.clone();
+        offsets.push(rows as u64);
+        file.column(
+            "kyoku_offsets",
+            "<u8",
+            &[kyokus + 1],
+            &offsets,
+            u64::to_le_bytes,
+        )?;
+        for (name, values) in [
+            ("chang", &self.chang),
+            ("ju", &self.ju),
+            ("ben", &self.ben),
+            ("liqibang", &self.liqibang),
+            ("has_game_end_scores", &self.has_game_end_scores),
+        ] {
+            file.column(name, "|u1", &[kyokus], values, u8::to_le_bytes)?;
+        }
+        for (name, values) in [
+            ("scores", &self.scores),
+            ("end_scores", &self.end_scores),
+            ("game_end_scores", &self.game_end_scores),
+        ] {
+            file.column(name, "<i4", &[kyokus, 4], values, i32::to_le_bytes)?;
+        }
+
+        file.finish(json!({
+            "num_rows": rows,
+            "num_kyokus": kyokus,
+            "channels": channels,
+            "quantized": quantize,
+        }))
+    }
+}
+
+fn four(values: &[i32]) -> [i32; 4] {
+    let mut out = [0; 4];
+    for (o, &v) in out.iter_mut().zip(values) {
+        *o = v;
+    }
+    out
+}
+
+/// Map every channel onto 0-255 between its minimum and maximum over the shard.
+///
+/// Returns `(values, offset, scale)` with `feature ≈ offset[c] + value * scale[c]`.
+fn quantize_features(features: &[f32], channels: usize) -> (Vec<u8>, Vec<f32>, Vec<f32>) {
+    let mut lo = vec![f32::INFINITY; channels];
+    let mut hi = vec![f32::NEG_INFINITY; channels];
+    for (i, plane) in features.chunks_exact(34).enumerate() {
+        let c = i % channels;
+        for &v in plane {
+            lo[c] = lo[c].min(v);
+            hi[c] = hi[c].max(v);
+        }
+    }
+    let offset: Vec<f32> = lo
+        .iter()
+        .map(|&l| if l.is_finite() { l } else { 0.0 })
+        .collect();
+    let scale: Vec<f32> = lo
+        .iter()
+        .zip(&hi)
+        .map(|(&l, &h)| if h > l { (h - l) / 255.0 } else { 0.0 })
+        .collect();
+
+    let mut values = Vec::with_capacity(features.len());
+    for (i, plane) in features.chunks_exact(34).enumerate() {
+        let c = i % channels;
+        values.extend(plane.iter().map(|&v| {
+            if scale[c] > 0.0 {
+                ((v - offset[c]) / scale[c]).round() as u8
+            } else {
+                0
+            }
+        }));
+    }
+    (values, offset, scale)
+}
+
+/// Output file: the preamble is reserved up front and filled in by `finish`.
+struct ShardFile {
+    out: BufWriter<File>,
+    pos: u64,
+    columns: Map<String, Value>,
+}
+
+impl ShardFile {
+    fn create(path: &str) -> io::Result<Self> {
+        let mut out = BufWriter::new(File::create(path)?);
+        out.write_all(&[0; ALIGN as usize])?;
+        Ok(Self {
+            out,
+            pos: ALIGN,
+            columns: Map::new(),
+        })
+    }
+
+    fn column<T: Copy, const W: usize>(
+        &mut self,
+        name: &str,
+        dtype: &str,
+        shape: &[usize],
+        values: &[T],
+        to_le_bytes: fn(T) -> [u8; W],
+    ) -> io::Result<()> {
+        let pad = self.pos.next_multiple_of(ALIGN) - self.pos;
+        self.out.write_all(&vec![0; pad as usize])?;
+        self.pos += pad;
+        self.columns.insert(
+            name.to_string(),
+            json!({ "dtype": dtype, "shape": shape, "offset": self.pos }),
+        );
+
+        let mut buf = Vec::with_capacity(8192 * W);
+        for chunk in values.chunks(8192) {
+            buf.clear();
+            for &v in chunk {
+                buf.extend_from_slice(&to_le_bytes(v));
+            }
+            self.out.write_all(&buf)?;
+        }
+        self.pos += (values.len() * W) as u64;
+        Ok(())
+    }
+
+    /// Append the JSON header and point the preamble at it.
+    fn finish(mut self, mut header: Value) -> io::Result<()> {
+        header["version"] = json!(VERSION);
+        header["columns"] = Value::Object(std::mem::take(&mut self.columns));
+        let bytes = serde_json::to_vec(&header)?;
+        self.out.write_all(&bytes)?;
+
+        let mut file = self.out.into_inner().map_err(|e| e.into_error())?;
+        file.seek(SeekFrom::Start(0))?;
+        file.write_all(MAGIC)?;
+        file.write_all(&VERSION.to_le_bytes())?;
+        file.write_all(&[0; 4])?;
+        file.write_all(&self.pos.to_le_bytes())?;
+        file.write_all(&(bytes.len() as u64).to_le_bytes())?;
+        Ok(())
+    }
+}
+
+/// Replay `kyokus` and write every decision of every seat to a shard at `path`.
+///
+/// `channels` picks feature groups as in `encode_batch` (default `["base"]`). With
+/// `quantize`, features are stored as uint8 with a per-channel offset and scale. A shard
+/// is assembled in memory before it is written. Returns the number of rows.
+#[pyfunction]
+#[pyo3(signature = (path, kyokus, channels=None, quantize=false, skip_single_action=false))]
+pub fn write_shard(
+    py: Python<'_>,
+    path: String,
+    kyokus: Vec<PyRef<'_, LogKyoku>>,
+    channels: Option<Vec<String>>,
+    quantize: bool,
+    skip_single_action: bool,
+) -> PyResult<usize> {
+    let channels = channels.unwrap_or_else(|| vec!["base".to_string()]);
+    let groups = channels
+        .iter()
+        .map(|name| FeatureGroup::from_name(name))
+        .collect::<PyResult<Vec<_>>>()?;
+    let num_channels = groups.iter().map(|g| g.channels()).sum();
+    let kyokus: Vec<&LogKyoku> = kyokus.iter().map(|k| &**k).collect();
+
+    py.detach(|| {
+        let mut columns = ShardColumns::default();
+        for kyoku in kyokus {
+            columns.push_kyoku(kyoku, &groups, skip_single_action)?;
+        }
+        columns
+            .write(&path, &channels, num_channels, quantize)
+            .map_err(|e| PyValueError::new_err(format!("Failed to write shard: {}", e)))?;
+        Ok(columns.action.len())
+    })
+}
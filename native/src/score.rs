@@ -1,4 +1,6 @@
+use numpy::{IntoPyArray, PyReadonlyArray1};
 use pyo3::prelude::*;
+use pyo3::types::PyDict;
 
 #[pyclass]
 #[derive(Debug, Clone)]
@@ -13,82 +15,194 @@ pub struct Score {
     pub pay_tsumo_ko: u32,
 }
 
-#[pyfunction]
-pub fn calculate_score(han: u8, fu: u8, is_oya: bool, is_tsumo: bool, tsumi: u32) -> Score {
-    let mut s = if han >= 5 {
-        let base_points = match han {
-            5 => 2000,                     // Mangan
-            6 | 7 => 3000,                 // Haneman
-            8..=10 => 4000,                // Baiman
-            11 | 12 => 6000,               // Sanbaiman
-            _ => 8000 * (han as u32 / 13), // Yakuman (13, 26, 39, ...)
-        };
-        make_score_result(base_points, is_oya, is_tsumo)
-    } else {
-        let fu = round_up_fu(fu);
-        let bp = (fu as u32) * (2u32.pow(2 + han as u32));
-        if bp > 2000 {
-            make_score_result(2000, is_oya, is_tsumo)
-        } else {
-            make_score_result(bp, is_oya, is_tsumo)
-        }
-    };
+/// `Score` fields before honba: `[total, pay_ron, pay_tsumo_oya, pay_tsumo_ko]`.
+type Payments = [u32; 4];
 
-    // Add Honba (300 per honba stack)
-    if is_tsumo {
-        s.pay_tsumo_oya += tsumi * 100;
-        s.pay_tsumo_ko += tsumi * 100;
-        s.total += tsumi * 300;
-    } else {
-        s.pay_ron += tsumi * 300;
-        s.total += tsumi * 300;
+/// Payments for every (oya, tsumo) pair, indexed by `is_oya as usize * 2 + is_tsumo as usize`.
+type PaymentRow = [Payments; 4];
+
+/// Fu slots of the regular table: `fu.div_ceil(10)` for every `u8`, plus chiitoitsu.
+const FU_SLOTS: usize = 28;
+const CHIITOITSU_SLOT: usize = 27;
+
+/// Han counts below mangan, whose payments depend on fu.
+const REGULAR_HAN: usize = 5;
+
+/// Payments for hands below 5 han, indexed by han and fu slot.
+static REGULAR: [[PaymentRow; FU_SLOTS]; REGULAR_HAN] = build_regular();
+
+/// Payments for 5 to 12 han, then a single yakuman at index 8.
+static LIMIT: [PaymentRow; 9] = build_limit();
+
+const fn ceil_100(val: u32) -> u32 {
+    val.div_ceil(100) * 100
+}
+
+const fn payment_row(base_points: u32) -> PaymentRow {
+    let mut row = [[0; 4]; 4];
+    let mut i = 0;
+    while i < 4 {
+        let is_oya = i >= 2;
+        let is_tsumo = i % 2 == 1;
+        row[i] = if is_tsumo {
+            let (pay_oya, pay_ko) = if is_oya {
+                (0, ceil_100(base_points * 2))
+            } else {
+                (ceil_100(base_points * 2), ceil_100(base_points))
+            };
+            let total = if is_oya {
+                pay_ko * 3
+            } else {
+                pay_oya + pay_ko * 2
+            };
+            [total, 0, pay_oya, pay_ko]
+        } else {
+            let total = ceil_100(base_points * if is_oya { 6 } else { 4 });
+            [total, total, 0, 0]
+        };
+        i += 1;
     }
-    s
+    row
 }
 
-fn make_score_result(base_points: u32, is_oya: bool, is_tsumo: bool) -> Score {
-    let total_ron = if is_oya {
-        ceil_100(base_points * 6)
-    } else {
-        ceil_100(base_points * 4)
-    };
+const fn build_regular() -> [[PaymentRow; FU_SLOTS]; REGULAR_HAN] {
+    let mut table = [[[[0; 4]; 4]; FU_SLOTS]; REGULAR_HAN];
+    let mut han = 0;
+    while han < REGULAR_HAN {
+        let mut slot = 0;
+        while slot < FU_SLOTS {
+            let fu = if slot == CHIITOITSU_SLOT {
+                25
+            } else {
+                slot as u32 * 10
+            };
+            let base_points = fu * (1 << (2 + han));
+            table[han][slot] = payment_row(if base_points > 2000 {
+                2000
+            } else {
+                base_points
+            });
+            slot += 1;
+        }
+        han += 1;
+    }
+    table
+}
 
-    let (pay_oya, pay_ko) = if is_oya {
-        (0, ceil_100(base_points * 2))
-    } else {
-        (ceil_100(base_points * 2), ceil_100(base_points))
-    };
+const fn build_limit() -> [PaymentRow; 9] {
+    // Mangan, haneman (6-7), baiman (8-10), sanbaiman (11-12), yakuman.
+    const BASE: [u32; 9] = [2000, 3000, 3000, 4000, 4000, 4000, 6000, 6000, 8000];
+    let mut table = [[[0; 4]; 4]; 9];
+    let mut i = 0;
+    while i < 9 {
+        table[i] = payment_row(BASE[i]);
+        i += 1;
+    }
+    table
+}
 
-    let total_tsumo = if is_oya {
-        pay_ko * 3
+/// Payments before honba, read from the precomputed tables.
+#[inline]
+fn lookup(han: u8, fu: u8, is_oya: bool, is_tsumo: bool) -> Payments {
+    let col = is_oya as usize * 2 + is_tsumo as usize;
+    let han = han as usize;
+    if han < REGULAR_HAN {
+        let slot = if fu == 25 {
+            CHIITOITSU_SLOT
+        } else {
+            fu.div_ceil(10) as usize
+        };
+        REGULAR[han][slot][col]
+    } else if han < 13 {
+        LIMIT[han - REGULAR_HAN][col]
     } else {
-        pay_oya + pay_ko * 2
-    };
+        // Multiple yakuman (13, 26, 39, ...) scale the single-yakuman payments.
+        LIMIT[8][col].map(|p| p * (han as u32 / 13))
+    }
+}
 
+#[inline]
+fn score_with_honba(han: u8, fu: u8, is_oya: bool, is_tsumo: bool, tsumi: u32) -> Payments {
+    let [total, pay_ron, pay_tsumo_oya, pay_tsumo_ko] = lookup(han, fu, is_oya, is_tsumo);
+    // Honba: 300 per stack, split 100 per payer on tsumo.
+    let honba = tsumi * 100;
     if is_tsumo {
-        Score {
-            total: total_tsumo,
-            pay_ron: 0,
-            pay_tsumo_oya: pay_oya,
-            pay_tsumo_ko: pay_ko,
-        }
+        [
+            total + honba * 3,
+            pay_ron,
+            pay_tsumo_oya + honba,
+            pay_tsumo_ko + honba,
+        ]
     } else {
-        Score {
-            total: total_ron,
-            pay_ron: total_ron,
-            pay_tsumo_oya: 0,
-            pay_tsumo_ko: 0,
-        }
+        [
+            total + honba * 3,
+            pay_ron + honba * 3,
+            pay_tsumo_oya,
+            pay_tsumo_ko,
+        ]
     }
 }
 
-fn round_up_fu(fu: u8) -> u8 {
-    if fu == 25 {
-        return 25; // Chiitoitsu fixed
+#[pyfunction]
+pub fn calculate_score(han: u8, fu: u8, is_oya: bool, is_tsumo: bool, tsumi: u32) -> Score {
+    let [total, pay_ron, pay_tsumo_oya, pay_tsumo_ko] =
+        score_with_honba(han, fu, is_oya, is_tsumo, tsumi);
+    Score {
+        total,
+        pay_ron,
+        pay_tsumo_oya,
+        pay_tsumo_ko,
     }
-    fu.div_ceil(10) * 10
 }
 
-fn ceil_100(val: u32) -> u32 {
-    val.div_ceil(100) * 100
+/// Vectorized `calculate_score` over equally long 1-D arrays.
+///
+/// Returns a dict of uint32 arrays keyed like the `Score` fields.
+#[pyfunction]
+#[pyo3(signature = (han, fu, is_oya, is_tsumo, tsumi=None))]
+pub fn calculate_score_batch<'py>(
+    py: Python<'py>,
+    han: PyReadonlyArray1<'py, u8>,
+    fu: PyReadonlyArray1<'py, u8>,
+    is_oya: PyReadonlyArray1<'py, bool>,
+    is_tsumo: PyReadonlyArray1<'py, bool>,
+    tsumi: Option<PyReadonlyArray1<'py, u32>>,
+) -> PyResult<Bound<'py, PyDict>> {
+    let (han, fu, is_oya, is_tsumo) = (
+        han.as_array(),
+        fu.as_array(),
+        is_oya.as_array(),
+        is_tsumo.as_array(),
+    );
+    let tsumi = tsumi.as_ref().map(|t| t.as_array());
+    let n = han.len();
+    let lengths = [
+        ("fu", fu.len()),
+        ("is_oya", is_oya.len()),
+        ("is_tsumo", is_tsumo.len()),
+        ("tsumi", tsumi.map_or(n, |t| t.len())),
+    ];
+    if let Some((name, len)) = lengths.iter().find(|(_, len)| *len != n) {
+        return Err(pyo3::exceptions::PyValueError::new_err(format!(
+            "{} has length {}, expected {}",
+            name, len, n
+        )));
+    }
+
+    let payments: Vec<Payments> = (0..n)
+        .map(|i| {
+            let tsumi = tsumi.map_or(0, |t| t[i]);
+            score_with_honba(han[i], fu[i], is_oya[i], is_tsumo[i], tsumi)
+        })
+        .collect();
+
+    let dict = PyDict::new(py);
+    for (k, name) in ["total", "pay_ron", "pay_tsumo_oya", "pay_tsumo_ko"]
+        .into_iter()
+        .enumerate()
+    {
+        let column: Vec<u32> = payments.iter().map(|p| p[k]).collect();
+        dict.set_item(name, column.into_pyarray(py))?;
+    }
+    Ok(dict)
 }
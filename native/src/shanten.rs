@@ -1,158 +1,365 @@
-/// Calculate shanten number for a given hand using simple algorithm
-/// This is a basic implementation without external dependencies
-/// Returns shanten number (-1 for tenpai, 0+ for not tenpai)
-pub fn calculate_shanten(hand_tiles: &[u32]) -> i32 {
-    // Convert tile IDs to tile counts (0-33)
-    let mut tile_counts = [0u8; 34];
-    for &tile in hand_tiles {
-        let tile_type = (tile / 4) as usize;
-        if tile_type < 34 {
-            tile_counts[tile_type] += 1;
-        }
-    }
+//! Exact shanten (deficiency number) calculation.
+//!
+//! The standard form is evaluated with precomputed tables in the style of `agari`: each
+//! suit is packed into a base-5 key of its nine counts (seven for honours), and the table
+//! stores, for every key, how many tiles are missing to build `m` mentsu (with or
+//! without a pair) out of that group alone. The groups are then combined with a tiny
+//! dynamic program, so a shanten query does four lookups and never allocates.
+//!
+//! Shanten follows the usual convention: `-1` for a complete hand, `0` for tenpai.
+
+use std::sync::OnceLock;
+
+use crate::state::compact::TileMask;
+
+/// Terminals and honours, the kinds used by kokushi musou.
+const ORPHANS: [usize; 13] = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33];
+
+/// First tile and length of the four groups: manzu, pinzu, souzu, honours.
+const GROUPS: [(usize, usize); 4] = [(0, 9), (9, 9), (18, 9), (27, 7)];
+
+/// Slot of "`m` mentsu" (`m + 5` for "`m` mentsu and a pair") in a distance row.
+const PAIR: usize = 5;
+const UNREACHABLE: u8 = u8::MAX;
+/// Distance row of no groups at all: zero mentsu are free, everything else impossible.
+const EMPTY_ROW: [u8; 10] = {
+    let mut row = [UNREACHABLE; 10];
+    row[0] = 0;
+    row
+};
 
-    // Calculate different shanten patterns and take minimum
-    let standard_shanten = calculate_standard_shanten(&tile_counts);
-    let seven_pairs_shanten = calculate_seven_pairs_shanten(&tile_counts);
-    let thirteen_orphans_shanten = calculate_thirteen_orphans_shanten(&tile_counts);
+/// Missing tiles for each target (`m` mentsu, optional pair), indexed by packed counts.
+type DistanceTable = Vec<[u8; 10]>;
 
-    standard_shanten
-        .min(seven_pairs_shanten)
-        .min(thirteen_orphans_shanten)
+struct Tables {
+    suit: DistanceTable,
+    honor: DistanceTable,
 }
 
-/// Calculate standard form shanten (4 melds + 1 pair)
-fn calculate_standard_shanten(tiles: &[u8; 34]) -> i32 {
-    // Simplified shanten calculation
-    let mut melds = 0;
-    let mut taatsu = 0;
-    let mut pairs = 0;
+fn tables() -> &'static Tables {
+    static TABLES: OnceLock<Tables> = OnceLock::new();
+    TABLES.get_or_init(|| Tables {
+        suit: build_table(9, true),
+        honor: build_table(7, false),
+    })
+}
 
-    for &count in tiles.iter().take(34) {
-        if count >= 3 {
-            melds += 1;
-        } else if count == 2 {
-            pairs += 1;
-        }
-    }
+/// Build the distance table of a group of `len` kinds.
+///
+/// A key is at distance 0 from a target if its counts contain a pattern of that shape;
+/// otherwise its distance is one more than the best key reachable by adding one tile.
+/// Keys are processed upwards for containment and downwards for distances, since adding
+/// a tile always yields a larger key.
+fn build_table(len: usize, sequences: bool) -> DistanceTable {
+    let size = 5usize.pow(len as u32);
+    let units: Vec<usize> = (0..len).map(|i| 5usize.pow(i as u32)).collect();
 
-    // Check for sequences (for number tiles only)
-    for suit_start in [0, 9, 18] {
-        for i in 0..7 {
-            let idx = suit_start + i;
-            if idx + 2 < 34 && tiles[idx] > 0 && tiles[idx + 1] > 0 && tiles[idx + 2] > 0 {
-                taatsu += 1;
+    // Targets matched exactly by each key, as a bit per row slot.
+    let mut contains = vec![0u16; size];
+    let num_kinds = if sequences { len + len - 2 } else { len };
+    let mut counts = [0u8; 9];
+    mark_patterns(&mut counts[..len], num_kinds, 0, 0, &mut contains);
+
+    for key in 0..size {
+        let mut rest = key;
+        for &unit in &units {
+            if rest % 5 > 0 {
+                contains[key] |= contains[key - unit];
             }
+            rest /= 5;
         }
     }
 
-    // Estimate shanten
-    let _total_groups = melds + taatsu;
-    let has_pair = pairs > 0 || melds + taatsu >= 5;
-
-    if melds == 4 && has_pair {
-        -1 // Tenpai
-    } else if melds == 4 {
-        0 // 1-shanten
-    } else {
-        (4 - melds - (taatsu.min(4 - melds))) + if has_pair { 0 } else { 1 }
+    let mut table = vec![[UNREACHABLE; 10]; size];
+    for key in (0..size).rev() {
+        let mut best = [UNREACHABLE; 10];
+        let mut rest = key;
+        for &unit in &units {
+            if rest % 5 < 4 {
+                for (b, &d) in best.iter_mut().zip(&table[key + unit]) {
+                    *b = (*b).min(d);
+                }
+            }
+            rest /= 5;
+        }
+        for (slot, d) in table[key].iter_mut().enumerate() {
+            *d = if contains[key] >> slot & 1 == 1 {
+                0
+            } else {
+                best[slot].saturating_add(1)
+            };
+        }
     }
+    table
 }
 
-/// Calculate seven pairs shanten
-fn calculate_seven_pairs_shanten(tiles: &[u8; 34]) -> i32 {
-    let mut pairs = 0;
+/// Flag every multiset of at most four mentsu, with and without an added pair.
+fn mark_patterns(
+    counts: &mut [u8],
+    num_kinds: usize,
+    first_kind: usize,
+    depth: usize,
+    contains: &mut [u16],
+) {
+    let key = pack(counts);
+    contains[key] |= 1 << depth;
+    let mut unit = 1;
+    for &c in counts.iter() {
+        if c <= 2 {
+            contains[key + 2 * unit] |= 1 << (depth + PAIR);
+        }
+        unit *= 5;
+    }
+    if depth == 4 {
+        return;
+    }
 
-    for &count in tiles {
-        if count >= 2 {
-            pairs += 1;
+    let len = counts.len();
+    for kind in first_kind..num_kinds {
+        let tiles = if kind < len {
+            [kind; 3]
+        } else {
+            let start = kind - len;
+            [start, start + 1, start + 2]
+        };
+        for &t in &tiles {
+            counts[t] += 1;
+        }
+        if tiles.iter().all(|&t| counts[t] <= 4) {
+            mark_patterns(counts, num_kinds, kind, depth + 1, contains);
+        }
+        for &t in &tiles {
+            counts[t] -= 1;
         }
     }
+}
 
-    6 - pairs
+/// Base-5 key of a group's counts (first tile in the lowest digit).
+#[inline]
+fn pack(counts: &[u8]) -> usize {
+    counts
+        .iter()
+        .rev()
+        .fold(0, |key, &c| key * 5 + c.min(4) as usize)
 }
 
-/// Calculate thirteen orphans shanten
-fn calculate_thirteen_orphans_shanten(tiles: &[u8; 34]) -> i32 {
-    let terminals_and_honors = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33];
-    let mut unique_count = 0;
-    let mut has_pair = false;
+/// Distance rows of the four groups of `counts`.
+#[inline]
+fn group_rows(counts: &[u8; 34]) -> [[u8; 10]; 4] {
+    let tables = tables();
+    let mut rows = [[UNREACHABLE; 10]; 4];
+    for (g, &(start, len)) in GROUPS.iter().enumerate() {
+        let table = if g == 3 { &tables.honor } else { &tables.suit };
+        rows[g] = table[pack(&counts[start..start + len])];
+    }
+    rows
+}
 
-    for &idx in &terminals_and_honors {
-        if tiles[idx] > 0 {
-            unique_count += 1;
-            if tiles[idx] >= 2 {
-                has_pair = true;
+/// Merge the distance rows of two disjoint sets of groups (at most `need` mentsu and
+/// one pair in total).
+#[inline]
+fn combine(a: &[u8; 10], b: &[u8; 10], need: usize) -> [u8; 10] {
+    let mut out = [UNREACHABLE; 10];
+    for (i, &da) in a.iter().enumerate() {
+        for (j, &db) in b.iter().enumerate() {
+            let m = i % PAIR + j % PAIR;
+            if m > need || (i >= PAIR && j >= PAIR) {
+                continue;
             }
+            let slot = m + if i >= PAIR || j >= PAIR { PAIR } else { 0 };
+            out[slot] = out[slot].min(da.saturating_add(db));
         }
     }
+    out
+}
 
-    13 - unique_count - if has_pair { 1 } else { 0 }
+/// Missing tiles for `need` mentsu and a pair, split between `rest` and `row`.
+#[inline]
+fn complete(rest: &[u8; 10], row: &[u8; 10], need: usize) -> i32 {
+    (0..=need)
+        .map(|m| {
+            let with_pair_in_row = rest[m].saturating_add(row[need - m + PAIR]);
+            let with_pair_in_rest = rest[m + PAIR].saturating_add(row[need - m]);
+            with_pair_in_row.min(with_pair_in_rest)
+        })
+        .min()
+        .unwrap_or(UNREACHABLE) as i32
 }
 
-/// Calculate effective tiles (tiles that reduce shanten when drawn)
-pub fn calculate_effective_tiles(hand_tiles: &[u32]) -> u32 {
-    let current_shanten = calculate_shanten(hand_tiles);
-    let mut effective_count = 0;
+/// Shanten of the standard form (`4 - num_melds` mentsu and a pair).
+pub fn standard_shanten(counts: &[u8; 34], num_melds: usize) -> i32 {
+    let need = 4 - num_melds.min(4);
+    let rows = group_rows(counts);
+    let rest = rows[..3]
+        .iter()
+        .fold(EMPTY_ROW, |acc, row| combine(&acc, row, need));
+    complete(&rest, &rows[3], need) - 1
+}
 
-    for tile_type in 0..34 {
-        let count_in_hand = hand_tiles.iter().filter(|&&t| (t / 4) == tile_type).count();
-        if count_in_hand >= 4 {
-            continue;
-        }
+/// Shanten of chiitoitsu; seven distinct kinds are needed.
+pub fn chiitoitsu_shanten(counts: &[u8; 34]) -> i32 {
+    let pairs = counts.iter().filter(|&&c| c >= 2).count() as i32;
+    let kinds = counts.iter().filter(|&&c| c >= 1).count() as i32;
+    6 - pairs + (7 - kinds).max(0)
+}
 
-        let mut new_hand = hand_tiles.to_vec();
-        new_hand.push(tile_type * 4);
-        let new_shanten = calculate_shanten(&new_hand);
+/// Shanten of kokushi musou.
+pub fn kokushi_shanten(counts: &[u8; 34]) -> i32 {
+    let unique = ORPHANS.iter().filter(|&&t| counts[t] > 0).count() as i32;
+    let has_pair = ORPHANS.iter().any(|&t| counts[t] >= 2);
+    13 - unique - has_pair as i32
+}
 
-        if new_shanten < current_shanten {
-            effective_count += 1;
-        }
+/// Shanten of the concealed counts `counts` next to `num_melds` called melds.
+///
+/// Chiitoitsu and kokushi are only considered for a closed hand without melds.
+pub fn shanten(counts: &[u8; 34], num_melds: usize) -> i32 {
+    let standard = standard_shanten(counts, num_melds);
+    if num_melds > 0 {
+        return standard;
     }
+    standard
+        .min(chiitoitsu_shanten(counts))
+        .min(kokushi_shanten(counts))
+}
 
-    effective_count
+/// 34-type counts of 136-format tiles (extra copies beyond four are ignored).
+pub fn tile_counts(tiles: &[u32]) -> [u8; 34] {
+    let mut counts = [0u8; 34];
+    for &tile in tiles {
+        if let Some(c) = counts.get_mut(tile as usize / 4) {
+            *c = (*c + 1).min(4);
+        }
+    }
+    counts
 }
 
-/// Calculate best ukeire (number of tiles that improve hand)
-pub fn calculate_best_ukeire(hand_tiles: &[u32], visible_tiles: &[u32]) -> u32 {
-    let mut max_ukeire = 0;
-    let mut visible_counts = [0u32; 34];
+/// Shanten after drawing one tile of each kind, or `None` for kinds held four times.
+///
+/// Only the group receiving the tile changes, so the other three groups are combined
+/// once per group and each draw costs a single table lookup.
+pub fn shanten_after_draw(counts: &[u8; 34], num_melds: usize) -> [Option<i32>; 34] {
+    let need = 4 - num_melds.min(4);
+    let tables = tables();
+    let rows = group_rows(counts);
+    let closed = num_melds == 0;
+    let pairs = counts.iter().filter(|&&c| c >= 2).count() as i32;
+    let kinds = counts.iter().filter(|&&c| c >= 1).count() as i32;
+    let unique = ORPHANS.iter().filter(|&&t| counts[t] > 0).count() as i32;
+    let orphan_pair = ORPHANS.iter().any(|&t| counts[t] >= 2);
 
-    for &tile in visible_tiles {
-        let tile_type = (tile / 4) as usize;
-        if tile_type < 34 {
-            visible_counts[tile_type] += 1;
+    let mut after = [None; 34];
+    for (g, &(start, len)) in GROUPS.iter().enumerate() {
+        let table = if g == 3 { &tables.honor } else { &tables.suit };
+        let mut rest = EMPTY_ROW;
+        for (h, row) in rows.iter().enumerate() {
+            if h != g {
+                rest = combine(&rest, row, need);
+            }
+        }
+        let key = pack(&counts[start..start + len]);
+        let mut unit = 1;
+        for t in start..start + len {
+            let c = counts[t];
+            if c < 4 {
+                let mut s = complete(&rest, &table[key + unit], need) - 1;
+                if closed {
+                    let pairs = pairs + (c == 1) as i32;
+                    let kinds = kinds + (c == 0) as i32;
+                    s = s.min(6 - pairs + (7 - kinds).max(0));
+                    let (unique, has_pair) = if ORPHANS.contains(&t) {
+                        (unique + (c == 0) as i32, orphan_pair || c == 1)
+                    } else {
+                        (unique, orphan_pair)
+                    };
+                    s = s.min(13 - unique - has_pair as i32);
+                }
+                after[t] = Some(s);
+            }
+            unit *= 5;
         }
     }
+    after
+}
 
-    let current_shanten = calculate_shanten(hand_tiles);
-
-    for (idx, _) in hand_tiles.iter().enumerate() {
-        let new_hand: Vec<u32> = hand_tiles
-            .iter()
-            .enumerate()
-            .filter(|(i, _)| *i != idx)
-            .map(|(_, &t)| t)
-            .collect();
+/// Tile efficiency of a hand waiting for its next draw.
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct Ukeire {
+    /// Shanten of the hand before the draw.
+    pub shanten: i32,
+    /// Kinds that lower the shanten when drawn.
+    pub tiles: TileMask,
+    /// Copies of `tiles` neither in hand nor visible.
+    pub remaining: u32,
+}
 
-        let new_shanten = calculate_shanten(&new_hand);
-        if new_shanten > current_shanten {
-            continue;
-        }
+/// Copies of `t` neither in `held` nor in `visible`.
+#[inline]
+pub fn unseen(held: &[u8; 34], visible: &[u8; 34], t: usize) -> u32 {
+    4u32.saturating_sub(held[t] as u32 + visible[t] as u32)
+}
 
-        let mut ukeire = 0;
-        for tile_type in 0..34 {
-            let mut test_hand = new_hand.clone();
-            test_hand.push(tile_type * 4);
-            let test_shanten = calculate_shanten(&test_hand);
+/// Ukeire of `counts`; `visible` counts tiles seen outside the hand.
+pub fn ukeire(counts: &[u8; 34], num_melds: usize, visible: &[u8; 34]) -> Ukeire {
+    ukeire_with_held(counts, counts, num_melds, visible)
+}
 
-            if test_shanten < new_shanten {
-                ukeire += 4 - visible_counts[tile_type as usize];
-            }
+fn ukeire_with_held(
+    counts: &[u8; 34],
+    held: &[u8; 34],
+    num_melds: usize,
+    visible: &[u8; 34],
+) -> Ukeire {
+    let shanten = shanten(counts, num_melds);
+    let mut result = Ukeire {
+        shanten,
+        ..Ukeire::default()
+    };
+    for (t, after) in shanten_after_draw(counts, num_melds).iter().enumerate() {
+        if after.is_some_and(|s| s < shanten) {
+            result.tiles.insert(t as u8);
+            result.remaining += unseen(held, visible, t);
         }
+    }
+    result
+}
 
-        max_ukeire = max_ukeire.max(ukeire);
+/// Ukeire after discarding one tile of each kind, or `None` for kinds not in hand.
+///
+/// The discarded tile still counts as held when remaining copies are counted, since
+/// it ends up in the river.
+pub fn discard_ukeire(
+    counts: &[u8; 34],
+    num_melds: usize,
+    visible: &[u8; 34],
+) -> [Option<Ukeire>; 34] {
+    let mut rest = *counts;
+    let mut table = [None; 34];
+    for (t, entry) in table.iter_mut().enumerate() {
+        if counts[t] == 0 {
+            continue;
+        }
+        rest[t] -= 1;
+        *entry = Some(ukeire_with_held(&rest, counts, num_melds, visible));
+        rest[t] += 1;
     }
+    table
+}
+
+/// Number of kinds that lower the shanten of `counts` when drawn.
+pub fn effective_tiles(counts: &[u8; 34], num_melds: usize) -> u32 {
+    ukeire(counts, num_melds, &[0; 34]).tiles.len() as u32
+}
 
-    max_ukeire
+/// Largest ukeire after one discard that keeps the shanten of `counts`; `visible`
+/// counts tiles seen outside the hand.
+pub fn best_ukeire(counts: &[u8; 34], num_melds: usize, visible: &[u8; 34]) -> u32 {
+    let current = shanten(counts, num_melds);
+    discard_ukeire(counts, num_melds, visible)
+        .iter()
+        .flatten()
+        .filter(|u| u.shanten <= current)
+        .map(|u| u.remaining)
+        .max()
+        .unwrap_or(0)
 }
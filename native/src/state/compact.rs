@@ -0,0 +1,453 @@
+//! Fixed-capacity containers used by `PlayerState` and `GameState`.
+//!
+//! A player never holds more than 14 tiles, discards at most a few dozen times per
+//! round, and pao can only be assigned for daisangen and daisuushii, so these
+//! containers keep their data inline instead of on the heap. Cloning a player is then a
+//! plain copy for everything except melds and discards.
+
+use std::collections::HashMap;
+
+use crate::action::Action;
+
+/// Maximum number of tiles in a concealed hand (13 + the drawn tile).
+pub const MAX_HAND_TILES: usize = 14;
+
+/// Concealed hand stored inline, with a 34-type count table kept in sync.
+///
+/// Dereferences to `[u8]` (136-format tile ids), so read-only slice methods such as
+/// `iter`, `len`, `contains` or `last` work as they did on `Vec<u8>`.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub struct HandTiles {
+    tiles: [u8; MAX_HAND_TILES],
+    len: u8,
+    counts: [u8; 34],
+}
+
+impl Default for HandTiles {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+impl HandTiles {
+    pub const fn new() -> Self {
+        Self {
+            tiles: [0; MAX_HAND_TILES],
+            len: 0,
+            counts: [0; 34],
+        }
+    }
+
+    /// Number of copies of the 34-type `t34` in the hand.
+    #[inline]
+    pub fn count(&self, t34: u8) -> u8 {
+        self.counts[t34 as usize]
+    }
+
+    /// 34-type count table of the hand.
+    #[inline]
+    pub fn counts(&self) -> &[u8; 34] {
+        &self.counts
+    }
+
+    /// Add a tile at the end of the hand.
+    ///
+    /// Panics if the hand already holds `MAX_HAND_TILES` tiles.
+    pub fn push(&mut self, tile: u8) {
+        let len = self.len as usize;
+        assert!(
+            len < MAX_HAND_TILES,
+            "hand cannot hold more than {} tiles",
+            MAX_HAND_TILES
+        );
+        self.tiles[len] = tile;
+        self.len += 1;
+        self.counts[tile as usize / 4] += 1;
+    }
+
+    /// Like `push`, but reports an invalid tile id or a full hand instead of panicking.
+    pub fn try_push(&mut self, tile: u8) -> Result<(), String> {
+        if tile >= 136 {
+            return Err(format!("Invalid tile id {}", tile));
+        }
+        if self.len as usize >= MAX_HAND_TILES {
+            return Err(format!(
+                "A hand holds at most {} tiles, got another {}",
+                MAX_HAND_TILES, tile
+            ));
+        }
+        self.push(tile);
+        Ok(())
+    }
+
+    /// Build a hand from untrusted 136-format tiles, failing where `try_push` would.
+    pub fn try_from_tiles(tiles: &[u8]) -> Result<Self, String> {
+        let mut hand = Self::new();
+        for &tile in tiles {
+            hand.try_push(tile)?;
+        }
+        Ok(hand)
+    }
+
+    /// Remove and return the tile at `idx`, shifting the following tiles left.
+    pub fn remove(&mut self, idx: usize) -> u8 {
+        let len = self.len as usize;
+        assert!(idx < len, "hand index {} out of range for {}", idx, len);
+        let tile = self.tiles[idx];
+        self.tiles.copy_within(idx + 1..len, idx);
+        self.len -= 1;
+        self.counts[tile as usize / 4] -= 1;
+        tile
+    }
+
+    /// Keep only the tiles for which `f` returns `true`, preserving their order.
+    pub fn retain<F: FnMut(&u8) -> bool>(&mut self, mut f: F) {
+        let len = self.len as usize;
+        let mut kept = 0;
+        for i in 0..len {
+            let tile = self.tiles[i];
+            if f(&tile) {
+                self.tiles[kept] = tile;
+                kept += 1;
+            } else {
+                self.counts[tile as usize / 4] -= 1;
+            }
+        }
+        self.len = kept as u8;
+    }
+
+    pub fn sort(&mut self) {
+        let len = self.len as usize;
+        self.tiles[..len].sort_unstable();
+    }
+
+    pub fn clear(&mut self) {
+        self.len = 0;
+        self.counts = [0; 34];
+    }
+}
+
+impl std::ops::Deref for HandTiles {
+    type Target = [u8];
+
+    #[inline]
+    fn deref(&self) -> &[u8] {
+        &self.tiles[..self.len as usize]
+    }
+}
+
+impl<'a> IntoIterator for &'a HandTiles {
+    type Item = &'a u8;
+    type IntoIter = std::slice::Iter<'a, u8>;
+
+    fn into_iter(self) -> Self::IntoIter {
+        self.iter()
+    }
+}
+
+impl FromIterator<u8> for HandTiles {
+    fn from_iter<I: IntoIterator<Item = u8>>(iter: I) -> Self {
+        let mut hand = Self::new();
+        for tile in iter {
+            hand.push(tile);
+        }
+        hand
+    }
+}
+
+impl From<&[u8]> for HandTiles {
+    fn from(tiles: &[u8]) -> Self {
+        tiles.iter().copied().collect()
+    }
+}
+
+impl From<Vec<u8>> for HandTiles {
+    fn from(tiles: Vec<u8>) -> Self {
+        Self::from(tiles.as_slice())
+    }
+}
+
+impl PartialEq<Vec<u8>> for HandTiles {
+    fn eq(&self, other: &Vec<u8>) -> bool {
+        **self == **other
+    }
+}
+
+/// Maximum number of discards tracked per player and round.
+pub const MAX_DISCARDS: usize = 64;
+
+/// Sequence of per-discard booleans packed into a single `u64`.
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct DiscardFlags {
+    bits: u64,
+    len: u8,
+}
+
+impl DiscardFlags {
+    pub const fn new() -> Self {
+        Self { bits: 0, len: 0 }
+    }
+
+    pub fn len(&self) -> usize {
+        self.len as usize
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len == 0
+    }
+
+    /// Panics once more than `MAX_DISCARDS` flags are pushed.
+    pub fn push(&mut self, flag: bool) {
+        let len = self.len as usize;
+        assert!(
+            len < MAX_DISCARDS,
+            "cannot track more than {} discards",
+            MAX_DISCARDS
+        );
+        if flag {
+            self.bits |= 1 << len;
+        } else {
+            self.bits &= !(1 << len);
+        }
+        self.len += 1;
+    }
+
+    pub fn get(&self, idx: usize) -> Option<bool> {
+        (idx < self.len as usize).then(|| (self.bits >> idx) & 1 == 1)
+    }
+
+    pub fn clear(&mut self) {
+        self.bits = 0;
+        self.len = 0;
+    }
+
+    pub fn iter(&self) -> impl Iterator<Item = bool> + '_ {
+        (0..self.len as usize).map(move |i| (self.bits >> i) & 1 == 1)
+    }
+
+    pub fn to_vec(&self) -> Vec<bool> {
+        self.iter().collect()
+    }
+}
+
+impl FromIterator<bool> for DiscardFlags {
+    fn from_iter<I: IntoIterator<Item = bool>>(iter: I) -> Self {
+        let mut flags = Self::new();
+        for flag in iter {
+            flags.push(flag);
+        }
+        flags
+    }
+}
+
+/// Set of 34-type tile kinds packed into the low 34 bits of a `u64`.
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq, Hash)]
+pub struct TileMask(u64);
+
+impl TileMask {
+    pub const EMPTY: Self = Self(0);
+
+    pub const fn from_bits(bits: u64) -> Self {
+        Self(bits & ((1 << 34) - 1))
+    }
+
+    pub const fn bits(self) -> u64 {
+        self.0
+    }
+
+    #[inline]
+    pub fn contains(self, t34: u8) -> bool {
+        t34 < 34 && (self.0 >> t34) & 1 == 1
+    }
+
+    #[inline]
+    pub fn insert(&mut self, t34: u8) {
+        debug_assert!(t34 < 34);
+        self.0 |= 1 << t34;
+    }
+
+    pub fn clear(&mut self) {
+        self.0 = 0;
+    }
+
+    pub fn is_empty(self) -> bool {
+        self.0 == 0
+    }
+
+    pub fn len(self) -> usize {
+        self.0.count_ones() as usize
+    }
+
+    /// Tile kinds in ascending order.
+    pub fn iter(self) -> impl Iterator<Item = u8> {
+        let mut bits = self.0;
+        std::iter::from_fn(move || {
+            if bits == 0 {
+                return None;
+            }
+            let t = bits.trailing_zeros() as u8;
+            bits &= bits - 1;
+            Some(t)
+        })
+    }
+}
+
+impl FromIterator<u8> for TileMask {
+    fn from_iter<I: IntoIterator<Item = u8>>(iter: I) -> Self {
+        let mut mask = Self::EMPTY;
+        for t34 in iter {
+            mask.insert(t34);
+        }
+        mask
+    }
+}
+
+/// Pao (sekinin barai) can only be assigned for daisangen and daisuushii.
+pub const PAO_SLOTS: usize = 2;
+
+/// Yaku id -> liable seat, for the at most `PAO_SLOTS` pao yaku of a player.
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq)]
+pub struct PaoTable {
+    entries: [(u8, u8); PAO_SLOTS],
+    len: u8,
+}
+
+impl PaoTable {
+    pub const fn new() -> Self {
+        Self {
+            entries: [(0, 0); PAO_SLOTS],
+            len: 0,
+        }
+    }
+
+    /// Seat liable for `yaku_id`, if any.
+    pub fn get(&self, yaku_id: u8) -> Option<u8> {
+        self.iter()
+            .find(|&(yid, _)| yid == yaku_id)
+            .map(|(_, liable)| liable)
+    }
+
+    /// Assign `liable` to `yaku_id`, replacing a previous assignment.
+    ///
+    /// Panics if a third distinct yaku is inserted.
+    pub fn insert(&mut self, yaku_id: u8, liable: u8) {
+        let len = self.len as usize;
+        if let Some(entry) = self.entries[..len].iter_mut().find(|e| e.0 == yaku_id) {
+            entry.1 = liable;
+            return;
+        }
+        assert!(len < PAO_SLOTS, "pao table is full");
+        self.entries[len] = (yaku_id, liable);
+        self.len += 1;
+    }
+
+    pub fn clear(&mut self) {
+        self.len = 0;
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len == 0
+    }
+
+    /// `(yaku_id, liable_seat)` pairs in insertion order.
+    pub fn iter(&self) -> impl Iterator<Item = (u8, u8)> + '_ {
+        self.entries[..self.len as usize].iter().copied()
+    }
+
+    pub fn to_map(&self) -> HashMap<u8, u8> {
+        self.iter().collect()
+    }
+}
+
+impl FromIterator<(u8, u8)> for PaoTable {
+    fn from_iter<I: IntoIterator<Item = (u8, u8)>>(iter: I) -> Self {
+        let mut table = Self::new();
+        for (yaku_id, liable) in iter {
+            table.insert(yaku_id, liable);
+        }
+        table
+    }
+}
+
+/// Claim actions offered to each seat in the current response window, indexed by seat.
+///
+/// Seats without offers keep an empty (non-allocating) list, so clearing the table
+/// keeps the buffers of the previous window.
+#[derive(Debug, Default, PartialEq)]
+pub struct ClaimTable {
+    seats: [Vec<Action>; 4],
+}
+
+impl Clone for ClaimTable {
+    fn clone(&self) -> Self {
+        Self {
+            seats: self.seats.clone(),
+        }
+    }
+
+    fn clone_from(&mut self, source: &Self) {
+        for (dst, src) in self.seats.iter_mut().zip(&source.seats) {
+            dst.clone_from(src);
+        }
+    }
+}
+
+impl ClaimTable {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Offers for `pid`, or `None` if it has none.
+    pub fn get(&self, pid: u8) -> Option<&Vec<Action>> {
+        self.seats
+            .get(pid as usize)
+            .filter(|actions| !actions.is_empty())
+    }
+
+    /// Append one offer for `pid`.
+    pub fn push(&mut self, pid: u8, action: Action) {
+        self.seats[pid as usize].push(action);
+    }
+
+    /// Replace the offers of `pid`.
+    pub fn insert(&mut self, pid: u8, actions: Vec<Action>) {
+        self.seats[pid as usize] = actions;
+    }
+
+    pub fn clear(&mut self) {
+        for actions in &mut self.seats {
+            actions.clear();
+        }
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.seats.iter().all(|actions| actions.is_empty())
+    }
+
+    /// `(seat, offers)` for every seat with at least one offer, in seat order.
+    pub fn iter(&self) -> impl Iterator<Item = (u8, &Vec<Action>)> + '_ {
+        self.seats
+            .iter()
+            .enumerate()
+            .filter(|(_, actions)| !actions.is_empty())
+            .map(|(pid, actions)| (pid as u8, actions))
+    }
+
+    pub fn to_map(&self) -> HashMap<u8, Vec<Action>> {
+        self.iter()
+            .map(|(pid, actions)| (pid, actions.clone()))
+            .collect()
+    }
+}
+
+impl From<HashMap<u8, Vec<Action>>> for ClaimTable {
+    fn from(map: HashMap<u8, Vec<Action>>) -> Self {
+        let mut table = Self::new();
+        for (pid, actions) in map {
+            if (pid as usize) < 4 {
+                table.insert(pid, actions);
+            }
+        }
+        table
+    }
+}
@@ -0,0 +1,220 @@
+//! Determinization: complete game states consistent with one player's view.
+//!
+//! Everything the viewer can see is kept: their own hand, every discard and meld, the
+//! revealed dora indicators and the riichi declarations. The remaining tiles are dealt
+//! at random over the hidden slots, which are the opponents' concealed hands (sizes
+//! kept) and every unrevealed wall position, dead wall included. Only tile ids move
+//! between slots, so tile counts and red fives are preserved exactly.
+//!
+//! With `riichi_tenpai`, each opponent in riichi is then made tenpai by swapping tiles
+//! between their hand and the other hidden slots, so samples are biased towards hands
+//! that need few swaps rather than drawn uniformly from all tenpai deals.
+
+use rand::rngs::StdRng;
+use rand::seq::SliceRandom;
+use rand::Rng;
+
+use super::legal_actions::GameStateLegalActions;
+use super::wait_cache::compute_waits;
+use super::GameState;
+use crate::action::Phase;
+use crate::shanten;
+
+/// Swaps tried on one riichi hand before the deal is thrown away.
+const MAX_TENPAI_SWAPS: usize = 4096;
+
+/// Fresh deals tried before giving up on the riichi constraint.
+const MAX_DEALS: usize = 16;
+
+/// A position holding a tile the viewer cannot see.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum Slot {
+    /// `(player, index in hand)`.
+    Hand(u8, usize),
+    /// Index in `wall.tiles`.
+    Wall(usize),
+}
+
+impl GameState {
+    /// A copy of this state with every tile hidden from `viewer` redealt by `rng`.
+    ///
+    /// In `WaitResponse` the viewer must be one of the players deciding on a claim; the
+    /// opponents' offers are rebuilt from their new hands. Chankan offers of opponents
+    /// are dropped. The MJAI log and wall digest still describe the original deal.
+    pub fn determinize(
+        &self,
+        viewer: u8,
+        riichi_tenpai: bool,
+        rng: &mut StdRng,
+    ) -> Result<GameState, String> {
+        if viewer >= 4 {
+            return Err(format!("player_id must be 0-3, got {}", viewer));
+        }
+        if self.phase == Phase::WaitResponse && !self.active_players.contains(&viewer) {
+            return Err(format!("player {} has no pending claim to decide", viewer));
+        }
+
+        let slots = self.hidden_slots(viewer);
+        let tiles: Vec<u8> = slots.iter().map(|&s| self.slot_tile(s)).collect();
+        let drawn_slot = self.drawn_tile.and_then(|t| {
+            slots
+                .iter()
+                .position(|&s| matches!(s, Slot::Hand(..)) && self.slot_tile(s) == t)
+        });
+        let riichi: Vec<u8> = (0..4)
+            .filter(|&p| riichi_tenpai && p != viewer && self.players[p as usize].riichi_declared)
+            .collect();
+
+        let mut deal = tiles;
+        let mut frozen = vec![false; slots.len()];
+        for _ in 0..MAX_DEALS {
+            deal.shuffle(rng);
+            frozen.fill(false);
+            let all_tenpai = riichi.iter().all(|&p| {
+                let own: Vec<usize> = (0..slots.len())
+                    .filter(|&i| {
+                        Some(i) != drawn_slot && matches!(slots[i], Slot::Hand(q, _) if q == p)
+                    })
+                    .collect();
+                let num_melds = self.players[p as usize].melds.len();
+                make_tenpai(&mut deal, &mut frozen, &own, num_melds, rng)
+            });
+            if all_tenpai {
+                return Ok(self.with_deal(viewer, &slots, &deal, drawn_slot));
+            }
+        }
+        Err(format!(
+            "could not deal tenpai hands to the players in riichi after {} attempts",
+            MAX_DEALS
+        ))
+    }
+
+    /// Hidden positions in a fixed order: opponents' hands by seat, then the wall.
+    fn hidden_slots(&self, viewer: u8) -> Vec<Slot> {
+        let mut slots = Vec::with_capacity(self.wall.tiles.len() + 39);
+        for p in (0..4).filter(|&p| p != viewer) {
+            slots.extend((0..self.players[p as usize].hand.len()).map(|i| Slot::Hand(p, i)));
+        }
+
+        // Revealed indicators sit at 4, 6, 8, ... shifted down by the rinshan draws; a
+        // wall set up by hand may hold them elsewhere.
+        let wall = &self.wall.tiles;
+        let revealed: Vec<usize> = self
+            .wall
+            .dora_indicators
+            .iter()
+            .enumerate()
+            .filter_map(|(k, &ind)| {
+                let idx = (4 + 2 * k).saturating_sub(self.wall.rinshan_draw_count as usize);
+                if wall.get(idx) == Some(&ind) {
+                    Some(idx)
+                } else {
+                    wall.iter().position(|&t| t == ind)
+                }
+            })
+            .collect();
+        slots.extend(
+            (0..wall.len())
+                .filter(|i| !revealed.contains(i))
+                .map(Slot::Wall),
+        );
+        slots
+    }
+
+    fn slot_tile(&self, slot: Slot) -> u8 {
+        match slot {
+            Slot::Hand(p, i) => self.players[p as usize].hand[i],
+            Slot::Wall(i) => self.wall.tiles[i],
+        }
+    }
+
+    fn with_deal(
+        &self,
+        viewer: u8,
+        slots: &[Slot],
+        deal: &[u8],
+        drawn_slot: Option<usize>,
+    ) -> GameState {
+        let mut state = self.clone();
+        for p in (0..4).filter(|&p| p != viewer) {
+            let player = &mut state.players[p as usize];
+            player.hand.clear();
+            // Missed wins belong to the real hand and would leak it, so a redealt hand
+            // starts without them. Furiten on its own discards is derived from the new
+            // hand when claims are computed, and the wait cache is keyed by the hand.
+            player.missed_agari_riichi = false;
+            player.missed_agari_doujun = false;
+        }
+        // Hand slots are listed in seat and hand order, so pushing rebuilds each hand
+        // with its tiles in their original positions.
+        for (&slot, &tile) in slots.iter().zip(deal) {
+            match slot {
+                Slot::Hand(p, _) => state.players[p as usize].hand.push(tile),
+                Slot::Wall(i) => state.wall.tiles[i] = tile,
+            }
+        }
+        if let Some(i) = drawn_slot {
+            state.drawn_tile = Some(deal[i]);
+        }
+
+        if state.phase == Phase::WaitResponse {
+            let discard = if state.pending_kan.is_none() {
+                state.last_discard
+            } else {
+                None
+            };
+            for p in (0..4).filter(|&p| p != viewer) {
+                let offers = match discard {
+                    Some((pid, tile)) if pid != p => {
+                        state._get_claim_actions_for_player(p, pid, tile).0
+                    }
+                    _ => Vec::new(),
+                };
+                state.current_claims.insert(p, offers);
+            }
+            state.active_players = state.current_claims.iter().map(|(p, _)| p).collect();
+        }
+        state
+    }
+}
+
+/// Swap tiles between the hand at `own` and the unfrozen slots until the hand is
+/// tenpai, never letting its shanten rise. The hand's slots are frozen on success.
+fn make_tenpai(
+    deal: &mut [u8],
+    frozen: &mut [bool],
+    own: &[usize],
+    num_melds: usize,
+    rng: &mut StdRng,
+) -> bool {
+    for &i in own {
+        frozen[i] = true;
+    }
+    let mut counts = [0u8; 34];
+    for &i in own {
+        counts[deal[i] as usize / 4] += 1;
+    }
+    let mut current = shanten::shanten(&counts, num_melds);
+    for _ in 0..MAX_TENPAI_SWAPS {
+        if current <= 0 && !compute_waits(&counts, num_melds).is_empty() {
+            return true;
+        }
+        let i = own[rng.gen_range(0..own.len())];
+        let j = rng.gen_range(0..deal.len());
+        let (out, into) = (deal[i] as usize / 4, deal[j] as usize / 4);
+        if frozen[j] || out == into {
+            continue;
+        }
+        counts[out] -= 1;
+        counts[into] += 1;
+        let after = shanten::shanten(&counts, num_melds);
+        if after <= current {
+            deal.swap(i, j);
+            current = after;
+        } else {
+            counts[out] += 1;
+            counts[into] -= 1;
+        }
+    }
+    false
+}
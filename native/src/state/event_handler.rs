@@ -1,6 +1,7 @@
 use crate::action::Phase;
 use crate::parser::mjai_to_tid;
 use crate::replay::{Action as LogAction, MjaiEvent};
+use crate::state::compact::HandTiles;
 use crate::state::GameState;
 use crate::types::{Meld, MeldType, Wind};
 
@@ -8,13 +9,15 @@ fn parse_mjai_tile(s: &str) -> u8 {
     mjai_to_tid(s).unwrap_or(0)
 }
 
+/// Both methods fail on a hand that would outgrow `MAX_HAND_TILES` or get an invalid
+/// tile id; the state may be partly updated by then.
 pub trait GameStateEventHandler {
-    fn apply_mjai_event(&mut self, event: MjaiEvent);
-    fn apply_log_action(&mut self, action: &LogAction);
+    fn apply_mjai_event(&mut self, event: MjaiEvent) -> Result<(), String>;
+    fn apply_log_action(&mut self, action: &LogAction) -> Result<(), String>;
 }
 
 impl GameStateEventHandler for GameState {
-    fn apply_mjai_event(&mut self, event: MjaiEvent) {
+    fn apply_mjai_event(&mut self, event: MjaiEvent) -> Result<(), String> {
         match event {
             MjaiEvent::StartKyoku {
                 bakaze,
@@ -49,7 +52,7 @@ impl GameStateEventHandler for GameState {
                         hand.push(parse_mjai_tile(tile_str));
                     }
                     hand.sort();
-                    self.players[i].hand = hand;
+                    self.players[i].hand = HandTiles::try_from_tiles(&hand)?;
                 }
 
                 // Clear other state
@@ -68,7 +71,7 @@ impl GameStateEventHandler for GameState {
                 let tile = parse_mjai_tile(&pai);
                 self.current_player = actor as u8;
                 self.drawn_tile = Some(tile);
-                self.players[actor].hand.push(tile);
+                self.players[actor].hand.try_push(tile)?;
                 self.players[actor].hand.sort();
                 if !self.wall.tiles.is_empty() {
                     self.wall.tiles.pop();
@@ -220,9 +223,10 @@ impl GameStateEventHandler for GameState {
             }
             _ => {}
         }
+        Ok(())
     }
 
-    fn apply_log_action(&mut self, action: &LogAction) {
+    fn apply_log_action(&mut self, action: &LogAction) -> Result<(), String> {
         match action {
             LogAction::DiscardTile {
                 seat,
@@ -264,7 +268,7 @@ impl GameStateEventHandler for GameState {
                 self.is_after_kan = false;
             }
             LogAction::DealTile { seat, tile, .. } => {
-                self.players[*seat].hand.push(*tile);
+                self.players[*seat].hand.try_push(*tile)?;
                 self.drawn_tile = Some(*tile);
                 self.current_player = *seat as u8;
                 self.phase = Phase::WaitAct;
@@ -371,5 +375,6 @@ impl GameStateEventHandler for GameState {
             }
             _ => {}
         }
+        Ok(())
     }
 }
@@ -1,6 +1,7 @@
 use crate::action::{Action, ActionType, Phase};
+use crate::state::wait_cache::{agari_counts, compute_waits};
 use crate::state::GameState;
-use crate::types::{is_terminal_tile, Conditions, Meld, MeldType, Wind};
+use crate::types::{is_terminal_tile, Conditions, MeldType, Wind};
 
 pub trait GameStateLegalActions {
     fn _get_legal_actions_internal(&self, pid: u8) -> Vec<Action>;
@@ -11,7 +12,7 @@ impl GameStateLegalActions for GameState {
     fn _get_legal_actions_internal(&self, pid: u8) -> Vec<Action> {
         let mut legals = Vec::new();
         let pid_us = pid as usize;
-        let mut hand = self.players[pid_us].hand.clone();
+        let mut hand = self.players[pid_us].hand;
         hand.sort();
 
         if self.is_done {
@@ -42,7 +43,7 @@ impl GameStateLegalActions for GameState {
                         kyoutaku: self.riichi_sticks,
                         tsumi: self.honba as u32,
                     };
-                    let mut hand = self.players[pid_us].hand.clone();
+                    let mut hand = self.players[pid_us].hand.to_vec();
                     if let Some(idx) = hand.iter().rposition(|&t| t == tile) {
                         hand.remove(idx);
                     }
@@ -71,39 +72,29 @@ impl GameStateLegalActions for GameState {
 
             if !self.players[pid_us].riichi_declared || declaration_turn {
                 for &t in self.players[pid_us].hand.iter() {
-                    let is_forbidden = self.players[pid_us]
-                        .forbidden_discards
-                        .iter()
-                        .any(|&f| f / 4 == t / 4);
+                    let is_forbidden = self.players[pid_us].forbidden_discards.contains(t / 4);
                     if !is_forbidden {
                         legals.push(Action::new(ActionType::Discard, Some(t), vec![]));
                     }
                 }
 
                 // Riichi check (Only if not already declared)
+                // The action carries the hand tiles whose discard keeps tenpai.
                 if !self.players[pid_us].riichi_declared
                     && self.players[pid_us].score >= 1000
                     && self.wall.tiles.len() >= 18
                     && self.players[pid_us].melds.iter().all(|m| !m.opened)
                     && !self.players[pid_us].riichi_stage
                 {
-                    let indices: Vec<usize> = (0..self.players[pid_us].hand.len()).collect();
-                    let mut can_riichi = false;
-
-                    for &skip_idx in &indices {
-                        let mut temp_hand = self.players[pid_us].hand.clone();
-                        temp_hand.remove(skip_idx);
-                        let calc = crate::agari_calculator::AgariCalculator::new(
-                            temp_hand,
-                            self.players[pid_us].melds.clone(),
-                        );
-                        if calc.is_tenpai() {
-                            can_riichi = true;
-                            break;
-                        }
-                    }
-                    if can_riichi {
-                        legals.push(Action::new(ActionType::Riichi, None, vec![]));
+                    let tenpai_discards = self.tenpai_discards(pid);
+                    if !tenpai_discards.is_empty() {
+                        let candidates = self.players[pid_us]
+                            .hand
+                            .iter()
+                            .copied()
+                            .filter(|&t| tenpai_discards.contains(t / 4))
+                            .collect();
+                        legals.push(Action::new(ActionType::Riichi, None, candidates));
                     }
                 }
             } else if let Some(dt) = self.drawn_tile {
@@ -112,11 +103,7 @@ impl GameStateLegalActions for GameState {
 
             // 3. Kan (Ankan / Kakan)
             if self.wall.tiles.len() > 14 && self.drawn_tile.is_some() {
-                let mut counts = [0; 34];
-                for &t in &self.players[pid_us].hand {
-                    let idx = t as usize / 4;
-                    counts[idx] += 1;
-                }
+                let counts = self.players[pid_us].hand.counts();
 
                 if !self.players[pid_us].riichi_declared && !self.players[pid_us].riichi_stage {
                     // Ankan
@@ -148,33 +135,17 @@ impl GameStateLegalActions for GameState {
                     if let Some(t) = self.drawn_tile {
                         let t34 = t / 4;
                         if counts[t34 as usize] == 4 {
-                            // Check waits
-                            let mut hand_pre = self.players[pid_us].hand.clone();
-                            if let Some(pos) = hand_pre.iter().position(|&x| x == t) {
-                                hand_pre.remove(pos);
-                            }
-                            let calc_pre = crate::agari_calculator::AgariCalculator::new(
-                                hand_pre,
-                                self.players[pid_us].melds.clone(),
-                            );
-                            let mut waits_pre = calc_pre.get_waits();
-                            waits_pre.sort();
+                            // Check waits: the hand before the draw is the cached riichi hand
+                            let waits_pre = self.player_waits_without(pid, t34);
 
-                            let mut hand_post = self.players[pid_us].hand.clone();
-                            hand_post.retain(|&x| x / 4 != t34);
-                            let mut melds_post = self.players[pid_us].melds.clone();
-                            let lowest = t34 * 4;
-                            melds_post.push(Meld::new(
-                                MeldType::Angang,
-                                vec![lowest, lowest + 1, lowest + 2, lowest + 3],
-                                false,
-                                -1,
-                            ));
-                            let calc_post = crate::agari_calculator::AgariCalculator::new(
-                                hand_post, melds_post,
+                            let mut counts_post = agari_counts(
+                                &self.players[pid_us].hand,
+                                &self.players[pid_us].melds,
                             );
-                            let mut waits_post = calc_post.get_waits();
-                            waits_post.sort();
+                            counts_post[t34 as usize] = 0;
+                            let waits_post =
+                                compute_waits(&counts_post, self.players[pid_us].melds.len() + 1);
+                            let lowest = t34 * 4;
 
                             if waits_pre == waits_post && !waits_pre.is_empty() {
                                 let consume = vec![lowest, lowest + 1, lowest + 2, lowest + 3];
@@ -204,7 +175,7 @@ impl GameStateLegalActions for GameState {
                 }
             }
         } else if self.phase == Phase::WaitResponse {
-            if let Some(acts) = self.current_claims.get(&pid) {
+            if let Some(acts) = self.current_claims.get(pid) {
                 legals.extend(acts.clone());
             }
             // Always offer Pass
@@ -230,7 +201,6 @@ impl GameStateLegalActions for GameState {
             || (self.players[i_us].riichi_declared && self.players[i_us].missed_agari_riichi);
 
         if !in_discards && !in_missed {
-            let calc = crate::agari_calculator::AgariCalculator::new(hand.clone(), melds.clone());
             let p_wind = (i + 4 - self.oya) % 4;
             let cond = Conditions {
                 tsumo: false,
@@ -248,19 +218,19 @@ impl GameStateLegalActions for GameState {
                 tsumi: self.honba as u32,
             };
 
-            let mut is_furiten = false;
-            let waits = calc.get_waits_u8();
-            for &w in &waits {
-                if self.players[i_us].discards.iter().any(|&d| d / 4 == w) {
-                    is_furiten = true;
-                    break;
-                }
-            }
+            let waits = self.player_waits(i);
+            let mut is_furiten = self.players[i_us]
+                .discards
+                .iter()
+                .any(|&d| waits.contains(d / 4));
             if self.players[i_us].missed_agari_riichi || self.players[i_us].missed_agari_doujun {
                 is_furiten = true;
             }
 
-            if !is_furiten {
+            // A tile outside the waits can neither win nor count as a missed agari.
+            if !is_furiten && waits.contains(tile_class) {
+                let calc =
+                    crate::agari_calculator::AgariCalculator::new(hand.to_vec(), melds.clone());
                 let res = calc.calc(tile, self.wall.dora_indicators.clone(), vec![], Some(cond));
                 if res.agari {
                     legals.push(Action::new(ActionType::Ron, Some(tile), vec![]));
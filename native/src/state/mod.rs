@@ -1,21 +1,27 @@
 use std::collections::HashMap;
+use std::sync::{Arc, OnceLock};
 
 use pyo3::prelude::*;
 
 use serde_json::Value;
 
 use crate::action::{Action, ActionType, Phase};
-use crate::observation::Observation;
+use crate::observation::{Observation, TableTiles};
 use crate::parser::tid_to_mjai;
 use crate::replay::Action as LogAction;
 use crate::replay::MjaiEvent;
 use crate::rule::GameRule;
 use crate::types::{Agari, Conditions, Meld, MeldType, Wind};
 
+pub mod compact;
+pub mod determinize;
 pub mod event_handler;
 pub mod legal_actions;
 pub mod player;
+pub mod snapshot;
+pub mod wait_cache;
 pub mod wall;
+use compact::ClaimTable;
 use event_handler::GameStateEventHandler;
 use legal_actions::GameStateLegalActions;
 use player::PlayerState;
@@ -39,7 +45,7 @@ pub struct GameState {
     pub phase: Phase,
     pub active_players: Vec<u8>,
     pub last_discard: Option<(u8, u8)>,
-    pub current_claims: HashMap<u8, Vec<Action>>,
+    pub current_claims: ClaimTable,
     pub pending_kan: Option<(u8, Action)>,
 
     pub oya: u8,
@@ -58,7 +64,7 @@ pub struct GameState {
 
     pub mjai_log: Vec<String>,
     pub player_event_counts: [usize; 4],
-    pub mjai_log_per_player: [Vec<String>; 4],
+    pub mjai_log_per_player: [Vec<Arc<str>>; 4],
 
     pub game_mode: u8,
     pub skip_mjai_logging: bool,
@@ -69,6 +75,10 @@ pub struct GameState {
 
     pub riichi_sutehais: [Option<u8>; 4], // Tile discarded when declaring riichi
     pub last_tedashis: [Option<u8>; 4],   // Last hand discard (not tsumogiri)
+
+    /// Resolve decisions with a single legal action (e.g. pass-only response windows,
+    /// tsumogiri after riichi) inside `step` instead of returning them to the caller.
+    pub auto_pass: bool,
 }
 
 impl GameState {
@@ -102,7 +112,7 @@ impl GameState {
             phase: Phase::WaitAct,
             active_players: Vec::new(),
             last_discard: None,
-            current_claims: HashMap::new(),
+            current_claims: ClaimTable::new(),
             pending_kan: None,
             oya: 0,
             honba: 0,
@@ -126,6 +136,7 @@ impl GameState {
             is_after_kan: false,
             riichi_sutehais: [None; 4],
             last_tedashis: [None; 4],
+            auto_pass: false,
         };
 
         if !state.skip_mjai_logging {
@@ -151,27 +162,44 @@ impl GameState {
         }
     }
 
+    /// Build the observation of `player_id`.
+    ///
+    /// Per-player data is converted straight into the observation's layout. Waits and
+    /// tenpai are taken from the player's wait cache when already known and are otherwise
+    /// left for `Observation::wait_info` to compute on first access.
     pub fn get_observation(&mut self, player_id: u8) -> Observation {
-        let pid = player_id as usize;
-
-        let mut masked_hands = Vec::new();
-        for (i, p) in self.players.iter().enumerate() {
-            if i == pid {
-                masked_hands.push(p.hand.clone());
-            } else {
-                masked_hands.push(Vec::new());
-            }
-        }
-
         let legal_actions = if self.is_done {
             Vec::new()
-        } else if (self.phase == Phase::WaitAct && self.current_player == player_id)
-            || (self.phase == Phase::WaitResponse && self.active_players.contains(&player_id))
-        {
+        } else if self.is_pending(player_id) {
             self._get_legal_actions_internal(player_id)
         } else {
             Vec::new()
         };
+        self.observation_with(player_id, legal_actions)
+    }
+
+    /// Whether `player_id` has a decision to make in the current phase.
+    fn is_pending(&self, player_id: u8) -> bool {
+        (self.phase == Phase::WaitAct && self.current_player == player_id)
+            || (self.phase == Phase::WaitResponse && self.active_players.contains(&player_id))
+    }
+
+    /// Observation of `player_id` offering `legal_actions`.
+    fn observation_with(&mut self, player_id: u8, legal_actions: Vec<Action>) -> Observation {
+        let pid = player_id as usize;
+
+        let hands: Vec<Vec<u32>> = self
+            .players
+            .iter()
+            .enumerate()
+            .map(|(i, p)| {
+                if i == pid {
+                    p.hand.iter().map(|&t| t as u32).collect()
+                } else {
+                    Vec::new()
+                }
+            })
+            .collect();
 
         let old_count = self.player_event_counts[pid];
         let full_log_len = self.mjai_log_per_player[pid].len();
@@ -182,108 +210,147 @@ impl GameState {
         };
         self.player_event_counts[pid] = full_log_len;
 
-        let calc = crate::agari_calculator::AgariCalculator::new(
-            self.players[pid].hand.clone(),
-            self.players[pid].melds.clone(),
-        );
-        let waits = calc.get_waits_u8();
-        let is_tenpai = !waits.is_empty();
-
-        let melds: Vec<Vec<Meld>> = self.players.iter().map(|p| p.melds.clone()).collect();
-        let discards: Vec<Vec<u8>> = self.players.iter().map(|p| p.discards.clone()).collect();
-        let scores: Vec<i32> = self.players.iter().map(|p| p.score).collect();
-        let riichi_declared: Vec<bool> = self.players.iter().map(|p| p.riichi_declared).collect();
-
-        Observation::new(
+        Observation {
             player_id,
-            masked_hands,
-            melds,
-            discards,
-            self.wall.dora_indicators.clone(),
-            scores,
-            riichi_declared,
-            legal_actions,
-            new_events,
-            self.honba,
-            self.riichi_sticks,
-            self.round_wind,
-            self.oya,
-            self.kyoku_idx,
-            waits,
-            is_tenpai,
-            self.riichi_sutehais.to_vec(),
-            self.last_tedashis.to_vec(),
-            self.last_discard.map(|(tile, _pid)| tile as u32),
-        )
+            hands,
+            table: TableTiles::new(
+                self.players.iter().map(|p| p.discards.as_slice()),
+                self.players.iter().map(|p| p.melds.as_slice()),
+                &self.wall.dora_indicators,
+            ),
+            melds: OnceLock::new(),
+            discards: OnceLock::new(),
+            dora_indicators: OnceLock::new(),
+            scores: self.players.iter().map(|p| p.score).collect(),
+            riichi_declared: self.players.iter().map(|p| p.riichi_declared).collect(),
+            _legal_actions: legal_actions,
+            events: new_events,
+            honba: self.honba,
+            riichi_sticks: self.riichi_sticks,
+            round_wind: self.round_wind,
+            oya: self.oya,
+            kyoku_index: self.kyoku_idx,
+            wait_info: match self.peek_player_waits(player_id) {
+                Some(waits) => OnceLock::from((waits.iter().collect(), !waits.is_empty())),
+                None => OnceLock::new(),
+            },
+            tsumogiri_flags: vec![vec![]; 4],
+            riichi_sutehais: self.riichi_sutehais.to_vec(),
+            last_tedashis: self.last_tedashis.to_vec(),
+            last_discard: self.last_discard.map(|(tile, _pid)| tile as u32),
+        }
     }
 
+    /// Observation of `pid` just before the logged `env_action` is applied.
+    ///
+    /// Replays never open response windows, so a logged claim is offered to `pid` next
+    /// to `Pass` instead of being checked. Any other action must be among `pid`'s legal
+    /// actions, taken from `cached_legal` when the caller already has them for the
+    /// current state. A discard that the riichi lock forbids is accepted if it would be
+    /// legal without riichi, and `riichi_declared` is then cleared. Fails with a
+    /// desync error if the action is not legal.
     pub fn get_observation_for_replay(
         &mut self,
         pid: u8,
         env_action: &Action,
-        log_action_str: &str,
+        log_action: &impl std::fmt::Debug,
+        cached_legal: Option<Vec<Action>>,
     ) -> PyResult<Observation> {
-        let original_phase = self.phase;
-        let original_active_players = self.active_players.clone();
-        let original_claims = self.current_claims.clone();
-        let original_riichi = self.players[pid as usize].riichi_declared;
-
-        match env_action.action_type {
-            ActionType::Ron | ActionType::Chi | ActionType::Pon | ActionType::Daiminkan => {
-                self.phase = Phase::WaitResponse;
-                self.active_players = vec![pid];
-                self.current_claims
-                    .entry(pid)
-                    .or_default()
-                    .push(env_action.clone());
-            }
-            _ => {}
+        match self.replay_legal_actions(pid, env_action, cached_legal) {
+            Some(legal_actions) => Ok(self.observation_with(pid, legal_actions)),
+            None => Err(pyo3::exceptions::PyRuntimeError::new_err(format!(
+                "Replay desync:\n  Env action: {:?}\n  Log action: {:?}\n  Self state:\n    phase: {:?}\n    drawn: {:?}",
+                env_action,
+                log_action,
+                self.phase,
+                self.drawn_tile
+            ))),
         }
+    }
 
-        let mut obs = self.get_observation(pid);
+    /// Legal actions of `pid` if `env_action` is among them, `None` otherwise.
+    fn replay_legal_actions(
+        &mut self,
+        pid: u8,
+        env_action: &Action,
+        cached_legal: Option<Vec<Action>>,
+    ) -> Option<Vec<Action>> {
+        if self.is_done {
+            return None;
+        }
+        if matches!(
+            env_action.action_type,
+            ActionType::Ron | ActionType::Chi | ActionType::Pon | ActionType::Daiminkan
+        ) {
+            let mut legal = self.current_claims.get(pid).cloned().unwrap_or_default();
+            legal.push(env_action.clone());
+            legal.push(Action::new(ActionType::Pass, None, vec![]));
+            return Some(legal);
+        }
+        if !self.is_pending(pid) {
+            return None;
+        }
 
-        let mut exists = obs
-            ._legal_actions
+        let legal = cached_legal.unwrap_or_else(|| self._get_legal_actions_internal(pid));
+        if legal
             .iter()
-            .any(|a| a.action_type == env_action.action_type && a.tile == env_action.tile);
-
-        if !exists
-            && env_action.action_type == ActionType::Discard
-            && self.players[pid as usize].riichi_declared
+            .any(|a| a.action_type == env_action.action_type && a.tile == env_action.tile)
         {
-            self.players[pid as usize].riichi_declared = false;
-            let new_obs = self.get_observation(pid);
-            let is_legal_retry = new_obs
-                ._legal_actions
-                .iter()
-                .any(|a| a.action_type == ActionType::Discard && a.tile == env_action.tile);
-
-            if is_legal_retry {
-                obs = new_obs;
-                exists = true;
-            } else {
-                self.players[pid as usize].riichi_declared = original_riichi;
-            }
+            return Some(legal);
         }
 
-        self.phase = original_phase;
-        self.active_players = original_active_players;
-        self.current_claims = original_claims;
+        let player = &self.players[pid as usize];
+        let legal_without_riichi = env_action.action_type == ActionType::Discard
+            && self.phase == Phase::WaitAct
+            && player.riichi_declared
+            && env_action.tile.is_some_and(|t| {
+                player.hand.contains(&t) && !player.forbidden_discards.contains(t / 4)
+            });
+        if !legal_without_riichi {
+            return None;
+        }
+        self.players[pid as usize].riichi_declared = false;
+        Some(self._get_legal_actions_internal(pid))
+    }
 
-        if !exists {
-            return Err(pyo3::exceptions::PyRuntimeError::new_err(format!(
-                "Replay desync:\n  Env action: {:?}\n  Log action: {}\n  Self state:\n    phase: {:?}\n    drawn: {:?}",
-                env_action,
-                log_action_str,
-                self.phase,
-                self.drawn_tile
-            )));
+    pub fn step(&mut self, actions: &HashMap<u8, Action>) {
+        self._apply_step(actions);
+        if self.auto_pass {
+            self._resolve_forced_actions();
         }
+    }
 
-        Ok(obs)
+    /// Seats whose decision is pending in the current phase.
+    pub fn pending_seats(&self) -> Vec<u8> {
+        match self.phase {
+            Phase::WaitAct => vec![self.current_player],
+            Phase::WaitResponse => self.active_players.clone(),
+        }
     }
 
-    pub fn step(&mut self, actions: &HashMap<u8, Action>) {
+    /// Keep stepping while every pending seat has exactly one legal action.
+    ///
+    /// Response windows where nobody can do anything but pass, and forced moves such as
+    /// tsumogiri after riichi, are played out here so control only returns to the caller
+    /// when a real decision exists.
+    pub fn _resolve_forced_actions(&mut self) {
+        while !self.is_done && self.last_error.is_none() {
+            let mut forced = HashMap::new();
+            for pid in self.pending_seats() {
+                let mut legals = self._get_legal_actions_internal(pid);
+                if legals.len() != 1 {
+                    return;
+                }
+                forced.insert(pid, legals.remove(0));
+            }
+            if forced.is_empty() {
+                return;
+            }
+            self._apply_step(&forced);
+        }
+    }
+
+    fn _apply_step(&mut self, actions: &HashMap<u8, Action>) {
         if self.is_done {
             return;
         }
@@ -448,7 +515,7 @@ impl GameState {
                                     .discards
                                     .iter()
                                     .any(|&d| d / 4 == tile_class);
-                                if in_discards {
+                                if in_discards || !self.player_waits(i).contains(tile_class) {
                                     continue;
                                 }
 
@@ -462,7 +529,7 @@ impl GameState {
                                     ..Default::default()
                                 };
                                 let calc = crate::agari_calculator::AgariCalculator::new(
-                                    hand.clone(),
+                                    hand.to_vec(),
                                     melds.clone(),
                                 );
                                 let res = calc.calc(
@@ -475,11 +542,8 @@ impl GameState {
                                 // 42=Kokushi, 49=Kokushi13
                                 if res.agari && (res.yaku.contains(&42) || res.yaku.contains(&49)) {
                                     chankan_ronners.push(i);
-                                    self.current_claims.entry(i).or_default().push(Action::new(
-                                        ActionType::Ron,
-                                        Some(tile),
-                                        vec![],
-                                    ));
+                                    self.current_claims
+                                        .push(i, Action::new(ActionType::Ron, Some(tile), vec![]));
                                 }
                             }
                         }
@@ -552,24 +616,13 @@ impl GameState {
                                 kyoutaku: self.riichi_sticks,
                                 tsumi: self.honba as u32,
                             };
-                            let calc = crate::agari_calculator::AgariCalculator::new(
-                                hand.clone(),
-                                melds.clone(),
-                            );
 
                             // Check Furiten
-                            let mut is_furiten = false;
-                            let waits = calc.get_waits_u8();
-                            for &w in &waits {
-                                if self.players[i as usize]
-                                    .discards
-                                    .iter()
-                                    .any(|&d| d / 4 == w)
-                                {
-                                    is_furiten = true;
-                                    break;
-                                }
-                            }
+                            let waits = self.player_waits(i);
+                            let mut is_furiten = self.players[i as usize]
+                                .discards
+                                .iter()
+                                .any(|&d| waits.contains(d / 4));
                             if self.players[i as usize].missed_agari_riichi
                                 || self.players[i as usize].missed_agari_doujun
                             {
@@ -577,7 +630,11 @@ impl GameState {
                             }
 
                             // If valid:
-                            let res = if !is_furiten {
+                            let res = if !is_furiten && waits.contains(tile / 4) {
+                                let calc = crate::agari_calculator::AgariCalculator::new(
+                                    hand.to_vec(),
+                                    melds.clone(),
+                                );
                                 calc.calc(
                                     tile,
                                     self.wall.dora_indicators.clone(),
@@ -602,11 +659,8 @@ impl GameState {
                             if res.agari && (res.yakuman || res.han >= 1) {
                                 // Add Ron action offer
                                 chankan_ronners.push(i);
-                                self.current_claims.entry(i).or_default().push(Action::new(
-                                    ActionType::Ron,
-                                    Some(tile),
-                                    vec![],
-                                ));
+                                self.current_claims
+                                    .push(i, Action::new(ActionType::Ron, Some(tile), vec![]));
                             }
                         }
 
@@ -639,7 +693,7 @@ impl GameState {
                             ..Default::default()
                         };
                         let calc = crate::agari_calculator::AgariCalculator::new(
-                            hand.clone(),
+                            hand.to_vec(),
                             melds.clone(),
                         );
                         let win_tile = self.drawn_tile.unwrap_or(0);
@@ -668,10 +722,10 @@ impl GameState {
                                     };
                                     total_yakuman_val += val;
                                     if let Some(liable) =
-                                        self.players[pid as usize].pao.get(&(yid as u8))
+                                        self.players[pid as usize].pao.get(yid as u8)
                                     {
                                         pao_yakuman_val += val;
-                                        pao_payer = Some(*liable);
+                                        pao_payer = Some(liable);
                                     }
                                 }
                             }
@@ -750,7 +804,7 @@ impl GameState {
                             }
 
                             let mut val = res;
-                            for (&yid, &liable) in &self.players[pid as usize].pao {
+                            for (yid, liable) in self.players[pid as usize].pao.iter() {
                                 if val.yaku.contains(&(yid as u32)) {
                                     val.pao_payer = Some(liable);
                                     break;
@@ -792,7 +846,7 @@ impl GameState {
             }
         } else if self.phase == Phase::WaitResponse {
             // Check Missed Agari for all who could Ron but didn't
-            for (&pid, legals) in &self.current_claims {
+            for (pid, legals) in self.current_claims.iter() {
                 if legals.iter().any(|a| a.action_type == ActionType::Ron) {
                     let mut roned = false;
                     if let Some(act) = actions.get(&pid) {
@@ -873,7 +927,7 @@ impl GameState {
                     };
 
                     let calc =
-                        crate::agari_calculator::AgariCalculator::new(hand.clone(), melds.clone());
+                        crate::agari_calculator::AgariCalculator::new(hand.to_vec(), melds.clone());
                     let res = calc.calc(
                         win_tile,
                         self.wall.dora_indicators.clone(),
@@ -897,10 +951,10 @@ impl GameState {
                                     1
                                 };
                                 if let Some(liable) =
-                                    self.players[w_pid as usize].pao.get(&(yid as u8))
+                                    self.players[w_pid as usize].pao.get(yid as u8)
                                 {
                                     pao_yakuman_val += val;
-                                    pao_payer = *liable;
+                                    pao_payer = liable;
                                 }
                             }
 
@@ -929,7 +983,7 @@ impl GameState {
                         }
 
                         let mut val = res;
-                        for (&yid, &liable) in &self.players[w_pid as usize].pao {
+                        for (yid, liable) in self.players[w_pid as usize].pao.iter() {
                             if val.yaku.contains(&(yid as u32)) {
                                 val.pao_payer = Some(liable);
                                 break;
@@ -1089,9 +1143,13 @@ impl GameState {
                 self.players[claimer as usize].forbidden_discards.clear();
 
                 if action.action_type == ActionType::Pon {
-                    self.players[claimer as usize].forbidden_discards.push(tile);
+                    self.players[claimer as usize]
+                        .forbidden_discards
+                        .insert(tile / 4);
                 } else if action.action_type == ActionType::Chi {
-                    self.players[claimer as usize].forbidden_discards.push(tile);
+                    self.players[claimer as usize]
+                        .forbidden_discards
+                        .insert(tile / 4);
                     let t34 = tile / 4;
                     let mut consumed_34: Vec<u8> =
                         action.consume_tiles.iter().map(|&x| x / 4).collect();
@@ -1100,7 +1158,7 @@ impl GameState {
                         if t34 % 9 <= 5 {
                             self.players[claimer as usize]
                                 .forbidden_discards
-                                .push((t34 + 3) * 4);
+                                .insert(t34 + 3);
                         }
                     } else if t34 >= 2
                         && consumed_34[1] == t34 - 1
@@ -1109,7 +1167,7 @@ impl GameState {
                     {
                         self.players[claimer as usize]
                             .forbidden_discards
-                            .push((t34 - 3) * 4);
+                            .insert(t34 - 3);
                     }
                 }
 
@@ -1477,7 +1535,7 @@ impl GameState {
             p.reset_round();
         }
         self.is_done = false;
-        self.current_claims = HashMap::new();
+        self.current_claims.clear();
         self.pending_kan = None;
         self.is_rinshan_flag = false;
         self.wall.rinshan_draw_count = 0;
@@ -1595,12 +1653,8 @@ impl GameState {
         let mut nagashi_winners = Vec::new();
 
         if reason == "exhaustive_draw" {
-            for (i, p) in self.players.iter().enumerate() {
-                let calc =
-                    crate::agari_calculator::AgariCalculator::new(p.hand.clone(), p.melds.clone());
-                if calc.is_tenpai() {
-                    tenpai[i] = true;
-                }
+            for (i, t) in tenpai.iter_mut().enumerate() {
+                *t = !self.player_waits(i as u8).is_empty();
             }
             for (i, p) in self.players.iter().enumerate() {
                 if p.nagashi_eligible {
@@ -1768,11 +1822,11 @@ impl GameState {
         }
     }
 
-    pub fn apply_mjai_event(&mut self, event: MjaiEvent) {
+    pub fn apply_mjai_event(&mut self, event: MjaiEvent) -> Result<(), String> {
         <Self as GameStateEventHandler>::apply_mjai_event(self, event)
     }
 
-    pub fn apply_log_action(&mut self, action: &LogAction) {
+    pub fn apply_log_action(&mut self, action: &LogAction) -> Result<(), String> {
         <Self as GameStateEventHandler>::apply_log_action(self, action)
     }
 }
@@ -1819,7 +1873,7 @@ impl GameState {
             }
 
             if should_push {
-                self.mjai_log_per_player[pid].push(final_json);
+                self.mjai_log_per_player[pid].push(final_json.into());
             }
         }
     }
@@ -1,14 +1,14 @@
-use std::collections::HashMap;
-
+use crate::state::compact::{DiscardFlags, HandTiles, PaoTable, TileMask};
+use crate::state::wait_cache::WaitCache;
 use crate::types::Meld;
 
 #[derive(Debug, Clone)]
 pub struct PlayerState {
-    pub hand: Vec<u8>,
+    pub hand: HandTiles,
     pub melds: Vec<Meld>,
     pub discards: Vec<u8>,
-    pub discard_from_hand: Vec<bool>,
-    pub discard_is_riichi: Vec<bool>,
+    pub discard_from_hand: DiscardFlags,
+    pub discard_is_riichi: DiscardFlags,
     pub riichi_declaration_index: Option<usize>,
     pub score: i32,
     pub score_delta: i32,
@@ -19,19 +19,21 @@ pub struct PlayerState {
     pub missed_agari_doujun: bool,
     pub nagashi_eligible: bool,
     pub ippatsu_cycle: bool,
-    pub pao: HashMap<u8, u8>,
-    pub forbidden_discards: Vec<u8>,
-    pub mjai_log: Vec<String>,
+    pub pao: PaoTable,
+    /// Tile kinds that may not be discarded right after a call (kuikae).
+    pub forbidden_discards: TileMask,
+    /// Waits and tenpai discards of the current hand (see `GameState::player_waits`).
+    pub wait_cache: WaitCache,
 }
 
 impl PlayerState {
     pub fn new(starting_score: i32) -> Self {
         Self {
-            hand: Vec::new(),
+            hand: HandTiles::new(),
             melds: Vec::new(),
             discards: Vec::new(),
-            discard_from_hand: Vec::new(),
-            discard_is_riichi: Vec::new(),
+            discard_from_hand: DiscardFlags::new(),
+            discard_is_riichi: DiscardFlags::new(),
             riichi_declaration_index: None,
             score: starting_score,
             score_delta: 0,
@@ -42,9 +44,9 @@ impl PlayerState {
             missed_agari_doujun: false,
             nagashi_eligible: true,
             ippatsu_cycle: false,
-            pao: HashMap::new(),
-            forbidden_discards: Vec::new(),
-            mjai_log: Vec::new(),
+            pao: PaoTable::new(),
+            forbidden_discards: TileMask::EMPTY,
+            wait_cache: WaitCache::default(),
         }
     }
 
@@ -63,7 +65,6 @@ impl PlayerState {
         self.nagashi_eligible = true;
         self.ippatsu_cycle = false;
         self.forbidden_discards.clear();
-        self.mjai_log.clear();
         // pao is usually cleared? Original code: self.pao = [HashMap::new(); 4]; in _initialize_round
         self.pao.clear();
     }
@@ -0,0 +1,167 @@
+// Restoring a snapshot goes field by field with `clone_from`, so the vectors and maps
+// already owned by the live state keep their allocations. The destructuring is exhaustive
+// on purpose: a new field fails to compile until it is handled here.
+
+use super::player::PlayerState;
+use super::wall::WallState;
+use super::GameState;
+
+impl GameState {
+    /// Overwrite `self` with `src`, reusing the buffers `self` already owns.
+    pub fn restore_from(&mut self, src: &GameState) {
+        let GameState {
+            wall,
+            players,
+            current_player,
+            turn_count,
+            is_done,
+            needs_tsumo,
+            needs_initialize_next_round,
+            pending_oya_won,
+            pending_is_draw,
+            riichi_sticks,
+            phase,
+            active_players,
+            last_discard,
+            current_claims,
+            pending_kan,
+            oya,
+            honba,
+            kyoku_idx,
+            round_wind,
+            is_rinshan_flag,
+            is_first_turn,
+            riichi_pending_acceptance,
+            drawn_tile,
+            agari_results,
+            last_agari_results,
+            round_end_scores,
+            mjai_log,
+            player_event_counts,
+            mjai_log_per_player,
+            game_mode,
+            skip_mjai_logging,
+            seed,
+            rule,
+            last_error,
+            is_after_kan,
+            riichi_sutehais,
+            last_tedashis,
+            auto_pass,
+        } = src;
+        self.wall.restore_from(wall);
+        for (dst, src) in self.players.iter_mut().zip(players.iter()) {
+            dst.restore_from(src);
+        }
+        self.current_player = *current_player;
+        self.turn_count = *turn_count;
+        self.is_done = *is_done;
+        self.needs_tsumo = *needs_tsumo;
+        self.needs_initialize_next_round = *needs_initialize_next_round;
+        self.pending_oya_won = *pending_oya_won;
+        self.pending_is_draw = *pending_is_draw;
+        self.riichi_sticks = *riichi_sticks;
+        self.phase = *phase;
+        self.active_players.clone_from(active_players);
+        self.last_discard = *last_discard;
+        self.current_claims.clone_from(current_claims);
+        self.pending_kan.clone_from(pending_kan);
+        self.oya = *oya;
+        self.honba = *honba;
+        self.kyoku_idx = *kyoku_idx;
+        self.round_wind = *round_wind;
+        self.is_rinshan_flag = *is_rinshan_flag;
+        self.is_first_turn = *is_first_turn;
+        self.riichi_pending_acceptance = *riichi_pending_acceptance;
+        self.drawn_tile = *drawn_tile;
+        self.agari_results.clone_from(agari_results);
+        self.last_agari_results.clone_from(last_agari_results);
+        self.round_end_scores = *round_end_scores;
+        self.mjai_log.clone_from(mjai_log);
+        self.player_event_counts = *player_event_counts;
+        for (dst, src) in self
+            .mjai_log_per_player
+            .iter_mut()
+            .zip(mjai_log_per_player.iter())
+        {
+            dst.clone_from(src);
+        }
+        self.game_mode = *game_mode;
+        self.skip_mjai_logging = *skip_mjai_logging;
+        self.seed = *seed;
+        self.rule = *rule;
+        self.last_error.clone_from(last_error);
+        self.is_after_kan = *is_after_kan;
+        self.riichi_sutehais = *riichi_sutehais;
+        self.last_tedashis = *last_tedashis;
+        self.auto_pass = *auto_pass;
+    }
+}
+
+impl PlayerState {
+    /// Overwrite `self` with `src`, reusing the buffers `self` already owns.
+    pub fn restore_from(&mut self, src: &PlayerState) {
+        let PlayerState {
+            hand,
+            melds,
+            discards,
+            discard_from_hand,
+            discard_is_riichi,
+            riichi_declaration_index,
+            score,
+            score_delta,
+            riichi_declared,
+            riichi_stage,
+            double_riichi_declared,
+            missed_agari_riichi,
+            missed_agari_doujun,
+            nagashi_eligible,
+            ippatsu_cycle,
+            pao,
+            forbidden_discards,
+            wait_cache,
+        } = src;
+        self.hand = *hand;
+        self.melds.clone_from(melds);
+        self.discards.clone_from(discards);
+        self.discard_from_hand = *discard_from_hand;
+        self.discard_is_riichi = *discard_is_riichi;
+        self.riichi_declaration_index = *riichi_declaration_index;
+        self.score = *score;
+        self.score_delta = *score_delta;
+        self.riichi_declared = *riichi_declared;
+        self.riichi_stage = *riichi_stage;
+        self.double_riichi_declared = *double_riichi_declared;
+        self.missed_agari_riichi = *missed_agari_riichi;
+        self.missed_agari_doujun = *missed_agari_doujun;
+        self.nagashi_eligible = *nagashi_eligible;
+        self.ippatsu_cycle = *ippatsu_cycle;
+        self.pao = *pao;
+        self.forbidden_discards = *forbidden_discards;
+        self.wait_cache.clone_from(wait_cache);
+    }
+}
+
+impl WallState {
+    /// Overwrite `self` with `src`, reusing the buffers `self` already owns.
+    pub fn restore_from(&mut self, src: &WallState) {
+        let WallState {
+            tiles,
+            dora_indicators,
+            rinshan_draw_count,
+            pending_kan_dora_count,
+            wall_digest,
+            salt,
+            seed,
+            hand_index,
+        } = src;
+        self.tiles.clone_from(tiles);
+        self.dora_indicators.clone_from(dora_indicators);
+        self.rinshan_draw_count = *rinshan_draw_count;
+        self.pending_kan_dora_count = *pending_kan_dora_count;
+        self.wall_digest.clone_from(wall_digest);
+        self.salt.clone_from(salt);
+        self.seed = *seed;
+        self.hand_index = *hand_index;
+    }
+}
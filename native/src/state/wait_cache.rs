@@ -0,0 +1,213 @@
+//! Per-player cache of waits and tenpai discards.
+//!
+//! Legal actions, ron/furiten checks, the riichi ankan rule, exhaustive-draw tenpai and
+//! observations all ask the same question about a player's concealed hand. Entries are
+//! keyed by the hand's 34-type counts and the number of melds, so they stay valid until
+//! that player's hand or melds change, however the state was mutated.
+
+use std::sync::Mutex;
+
+use crate::agari;
+use crate::state::compact::{HandTiles, TileMask};
+use crate::state::GameState;
+use crate::types::{Meld, MeldType};
+
+/// Counts fed to agari detection: concealed tiles, with a kan tile still present four
+/// times in hand reduced to three (as `AgariCalculator` does).
+pub fn agari_counts(hand: &HandTiles, melds: &[Meld]) -> [u8; 34] {
+    let mut counts = *hand.counts();
+    reduce_kan_counts(&mut counts, melds);
+    counts
+}
+
+pub fn reduce_kan_counts(counts: &mut [u8; 34], melds: &[Meld]) {
+    for m in melds {
+        if matches!(
+            m.meld_type,
+            MeldType::Gang | MeldType::Angang | MeldType::Addgang
+        ) {
+            let t34 = m.tiles[0] as usize / 4;
+            if counts[t34] == 4 {
+                counts[t34] = 3;
+            }
+        }
+    }
+}
+
+/// Tile kinds completing a 13-tile hand; empty for any other hand size.
+pub fn compute_waits(counts: &[u8; 34], num_melds: usize) -> TileMask {
+    let total = counts.iter().map(|&c| c as usize).sum::<usize>() + num_melds * 3;
+    if total != 13 {
+        return TileMask::EMPTY;
+    }
+    agari::waits(counts)
+}
+
+/// Waits left after discarding one tile of each kind from the 14-tile hand `counts`.
+///
+/// Indexed by the discarded 34-type; a non-empty entry is a tenpai-keeping (riichi)
+/// discard. Kinds not in hand, or any hand that is not 14 tiles, give empty entries.
+pub fn tenpai_discards_by_type(counts: &[u8; 34], num_melds: usize) -> [TileMask; 34] {
+    let mut waits_after = [TileMask::EMPTY; 34];
+    let mut rest = *counts;
+    for t in 0..34 {
+        if counts[t] == 0 {
+            continue;
+        }
+        rest[t] -= 1;
+        waits_after[t] = compute_waits(&rest, num_melds);
+        rest[t] += 1;
+    }
+    waits_after
+}
+
+#[derive(Debug, Clone, Copy)]
+struct WaitEntry {
+    counts: [u8; 34],
+    num_melds: u8,
+    waits: TileMask,
+}
+
+#[derive(Debug, Clone, Copy)]
+struct DiscardEntry {
+    counts: [u8; 34],
+    num_melds: u8,
+    /// Waits left after discarding one tile of each kind (only kinds in hand are set).
+    waits_after: [TileMask; 34],
+    tenpai_discards: TileMask,
+}
+
+#[derive(Debug, Clone, Copy, Default)]
+struct Slots {
+    waits: Option<WaitEntry>,
+    discards: Option<DiscardEntry>,
+}
+
+/// Last 13-tile waits and last 14-tile discard table of one player.
+///
+/// A player alternates between the two hand sizes, so keeping one entry of each keeps
+/// both hot; the waits after the chosen discard are also served from the discard table.
+#[derive(Debug, Default)]
+pub struct WaitCache {
+    slots: Mutex<Slots>,
+}
+
+impl Clone for WaitCache {
+    fn clone(&self) -> Self {
+        Self {
+            slots: Mutex::new(self.get()),
+        }
+    }
+
+    fn clone_from(&mut self, source: &Self) {
+        let slots = source.get();
+        *self.slots.get_mut().unwrap_or_else(|e| e.into_inner()) = slots;
+    }
+}
+
+impl WaitCache {
+    fn get(&self) -> Slots {
+        *self.slots.lock().unwrap_or_else(|e| e.into_inner())
+    }
+
+    /// Waits of the 13-tile hand with `counts`, if already known.
+    pub fn peek_waits(&self, counts: &[u8; 34], num_melds: usize) -> Option<TileMask> {
+        let slots = self.slots.lock().unwrap_or_else(|e| e.into_inner());
+        Self::lookup_waits(&slots, counts, num_melds as u8)
+    }
+
+    fn lookup_waits(slots: &Slots, counts: &[u8; 34], num_melds: u8) -> Option<TileMask> {
+        if let Some(e) = &slots.waits {
+            if e.num_melds == num_melds && e.counts == *counts {
+                return Some(e.waits);
+            }
+        }
+        // One tile discarded from the cached 14-tile hand.
+        let d = slots.discards.as_ref()?;
+        if d.num_melds != num_melds {
+            return None;
+        }
+        let mut removed = None;
+        for t in 0..34 {
+            match d.counts[t].checked_sub(counts[t]) {
+                Some(0) => {}
+                Some(1) if removed.is_none() => removed = Some(t),
+                _ => return None,
+            }
+        }
+        removed.map(|t| d.waits_after[t])
+    }
+
+    /// Waits of the 13-tile hand with `counts` (see `compute_waits`).
+    pub fn waits(&self, counts: &[u8; 34], num_melds: usize) -> TileMask {
+        let mut slots = self.slots.lock().unwrap_or_else(|e| e.into_inner());
+        let num_melds = num_melds as u8;
+        let waits = match Self::lookup_waits(&slots, counts, num_melds) {
+            Some(waits) => waits,
+            None => compute_waits(counts, num_melds as usize),
+        };
+        slots.waits = Some(WaitEntry {
+            counts: *counts,
+            num_melds,
+            waits,
+        });
+        waits
+    }
+
+    /// Kinds whose discard leaves the 14-tile hand with `counts` tenpai.
+    pub fn tenpai_discards(&self, counts: &[u8; 34], num_melds: usize) -> TileMask {
+        let mut slots = self.slots.lock().unwrap_or_else(|e| e.into_inner());
+        let num_melds = num_melds as u8;
+        if let Some(d) = &slots.discards {
+            if d.num_melds == num_melds && d.counts == *counts {
+                return d.tenpai_discards;
+            }
+        }
+
+        let waits_after = tenpai_discards_by_type(counts, num_melds as usize);
+        let tenpai_discards = (0..34u8)
+            .filter(|&t| !waits_after[t as usize].is_empty())
+            .collect();
+        slots.discards = Some(DiscardEntry {
+            counts: *counts,
+            num_melds,
+            waits_after,
+            tenpai_discards,
+        });
+        tenpai_discards
+    }
+}
+
+impl GameState {
+    /// Waits of `pid`'s current 13-tile hand (empty if noten or not 13 tiles).
+    pub fn player_waits(&self, pid: u8) -> TileMask {
+        let p = &self.players[pid as usize];
+        p.wait_cache
+            .waits(&agari_counts(&p.hand, &p.melds), p.melds.len())
+    }
+
+    /// Waits of `pid`'s hand after one tile of kind `t34` leaves it.
+    pub fn player_waits_without(&self, pid: u8, t34: u8) -> TileMask {
+        let p = &self.players[pid as usize];
+        let mut counts = agari_counts(&p.hand, &p.melds);
+        match counts[t34 as usize].checked_sub(1) {
+            Some(c) => counts[t34 as usize] = c,
+            None => return TileMask::EMPTY,
+        }
+        p.wait_cache.waits(&counts, p.melds.len())
+    }
+
+    /// Cached waits of `pid`'s current hand, without computing them on a miss.
+    pub fn peek_player_waits(&self, pid: u8) -> Option<TileMask> {
+        let p = &self.players[pid as usize];
+        p.wait_cache
+            .peek_waits(&agari_counts(&p.hand, &p.melds), p.melds.len())
+    }
+
+    /// Kinds `pid` can discard from the current 14-tile hand and stay tenpai.
+    pub fn tenpai_discards(&self, pid: u8) -> TileMask {
+        let p = &self.players[pid as usize];
+        p.wait_cache
+            .tenpai_discards(&agari_counts(&p.hand, &p.melds), p.melds.len())
+    }
+}
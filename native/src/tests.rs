@@ -1,7 +1,7 @@
 #[cfg(test)]
 mod unit_tests {
     use crate::action::Phase;
-    use crate::agari::{is_agari, is_chiitoitsu, is_kokushi};
+    use crate::agari::{find_divisions, is_agari, is_chiitoitsu, is_kokushi, waits, Mentsu};
     use crate::env::RiichiEnv;
     use crate::score::calculate_score;
     use crate::types::Hand;
@@ -75,6 +75,129 @@ mod unit_tests {
         assert!(is_agari(&mut hand));
     }
 
+    #[test]
+    fn test_find_divisions_from_tables() {
+        // 111222333m 456p 77z: three koutsu or three shuntsu in manzu
+        let tiles = [0, 0, 0, 1, 1, 1, 2, 2, 2, 12, 13, 14, 33, 33];
+        let hand = Hand::new(Some(tiles.to_vec()));
+        let divisions = find_divisions(&hand);
+        assert_eq!(divisions.len(), 2);
+        assert!(divisions.iter().all(|d| d.head == 33));
+        assert_eq!(
+            divisions[0].body,
+            vec![
+                Mentsu::Koutsu(0),
+                Mentsu::Koutsu(1),
+                Mentsu::Koutsu(2),
+                Mentsu::Shuntsu(12)
+            ]
+        );
+        assert_eq!(
+            divisions[1].body,
+            vec![
+                Mentsu::Shuntsu(0),
+                Mentsu::Shuntsu(0),
+                Mentsu::Shuntsu(0),
+                Mentsu::Shuntsu(12)
+            ]
+        );
+
+        // 11123455678999m (chuuren shape): only the 5m head completes the hand
+        let tiles = [0, 0, 0, 1, 2, 3, 4, 4, 5, 6, 7, 8, 8, 8];
+        let mut hand = Hand::new(Some(tiles.to_vec()));
+        assert!(is_agari(&mut hand));
+        let heads: Vec<u8> = find_divisions(&hand).iter().map(|d| d.head).collect();
+        assert_eq!(heads, vec![4]);
+
+        // Honours never form sequences, and a lone pair in a suit needs its mentsu.
+        let mut hand = Hand::new(Some(vec![27, 28, 29, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9]));
+        assert!(!is_agari(&mut hand));
+        assert!(find_divisions(&hand).is_empty());
+    }
+
+    #[test]
+    fn test_waits_from_tables() {
+        let waits_of = |tiles: &[u8]| -> Vec<u8> {
+            let hand = Hand::new(Some(tiles.to_vec()));
+            waits(&hand.counts).iter().collect()
+        };
+        // 1112345678999m: junsei chuuren waits on every manzu
+        assert_eq!(
+            waits_of(&[0, 0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 8, 8]),
+            (0..9).collect::<Vec<u8>>()
+        );
+        // 13 distinct terminals and honours: kokushi 13-wait
+        let kokushi = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33];
+        assert_eq!(waits_of(&kokushi), kokushi.to_vec());
+        // 1188m 2299p 33s 55z + 7z single: chiitoitsu tanki
+        assert_eq!(
+            waits_of(&[0, 0, 7, 7, 10, 10, 17, 17, 20, 20, 31, 31, 33]),
+            vec![33]
+        );
+        // 1111m 345p 678p 444z: only a fifth 1m would complete it, so there is no wait
+        assert_eq!(
+            waits_of(&[0, 0, 0, 0, 11, 12, 13, 14, 15, 16, 30, 30, 30]),
+            Vec::<u8>::new()
+        );
+        // Four-tile remainder after three melds: 23p + 55z waits on 1p/4p
+        assert_eq!(waits_of(&[10, 11, 31, 31]), vec![9, 12]);
+
+        // Matches adding each kind and re-running agari detection.
+        let hands: [&[u8]; 3] = [
+            &[0, 1, 2, 3, 4, 5, 6, 9, 9, 9, 27, 27, 28],
+            &[1, 1, 2, 2, 3, 3, 4, 12, 13, 14, 20, 20, 20],
+            &[9, 10, 11, 11, 12, 13, 13, 14, 15, 15, 16, 17, 17],
+        ];
+        for tiles in hands {
+            let mut hand = Hand::new(Some(tiles.to_vec()));
+            let mut expected = Vec::new();
+            for t in 0..34u8 {
+                if hand.counts[t as usize] < 4 {
+                    hand.add(t);
+                    if is_agari(&mut hand) {
+                        expected.push(t);
+                    }
+                    hand.remove(t);
+                }
+            }
+            assert_eq!(waits_of(tiles), expected, "{:?}", tiles);
+        }
+    }
+
+    #[test]
+    fn test_exact_shanten() {
+        use crate::shanten::{shanten, standard_shanten};
+
+        fn counts(tiles: &[usize]) -> [u8; 34] {
+            let mut counts = [0u8; 34];
+            for &t in tiles {
+                counts[t] += 1;
+            }
+            counts
+        }
+
+        // 123m 456m 789m 123p 1s: tenpai on a tanki wait, complete once 1s is drawn
+        let mut hand = counts(&[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 18]);
+        assert_eq!(shanten(&hand, 0), 0);
+        hand[18] += 1;
+        assert_eq!(shanten(&hand, 0), -1);
+
+        // Three overlapping windows do not make a hand tenpai: 1234m 5678p 1357s 1z
+        let hand = counts(&[0, 1, 2, 3, 13, 14, 15, 16, 18, 20, 22, 24, 27]);
+        assert_eq!(standard_shanten(&hand, 0), 2);
+
+        // Six pairs and kokushi tenpai
+        let hand = counts(&[0, 0, 4, 4, 9, 9, 13, 13, 20, 20, 27, 27, 33]);
+        assert_eq!(shanten(&hand, 0), 0);
+        let hand = counts(&[0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 32]);
+        assert_eq!(shanten(&hand, 0), 0);
+
+        // With one meld, 10 tiles need three mentsu and a pair
+        let hand = counts(&[0, 1, 2, 3, 4, 5, 6, 7, 8, 27]);
+        assert_eq!(shanten(&hand, 1), 0);
+        assert_eq!(shanten(&hand, 0), 3);
+    }
+
     #[test]
     fn test_score_calculation() {
         // Current implementation does NOT do Kiriage Mangan (rounding 1920->2000).
@@ -105,7 +228,7 @@ mod unit_tests {
 
         let res = calculate_yaku(&hand, &[], &YakuContext::default(), 31);
         assert!(res.han >= 13);
-        assert!(res.yaku_ids.contains(&39));
+        assert!(res.ids().any(|id| id == 39));
     }
 
     #[test]
@@ -127,7 +250,7 @@ mod unit_tests {
 
         let res = calculate_yaku(&hand, &[], &YakuContext::default(), 19);
         assert!(res.han >= 13);
-        assert!(res.yaku_ids.contains(&40));
+        assert!(res.ids().any(|id| id == 40));
     }
 
     #[test]
@@ -145,7 +268,7 @@ mod unit_tests {
 
         let res = calculate_yaku(&hand, &[], &YakuContext::default(), 0);
         assert!(res.han >= 26);
-        assert!(res.yaku_ids.contains(&50));
+        assert!(res.ids().any(|id| id == 50));
     }
 
     // --- Helper for creating RiichiEnv in tests ---
@@ -279,7 +402,7 @@ mod unit_tests {
 
         // Hand: 4m, 5m, 6m, 6m. (12, 16, 20, 21)
         // 3m is 8.
-        env.state.players[pid as usize].hand = vec![12, 16, 20, 21];
+        env.state.players[pid as usize].hand = vec![12, 16, 20, 21].into();
 
         // Setup P3 (Kamicha of P0)
         env.state.current_player = 3;
@@ -303,7 +426,7 @@ mod unit_tests {
         assert_eq!(env.state.current_player, 0, "Should be P0's turn");
 
         // Verify current_claims is empty or does not contain 0
-        if let Some(claims) = env.state.current_claims.get(&0) {
+        if let Some(claims) = env.state.current_claims.get(0) {
             assert!(claims.is_empty(), "P0 should have no legal claims");
         }
     }
@@ -439,7 +562,7 @@ mod unit_tests {
                 .collect(),
             ],
         };
-        state.apply_mjai_event(start);
+        state.apply_mjai_event(start).unwrap();
 
         // Player 0: verify honor tiles are parsed correctly
         let hand0 = &state.players[0].hand;
@@ -508,7 +631,7 @@ mod unit_tests {
             actor: 0,
             pai: "C".to_string(), // Red dragon (tid 132)
         };
-        state.apply_mjai_event(tsumo);
+        state.apply_mjai_event(tsumo).unwrap();
         assert!(
             state.players[0].hand.contains(&132),
             "Tsumo C should add tid 132 to hand, hand: {:?}",
@@ -521,7 +644,7 @@ mod unit_tests {
             pai: "E".to_string(), // East (tid 108)
             tsumogiri: false,
         };
-        state.apply_mjai_event(dahai);
+        state.apply_mjai_event(dahai).unwrap();
         assert!(
             state.players[0].discards.contains(&108),
             "Dahai E should discard tid 108, discards: {:?}",
@@ -532,7 +655,7 @@ mod unit_tests {
         let dora = MjaiEvent::Dora {
             dora_marker: "F".to_string(), // Green dragon (tid 128)
         };
-        state.apply_mjai_event(dora);
+        state.apply_mjai_event(dora).unwrap();
         assert_eq!(
             state.wall.dora_indicators[1], 128,
             "dora F should be tid 128, got: {}",
@@ -563,4 +686,162 @@ mod unit_tests {
             "Game should NOT be done (all players have positive scores)"
         );
     }
+
+    #[test]
+    fn test_snapshot_restore_replays_identically() {
+        use crate::state::legal_actions::GameStateLegalActions;
+        use crate::state::GameState;
+        use std::collections::HashMap;
+
+        fn play(state: &mut GameState, steps: usize) {
+            for _ in 0..steps {
+                if state.is_done {
+                    break;
+                }
+                let mut actions = HashMap::new();
+                for pid in state.pending_seats() {
+                    let legals = state._get_legal_actions_internal(pid);
+                    actions.insert(pid, legals.last().unwrap().clone());
+                }
+                state.step(&actions);
+            }
+        }
+
+        fn summary(state: &GameState) -> (Vec<Vec<u8>>, Vec<Vec<u8>>, usize, u8, Phase) {
+            (
+                state.players.iter().map(|p| p.hand.to_vec()).collect(),
+                state.players.iter().map(|p| p.discards.clone()).collect(),
+                state.wall.tiles.len(),
+                state.current_player,
+                state.phase,
+            )
+        }
+
+        let mut state = GameState::new(0, true, Some(42), 0, crate::rule::GameRule::default());
+        let snapshot = state.clone();
+        let initial = summary(&state);
+
+        play(&mut state, 40);
+        let after = summary(&state);
+        assert_ne!(initial, after);
+
+        state.restore_from(&snapshot);
+        assert_eq!(summary(&state), initial);
+
+        play(&mut state, 40);
+        assert_eq!(summary(&state), after);
+    }
+
+    #[test]
+    fn test_compact_player_containers() {
+        use crate::state::compact::{DiscardFlags, HandTiles, PaoTable, TileMask};
+
+        let mut hand: HandTiles = vec![9, 0, 4, 5, 1].into();
+        hand.sort();
+        assert_eq!(hand, vec![0, 1, 4, 5, 9]);
+        assert_eq!(hand.count(0), 2);
+        assert_eq!(hand.count(1), 2);
+        assert_eq!(hand.remove(1), 1);
+        hand.retain(|&t| t / 4 != 1);
+        assert_eq!(hand, vec![0, 9]);
+        assert_eq!(hand.counts().iter().map(|&c| c as usize).sum::<usize>(), 2);
+        assert!(hand.try_push(136).is_err());
+        assert!(HandTiles::try_from_tiles(&[0; 15]).is_err());
+        assert_eq!(HandTiles::try_from_tiles(&[9, 0]).unwrap(), vec![9, 0]);
+
+        let flags: DiscardFlags = [true, false, true].into_iter().collect();
+        assert_eq!(flags.to_vec(), vec![true, false, true]);
+        assert_eq!(flags.get(1), Some(false));
+        assert_eq!(flags.get(3), None);
+
+        let mut forbidden = TileMask::EMPTY;
+        forbidden.insert(3);
+        forbidden.insert(33);
+        assert!(forbidden.contains(33) && !forbidden.contains(4));
+        assert_eq!(forbidden.iter().collect::<Vec<_>>(), vec![3, 33]);
+
+        let mut pao = PaoTable::new();
+        pao.insert(37, 2);
+        pao.insert(37, 1);
+        pao.insert(50, 3);
+        assert_eq!(pao.get(37), Some(1));
+        assert_eq!(pao.get(50), Some(3));
+        assert_eq!(pao.get(39), None);
+    }
+
+    #[test]
+    fn test_wait_cache_matches_agari_calculator() {
+        use crate::agari_calculator::AgariCalculator;
+        use crate::state::GameState;
+
+        let mut state = GameState::new(0, true, Some(1), 0, crate::rule::GameRule::default());
+        // 123m 456p 789s EEE + 2m: tanki on 2m
+        let tenpai: Vec<u8> = vec![0, 4, 8, 48, 53, 56, 96, 100, 104, 108, 109, 110, 5];
+        state.players[1].hand = tenpai.clone().into();
+        let expected = AgariCalculator::new(tenpai.clone(), vec![]).get_waits_u8();
+        assert_eq!(state.player_waits(1).iter().collect::<Vec<_>>(), expected);
+        assert_eq!(state.peek_player_waits(1), Some(state.player_waits(1)));
+
+        // Draw 3m: every discard is checked against a fresh calculator.
+        state.players[1].hand.push(9);
+        let discards = state.tenpai_discards(1);
+        for t34 in 0..34u8 {
+            let mut rest = state.players[1].hand.to_vec();
+            let expected = match rest.iter().position(|&t| t / 4 == t34) {
+                Some(idx) => {
+                    rest.remove(idx);
+                    AgariCalculator::new(rest, vec![]).is_tenpai()
+                }
+                None => false,
+            };
+            assert_eq!(discards.contains(t34), expected, "discard kind {}", t34);
+        }
+
+        // Discarding 2m is served from the discard table and matches a recomputation.
+        let idx = state.players[1].hand.iter().position(|&t| t == 5).unwrap();
+        state.players[1].hand.remove(idx);
+        let cached = state
+            .peek_player_waits(1)
+            .expect("waits after discard are cached");
+        let fresh = AgariCalculator::new(state.players[1].hand.to_vec(), vec![]).get_waits_u8();
+        assert_eq!(cached.iter().collect::<Vec<_>>(), fresh);
+    }
+
+    #[test]
+    fn test_observation_for_replay() {
+        use crate::action::{Action, ActionType};
+        use crate::state::GameState;
+
+        let mut state = GameState::new(0, true, Some(42), 0, crate::rule::GameRule::default());
+        let pid = state.current_player;
+        let other = (pid + 1) % 4;
+        let drawn = state.drawn_tile;
+        let tile = *state.players[pid as usize]
+            .hand
+            .iter()
+            .find(|&&t| Some(t) != drawn)
+            .unwrap();
+
+        // A logged claim is offered next to Pass without opening a response window.
+        let pon = Action::new(ActionType::Pon, Some(tile), vec![]);
+        let obs = state
+            .get_observation_for_replay(other, &pon, &pon, None)
+            .unwrap();
+        let offered: Vec<_> = obs._legal_actions.iter().map(|a| a.action_type).collect();
+        assert_eq!(offered, vec![ActionType::Pon, ActionType::Pass]);
+        assert_eq!(state.phase, Phase::WaitAct);
+
+        let discard = Action::new(ActionType::Discard, Some(tile), vec![]);
+        assert!(state
+            .get_observation_for_replay(other, &discard, &discard, None)
+            .is_err());
+
+        // Under riichi only the drawn tile may go; the logged discard drops the flag.
+        state.players[pid as usize].riichi_declared = true;
+        let obs = state
+            .get_observation_for_replay(pid, &discard, &discard, None)
+            .unwrap();
+        assert!(!state.players[pid as usize].riichi_declared);
+        assert!(!obs.riichi_declared[pid as usize]);
+    }
 }
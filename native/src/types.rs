@@ -200,6 +200,54 @@ impl Conditions {
             tsumi,
         }
     }
+
+    /// Pack the conditions used for scoring into one integer (see `Conditions.unpack`).
+    ///
+    /// Bits 0-8 hold `tsumo`, `riichi`, `double_riichi`, `ippatsu`, `haitei`, `houtei`,
+    /// `rinshan`, `chankan` and `tsumo_first_turn`; bits 9-10 `player_wind`, bits 11-12
+    /// `round_wind` and bits 16-31 `tsumi`. `kyoutaku` does not affect scoring and is
+    /// not stored.
+    pub fn pack(&self) -> u32 {
+        let flags = [
+            self.tsumo,
+            self.riichi,
+            self.double_riichi,
+            self.ippatsu,
+            self.haitei,
+            self.houtei,
+            self.rinshan,
+            self.chankan,
+            self.tsumo_first_turn,
+        ];
+        let mut bits = flags
+            .iter()
+            .enumerate()
+            .fold(0u32, |acc, (i, &f)| acc | ((f as u32) << i));
+        bits |= (self.player_wind as u32) << 9;
+        bits |= (self.round_wind as u32) << 11;
+        bits | (self.tsumi.min(0xffff) << 16)
+    }
+
+    /// Inverse of `Conditions.pack`.
+    #[staticmethod]
+    pub fn unpack(bits: u32) -> Self {
+        let flag = |i: u32| (bits >> i) & 1 == 1;
+        Self {
+            tsumo: flag(0),
+            riichi: flag(1),
+            double_riichi: flag(2),
+            ippatsu: flag(3),
+            haitei: flag(4),
+            houtei: flag(5),
+            rinshan: flag(6),
+            chankan: flag(7),
+            tsumo_first_turn: flag(8),
+            player_wind: Wind::from((bits >> 9) as u8 & 3),
+            round_wind: Wind::from((bits >> 11) as u8 & 3),
+            kyoutaku: 0,
+            tsumi: bits >> 16,
+        }
+    }
 }
 
 #[pyclass]
@@ -257,6 +305,15 @@ impl Agari {
             has_agari_shape,
         }
     }
+
+    /// Names of the scored yaku, in the order of `yaku`.
+    #[getter]
+    pub fn yaku_names(&self) -> Vec<&'static str> {
+        self.yaku
+            .iter()
+            .filter_map(|&id| crate::yaku::yaku_name(id))
+            .collect()
+    }
 }
 
 pub fn is_terminal_tile(t: u8) -> bool {
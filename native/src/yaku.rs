@@ -53,15 +53,101 @@ pub const ID_SUANKO_TANKI: u32 = 48;
 pub const ID_KOKUSHI_13: u32 = 49;
 pub const ID_DAISUUSHI: u32 = 50;
 
-#[derive(Debug, Clone, Default)]
+/// Dora, aka dora and ura dora, which add han but do not satisfy the one-yaku minimum.
+pub const DORA_YAKU: u64 = 1 << ID_DORA | 1 << ID_AKADORA | 1 << ID_URADORA;
+
+/// Display names indexed by yaku id; `None` for unused ids.
+const YAKU_NAMES: [Option<&str>; 51] = [
+    None,
+    Some("Menzen Tsumo"),
+    Some("Riichi"),
+    Some("Chankan"),
+    Some("Rinshan Kaihou"),
+    Some("Haitei Raoyue"),
+    Some("Houtei Raoyui"),
+    Some("Yakuhai Haku"),
+    Some("Yakuhai Hatsu"),
+    Some("Yakuhai Chun"),
+    Some("Yakuhai Jikaze"),
+    Some("Yakuhai Bakaze"),
+    Some("Tanyao"),
+    Some("Iipeiko"),
+    Some("Pinfu"),
+    Some("Chantai"),
+    Some("Ittsu"),
+    Some("Sanshoku Doujun"),
+    Some("Double Riichi"),
+    Some("Sanshoku Doukou"),
+    Some("San Kantsu"),
+    Some("Toitoi"),
+    Some("San Ankou"),
+    Some("Shousangen"),
+    Some("Honroutou"),
+    Some("Chiitoitsu"),
+    Some("Junchan"),
+    Some("Honitsu"),
+    Some("Ryanpeikou"),
+    Some("Chinitsu"),
+    Some("Ippatsu"),
+    Some("Dora"),
+    Some("Aka Dora"),
+    Some("Ura Dora"),
+    Some("Nuki Dora"),
+    Some("Tenhou"),
+    Some("Chiihou"),
+    Some("Daisangen"),
+    Some("Su Ankou"),
+    Some("Tsuu iisou"),
+    Some("Ryuu iisou"),
+    Some("Chinroutou"),
+    Some("Kokushi Musou"),
+    Some("Shousushii"),
+    Some("Su Kantsu"),
+    Some("Chuuren Poutou"),
+    None,
+    Some("Chuuren Poutou 9-wait"),
+    Some("Su Ankou Tanki"),
+    Some("Kokushi Musou 13-wait"),
+    Some("Daisushii"),
+];
+
+/// Display name of a yaku id, resolved only when a caller asks for it.
+pub fn yaku_name(id: u32) -> Option<&'static str> {
+    YAKU_NAMES.get(id as usize).copied().flatten()
+}
+
+/// Han, fu and the set of scored yaku for one interpretation of a hand.
+///
+/// Yaku are a bitmask (bit `i` set for yaku id `i`), so results are `Copy` and building
+/// one in the per-division loop never touches the heap.
+#[derive(Debug, Clone, Copy, Default)]
 pub struct YakuResult {
     pub han: u8,
     pub fu: u8,
-    pub yaku_ids: Vec<u32>,
-    pub yaku_names: Vec<String>,
+    pub yaku: u64,
     pub yakuman_count: u8,
 }
 
+impl YakuResult {
+    #[inline]
+    fn add(&mut self, id: u32) {
+        self.yaku |= 1 << id;
+    }
+
+    /// Yaku ids in ascending order.
+    pub fn ids(&self) -> impl Iterator<Item = u32> {
+        let mut bits = self.yaku;
+        std::iter::from_fn(move || {
+            if bits == 0 {
+                return None;
+            }
+            let id = bits.trailing_zeros();
+            bits &= bits - 1;
+            Some(id)
+        })
+    }
+}
+
 #[derive(Debug)]
 pub struct YakuContext {
     pub is_menzen: bool,
@@ -113,42 +199,33 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
             if is_13_wait {
                 best_res.han = 26;
                 best_res.yakuman_count = 2;
-                best_res.yaku_ids.push(ID_KOKUSHI_13);
-                best_res
-                    .yaku_names
-                    .push("Kokushi Musou 13-wait".to_string());
+                best_res.add(ID_KOKUSHI_13);
             } else {
                 best_res.han = 13;
                 best_res.yakuman_count = 1;
-                best_res.yaku_ids.push(ID_KOKUSHI);
-                best_res.yaku_names.push("Kokushi Musou".to_string());
+                best_res.add(ID_KOKUSHI);
             }
             return best_res;
         }
         if agari::is_chiitoitsu(hand) {
             best_res.han = 2;
             best_res.fu = 25;
-            best_res.yaku_ids.push(ID_CHITOITSU);
-            best_res.yaku_names.push("Chiitoitsu".to_string());
+            best_res.add(ID_CHITOITSU);
 
             if is_tanyao(hand, melds) {
                 best_res.han += 1;
-                best_res.yaku_ids.push(12);
-                best_res.yaku_names.push("Tanyao".to_string());
+                best_res.add(ID_TANYAO);
             }
             if is_chinitsu(hand, melds) {
                 best_res.han += 6;
-                best_res.yaku_ids.push(29);
-                best_res.yaku_names.push("Chinitsu".to_string());
+                best_res.add(ID_CHINITSU);
             } else if is_honitsu(hand, melds) {
                 best_res.han += 3;
-                best_res.yaku_ids.push(27);
-                best_res.yaku_names.push("Honitsu".to_string());
+                best_res.add(ID_HONITSU);
             }
             if is_honroutou(hand, melds) {
                 best_res.han += 2;
-                best_res.yaku_ids.push(24);
-                best_res.yaku_names.push("Honroutou".to_string());
+                best_res.add(ID_HONROUTO);
             }
 
             apply_yakuman(
@@ -211,15 +288,13 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
             // Tanyao
             if is_tanyao(hand, melds) {
                 res.han += 1;
-                res.yaku_ids.push(ID_TANYAO); // Corrected to 12
-                res.yaku_names.push("Tanyao".to_string());
+                res.add(ID_TANYAO);
             }
 
             // Pinfu check
             if check_pinfu(div, melds, ctx, wg_idx, win_tile) {
                 res.han += 1;
-                res.yaku_ids.push(ID_PINFU);
-                res.yaku_names.push("Pinfu".to_string());
+                res.add(ID_PINFU);
                 res.fu = if ctx.is_tsumo { 20 } else { 30 };
             } else {
                 res.fu = calculate_fu_with_waiting(div, melds, ctx, wg_idx, win_tile);
@@ -254,8 +329,7 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
                             } // Jikaze iteration
                         }
                     };
-                    res.yaku_ids.push(id);
-                    res.yaku_names.push("Yakuhai".to_string());
+                    res.add(id);
                 }
             }
 
@@ -290,8 +364,7 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
                     + (if div.head == 33 { 1 } else { 0 });
                 if dragon_koutsu_count == 2 && dragon_pair_count == 1 {
                     res.han += 2;
-                    res.yaku_ids.push(ID_SHOSANGEN);
-                    res.yaku_names.push("Shousangen".to_string());
+                    res.add(ID_SHOSANGEN);
                 }
             }
 
@@ -307,8 +380,7 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
                     .count();
             if koutsu_total == 4 {
                 res.han += 2;
-                res.yaku_ids.push(ID_TOITOI);
-                res.yaku_names.push("Toitoi".to_string());
+                res.add(ID_TOITOI);
             }
 
             // San Ankou
@@ -329,8 +401,7 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
             }
             if closed_koutsu_count == 3 {
                 res.han += 2;
-                res.yaku_ids.push(ID_SANANKOU);
-                res.yaku_names.push("San Ankou".to_string());
+                res.add(ID_SANANKOU);
             }
 
             // San Kantsu
@@ -344,8 +415,7 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
                 .count();
             if kantsu_count == 3 {
                 res.han += 2;
-                res.yaku_ids.push(ID_SANKANTSU);
-                res.yaku_names.push("San Kantsu".to_string());
+                res.add(ID_SANKANTSU);
             }
 
             // Iipeiko / Ryanpeikou (Closed only)
@@ -369,56 +439,46 @@ pub fn calculate_yaku(hand: &Hand, melds: &[Meld], ctx: &YakuContext, win_tile:
                 }
                 if identical_pairs == 2 {
                     res.han += 3;
-                    res.yaku_ids.push(ID_RYANPEIKO);
-                    res.yaku_names.push("Ryanpeikou".to_string());
+                    res.add(ID_RYANPEIKO);
                 } else if identical_pairs == 1 {
                     res.han += 1;
-                    res.yaku_ids.push(ID_IPEIKO);
-                    res.yaku_names.push("Iipeiko".to_string());
+                    res.add(ID_IPEIKO);
                 }
             }
 
             // Ittsu / Sanshoku Doujun
             if check_ittsu(div, melds) {
                 res.han += if ctx.is_menzen { 2 } else { 1 };
-                res.yaku_ids.push(ID_ITTSU);
-                res.yaku_names.push("Ittsu".to_string());
+                res.add(ID_ITTSU);
             }
             if is_sanshoku_doujun(div, melds) {
                 res.han += if ctx.is_menzen { 2 } else { 1 };
-                res.yaku_ids.push(ID_SANSHOKU);
-                res.yaku_names.push("Sanshoku Doujun".to_string());
+                res.add(ID_SANSHOKU);
             }
             if is_sanshoku_doukou(div, melds) {
                 res.han += 2;
-                res.yaku_ids.push(ID_SANSHOKU_DOKO);
-                res.yaku_names.push("Sanshoku Doukou".to_string());
+                res.add(ID_SANSHOKU_DOKO);
             }
 
             // Honitsu / Chinitsu
             if is_chinitsu(hand, melds) {
                 res.han += if ctx.is_menzen { 6 } else { 5 };
-                res.yaku_ids.push(ID_CHINITSU);
-                res.yaku_names.push("Chinitsu".to_string());
+                res.add(ID_CHINITSU);
             } else if is_honitsu(hand, melds) {
                 res.han += if ctx.is_menzen { 3 } else { 2 };
-                res.yaku_ids.push(ID_HONITSU);
-                res.yaku_names.push("Honitsu".to_string());
+                res.add(ID_HONITSU);
             }
 
             // Chantai / Junchan / Honroutou
             if is_honroutou(hand, melds) {
                 res.han += 2;
-                res.yaku_ids.push(ID_HONROUTO);
-                res.yaku_names.push("Honroutou".to_string());
+                res.add(ID_HONROUTO);
             } else if is_junchan(div, melds) {
                 res.han += if ctx.is_menzen { 3 } else { 2 };
-                res.yaku_ids.push(ID_JUNCHAN);
-                res.yaku_names.push("Junchan".to_string());
+                res.add(ID_JUNCHAN);
             } else if is_chantai(div, melds) {
                 res.han += if ctx.is_menzen { 2 } else { 1 };
-                res.yaku_ids.push(ID_CHANTA);
-                res.yaku_names.push("Chantai".to_string());
+                res.add(ID_CHANTA);
             }
 
             // Static Yaku and Dora are handled by apply_static_yaku (already called at start of loop)
@@ -718,48 +778,48 @@ fn apply_static_yaku(res: &mut YakuResult, ctx: &YakuContext) {
     // Riichi
     if ctx.is_reach && !ctx.is_daburu_reach {
         res.han += 1;
-        res.yaku_ids.push(ID_RIICHI);
+        res.add(ID_RIICHI);
     }
     if ctx.is_daburu_reach {
         res.han += 2;
-        res.yaku_ids.push(ID_DOUBLE_RIICHI);
+        res.add(ID_DOUBLE_RIICHI);
     }
     if ctx.is_ippatsu {
         res.han += 1;
-        res.yaku_ids.push(ID_IPPATSU);
+        res.add(ID_IPPATSU);
     }
     if ctx.is_menzen && ctx.is_tsumo {
         res.han += 1;
-        res.yaku_ids.push(ID_TSUMO);
+        res.add(ID_TSUMO);
     }
     if ctx.is_haitei && ctx.is_tsumo {
         res.han += 1;
-        res.yaku_ids.push(ID_HAITEI);
+        res.add(ID_HAITEI);
     }
     if ctx.is_houtei && !ctx.is_tsumo {
         res.han += 1;
-        res.yaku_ids.push(ID_HOUTEI);
+        res.add(ID_HOUTEI);
     }
     if ctx.is_rinshan && ctx.is_tsumo {
         res.han += 1;
-        res.yaku_ids.push(ID_RINSHAN);
+        res.add(ID_RINSHAN);
     }
     if ctx.is_chankan && !ctx.is_tsumo {
         res.han += 1;
-        res.yaku_ids.push(ID_CHANKAN);
+        res.add(ID_CHANKAN);
     }
 
     if ctx.dora_count > 0 {
         res.han += ctx.dora_count;
-        res.yaku_ids.push(ID_DORA);
+        res.add(ID_DORA);
     }
     if ctx.aka_dora > 0 {
         res.han += ctx.aka_dora;
-        res.yaku_ids.push(ID_AKADORA);
+        res.add(ID_AKADORA);
     }
     if ctx.ura_dora_count > 0 {
         res.han += ctx.ura_dora_count;
-        res.yaku_ids.push(ID_URADORA);
+        res.add(ID_URADORA);
     }
 }
 
@@ -783,22 +843,19 @@ fn apply_yakuman(
     // Tsuu iisou (All Honors)
     if is_tsuu_iisou(hand, melds) {
         yakuman_count += 1;
-        res.yaku_ids.push(ID_TSUISO);
-        res.yaku_names.push("Tsuu iisou".to_string());
+        res.add(ID_TSUISO);
     }
 
     // Chinroutou (All Terminals)
     if is_chinroutou(hand, melds) {
         yakuman_count += 1;
-        res.yaku_ids.push(ID_CHINROUTO);
-        res.yaku_names.push("Chinroutou".to_string());
+        res.add(ID_CHINROUTO);
     }
 
     // Ryuu iisou (All Green)
     if is_ryuu_iisou(hand, melds) {
         yakuman_count += 1;
-        res.yaku_ids.push(ID_RYUISOU);
-        res.yaku_names.push("Ryuu iisou".to_string());
+        res.add(ID_RYUISOU);
     }
 
     // Su Kantsu (Four Kans)
@@ -813,8 +870,7 @@ fn apply_yakuman(
         == 4
     {
         yakuman_count += 1;
-        res.yaku_ids.push(ID_SUKANTSU);
-        res.yaku_names.push("Su Kantsu".to_string());
+        res.add(ID_SUKANTSU);
     }
 
     // Chuuren Poutou
@@ -824,12 +880,10 @@ fn apply_yakuman(
             let is_9_wait = is_chuuren_9_wait(hand, win_tile);
             if is_9_wait {
                 yakuman_count += 2;
-                res.yaku_ids.push(ID_JUNSEI_CHUUREN);
-                res.yaku_names.push("Chuuren Poutou 9-wait".to_string());
+                res.add(ID_JUNSEI_CHUUREN);
             } else {
                 yakuman_count += 1;
-                res.yaku_ids.push(ID_CHUUREN);
-                res.yaku_names.push("Chuuren Poutou".to_string());
+                res.add(ID_CHUUREN);
             }
         }
     }
@@ -839,12 +893,10 @@ fn apply_yakuman(
         if ctx.jikaze == 27 {
             // Oya (East)
             yakuman_count += 1;
-            res.yaku_ids.push(ID_TENHO);
-            res.yaku_names.push("Tenhou".to_string());
+            res.add(ID_TENHO);
         } else {
             yakuman_count += 1;
-            res.yaku_ids.push(ID_CHIHO);
-            res.yaku_names.push("Chiihou".to_string());
+            res.add(ID_CHIHO);
         }
     }
 
@@ -867,12 +919,10 @@ fn apply_yakuman(
     if closed_koutsu_count == 4 {
         if wg_idx.is_none() {
             yakuman_count += 2;
-            res.yaku_ids.push(ID_SUANKO_TANKI); // Su Ankou Tanki
-            res.yaku_names.push("Su Ankou Tanki".to_string());
+            res.add(ID_SUANKO_TANKI); // Su Ankou Tanki
         } else {
             yakuman_count += 1;
-            res.yaku_ids.push(ID_SUANKO);
-            res.yaku_names.push("Su Ankou".to_string());
+            res.add(ID_SUANKO);
         }
     }
 
@@ -892,8 +942,7 @@ fn apply_yakuman(
 
     if haku_koutsu && hatsu_koutsu && chun_koutsu {
         yakuman_count += 1;
-        res.yaku_ids.push(ID_DAISANGEN);
-        res.yaku_names.push("Daisangen".to_string());
+        res.add(ID_DAISANGEN);
     }
 
     // Winds
@@ -914,12 +963,10 @@ fn apply_yakuman(
     }
     if wind_koutsu_count == 4 {
         yakuman_count += 2; // Double Yakuman
-        res.yaku_ids.push(ID_DAISUUSHI);
-        res.yaku_names.push("Daisushii".to_string());
+        res.add(ID_DAISUUSHI);
     } else if wind_koutsu_count == 3 && wind_pair_count == 1 {
         yakuman_count += 1;
-        res.yaku_ids.push(ID_SHOUSUUSHI);
-        res.yaku_names.push("Shousushii".to_string());
+        res.add(ID_SHOUSUUSHI);
     }
 
     if yakuman_count > 0 {
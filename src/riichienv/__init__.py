@@ -1,6 +1,7 @@
 from . import convert
 from ._riichienv import (  # type: ignore
     AgariContext,
+    EnvSnapshot,
     GameRule,
     KanDoraTimingMode,
     KuikaeMode,
@@ -11,17 +12,24 @@ from ._riichienv import (  # type: ignore
     MjSoulReplay,
     Observation,
     Phase,
+    ReplayLoader,
     RiichiEnv,
+    RiichiEnvBatch,
     Score,
     Wind,
     calculate_score,
+    calculate_score_batch,
     check_riichi_candidates,
+    encode_batch,
     parse_hand,
     parse_tile,
+    tenpai_discards,
+    write_shard,
 )
 from .action import Action, ActionType
 from .game_mode import GameType
 from .hand import Agari, AgariCalculator, Conditions
+from .shard import ShardReader
 
 EAST = Wind.East
 SOUTH = Wind.South
@@ -38,15 +46,23 @@ __all__ = [
     "Observation",
     "MjSoulReplay",
     "MjaiReplay",
+    "ReplayLoader",
     "Score",
     "Wind",
     "calculate_score",
+    "calculate_score_batch",
     "check_riichi_candidates",
+    "encode_batch",
     "parse_hand",
     "parse_tile",
+    "tenpai_discards",
+    "write_shard",
+    "ShardReader",
     "Action",
     "ActionType",
     "RiichiEnv",
+    "RiichiEnvBatch",
+    "EnvSnapshot",
     "GameRule",
     "Phase",
     "KanDoraTimingMode",
@@ -1,6 +1,10 @@
+from collections.abc import Sequence
 from enum import IntEnum
 from typing import Any
 
+import numpy as np
+import numpy.typing as npt
+
 class KuikaeMode(IntEnum):
     None_ = 0
     Basic = 1
@@ -125,6 +129,9 @@ class Conditions:
         kyoutaku: int = 0,
         tsumi: int = 0,
     ): ...
+    def pack(self) -> int: ...
+    @staticmethod
+    def unpack(bits: int) -> Conditions: ...
 
 class Agari:
     agari: bool
@@ -135,6 +142,8 @@ class Agari:
     yaku: list[int]
     han: int
     fu: int
+    @property
+    def yaku_names(self) -> list[str]: ...
 
 class AgariContext:
     actual: bool
@@ -165,19 +174,55 @@ class AgariCalculator:
     def get_waits(self) -> list[int]: ...
     @staticmethod
     def hand_from_text(text: str) -> AgariCalculator: ...
+    @staticmethod
+    def set_cache_size(maxsize: int) -> None: ...
+    @staticmethod
+    def cache_info() -> dict[str, int]: ...
+    @staticmethod
+    def cache_clear() -> None: ...
+    @staticmethod
+    def calc_batch(
+        tiles: npt.NDArray[np.uint8],
+        win_tile: npt.NDArray[np.uint8],
+        melds: npt.NDArray[np.uint8] | None = None,
+        meld_types: npt.NDArray[np.int8] | None = None,
+        dora_indicators: npt.NDArray[np.uint8] | None = None,
+        ura_indicators: npt.NDArray[np.uint8] | None = None,
+        conditions: npt.NDArray[np.uint32] | None = None,
+        num_threads: int | None = None,
+    ) -> dict[str, npt.NDArray[Any]]: ...
 
 class Observation:
     events: list[Any]
     hand: list[int]
     player_id: int
     prev_events_size: int
+    waits: list[int]
+    is_tenpai: bool
     def new_events(self) -> list[str]: ...
     def legal_actions(self) -> list[Action]: ...
     def select_action_from_mjai(self, mjai: str | dict[str, Any]) -> Action | None: ...
     def to_dict(self) -> dict[str, Any]: ...
-    def encode_discard_history_decay(self, decay_rate: float | None = None) -> bytes: ...
-    def encode_yaku_possibility(self) -> bytes: ...
-    def encode_furiten_ron_possibility(self) -> bytes: ...
+    def encode(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def mask(self, out: npt.NDArray[np.uint8] | None = None) -> npt.NDArray[np.uint8]: ...
+    def encode_discard_history_decay(
+        self, decay_rate: float | None = None, out: npt.NDArray[np.float32] | None = None
+    ) -> npt.NDArray[np.float32]: ...
+    def encode_yaku_possibility(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_furiten_ron_possibility(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_shanten_efficiency(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_ukeire_table(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def discard_ev(
+        self, samples: int = 1000, num_draws: int | None = None, seed: int = 0, num_threads: int | None = None
+    ) -> dict[int, tuple[float, float]]: ...
+    def encode_kawa_overview(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_fuuro_overview(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_ankan_overview(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_action_availability(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_riichi_sutehais(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_last_tedashis(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_pass_context(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
+    def encode_discard_candidates(self, out: npt.NDArray[np.float32] | None = None) -> npt.NDArray[np.float32]: ...
     def __init__(self, *args: Any, **kwargs: Any): ...
 
 class Kyoku:
@@ -186,7 +231,13 @@ class Kyoku:
     def grp_features(self) -> dict[str, Any]: ...
     def take_agari_contexts(self) -> AgariContextIterator: ...
     def take_grp_features(self) -> dict[str, Any]: ...
-    def steps(self, seat: int | None = None, rule: GameRule | None = None) -> KyokuStepIterator: ...
+    def steps(
+        self,
+        seat: int | None = None,
+        rule: GameRule | None = None,
+        skip_single_action: bool | None = None,
+        seats: list[int] | None = None,
+    ) -> KyokuStepIterator: ...
     def __iter__(self) -> KyokuIterator: ...
 
 class KyokuIterator:
@@ -208,8 +259,33 @@ class MjSoulReplay:
     def __init__(self, *args: Any, **kwargs: Any) -> None: ...
 
 class MjaiReplay:
+    @staticmethod
+    def from_jsonl(path: str) -> MjaiReplay: ...
+    @staticmethod
+    def iter_jsonl(path: str) -> MjaiKyokuStream: ...
+    def num_rounds(self) -> int: ...
+    def take_kyokus(self) -> KyokuIterator: ...
     def __init__(self) -> None: ...
 
+class MjaiKyokuStream:
+    def __next__(self) -> Kyoku: ...
+    def __iter__(self) -> MjaiKyokuStream: ...
+
+class ReplayLoader:
+    num_files: int
+    def __init__(
+        self,
+        paths: str | list[str],
+        log_format: str = "mjai",
+        num_threads: int | None = None,
+        seed: int | None = None,
+        prefetch: int = 64,
+    ) -> None: ...
+    def __next__(self) -> Kyoku: ...
+    def __iter__(self) -> ReplayLoader: ...
+
+class EnvSnapshot: ...
+
 class RiichiEnv:
     oya: int
     riichi_sticks: int
@@ -263,6 +339,7 @@ class RiichiEnv:
     turn_count: int
     wall_digest: str
     pao: list[dict[int, int]]
+    auto_pass: bool
 
     def __init__(
         self,
@@ -271,6 +348,7 @@ class RiichiEnv:
         seed: int | None = None,
         round_wind: int | None = None,  # TODO: This should be moved to reset().
         rule: GameRule | None = None,
+        auto_pass: bool = False,  # If True, decisions with a single legal action are resolved in step().
     ) -> None: ...
     @property
     def game_mode(self) -> int: ...
@@ -284,6 +362,11 @@ class RiichiEnv:
         self, action: Action | int | dict[int, Action] | None = None, *args: Any, **kwargs: Any
     ) -> dict[int, Observation]: ...
     def done(self) -> bool: ...
+    def snapshot(self, out: EnvSnapshot | None = None) -> EnvSnapshot: ...
+    def restore(self, snapshot: EnvSnapshot) -> None: ...
+    def determinize(
+        self, player_id: int, count: int, seed: int | None = None, riichi_tenpai: bool = True
+    ) -> list[EnvSnapshot]: ...
     def get_observations(self, players: list[int] | None = None) -> dict[int, Observation]: ...
     def get_obs_py(self, player_id: int) -> Observation: ...
     def _check_midway_draws(self) -> Any: ...
@@ -294,15 +377,61 @@ class RiichiEnv:
     def _is_furiten(self, player_id: int) -> bool: ...
     def _reveal_kan_dora(self) -> None: ...
 
+BatchOutput = tuple[
+    npt.NDArray[np.float32],
+    npt.NDArray[np.uint8],
+    npt.NDArray[np.int8],
+    npt.NDArray[np.int32],
+    npt.NDArray[np.bool_],
+]
+
+class RiichiEnvBatch:
+    num_envs: int
+    def __init__(
+        self,
+        num_envs: int,
+        game_mode: str | int | None = None,
+        skip_mjai_logging: bool = True,
+        seed: int | None = None,
+        rule: GameRule | None = None,
+        auto_pass: bool = False,
+    ) -> None: ...
+    def __len__(self) -> int: ...
+    def reset(self, indices: list[int] | None = None, seed: int | None = None) -> BatchOutput: ...
+    def step(self, actions: npt.ArrayLike) -> BatchOutput: ...
+    def get_env(self, index: int) -> RiichiEnv: ...
+    def legal_actions(self, index: int) -> list[Action]: ...
+
 class Score:
     total: int
-    def pay_ron(self, *args: Any, **kwargs: Any) -> None: ...
-    def pay_tsumo_ko(self, *args: Any, **kwargs: Any) -> None: ...
-    def pay_tsumo_oya(self, *args: Any, **kwargs: Any) -> None: ...
-    def __init__(self, *args: Any, **kwargs: Any): ...
+    pay_ron: int
+    pay_tsumo_oya: int
+    pay_tsumo_ko: int
 
-def calculate_score(han: int, fu: int, is_oya: bool, is_tsumo: bool) -> tuple[int, int]: ...
+def calculate_score(han: int, fu: int, is_oya: bool, is_tsumo: bool, tsumi: int) -> Score: ...
+def calculate_score_batch(
+    han: npt.NDArray[np.uint8],
+    fu: npt.NDArray[np.uint8],
+    is_oya: npt.NDArray[np.bool_],
+    is_tsumo: npt.NDArray[np.bool_],
+    tsumi: npt.NDArray[np.uint32] | None = None,
+) -> dict[str, npt.NDArray[np.uint32]]: ...
 def check_riichi_candidates(tiles: list[int]) -> list[int]: ...
+def tenpai_discards(tiles_136: list[int], melds: list[Meld] = []) -> dict[int, list[int]]: ...
+def encode_batch(
+    observations: Sequence[Observation],
+    channels: list[str] | None = None,
+    out: npt.NDArray[np.float32] | None = None,
+    mask_out: npt.NDArray[np.uint8] | None = None,
+    num_threads: int | None = None,
+) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.uint8]]: ...
+def write_shard(
+    path: str,
+    kyokus: Sequence[Kyoku],
+    channels: list[str] | None = None,
+    quantize: bool = False,
+    skip_single_action: bool = False,
+) -> int: ...
 def parse_hand(hand_str: str) -> tuple[list[int], list[Meld]]: ...
 def parse_tile(tile_str: str) -> int: ...
 
@@ -315,6 +444,7 @@ __all__ = [
     "AgariContext",
     "AgariContextIterator",
     "Conditions",
+    "EnvSnapshot",
     "Kyoku",
     "KyokuIterator",
     "Meld",
@@ -323,13 +453,20 @@ __all__ = [
     "Phase",
     "MjSoulReplay",
     "MjaiReplay",
+    "MjaiKyokuStream",
+    "ReplayLoader",
     "RiichiEnv",
+    "RiichiEnvBatch",
     "Score",
     "Wind",
     "calculate_score",
+    "calculate_score_batch",
     "check_riichi_candidates",
+    "encode_batch",
     "parse_hand",
     "parse_tile",
+    "tenpai_discards",
+    "write_shard",
     "KuikaeMode",
     "KanDoraTimingMode",
 ]
@@ -0,0 +1,80 @@
+import json
+import struct
+from os import PathLike
+
+import numpy as np
+import numpy.typing as npt
+
+MAGIC = b"RIICHISH"
+VERSION = 1
+
+# MAGIC, version, 4 padding bytes, header offset, header length.
+_PREAMBLE = struct.Struct("<8sI4xQQ")
+
+
+class ShardReader:
+    """Memory-mapped training shard written by ``write_shard``.
+
+    Every column is a read-only NumPy view of the file, so opening a shard reads only its
+    header and indexing a row only touches the pages holding that row. Row columns are
+    ``features``, ``mask``, ``action``, ``seat`` and ``kyoku``; per-kyoku columns are
+    ``chang``, ``ju``, ``ben``, ``liqibang``, ``scores``, ``end_scores``,
+    ``game_end_scores`` and ``has_game_end_scores``, with ``kyoku_offsets`` giving the
+    row range of each kyoku.
+    """
+
+    def __init__(self, path: str | PathLike[str]):
+        with open(path, "rb") as f:
+            magic, version, header_offset, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a riichienv shard")
+            if version != VERSION:
+                raise ValueError(f"Unsupported shard version {version}")
+            f.seek(header_offset)
+            self.header = json.loads(f.read(header_len))
+
+        self._mmap = np.memmap(path, dtype=np.uint8, mode="r")
+        self.columns: dict[str, np.ndarray] = {name: self._view(spec) for name, spec in self.header["columns"].items()}
+
+    def _view(self, spec: dict) -> np.ndarray:
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        start = spec["offset"]
+        end = start + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        return self._mmap[start:end].view(dtype).reshape(shape)
+
+    def __len__(self) -> int:
+        return self.header["num_rows"]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def num_kyokus(self) -> int:
+        return self.header["num_kyokus"]
+
+    @property
+    def channels(self) -> list[str]:
+        return self.header["channels"]
+
+    @property
+    def quantized(self) -> bool:
+        return self.header["quantized"]
+
+    def features(self, index: int | slice | npt.ArrayLike) -> npt.NDArray[np.float32]:
+        """Float32 features of the given rows, dequantized if needed."""
+        raw = self.columns["features"][index]
+        if not self.quantized:
+            return np.asarray(raw, dtype=np.float32)
+        offset = self.columns["feature_offset"][:, None]
+        scale = self.columns["feature_scale"][:, None]
+        return (raw * scale + offset).astype(np.float32)
+
+    def sample(self, index: int) -> tuple[npt.NDArray[np.float32], int, npt.NDArray[np.uint8]]:
+        """``(features, action_id, mask)`` of one row."""
+        return self.features(index), int(self.columns["action"][index]), self.columns["mask"][index]
+
+    def kyoku_rows(self, kyoku: int) -> slice:
+        """Row range of the ``kyoku``-th kyoku of the shard."""
+        offsets = self.columns["kyoku_offsets"]
+        return slice(int(offsets[kyoku]), int(offsets[kyoku + 1]))
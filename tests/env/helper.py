@@ -1,4 +1,4 @@
-from riichienv import Meld, Phase, RiichiEnv
+from riichienv import ActionType, Meld, Observation, Phase, RiichiEnv, parse_hand
 
 
 def helper_setup_env(
@@ -68,3 +68,28 @@ def helper_setup_env(
         env.mjai_log = mjai_log
 
     return env
+
+
+def helper_act(env: RiichiEnv, obs_dict: dict, n: int) -> dict:
+    for _ in range(n):
+        if env.done():
+            break
+        actions = {}
+        for pid, obs in obs_dict.items():
+            legal = obs.legal_actions()
+            passes = [a for a in legal if a.action_type == ActionType.Pass]
+            actions[pid] = passes[0] if passes else legal[-1]
+        obs_dict = env.step(actions)
+    return obs_dict
+
+
+def helper_tenpai_obs() -> Observation:
+    # 123m 456p 789s 111z + 2z 5z: discarding either single honour leaves a tanki wait
+    tiles, _ = parse_hand("123m456p789s11125z")
+    env = helper_setup_env(
+        seed=1,
+        hands=[tiles[:-1], [], [], []],
+        current_player=0,
+        drawn_tile=tiles[-1],
+    )
+    return env.get_observations([0])[0]
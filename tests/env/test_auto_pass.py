@@ -0,0 +1,63 @@
+import numpy as np
+
+from riichienv import ActionType, RiichiEnv, RiichiEnvBatch
+
+
+def _choose(obs):
+    legal = obs.legal_actions()
+    passes = [a for a in legal if a.action_type == ActionType.Pass]
+    if passes:
+        return passes[0]
+    riichi = [a for a in legal if a.action_type == ActionType.Riichi]
+    if riichi:
+        return riichi[0]
+    return legal[-1]
+
+
+def _play(auto_pass: bool, seed: int) -> tuple[list[int], int, bool]:
+    env = RiichiEnv(seed=seed, game_mode="4p-red-half", auto_pass=auto_pass)
+    obs_dict = env.reset()
+    steps = 0
+    saw_forced = False
+    while not env.done():
+        if all(len(obs.legal_actions()) == 1 for obs in obs_dict.values()):
+            saw_forced = True
+        obs_dict = env.step({pid: _choose(obs) for pid, obs in obs_dict.items()})
+        steps += 1
+    return env.scores(), steps, saw_forced
+
+
+def test_auto_pass_never_returns_forced_decisions():
+    for seed in range(3):
+        _, _, saw_forced = _play(auto_pass=True, seed=seed)
+        assert not saw_forced
+
+
+def test_auto_pass_plays_the_same_game_in_fewer_steps():
+    for seed in range(3):
+        scores, steps, saw_forced = _play(auto_pass=False, seed=seed)
+        auto_scores, auto_steps, _ = _play(auto_pass=True, seed=seed)
+        assert auto_scores == scores
+        assert auto_steps <= steps
+        if saw_forced:
+            assert auto_steps < steps
+
+
+def test_auto_pass_property():
+    env = RiichiEnv(seed=1)
+    assert env.auto_pass is False
+    env.auto_pass = True
+    assert env.auto_pass is True
+
+
+def test_batch_auto_pass_masks_have_choices():
+    batch = RiichiEnvBatch(2, game_mode="4p-red-single", seed=3, auto_pass=True)
+    _, masks, _, _, dones = batch.reset()
+    for _ in range(2000):
+        if dones.all():
+            break
+        live = ~dones
+        assert (masks[live].sum(axis=1) > 1).all()
+        actions = np.array([int(np.flatnonzero(m)[-1]) if m.any() else 0 for m in masks], dtype=np.int64)
+        _, masks, _, _, dones = batch.step(actions)
+    assert dones.all()
@@ -0,0 +1,80 @@
+import pytest
+
+from riichienv import AgariCalculator, RiichiEnv
+
+from .helper import helper_act
+
+
+def _all_tiles(env):
+    return sorted([t for hand in env.hands for t in hand] + env.wall + [t for d in env.discards for t in d])
+
+
+def test_determinize_keeps_what_the_viewer_sees():
+    env = RiichiEnv(seed=11, skip_mjai_logging=True)
+    helper_act(env, env.reset(), 9)
+    viewer = env.active_players[0]
+    riichi = (viewer + 1) % 4
+    env.riichi_declared = [pid == riichi for pid in range(4)]
+
+    hand = env.hands[viewer]
+    discards = env.discards
+    dora = env.dora_indicators
+    sizes = [len(h) for h in env.hands]
+    tiles = _all_tiles(env)
+
+    riichi_hands = set()
+    for snap in env.determinize(viewer, 8, seed=3):
+        env.restore(snap)
+        assert env.hands[viewer] == hand
+        assert env.discards == discards
+        assert env.dora_indicators == dora
+        assert [len(h) for h in env.hands] == sizes
+        assert _all_tiles(env) == tiles
+        assert AgariCalculator(env.hands[riichi], env.melds[riichi]).is_tenpai()
+        riichi_hands.add(tuple(sorted(env.hands[riichi])))
+    assert len(riichi_hands) > 1
+
+
+def test_determinize_is_seeded_and_steppable():
+    env = RiichiEnv(seed=4, skip_mjai_logging=True)
+    env.reset()
+    viewer = env.current_player
+    base = env.snapshot()
+
+    def deals(seed):
+        env.restore(base)
+        out = []
+        for snap in env.determinize(viewer, 4, seed=seed):
+            env.restore(snap)
+            out.append((env.hands, env.wall))
+        return out
+
+    assert deals(9) == deals(9)
+    assert deals(9) != deals(10)
+
+    env.restore(base)
+    for snap in env.determinize(viewer, 4, seed=1):
+        env.restore(snap)
+        obs_dict = helper_act(env, env.get_observations(env.active_players), 40)
+        assert obs_dict or env.done()
+
+
+def test_determinize_clears_missed_wins_of_redealt_hands():
+    env = RiichiEnv(seed=11, skip_mjai_logging=True)
+    env.reset()
+    viewer = env.current_player
+    env.missed_agari_doujun = [True] * 4
+    env.missed_agari_riichi = [True] * 4
+
+    for snap in env.determinize(viewer, 3, seed=2):
+        env.restore(snap)
+        expected = [pid == viewer for pid in range(4)]
+        assert env.missed_agari_doujun == expected
+        assert env.missed_agari_riichi == expected
+
+
+def test_determinize_rejects_bad_player():
+    env = RiichiEnv(seed=1, skip_mjai_logging=True)
+    env.reset()
+    with pytest.raises(ValueError):
+        env.determinize(4, 1)
@@ -0,0 +1,26 @@
+from riichienv import ActionType
+
+from .helper import helper_tenpai_obs
+
+
+def test_discard_ev_covers_legal_discards():
+    obs = helper_tenpai_obs()
+    table = obs.discard_ev(samples=300, seed=5)
+
+    legal = {a.tile // 4 for a in obs.legal_actions() if a.action_type == ActionType.Discard}
+    assert {t // 4 for t in table} == legal
+    for win_rate, expected_points in table.values():
+        assert 0.0 <= win_rate <= 1.0
+        assert expected_points >= 0.0
+
+    # Keeping the tanki wait beats breaking a finished sequence.
+    by_kind = {t // 4: ev for t, ev in table.items()}
+    assert by_kind[28][0] > by_kind[0][0]
+    assert by_kind[31][1] > by_kind[0][1]
+
+
+def test_discard_ev_is_seeded():
+    obs = helper_tenpai_obs()
+    first = obs.discard_ev(samples=200, seed=11, num_threads=1)
+    assert first == obs.discard_ev(samples=200, seed=11, num_threads=3)
+    assert obs.discard_ev(samples=200, num_draws=0) == {t: (0.0, 0.0) for t in first}
@@ -0,0 +1,37 @@
+import pytest
+
+from riichienv import RiichiEnv
+
+
+def test_hands_setter_rejects_invalid_tiles():
+    env = RiichiEnv(seed=1)
+    env.reset()
+    before = env.hands
+
+    hands = [list(h) for h in before]
+    hands[2][0] = 136
+    with pytest.raises(ValueError):
+        env.hands = hands
+    with pytest.raises(ValueError):
+        env.hands = [list(range(15)), [], [], []]
+    assert env.hands == before
+
+
+def test_mjai_event_overfilling_a_hand_raises():
+    env = RiichiEnv(seed=1)
+    env.reset()
+    tehais = [["1m"] * 13 for _ in range(4)]
+    tehais[1] = ["2m"] * 15
+    start = {
+        "type": "start_kyoku",
+        "bakaze": "E",
+        "kyoku": 1,
+        "honba": 0,
+        "kyoutaku": 0,
+        "oya": 0,
+        "scores": [25000] * 4,
+        "dora_marker": "1p",
+        "tehais": tehais,
+    }
+    with pytest.raises(ValueError):
+        env.apply_mjai_event(start)
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from riichienv import RiichiEnv, encode_batch
+
+
+def _first_obs():
+    env = RiichiEnv(seed=3)
+    return env.reset()[0]
+
+
+_AUX_SHAPES = {
+    "encode_discard_history_decay": (4, 34),
+    "encode_yaku_possibility": (4, 21, 2),
+    "encode_furiten_ron_possibility": (4, 21),
+    "encode_shanten_efficiency": (4, 4),
+    "encode_ukeire_table": (34, 34),
+    "encode_kawa_overview": (4, 7, 34),
+    "encode_fuuro_overview": (4, 4, 5, 34),
+    "encode_ankan_overview": (4, 34),
+    "encode_action_availability": (11,),
+    "encode_riichi_sutehais": (3, 3),
+    "encode_last_tedashis": (3, 3),
+    "encode_pass_context": (3,),
+    "encode_discard_candidates": (5,),
+}
+
+
+class TestObservationArrays:
+    def test_encode_and_mask_shapes(self):
+        obs = _first_obs()
+
+        features = obs.encode()
+        assert features.shape == (74, 34)
+        assert features.dtype == np.float32
+
+        mask = obs.mask()
+        assert mask.shape == (82,)
+        assert mask.dtype == np.uint8
+        for action in obs.legal_actions():
+            assert mask[action.encode()] == 1
+
+    def test_auxiliary_encoder_shapes(self):
+        obs = _first_obs()
+        for name, shape in _AUX_SHAPES.items():
+            arr = getattr(obs, name)()
+            assert arr.shape == shape, name
+            assert arr.dtype == np.float32, name
+
+    def test_ukeire_table(self):
+        obs = _first_obs()
+        table = obs.encode_ukeire_table()
+        held = {t // 4 for t in obs.hand}
+
+        assert ((table >= 0) & (table <= 4)).all()
+        for t34 in range(34):
+            if t34 not in held:
+                assert not table[t34].any()
+        assert table.any()
+
+    def test_out_writes_into_batch_slot(self):
+        obs = _first_obs()
+        features = np.full((2, 74, 34), -1.0, dtype=np.float32)
+        masks = np.full((2, 82), 7, dtype=np.uint8)
+
+        returned = obs.encode(out=features[1])
+        obs.mask(out=masks[1])
+
+        assert np.shares_memory(returned, features)
+        np.testing.assert_array_equal(features[1], obs.encode())
+        np.testing.assert_array_equal(masks[1], obs.mask())
+        assert (features[0] == -1.0).all()
+        assert (masks[0] == 7).all()
+
+        decay = np.empty((4, 34), dtype=np.float32)
+        obs.encode_discard_history_decay(0.3, out=decay)
+        np.testing.assert_array_equal(decay, obs.encode_discard_history_decay(0.3))
+
+    def test_auxiliary_encoders_fill_out_in_place(self):
+        obs = _first_obs()
+        for name, shape in _AUX_SHAPES.items():
+            out = np.full(shape, -1.0, dtype=np.float32)
+            returned = getattr(obs, name)(out=out)
+            assert np.shares_memory(returned, out), name
+            np.testing.assert_array_equal(out, getattr(obs, name)(), err_msg=name)
+
+    def test_out_shape_mismatch_raises(self):
+        obs = _first_obs()
+        with pytest.raises(ValueError):
+            obs.encode(out=np.empty((46, 34), dtype=np.float32))
+        with pytest.raises(ValueError):
+            obs.mask(out=np.empty((81,), dtype=np.uint8))
+        with pytest.raises(ValueError):
+            obs.encode_kawa_overview(out=np.empty((4, 7, 33), dtype=np.float32))
+
+
+def _collect_observations(count: int) -> list:
+    env = RiichiEnv(seed=11, game_mode="4p-red-single")
+    obs_dict = env.reset()
+    collected = []
+    while not env.done() and len(collected) < count:
+        collected.extend(obs_dict.values())
+        actions = {}
+        for pid, obs in obs_dict.items():
+            mask = obs.mask()
+            actions[pid] = obs.find_action(int(np.flatnonzero(mask)[-1]))
+        obs_dict = env.step(actions)
+    return collected[:count]
+
+
+class TestEncodeBatch:
+    def test_matches_per_observation_encoders(self):
+        observations = _collect_observations(80)
+        features, masks = encode_batch(observations, channels=["base", "discard_history_decay", "shanten_efficiency"])
+
+        assert features.shape == (80, 74 + 4 + 16, 34)
+        assert masks.shape == (80, 82)
+        for i, obs in enumerate(observations):
+            np.testing.assert_array_equal(features[i, :74], obs.encode())
+            np.testing.assert_array_equal(features[i, 74:78], obs.encode_discard_history_decay())
+            shanten = obs.encode_shanten_efficiency().reshape(16, 1)
+            np.testing.assert_array_equal(features[i, 78:], np.broadcast_to(shanten, (16, 34)))
+            np.testing.assert_array_equal(masks[i], obs.mask())
+
+    def test_thread_count_does_not_change_result(self):
+        observations = _collect_observations(70)
+        single, single_masks = encode_batch(observations, num_threads=1)
+        multi, multi_masks = encode_batch(observations, num_threads=4)
+        np.testing.assert_array_equal(single, multi)
+        np.testing.assert_array_equal(single_masks, multi_masks)
+
+    def test_out_is_filled_in_place(self):
+        observations = _collect_observations(5)
+        out = np.empty((5, 74, 34), dtype=np.float32)
+        mask_out = np.empty((5, 82), dtype=np.uint8)
+        features, masks = encode_batch(observations, out=out, mask_out=mask_out)
+        assert features is out
+        assert masks is mask_out
+        np.testing.assert_array_equal(out[3], observations[3].encode())
+
+    def test_invalid_arguments_raise(self):
+        observations = _collect_observations(2)
+        with pytest.raises(ValueError):
+            encode_batch(observations, channels=["nope"])
+        with pytest.raises(ValueError):
+            encode_batch(observations, out=np.empty((3, 74, 34), dtype=np.float32))
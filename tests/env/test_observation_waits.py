@@ -0,0 +1,51 @@
+from riichienv import AgariCalculator, RiichiEnv
+
+from .helper import helper_act
+
+
+def _play_observations(seed: int, limit: int = 200):
+    env = RiichiEnv(seed=seed, game_mode="4p-red-single")
+    obs_dict = env.reset()
+    for _ in range(limit):
+        if env.done():
+            break
+        yield from obs_dict.values()
+        obs_dict = helper_act(env, obs_dict, 1)
+
+
+def test_waits_are_computed_on_access():
+    for obs in _play_observations(seed=5):
+        if len(obs.hand) % 3 != 1:
+            continue
+        expected = AgariCalculator(obs.hand, obs.melds[obs.player_id]).get_waits()
+        assert sorted(obs.waits) == sorted(expected)
+        assert obs.is_tenpai == bool(expected)
+        # Cached value is stable across accesses
+        assert obs.waits == obs.waits
+
+
+def test_encode_uses_lazy_waits():
+    for obs in _play_observations(seed=9, limit=60):
+        features = obs.encode()
+        waits = obs.waits
+        assert sorted(int(t) for t in features[47].nonzero()[0]) == sorted(waits)
+        assert (features[48] == (1.0 if obs.is_tenpai else 0.0)).all()
+
+
+def _meld_key(meld):
+    return (meld.meld_type, meld.tiles, meld.opened, meld.from_who)
+
+
+def test_table_fields_match_the_env():
+    env = RiichiEnv(seed=21, game_mode="4p-red-single")
+    obs_dict = env.reset()
+    for _ in range(200):
+        if env.done():
+            break
+        for obs in obs_dict.values():
+            assert obs.discards == env.discards
+            assert obs.dora_indicators == env.dora_indicators
+            assert [[_meld_key(m) for m in melds] for melds in obs.melds] == [
+                [_meld_key(m) for m in melds] for melds in env.melds
+            ]
+        obs_dict = helper_act(env, obs_dict, 1)
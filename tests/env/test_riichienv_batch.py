@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from riichienv import RiichiEnvBatch
+
+
+def _last_legal(masks: np.ndarray) -> np.ndarray:
+    # Highest legal id: prefers Pass (81) in response windows and a discard otherwise.
+    return np.array([int(np.flatnonzero(m)[-1]) if m.any() else 0 for m in masks], dtype=np.int64)
+
+
+class TestRiichiEnvBatch:
+    def test_reset_shapes(self):
+        batch = RiichiEnvBatch(3, seed=7)
+        features, masks, actors, rewards, dones = batch.reset()
+
+        assert len(batch) == 3
+        assert features.shape == (3, 74, 34)
+        assert features.dtype == np.float32
+        assert masks.shape == (3, 82)
+        assert masks.dtype == np.uint8
+        assert actors.tolist() == [0, 0, 0]
+        assert rewards.shape == (3, 4)
+        assert not rewards.any()
+        assert not dones.any()
+        # Dealer starts with 14 tiles and must discard
+        assert masks[:, :34].sum(axis=1).min() > 0
+
+    def test_seeded_tables_are_reproducible(self):
+        a = RiichiEnvBatch(2, seed=100)
+        b = RiichiEnvBatch(2, seed=100)
+        a.reset()
+        b.reset()
+        assert a.get_env(1).wall == b.get_env(1).wall
+        assert a.get_env(0).wall != a.get_env(1).wall
+
+    def test_seeded_tables_never_share_a_wall(self):
+        batch = RiichiEnvBatch(8, seed=3)
+        walls = []
+        for _ in range(4):
+            batch.reset()
+            walls.extend(tuple(batch.get_env(i).wall) for i in range(len(batch)))
+        assert len(set(walls)) == len(walls)
+
+        # Consecutive resets of a table deal different hands; reseeding starts over.
+        first = batch.reset(seed=5)[0]
+        assert not np.array_equal(batch.reset()[0], first)
+        np.testing.assert_array_equal(batch.reset(seed=5)[0], first)
+
+    def test_play_until_done(self):
+        batch = RiichiEnvBatch(4, game_mode="4p-red-single", seed=42)
+        _, masks, _, _, dones = batch.reset()
+
+        total_rewards = np.zeros((4, 4), dtype=np.int64)
+        for _ in range(2000):
+            if dones.all():
+                break
+            _, masks, actors, rewards, dones = batch.step(_last_legal(masks))
+            total_rewards += rewards
+            assert (actors[dones] == -1).all()
+        assert dones.all()
+
+        for i in range(4):
+            env = batch.get_env(i)
+            assert env.done()
+            assert (total_rewards[i] == np.array(env.scores()) - 25000).all()
+
+    def test_illegal_action_raises(self):
+        batch = RiichiEnvBatch(1, seed=1)
+        _, masks, _, _, _ = batch.reset()
+        illegal = int(np.flatnonzero(masks[0] == 0)[0])
+        with pytest.raises(ValueError):
+            batch.step([illegal])
+
+    def test_wrong_action_count_raises(self):
+        batch = RiichiEnvBatch(2, seed=1)
+        batch.reset()
+        with pytest.raises(ValueError):
+            batch.step([0])
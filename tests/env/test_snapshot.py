@@ -0,0 +1,54 @@
+from riichienv import RiichiEnv
+
+from .helper import helper_act
+
+
+def _summary(env):
+    return (env.hands, env.discards, env.wall, env.scores(), env.current_player, env.phase)
+
+
+def _legal_ids(env):
+    obs_dict = env.get_observations(env.active_players)
+    return {pid: [a.encode() for a in obs.legal_actions()] for pid, obs in obs_dict.items()}
+
+
+def test_restore_returns_to_snapshot():
+    env = RiichiEnv(seed=21, skip_mjai_logging=True)
+    obs_dict = helper_act(env, env.reset(), 10)
+    snap = env.snapshot()
+    before = _summary(env)
+    legal_before = _legal_ids(env)
+
+    helper_act(env, obs_dict, 30)
+    assert _summary(env) != before
+
+    env.restore(snap)
+    assert _summary(env) == before
+    assert _legal_ids(env) == legal_before
+
+
+def test_branches_are_deterministic():
+    env = RiichiEnv(seed=4, game_mode="4p-red-half", skip_mjai_logging=True)
+    obs_dict = env.reset()
+    snap = env.snapshot()
+
+    helper_act(env, obs_dict, 500)
+    first = _summary(env)
+
+    env.restore(snap)
+    helper_act(env, env.get_observations(env.active_players), 500)
+    assert _summary(env) == first
+
+
+def test_snapshot_out_is_updated_in_place():
+    env = RiichiEnv(seed=8, skip_mjai_logging=True)
+    obs_dict = env.reset()
+    snap = env.snapshot()
+    helper_act(env, obs_dict, 12)
+    same = env.snapshot(out=snap)
+    assert same is snap
+    expected = _summary(env)
+
+    helper_act(env, env.get_observations(env.active_players), 12)
+    env.restore(snap)
+    assert _summary(env) == expected
@@ -0,0 +1,49 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from riichienv import RiichiEnv
+
+from .helper import helper_act
+
+
+def _play(seed: int) -> list[int]:
+    env = RiichiEnv(seed=seed, game_mode="4p-red-single", skip_mjai_logging=True)
+    helper_act(env, env.reset(), 2000)
+    return env.scores()
+
+
+def test_envs_can_be_stepped_from_threads():
+    seeds = list(range(8))
+    expected = [_play(seed) for seed in seeds]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(_play, seeds))
+    assert results == expected
+
+
+def test_step_releases_the_gil():
+    stop = threading.Event()
+    ticks = []
+
+    def tick():
+        while not stop.is_set():
+            ticks.append(None)
+            time.sleep(0.0001)
+
+    # With forced switches disabled the ticker can only run while the main thread
+    # has dropped the GIL, i.e. inside reset() and step().
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(60.0)
+    ticker = threading.Thread(target=tick)
+    ticker.start()
+    try:
+        before = len(ticks)
+        for seed in range(4):
+            _play(seed)
+        during = len(ticks) - before
+    finally:
+        stop.set()
+        ticker.join()
+        sys.setswitchinterval(interval)
+    assert during > 0
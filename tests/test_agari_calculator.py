@@ -1,3 +1,6 @@
+import numpy as np
+import pytest
+
 import riichienv as rv
 
 
@@ -139,3 +142,108 @@ def test_yaku_shibari():
     # Ideally should be Yaku Shibari if shape is valid.
     # But for now we just verify it doesn't allow a win.
     assert not res.agari, "Yaku Shibari failed: Allowed agari with only Aka Dora"
+
+
+def test_calc_cache_hits_and_eviction():
+    hand = [12, 17, 21, 68, 68, 80, 80, 83, 96, 104, 120, 120, 122]
+    cond = rv.Conditions(riichi=True)
+    expected = rv.AgariCalculator(hand, []).calc(100, conditions=cond)
+
+    rv.AgariCalculator.set_cache_size(2)
+    try:
+        rv.AgariCalculator.cache_clear()
+        first = rv.AgariCalculator(hand, []).calc(100, conditions=cond)
+        second = rv.AgariCalculator(hand, []).calc(100, conditions=cond)
+        for res in (first, second):
+            assert (res.agari, res.han, res.fu, res.yaku) == (expected.agari, expected.han, expected.fu, expected.yaku)
+        assert rv.AgariCalculator.cache_info() == {"hits": 1, "misses": 1, "maxsize": 2, "currsize": 1}
+
+        # Different dora counts and conditions are cached separately; the oldest entry is evicted.
+        rv.AgariCalculator(hand, []).calc(100, dora_indicators=[116], conditions=cond)
+        rv.AgariCalculator(hand, []).calc(100, conditions=rv.Conditions(riichi=True, ippatsu=True))
+        rv.AgariCalculator(hand, []).calc(100, conditions=cond)
+        info = rv.AgariCalculator.cache_info()
+        assert (info["misses"], info["currsize"]) == (4, 2)
+
+        # calc_batch scores its rows without touching the shared cache.
+        rv.AgariCalculator.calc_batch(np.array([hand], dtype=np.uint8), np.array([100], dtype=np.uint8))
+        assert rv.AgariCalculator.cache_info() == info
+    finally:
+        rv.AgariCalculator.set_cache_size(0)
+        rv.AgariCalculator.cache_clear()
+    assert rv.AgariCalculator.cache_info()["currsize"] == 0
+
+
+def test_conditions_pack_roundtrip():
+    cond = rv.Conditions(tsumo=True, ippatsu=True, rinshan=True, player_wind=2, round_wind=1, tsumi=3)
+    back = rv.Conditions.unpack(cond.pack())
+    assert (back.tsumo, back.riichi, back.ippatsu, back.rinshan) == (True, False, True, True)
+    assert (int(back.player_wind), int(back.round_wind), back.tsumi) == (2, 1, 3)
+
+
+def test_calc_batch_matches_calc():
+    pinfu = [12, 17, 21, 68, 68, 80, 80, 83, 96, 104, 120, 120, 122]
+    # 12m + 999m 456p 11p with a 567m chi: the 3m completes the shape but an open hand has no yaku
+    chi_hand = [0, 4, 32, 33, 34, 48, 52, 56, 36, 37]
+    chi = rv.Meld(rv.MeldType.Chi, [16, 20, 24], True)
+    cases = [
+        (pinfu, [], 100, [], rv.Conditions(riichi=True)),
+        (pinfu, [], 100, [116], rv.Conditions(tsumo=True, player_wind=1)),
+        (chi_hand, [chi], 8, [0], rv.Conditions()),
+        (pinfu, [], 0, [], rv.Conditions(riichi=True)),
+    ]
+
+    pad = 255
+    n = len(cases)
+    tiles = np.full((n, 13), pad, dtype=np.uint8)
+    melds = np.full((n, 4, 4), pad, dtype=np.uint8)
+    meld_types = np.full((n, 4), -1, dtype=np.int8)
+    dora = np.full((n, 5), pad, dtype=np.uint8)
+    for i, (hand, hand_melds, _, indicators, _) in enumerate(cases):
+        tiles[i, : len(hand)] = hand
+        for j, m in enumerate(hand_melds):
+            melds[i, j, : len(m.tiles)] = m.tiles
+            meld_types[i, j] = int(m.meld_type)
+        dora[i, : len(indicators)] = indicators
+    win_tile = np.array([c[2] for c in cases], dtype=np.uint8)
+    conditions = np.array([c[4].pack() for c in cases], dtype=np.uint32)
+
+    out = rv.AgariCalculator.calc_batch(
+        tiles, win_tile, melds, meld_types, dora_indicators=dora, conditions=conditions, num_threads=2
+    )
+    for i, (hand, hand_melds, win, indicators, cond) in enumerate(cases):
+        res = rv.AgariCalculator(hand, hand_melds).calc(win, dora_indicators=indicators, conditions=cond)
+        assert out["agari"][i] == res.agari
+        assert (out["han"][i], out["fu"][i], out["ron_agari"][i]) == (res.han, res.fu, res.ron_agari)
+        assert (out["tsumo_agari_oya"][i], out["tsumo_agari_ko"][i]) == (res.tsumo_agari_oya, res.tsumo_agari_ko)
+        assert [y for y in range(64) if int(out["yaku"][i]) >> y & 1] == sorted(res.yaku)
+    assert out["agari"][0] and not out["agari"][3]
+
+    with pytest.raises(ValueError):
+        rv.AgariCalculator.calc_batch(tiles, win_tile[:2])
+    with pytest.raises(ValueError):
+        rv.AgariCalculator.calc_batch(tiles, win_tile, melds=melds)
+
+    # A kan slot with only padding tiles, and a chi slot missing a tile.
+    empty_kan = meld_types.copy()
+    empty_kan[0, 0] = int(rv.MeldType.Gang)
+    with pytest.raises(ValueError):
+        rv.AgariCalculator.calc_batch(tiles, win_tile, melds, empty_kan)
+    short_chi = melds.copy()
+    short_chi[2, 0, 2] = pad
+    with pytest.raises(ValueError):
+        rv.AgariCalculator.calc_batch(tiles, win_tile, short_chi, meld_types)
+
+
+def test_yaku_names_follow_yaku_ids():
+    # 234m 567m 345p 22p 67s + 8s ron, with 1m as the dora indicator.
+    hand = [4, 8, 12, 17, 20, 24, 40, 41, 44, 48, 53, 92, 96]
+    win_tile = 100
+    cond = rv._riichienv.Conditions(riichi=True, player_wind=rv.Wind.South, round_wind=rv.Wind.East)
+    res = rv._riichienv.AgariCalculator(sorted([*hand, win_tile]), []).calc(win_tile, [0], [], cond)
+
+    assert res.agari
+    assert set(res.yaku) == {2, 12, 14, 31}
+    names = {y.mjsoul_id: y.name_en for y in rv.hand.YakuList.yaku_list}
+    assert res.yaku_names == [names[i] for i in res.yaku]
+    assert {"Riichi", "Pinfu", "Dora"} <= set(res.yaku_names)
@@ -1,4 +1,7 @@
-from riichienv import calculate_score
+import numpy as np
+import pytest
+
+from riichienv import calculate_score, calculate_score_batch
 
 
 def test_calculate_score() -> None:
@@ -6,3 +9,23 @@ def test_calculate_score() -> None:
     assert score.pay_tsumo_oya == 3900
     assert score.pay_tsumo_ko == 2000
     assert score.total == 7900
+
+
+def test_calculate_score_batch_matches_scalar() -> None:
+    han = np.array([1, 2, 3, 4, 5, 6, 13, 26, 2, 3], dtype=np.uint8)
+    fu = np.array([30, 25, 40, 30, 30, 30, 30, 30, 110, 70], dtype=np.uint8)
+    is_oya = np.array([False, True, False, True, False, True, False, True, False, True])
+    is_tsumo = np.array([True, False, False, True, True, False, True, False, False, True])
+    tsumi = np.array([0, 1, 2, 0, 3, 0, 1, 0, 0, 2], dtype=np.uint32)
+
+    out = calculate_score_batch(han, fu, is_oya, is_tsumo, tsumi)
+    for i in range(len(han)):
+        score = calculate_score(int(han[i]), int(fu[i]), bool(is_oya[i]), bool(is_tsumo[i]), int(tsumi[i]))
+        assert out["total"][i] == score.total
+        assert out["pay_ron"][i] == score.pay_ron
+        assert out["pay_tsumo_oya"][i] == score.pay_tsumo_oya
+        assert out["pay_tsumo_ko"][i] == score.pay_tsumo_ko
+    assert out["total"][7] == 96000  # double yakuman, dealer ron
+
+    with pytest.raises(ValueError):
+        calculate_score_batch(han, fu[:3], is_oya, is_tsumo)
@@ -4,7 +4,7 @@ import os
 
 import pytest
 
-from riichienv import MjaiReplay
+from riichienv import MjaiReplay, ReplayLoader
 
 
 @pytest.fixture
@@ -98,3 +98,117 @@ def test_mjai_replay_real_file():
     assert kyokus[0].grp_features()["delta_scores"] == [-4000, -3000, -2000, 9000]
     for idx in range(len(kyokus) - 1):
         assert kyokus[idx + 1].grp_features()["scores"] == kyokus[idx].grp_features()["end_scores"]
+
+
+def test_kyoku_steps_seat_subset():
+    file_path = os.path.join(os.path.dirname(__file__), "data", "126_204_0_mjai.jsonl")
+    if not os.path.exists(file_path):
+        pytest.skip(f"Test file not found: {file_path}")
+
+    kyoku = next(iter(MjaiReplay.from_jsonl(file_path).take_kyokus()))
+    both = [(pid, action.encode()) for pid, _, action in kyoku.steps(seats=[0, 2], skip_single_action=True)]
+    assert {pid for pid, _ in both} == {0, 2}
+    for seat in (0, 2):
+        single = [action.encode() for _, action in kyoku.steps(seat)]
+        assert [a for pid, a in both if pid == seat] == single
+
+    every = [pid for pid, _, _ in kyoku.steps()]
+    assert [pid for pid, _, _ in kyoku.steps(seats=[0, 1, 2, 3])] == every
+
+    with pytest.raises(ValueError):
+        kyoku.steps(0, seats=[1])
+    with pytest.raises(ValueError):
+        kyoku.steps(seats=[4])
+
+
+def test_mjai_replay_iter_jsonl_matches_from_jsonl():
+    file_path = os.path.join(os.path.dirname(__file__), "data", "126_204_0_mjai.jsonl")
+    if not os.path.exists(file_path):
+        pytest.skip(f"Test file not found: {file_path}")
+
+    loaded = [k.grp_features() for k in MjaiReplay.from_jsonl(file_path).take_kyokus()]
+    streamed = [k.grp_features() for k in MjaiReplay.iter_jsonl(file_path)]
+    assert streamed == loaded
+
+
+def test_mjai_replay_iter_jsonl_directory(tmp_path, sample_mjai_data):
+    lines = "".join(json.dumps(event) + "\n" for event in sample_mjai_data)
+    # Two games in one file, and two gzip members in another.
+    (tmp_path / "a.jsonl").write_text(lines * 2)
+    with open(tmp_path / "b.jsonl.gz", "wb") as f:
+        f.write(gzip.compress(lines.encode()))
+        f.write(gzip.compress(lines.encode()))
+    (tmp_path / "notes.txt").write_text("not a log\n")
+
+    kyokus = list(MjaiReplay.iter_jsonl(str(tmp_path)))
+    assert len(kyokus) == 4
+    assert all(len(k.events()) == 4 for k in kyokus)
+    assert MjaiReplay.from_jsonl(str(tmp_path)).num_rounds() == 4
+
+
+def test_mjai_replay_iter_jsonl_reports_bad_line(tmp_path, sample_mjai_data):
+    file_path = tmp_path / "broken.jsonl"
+    lines = [json.dumps(event) for event in sample_mjai_data]
+    file_path.write_text("\n".join(lines + ["{not json"]) + "\n")
+
+    stream = MjaiReplay.iter_jsonl(str(file_path))
+    assert len(next(stream).events()) == 4
+    with pytest.raises(ValueError, match=r"broken\.jsonl:8"):
+        next(stream)
+
+
+def _write_games(tmp_path, sample_mjai_data, count):
+    paths = []
+    for i in range(count):
+        events = json.loads(json.dumps(sample_mjai_data))
+        events[1]["scores"] = [25000 + 100 * i, 25000, 25000, 25000 - 100 * i]
+        path = tmp_path / f"game{i:02d}.jsonl.gz"
+        with gzip.open(path, "wt") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        paths.append(str(path))
+    return paths
+
+
+def test_replay_loader_keeps_file_order(tmp_path, sample_mjai_data):
+    paths = _write_games(tmp_path, sample_mjai_data, 7)
+    expected = [k.grp_features()["scores"] for p in paths for k in MjaiReplay.from_jsonl(p).take_kyokus()]
+
+    loader = ReplayLoader(paths, num_threads=3, prefetch=1)
+    assert loader.num_files == 7
+    assert [k.grp_features()["scores"] for k in loader] == expected
+
+    globbed = ReplayLoader(str(tmp_path / "game*.jsonl.gz"), num_threads=2)
+    assert [k.grp_features()["scores"] for k in globbed] == expected
+
+
+def test_replay_loader_seeded_shuffle(tmp_path, sample_mjai_data):
+    paths = _write_games(tmp_path, sample_mjai_data, 7)
+
+    def order(seed, threads):
+        return [k.grp_features()["scores"][0] for k in ReplayLoader(paths, num_threads=threads, seed=seed)]
+
+    assert order(5, 1) == order(5, 4)
+    assert sorted(order(5, 2)) == [25000 + 100 * i for i in range(7)]
+
+
+def test_replay_loader_errors(tmp_path, sample_mjai_data):
+    with pytest.raises(ValueError):
+        ReplayLoader([], log_format="tenhou")
+
+    paths = _write_games(tmp_path, sample_mjai_data, 1) + [str(tmp_path / "missing.jsonl")]
+    loader = ReplayLoader(paths, num_threads=2)
+    assert next(loader).grp_features()["scores"][0] == 25000
+    with pytest.raises(ValueError):
+        next(loader)
+
+
+def test_replay_loader_streams_kyokus_before_a_bad_line(tmp_path, sample_mjai_data):
+    lines = [json.dumps(event) for event in sample_mjai_data]
+    broken = tmp_path / "broken.jsonl"
+    broken.write_text("\n".join(lines * 3 + ["{not json"]) + "\n")
+
+    loader = ReplayLoader([str(broken)], num_threads=1, prefetch=1)
+    assert [len(next(loader).events()) for _ in range(3)] == [4, 4, 4]
+    with pytest.raises(ValueError, match=r"broken\.jsonl"):
+        next(loader)
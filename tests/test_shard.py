@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from riichienv import MjaiReplay, ShardReader, write_shard
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "126_204_0_mjai.jsonl")
+
+
+@pytest.fixture
+def kyokus():
+    if not os.path.exists(DATA):
+        pytest.skip(f"Test file not found: {DATA}")
+    return list(MjaiReplay.from_jsonl(DATA).take_kyokus())[:3]
+
+
+def test_shard_round_trip(tmp_path, kyokus):
+    path = tmp_path / "train.shard"
+    rows = write_shard(str(path), kyokus)
+    shard = ShardReader(path)
+
+    steps = [(k, pid, obs, action) for k, kyoku in enumerate(kyokus) for pid, obs, action in kyoku.steps()]
+    assert rows == len(shard) == len(steps)
+    assert shard.num_kyokus == len(kyokus)
+    assert shard["features"].shape == (rows, 74, 34)
+    assert not shard["features"].flags.writeable
+
+    for i, (k, pid, obs, action) in enumerate(steps):
+        np.testing.assert_array_equal(shard.features(i), obs.encode())
+        np.testing.assert_array_equal(shard["mask"][i], obs.mask())
+        assert shard["action"][i] == action.encode()
+        assert shard["seat"][i] == pid
+        assert shard["kyoku"][i] == k
+
+    for k, kyoku in enumerate(kyokus):
+        rows_k = shard.kyoku_rows(k)
+        assert (shard["kyoku"][rows_k] == k).all()
+        assert shard["scores"][k].tolist() == kyoku.scores
+        assert shard["end_scores"][k].tolist() == kyoku.end_scores
+
+
+def test_shard_quantized(tmp_path, kyokus):
+    plain, packed = tmp_path / "plain.shard", tmp_path / "packed.shard"
+    write_shard(str(plain), kyokus, channels=["base", "shanten_efficiency"])
+    write_shard(str(packed), kyokus, channels=["base", "shanten_efficiency"], quantize=True)
+    plain, packed = ShardReader(plain), ShardReader(packed)
+
+    assert packed.quantized
+    assert packed["features"].dtype == np.uint8
+    assert packed.channels == ["base", "shanten_efficiency"]
+    expected = plain.features(slice(None))
+    scale = packed["feature_scale"][:, None]
+    assert (np.abs(packed.features(slice(None)) - expected) <= scale / 2 + 1e-6).all()
+    np.testing.assert_array_equal(packed["action"], plain["action"])
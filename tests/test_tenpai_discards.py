@@ -0,0 +1,29 @@
+import pytest
+
+from riichienv import Action, ActionType, check_riichi_candidates, parse_hand, tenpai_discards
+
+from .env.helper import helper_tenpai_obs
+
+
+def test_tenpai_discards_grouped_by_type():
+    # 123m 456p 789s 111z + 2z 5z: discarding either single honour leaves a tanki wait
+    tiles, _ = parse_hand("123m456p789s11125z")
+    assert tenpai_discards(tiles) == {28: [31], 31: [28]}
+
+    candidates = check_riichi_candidates(tiles)
+    assert sorted({t // 4 for t in candidates}) == [28, 31]
+
+
+def test_tenpai_discards_noten_and_invalid():
+    tiles, _ = parse_hand("1479m1479p1479s25z")
+    assert tenpai_discards(tiles) == {}
+    with pytest.raises(ValueError):
+        tenpai_discards([0, 0, 0, 0, 0])
+
+
+def test_riichi_action_carries_tenpai_discards():
+    obs = helper_tenpai_obs()
+    riichi = [a for a in obs.legal_actions() if a.action_type == ActionType.Riichi]
+    assert len(riichi) == 1
+    assert sorted(t // 4 for t in riichi[0].consume_tiles) == [28, 31]
+    assert riichi[0].to_mjai() == Action(ActionType.Riichi).to_mjai()